@@ -0,0 +1,1730 @@
+"""
+almacen.py - Almacén indexado de tareas.
+
+Contiene la clase AlmacenTareas, que guarda las tareas en un diccionario
+indexado por ID (clave primaria) conservando el orden de inserción. Así las
+operaciones de obtener, actualizar y eliminar cuestan O(1) en lugar de
+recorrer toda la lista.
+
+También contiene la clase Tarea, una representación compacta (__slots__) de
+una tarea que se sigue usando como diccionario (tarea['titulo']).
+
+Cuando varios procesos comparten el archivo (ver concurrencia.py), cada
+cambio recibe un número de versión creciente. Quien leyó una tarea puede
+pasar su versión al actualizarla o eliminarla: si otro proceso la modificó
+entretanto, se combinan los cambios que no se pisan o se lanza
+ConflictoEscritura.
+
+ordenar() da las tareas ordenadas por varias claves (prioridad, estado, ID,
+título) o solo las primeras del orden: recorre el índice por prioridad o por
+estado cuando la primera clave es ese campo y selecciona con heapq en lugar
+de ordenar todo.
+
+Los resultados de buscar(), filtrar() y ordenar() se guardan en una caché
+LRU (CacheConsultas) que cada cambio invalida solo para los campos que toca.
+
+Compatibilidad: Python 3.8+
+"""
+
+import heapq
+from collections import Counter, OrderedDict
+from contextlib import nullcontext
+from itertools import islice
+from operator import attrgetter, itemgetter
+
+# Códigos 1-3, los mismos que usan validar_estado y validar_prioridad
+ESTADOS = {1: "pendiente", 2: "en_progreso", 3: "completada"}
+PRIORIDADES = {1: "baja", 2: "media", 3: "alta"}
+CODIGOS_ESTADO = {nombre: codigo for codigo, nombre in ESTADOS.items()}
+CODIGOS_PRIORIDAD = {nombre: codigo for codigo, nombre in PRIORIDADES.items()}
+
+CAMPOS = ("id", "titulo", "descripcion", "estado", "prioridad")
+
+# Valores que se comparan para saber si una tarea cambió (ver reemplazar)
+VALORES_TAREA = attrgetter("titulo", "descripcion", "codigo_estado", "codigo_prioridad")
+
+# Resultados de consultas que conserva cada almacén (ver CacheConsultas)
+CAPACIDAD_CACHE_CONSULTAS = 128
+
+# Tareas a partir de las cuales una búsqueda sin índice usa EscaneoParalelo
+# (ver escaneo.py): con menos, crear y coordinar los procesos cuesta más de
+# lo que ahorran
+UMBRAL_ESCANEO_PARALELO = 200_000
+
+# Campos por los que se puede ordenar y valor que se compara de cada tarea
+# (Tarea o diccionario); los valores desconocidos van antes que los válidos
+VALORES_ORDEN = {
+    "prioridad": lambda tarea: CODIGOS_PRIORIDAD.get(tarea["prioridad"], 0),
+    "estado": lambda tarea: CODIGOS_ESTADO.get(tarea["estado"], 0),
+    "id": itemgetter("id"),
+    "titulo": lambda tarea: tarea["titulo"].lower(),
+}
+# Los mismos valores leídos de los atributos de Tarea, sin pasar por
+# tarea[campo] (los almacenes ordenan así sus tareas); los códigos válidos
+# (1-3) son su propio valor de orden
+ORDEN_CODIGOS = {codigo: codigo for codigo in ESTADOS}
+VALORES_ORDEN_TAREA = {
+    "prioridad": lambda tarea: ORDEN_CODIGOS.get(tarea.codigo_prioridad, 0),
+    "estado": lambda tarea: ORDEN_CODIGOS.get(tarea.codigo_estado, 0),
+    "id": attrgetter("id"),
+    "titulo": lambda tarea: tarea.titulo.lower(),
+}
+# Índice que sirve cada campo para recorrer las tareas ya ordenadas
+CODIGOS_ORDEN = {"estado": CODIGOS_ESTADO, "prioridad": CODIGOS_PRIORIDAD}
+
+
+class ConflictoEscritura(Exception):
+    """
+    Otro proceso modificó o eliminó la tarea desde que se leyó su versión.
+
+    Atributos:
+        tarea_id (int): ID de la tarea.
+        campos (list): Campos que ambos cambiaron con valores distintos
+            (vacío si la tarea se quiso eliminar).
+    """
+
+    def __init__(self, tarea_id, campos=()):
+        self.tarea_id = tarea_id
+        self.campos = list(campos)
+        if self.campos:
+            mensaje = (
+                f"Otro proceso modificó la tarea {tarea_id} "
+                f"({', '.join(self.campos)}) desde que se leyó."
+            )
+        else:
+            mensaje = f"Otro proceso modificó la tarea {tarea_id} desde que se leyó."
+        super().__init__(mensaje)
+
+
+class ContadoresInconsistentes(Exception):
+    """
+    Los contadores incrementales de un almacén no coinciden con sus tareas
+    (ver AlmacenTareas.recalcular_estadisticas).
+
+    Atributos:
+        diferencias (dict): (estado, prioridad) -> (según los contadores,
+            según las tareas), solo de los pares que difieren.
+    """
+
+    def __init__(self, diferencias):
+        self.diferencias = diferencias
+        detalle = ", ".join(
+            f"{estado}/{prioridad}: {contado} en vez de {real}"
+            for (estado, prioridad), (contado, real) in sorted(
+                diferencias.items(), key=str
+            )
+        )
+        super().__init__(f"Contadores inconsistentes ({detalle})")
+
+
+def resumir_conteos(conteos):
+    """
+    Construye el diccionario de estadísticas a partir de conteos por par.
+
+    Parámetros:
+        conteos (dict): (estado, prioridad) -> cantidad de tareas.
+
+    Retorna:
+        dict: Estadísticas con el formato de obtener_estadisticas, más
+            'por_estado_prioridad' con los conteos de cada par.
+    """
+    por_estado = dict.fromkeys(ESTADOS.values(), 0)
+    por_prioridad = dict.fromkeys(PRIORIDADES.values(), 0)
+    total_tareas = 0
+    for (estado, prioridad), cantidad in conteos.items():
+        total_tareas += cantidad
+        if estado in por_estado:
+            por_estado[estado] += cantidad
+        if prioridad in por_prioridad:
+            por_prioridad[prioridad] += cantidad
+
+    completadas = por_estado["completada"]
+    tasa_finalizacion = (completadas / total_tareas * 100) if total_tareas > 0 else 0
+
+    return {
+        "total_tareas": total_tareas,
+        "pendientes": por_estado["pendiente"],
+        "en_progreso": por_estado["en_progreso"],
+        "completadas": completadas,
+        "baja": por_prioridad["baja"],
+        "media": por_prioridad["media"],
+        "alta": por_prioridad["alta"],
+        "tasa_finalizacion": tasa_finalizacion,
+        "por_estado_prioridad": {par: n for par, n in conteos.items() if n},
+    }
+
+
+def reunir_cambios(titulo=None, descripcion=None, estado=None, prioridad=None):
+    """
+    Reúne los campos indicados (no None) de una actualización.
+
+    Parámetros:
+        titulo (str, optional): Nuevo título.
+        descripcion (str, optional): Nueva descripción.
+        estado (str, optional): Nuevo estado (se pasa a minúsculas).
+        prioridad (str, optional): Nueva prioridad (se pasa a minúsculas).
+
+    Retorna:
+        dict: Campo -> nuevo valor.
+    """
+    cambios = {}
+    if titulo is not None:
+        cambios["titulo"] = titulo
+    if descripcion is not None:
+        cambios["descripcion"] = descripcion
+    if estado is not None:
+        cambios["estado"] = estado.lower()
+    if prioridad is not None:
+        cambios["prioridad"] = prioridad.lower()
+    return cambios
+
+
+class Descendente:
+    """
+    Envuelve un valor invirtiendo su comparación (orden descendente de
+    textos, que no se pueden negar como los números).
+
+    Atributos:
+        valor: Valor envuelto.
+    """
+
+    __slots__ = ("valor",)
+
+    def __init__(self, valor):
+        self.valor = valor
+
+    def __lt__(self, otro):
+        return otro.valor < self.valor
+
+    def __eq__(self, otro):
+        return self.valor == otro.valor
+
+    def __repr__(self):
+        return f"Descendente({self.valor!r})"
+
+
+def leer_orden(orden):
+    """
+    Interpreta un criterio de orden de varias claves.
+
+    Cada clave es un campo de VALORES_ORDEN, con '-' delante para orden
+    descendente: '-prioridad,id' da primero las de prioridad alta y, entre
+    ellas, las de menor ID. Los estados y prioridades se ordenan por código
+    (pendiente < en_progreso < completada, baja < media < alta) y los
+    títulos sin distinguir mayúsculas.
+
+    Parámetros:
+        orden (str o iterable): Claves separadas por comas o una secuencia
+            de claves (('-prioridad', 'id')).
+
+    Retorna:
+        tuple: Pares (campo, descendente).
+
+    Lanza:
+        ValueError: Si una clave no es un campo ordenable o no hay claves.
+    """
+    if isinstance(orden, str):
+        orden = orden.split(",")
+    criterios = []
+    for clave in orden:
+        clave = clave.strip().lower()
+        campo = clave.lstrip("+-")
+        if campo not in VALORES_ORDEN:
+            opciones = ", ".join(VALORES_ORDEN)
+            raise ValueError(f"Clave de orden desconocida: {clave!r} (use {opciones})")
+        criterios.append((campo, clave.startswith("-")))
+    if not criterios:
+        raise ValueError("El orden necesita alguna clave")
+    return tuple(criterios)
+
+
+def clave_orden(criterios, extractores=VALORES_ORDEN):
+    """
+    Construye la función clave para sorted() o heapq según unos criterios.
+
+    Parámetros:
+        criterios (tuple): Pares (campo, descendente) (ver leer_orden).
+        extractores (dict, optional): Campo -> función que da el valor a
+            comparar (VALORES_ORDEN_TAREA si todas son Tarea).
+
+    Retorna:
+        callable: tarea -> valor comparable (una tupla con varias claves).
+    """
+    valores = []
+    for campo, descendente in criterios:
+        valor = extractores[campo]
+        if descendente and campo == "titulo":
+            valor = (lambda obtener: lambda tarea: Descendente(obtener(tarea)))(valor)
+        elif descendente:
+            valor = (lambda obtener: lambda tarea: -obtener(tarea))(valor)
+        valores.append(valor)
+    if len(valores) == 1:
+        return valores[0]
+    if len(valores) == 2:
+        primero, segundo = valores
+        return lambda tarea: (primero(tarea), segundo(tarea))
+    return lambda tarea: tuple([valor(tarea) for valor in valores])
+
+
+def seleccionar_ordenadas(tareas, criterios, limite=None, extractores=VALORES_ORDEN):
+    """
+    Ordena un iterable de tareas o selecciona las primeras del orden.
+
+    Con límite se usa heapq.nsmallest, que conserva un montículo de tamaño
+    limite: O(n log limite) en lugar del O(n log n) de ordenar todo. Ambos
+    son estables (a igual clave se respeta el orden de entrada).
+
+    Parámetros:
+        tareas (iterable): Tareas (Tarea o diccionarios).
+        criterios (tuple): Pares (campo, descendente) (ver leer_orden).
+        limite (int, optional): Cantidad de tareas; None para todas.
+        extractores (dict, optional): Ver clave_orden.
+
+    Retorna:
+        list: Tareas en el orden indicado.
+    """
+    clave = clave_orden(criterios, extractores)
+    if limite is None:
+        return sorted(tareas, key=clave)
+    return heapq.nsmallest(limite, tareas, key=clave)
+
+
+class CacheConsultas:
+    """
+    Caché LRU de resultados de consultas de un almacén.
+
+    Cada resultado se guarda junto con la generación de los campos de los
+    que depende. Un cambio en el almacén solo incrementa la generación de
+    los campos que modifica ("id" representa altas y bajas), en O(1); un
+    resultado cuyos campos cambiaron de generación ya no se usa. Así, por
+    ejemplo, cambiar el estado de una tarea no invalida las búsquedas por
+    título. Al superar la capacidad se descarta el menos usado.
+
+    Atributos:
+        capacidad (int): Máximo de resultados guardados; 0 la desactiva.
+        aciertos (int): Consultas respondidas desde la caché.
+        fallos (int): Consultas que hubo que calcular.
+        desalojos (int): Resultados descartados por falta de capacidad.
+    """
+
+    def __init__(self, capacidad=CAPACIDAD_CACHE_CONSULTAS):
+        """
+        Parámetros:
+            capacidad (int, optional): Máximo de resultados guardados.
+        """
+        self.capacidad = capacidad
+        self._resultados = OrderedDict()
+        self._generaciones = dict.fromkeys(CAMPOS, 0)
+        # Consultas perezosas que se están consumiendo (ver iterar)
+        self._llenando = 0
+        self.aciertos = 0
+        self.fallos = 0
+        self.desalojos = 0
+
+    def __len__(self):
+        return len(self._resultados)
+
+    def __repr__(self):
+        return f"CacheConsultas({len(self._resultados)}/{self.capacidad})"
+
+    def consultar(self, clave, campos, calcular):
+        """
+        Retorna el resultado guardado de una consulta o lo calcula y lo guarda.
+
+        Parámetros:
+            clave (tuple): Identifica la consulta y sus argumentos.
+            campos (tuple): Campos de los que depende el resultado.
+            calcular (callable): Calcula el resultado (sin argumentos).
+
+        Retorna:
+            tuple: Resultado de la consulta.
+        """
+        if self.capacidad <= 0:
+            return tuple(calcular())
+        generaciones = self._generaciones_de(campos)
+        entrada = self._buscar(clave, generaciones)
+        if entrada is not None:
+            return entrada
+
+        self.fallos += 1
+        resultado = tuple(calcular())
+        self._guardar(clave, generaciones, resultado)
+        return resultado
+
+    def iterar(self, clave, campos, calcular):
+        """
+        Versión perezosa de consultar(): produce el resultado de una consulta
+        de una en una tarea.
+
+        Un resultado guardado se recorre sin volver a calcularlo. Si no hay
+        ninguno, se calcula a medida que se consume y se guarda solo si se
+        consume completo (una página que se detiene antes no lo guarda) y
+        los campos no cambiaron entretanto.
+
+        Parámetros:
+            clave (tuple): Identifica la consulta y sus argumentos.
+            campos (tuple): Campos de los que depende el resultado.
+            calcular (callable): Retorna un iterable con el resultado (sin
+                argumentos).
+
+        Retorna:
+            iterator: Tareas del resultado.
+        """
+        if self.capacidad <= 0:
+            return iter(calcular())
+        generaciones = self._generaciones_de(campos)
+        entrada = self._buscar(clave, generaciones)
+        if entrada is not None:
+            return iter(entrada)
+
+        self.fallos += 1
+        return self._llenar(clave, campos, generaciones, calcular())
+
+    def _llenar(self, clave, campos, generaciones, tareas):
+        """
+        Produce las tareas de una consulta y guarda el resultado al terminar
+        (ver iterar).
+        """
+        self._llenando += 1
+        try:
+            resultado = []
+            for tarea in tareas:
+                resultado.append(tarea)
+                yield tarea
+        finally:
+            self._llenando -= 1
+        if self._generaciones_de(campos) == generaciones:
+            self._guardar(clave, generaciones, tuple(resultado))
+
+    def _generaciones_de(self, campos):
+        """
+        Retorna la generación actual de cada campo.
+        """
+        return tuple(map(self._generaciones.__getitem__, campos))
+
+    def _buscar(self, clave, generaciones):
+        """
+        Retorna el resultado guardado si sigue vigente, o None.
+        """
+        entrada = self._resultados.get(clave)
+        if entrada is None or entrada[0] != generaciones:
+            return None
+        self._resultados.move_to_end(clave)
+        self.aciertos += 1
+        return entrada[1]
+
+    def _guardar(self, clave, generaciones, resultado):
+        """
+        Guarda un resultado y desaloja los menos usados que sobren.
+        """
+        self._resultados[clave] = (generaciones, resultado)
+        self._resultados.move_to_end(clave)
+        while len(self._resultados) > self.capacidad:
+            self._resultados.popitem(last=False)
+            self.desalojos += 1
+
+    def invalidar(self, campos=CAMPOS):
+        """
+        Descarta los resultados que dependen de alguno de los campos.
+
+        Parámetros:
+            campos (iterable, optional): Campos modificados; por defecto,
+                todos (los resultados guardados dejan de usarse).
+        """
+        if not self._resultados and not self._llenando:
+            return  # Nada que invalidar (p. ej., durante una carga)
+        generaciones = self._generaciones
+        for campo in campos:
+            generaciones[campo] += 1
+
+    def redimensionar(self, capacidad):
+        """
+        Cambia la capacidad, descartando los resultados menos usados que
+        sobren.
+
+        Parámetros:
+            capacidad (int): Nueva capacidad; 0 desactiva la caché.
+        """
+        self.capacidad = capacidad
+        while self._resultados and len(self._resultados) > max(capacidad, 0):
+            self._resultados.popitem(last=False)
+            self.desalojos += 1
+
+    def estadisticas(self):
+        """
+        Retorna los contadores de uso, para dimensionar la caché.
+
+        Retorna:
+            dict: capacidad, entradas, aciertos, fallos, desalojos y
+                tasa_aciertos (porcentaje).
+        """
+        consultas = self.aciertos + self.fallos
+        return {
+            "capacidad": self.capacidad,
+            "entradas": len(self._resultados),
+            "aciertos": self.aciertos,
+            "fallos": self.fallos,
+            "desalojos": self.desalojos,
+            "tasa_aciertos": self.aciertos / consultas * 100 if consultas else 0,
+        }
+
+
+class Tarea:
+    """
+    Tarea compacta con acceso tipo diccionario.
+
+    Usa __slots__ en lugar de un diccionario por tarea y guarda estado y
+    prioridad como códigos 1-3, de modo que las millones de repeticiones de
+    'pendiente', 'alta', etc. no ocupan una cadena por tarea. Un valor fuera
+    de los conocidos se guarda tal cual.
+
+    Se puede usar como diccionario: tarea['estado'], tarea.get('id'),
+    dict(tarea), tarea.update({...}).
+    """
+
+    __slots__ = ("id", "titulo", "descripcion", "codigo_estado", "codigo_prioridad")
+
+    def __init__(self, id, titulo, descripcion, estado, prioridad):
+        self.id = id
+        self.titulo = titulo
+        self.descripcion = descripcion
+        self.codigo_estado = CODIGOS_ESTADO.get(estado, estado)
+        self.codigo_prioridad = CODIGOS_PRIORIDAD.get(prioridad, prioridad)
+
+    @classmethod
+    def desde_dict(cls, datos):
+        """
+        Crea una Tarea a partir de un diccionario con las claves de CAMPOS.
+
+        Parámetros:
+            datos (dict): Datos de la tarea.
+
+        Retorna:
+            Tarea: La tarea compacta.
+        """
+        return cls(
+            datos["id"],
+            datos["titulo"],
+            datos["descripcion"],
+            datos["estado"],
+            datos["prioridad"],
+        )
+
+    @property
+    def estado(self):
+        return ESTADOS.get(self.codigo_estado, self.codigo_estado)
+
+    @estado.setter
+    def estado(self, valor):
+        self.codigo_estado = CODIGOS_ESTADO.get(valor, valor)
+
+    @property
+    def prioridad(self):
+        return PRIORIDADES.get(self.codigo_prioridad, self.codigo_prioridad)
+
+    @prioridad.setter
+    def prioridad(self, valor):
+        self.codigo_prioridad = CODIGOS_PRIORIDAD.get(valor, valor)
+
+    def __getitem__(self, campo):
+        if campo not in CAMPOS:
+            raise KeyError(campo)
+        return getattr(self, campo)
+
+    def __setitem__(self, campo, valor):
+        if campo not in CAMPOS:
+            raise KeyError(campo)
+        setattr(self, campo, valor)
+
+    def __contains__(self, campo):
+        return campo in CAMPOS
+
+    def __iter__(self):
+        return iter(CAMPOS)
+
+    def __len__(self):
+        return len(CAMPOS)
+
+    def __eq__(self, otra):
+        if isinstance(otra, (Tarea, dict)):
+            return dict(self) == dict(otra)
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"Tarea({dict(self)!r})"
+
+    def keys(self):
+        return CAMPOS
+
+    def values(self):
+        return [getattr(self, campo) for campo in CAMPOS]
+
+    def items(self):
+        return [(campo, getattr(self, campo)) for campo in CAMPOS]
+
+    def get(self, campo, defecto=None):
+        if campo not in CAMPOS:
+            return defecto
+        return getattr(self, campo)
+
+    def update(self, cambios):
+        """
+        Actualiza varios campos a la vez, como dict.update.
+
+        Parámetros:
+            cambios (dict): Campos y sus nuevos valores.
+        """
+        for campo, valor in cambios.items():
+            self[campo] = valor
+
+
+class AlmacenTareas:
+    """
+    Almacén de tareas con índice por clave primaria (ID).
+
+    Se comporta como una colección de tareas: se puede recorrer con for,
+    consultar su longitud con len() y usar en condiciones (vacío = False),
+    por lo que las funciones de funciones.py que reciben una lista de
+    tareas funcionan igual con un almacén.
+
+    Las tareas se guardan como objetos Tarea; los diccionarios que se
+    agregan se convierten.
+
+    Además del índice por ID mantiene índices secundarios por estado y por
+    prioridad (código -> {id: orden de inserción}), que se actualizan en
+    cada creación, actualización y eliminación. Filtrar cuesta así
+    O(tamaño del resultado) en lugar de recorrer todas las tareas. También
+    lleva contadores por par (estado, prioridad), de modo que las
+    estadísticas cuestan O(1).
+
+    Atributos:
+        _tareas (dict): Diccionario id -> tarea en orden de inserción.
+        ultimo_id (int): Marca de agua de IDs asignados. Nunca disminuye, de
+            modo que un ID eliminado no se vuelve a usar.
+        diario (DiarioTareas o None): Si está asignado, cada creación,
+            actualización y eliminación se anota en el diario.
+        indice_texto (IndiceTexto o None): Si está asignado, se mantiene al
+            día en cada cambio y buscar() lo usa (ver indice_texto.py).
+        indice_pendiente (callable o None): Asigna indice_texto en la primera
+            búsqueda (ver activar_indice_texto con perezoso=True).
+        version (int): Última versión de cambio asignada o incorporada.
+        generacion (int o None): Generación del diario con la que el almacén
+            está al día (ver concurrencia.py); None si no se cargó de disco.
+        posicion_diario (int o None): Bytes del diario ya incorporados.
+        cache_consultas (CacheConsultas o None): Resultados de buscar(),
+            filtrar() y ordenar(); None si el almacén no la usa.
+        procesos_escaneo (int o None): Procesos con que buscar() escanea un
+            almacén de UMBRAL_ESCANEO_PARALELO tareas o más cuando el índice
+            de texto no resuelve la búsqueda (ver escaneo.py; con 1, sobre
+            las columnas en este proceso); None para recorrerlo en serie.
+    """
+
+    # Puede incorporar los cambios de otros procesos (ver sincronizar_almacen)
+    sincronizable = True
+    # Admite el escaneo en paralelo sobre columnas (ver escaneo.py)
+    escaneable = True
+    indice_pendiente = None
+
+    def __init__(
+        self, tareas=None, ultimo_id=0, capacidad_cache=CAPACIDAD_CACHE_CONSULTAS
+    ):
+        """
+        Inicializa el almacén, opcionalmente con tareas ya existentes.
+
+        Parámetros:
+            tareas (iterable, optional): Tareas (diccionarios o Tarea) a cargar.
+            ultimo_id (int, optional): Marca de agua persistida previamente.
+            capacidad_cache (int, optional): Resultados de consultas que se
+                conservan (ver CacheConsultas); 0 para no guardarlos.
+        """
+        self._tareas = {}
+        self.ultimo_id = ultimo_id
+        self.diario = None
+        self.indice_texto = None
+
+        # Índices secundarios: código -> {id: orden de inserción}
+        self._por_estado = {}
+        self._por_prioridad = {}
+        self._orden = 0
+        # Cubetas (nombre del índice, código) que perdieron el orden de
+        # inserción al mover una tarea; se reordenan al consultarlas
+        self._desordenadas = set()
+        # Contadores: (código de estado, código de prioridad) -> cantidad
+        self._conteos = Counter()
+
+        # Versiones de las tareas cambiadas desde la carga (las demás tienen
+        # versión 0) y de cada uno de sus campos modificados
+        self.version = 0
+        self._versiones = {}
+        self._versiones_campo = {}
+        self.generacion = None
+        self.posicion_diario = None
+        self.cache_consultas = CacheConsultas(capacidad_cache)
+        self.procesos_escaneo = None
+        self._escaneo = None
+
+        if tareas is not None:
+            self._cargar(tareas)
+
+    def _cargar(self, tareas):
+        """
+        Carga inicial: equivale a agregar() cada tarea, pero arma el
+        diccionario, los índices y los contadores de una vez (con un millón
+        de tareas, agregar una por una lleva más tiempo que leerlas).
+
+        Parámetros:
+            tareas (iterable): Tareas (diccionarios o Tarea) a cargar.
+        """
+        tareas = [
+            tarea if isinstance(tarea, Tarea) else Tarea.desde_dict(tarea)
+            for tarea in tareas
+        ]
+        ids = list(map(attrgetter("id"), tareas))
+        self._tareas = dict(zip(ids, tareas))
+        if len(self._tareas) != len(tareas):
+            # IDs repetidos: cada reemplazo conserva la posición del primero
+            self._tareas = {}
+            for tarea in tareas:
+                self.agregar(tarea)
+            return
+
+        self._orden = len(ids)
+        orden = range(1, len(ids) + 1)
+        estados = list(map(attrgetter("codigo_estado"), tareas))
+        prioridades = list(map(attrgetter("codigo_prioridad"), tareas))
+        for indice, codigos in (
+            (self._por_estado, estados),
+            (self._por_prioridad, prioridades),
+        ):
+            for codigo in set(codigos):
+                indice[codigo] = {
+                    tarea_id: posicion
+                    for tarea_id, posicion, otro in zip(ids, orden, codigos)
+                    if otro == codigo
+                }
+        self._conteos.update(zip(estados, prioridades))
+        if ids:
+            self.ultimo_id = max(self.ultimo_id, max(ids))
+
+    def __len__(self):
+        return len(self._tareas)
+
+    def __iter__(self):
+        return iter(self._tareas.values())
+
+    def __contains__(self, tarea_id):
+        return tarea_id in self._tareas
+
+    def __repr__(self):
+        return f"AlmacenTareas({len(self._tareas)} tareas)"
+
+    def ids(self):
+        """
+        Retorna una vista de los IDs almacenados en orden de inserción.
+
+        Retorna:
+            dict_keys: IDs de las tareas.
+        """
+        return self._tareas.keys()
+
+    def proximo_id(self):
+        """
+        Calcula el próximo ID disponible en O(1) a partir de la marca de agua.
+
+        Retorna:
+            int: Próximo ID a utilizar.
+        """
+        return self.ultimo_id + 1
+
+    def agregar(self, tarea):
+        """
+        Agrega una tarea que ya tiene ID (por ejemplo, al cargar del archivo).
+
+        Si ya existe una tarea con el mismo ID, se reemplaza.
+
+        Parámetros:
+            tarea (dict o Tarea): Tarea completa con clave 'id'.
+
+        Retorna:
+            Tarea: La tarea agregada.
+        """
+        if not isinstance(tarea, Tarea):
+            tarea = Tarea.desde_dict(tarea)
+
+        anterior = self._tareas.get(tarea.id)
+        if anterior is not None:
+            # Reemplazo: conserva su posición en el orden de inserción
+            orden = self._desindexar(anterior)
+            if self.indice_texto is not None:
+                self.indice_texto.quitar(anterior)
+        else:
+            self._orden += 1
+            orden = self._orden
+        self._tareas[tarea.id] = tarea
+        self._indexar(tarea, orden)
+        if self.indice_texto is not None:
+            self.indice_texto.agregar(tarea)
+        self._invalidar_consultas()
+
+        if tarea.id > self.ultimo_id:
+            self.ultimo_id = tarea.id
+        return tarea
+
+    def crear(self, titulo, descripcion, estado, prioridad):
+        """
+        Crea una nueva tarea con el próximo ID disponible.
+
+        Parámetros:
+            titulo (str): Título de la tarea.
+            descripcion (str): Descripción de la tarea.
+            estado (str): Estado inicial de la tarea.
+            prioridad (str): Prioridad de la tarea.
+
+        Retorna:
+            Tarea: La tarea creada.
+        """
+        with self.escritura():
+            nueva_tarea = Tarea(
+                self.proximo_id(),
+                titulo,
+                descripcion,
+                estado.lower(),
+                prioridad.lower(),
+            )
+            self.agregar(nueva_tarea)
+            # Todos los campos nacen con la versión de la creación (como en
+            # AlmacenSQLite), para que _comprobar_version los compare
+            self._sellar(nueva_tarea.id, CAMPOS[1:])
+            if self.diario is not None:
+                self.diario.registrar_creacion(nueva_tarea, self.version)
+        return nueva_tarea
+
+    def agregar_lote(self, tareas):
+        """
+        Agrega tareas nuevas que ya tienen ID con una sola versión y un
+        único registro en el diario.
+
+        Los IDs deben calcularse dentro de escritura() para que no coincidan
+        con los que crea otro proceso al mismo tiempo.
+
+        Parámetros:
+            tareas (list): Tareas (diccionarios o Tarea) con IDs nuevos.
+
+        Retorna:
+            list: Las tareas agregadas.
+        """
+        with self.escritura():
+            agregadas = [self.agregar(tarea) for tarea in tareas]
+            if agregadas:
+                self.version += 1
+                for tarea in agregadas:
+                    self._sellar(tarea.id, CAMPOS[1:], self.version)
+                if self.diario is not None:
+                    self.diario.registrar_lote(agregadas, self.version)
+        return agregadas
+
+    def obtener(self, tarea_id):
+        """
+        Busca una tarea por su ID en O(1).
+
+        Parámetros:
+            tarea_id (int): ID de la tarea a buscar.
+
+        Retorna:
+            Tarea o None: La tarea si existe, None en caso contrario.
+        """
+        return self._tareas.get(tarea_id)
+
+    def actualizar(
+        self,
+        tarea_id,
+        titulo=None,
+        descripcion=None,
+        estado=None,
+        prioridad=None,
+        version=None,
+    ):
+        """
+        Actualiza los campos indicados de una tarea existente.
+
+        Si se indica la versión con la que se leyó la tarea y otro proceso la
+        modificó después, los cambios se combinan cuando tocan campos
+        distintos; si ambos cambiaron un mismo campo con valores distintos,
+        se lanza ConflictoEscritura sin modificar nada.
+
+        Parámetros:
+            tarea_id (int): ID de la tarea a actualizar.
+            titulo (str, optional): Nuevo título.
+            descripcion (str, optional): Nueva descripción.
+            estado (str, optional): Nuevo estado.
+            prioridad (str, optional): Nueva prioridad.
+            version (int, optional): Versión leída (ver version_de).
+
+        Retorna:
+            bool: True si la tarea fue actualizada, False si no existe.
+        """
+        with self.escritura():
+            tarea = self._tareas.get(tarea_id)
+            if tarea is None:
+                return False
+
+            # Actualizar solo los campos proporcionados
+            cambios = reunir_cambios(titulo, descripcion, estado, prioridad)
+            self._comprobar_version(tarea_id, version, cambios)
+            if cambios:
+                self._modificar(tarea, cambios)
+                self._sellar(tarea_id, cambios)
+                if self.diario is not None:
+                    self.diario.registrar_actualizacion(tarea_id, cambios, self.version)
+        return True
+
+    def eliminar(self, tarea_id, version=None):
+        """
+        Elimina una tarea por su ID en O(1).
+
+        Parámetros:
+            tarea_id (int): ID de la tarea a eliminar.
+            version (int, optional): Versión leída (ver version_de); si otro
+                proceso modificó la tarea después, se lanza ConflictoEscritura.
+
+        Retorna:
+            bool: True si la tarea fue eliminada, False si no existe.
+        """
+        with self.escritura():
+            if tarea_id not in self._tareas:
+                return False
+            self._comprobar_version(tarea_id, version)
+            self._quitar(tarea_id)
+            self.version += 1
+            if self.diario is not None:
+                self.diario.registrar_eliminacion(tarea_id, self.version)
+        return True
+
+    def actualizar_lote(
+        self, ids, titulo=None, descripcion=None, estado=None, prioridad=None
+    ):
+        """
+        Aplica el mismo cambio a varias tareas en un solo recorrido, con una
+        única versión y un único registro en el diario.
+
+        Se omiten los IDs que no existen y las tareas que ya tienen esos
+        valores.
+
+        Parámetros:
+            ids (iterable): IDs de las tareas a actualizar.
+            titulo (str, optional): Nuevo título.
+            descripcion (str, optional): Nueva descripción.
+            estado (str, optional): Nuevo estado.
+            prioridad (str, optional): Nueva prioridad.
+
+        Retorna:
+            list: IDs de las tareas modificadas.
+        """
+        cambios = reunir_cambios(titulo, descripcion, estado, prioridad)
+        modificadas = []
+        with self.escritura():
+            for tarea_id in dict.fromkeys(ids):
+                tarea = self._tarea_modificable(tarea_id)
+                if tarea is not None and any(
+                    tarea[campo] != valor for campo, valor in cambios.items()
+                ):
+                    modificadas.append(tarea)
+            if modificadas:
+                self.version += 1
+                for tarea in modificadas:
+                    self._modificar(tarea, cambios)
+                    self._sellar(tarea.id, cambios, self.version)
+                if self.diario is not None:
+                    self.diario.registrar_actualizacion_lote(
+                        [tarea.id for tarea in modificadas], cambios, self.version
+                    )
+        return [tarea.id for tarea in modificadas]
+
+    def eliminar_lote(self, ids):
+        """
+        Elimina varias tareas en un solo recorrido, con una única versión y
+        un único registro en el diario. Se omiten los IDs que no existen.
+
+        Parámetros:
+            ids (iterable): IDs de las tareas a eliminar.
+
+        Retorna:
+            list: IDs de las tareas eliminadas.
+        """
+        with self.escritura():
+            eliminadas = [
+                tarea_id
+                for tarea_id in dict.fromkeys(ids)
+                if self._quitar(tarea_id) is not None
+            ]
+            if eliminadas:
+                self.version += 1
+                if self.diario is not None:
+                    self.diario.registrar_eliminacion_lote(eliminadas, self.version)
+        return eliminadas
+
+    def escritura(self, esperar=True):
+        """
+        Retorna el contexto en el que se hacen los cambios del almacén.
+
+        Con diario, toma el cerrojo de escritura del archivo e incorpora antes
+        los cambios de otros procesos (ver DiarioTareas.escritura); sin diario
+        no hace nada. Los bloques se pueden anidar: los cambios de un mismo
+        with se aplican sin que otro proceso escriba en medio.
+
+        Parámetros:
+            esperar (bool, optional): Si es False y el cerrojo está tomado,
+                el contexto lanza CerrojoOcupado (ver concurrencia.py) en
+                lugar de esperarlo.
+
+        Retorna:
+            context manager: Contexto para usar con with.
+        """
+        if self.diario is None:
+            return nullcontext()
+        return self.diario.escritura(esperar)
+
+    def lote(self):
+        """
+        Retorna el contexto para aplicar muchos cambios en memoria y
+        persistirlos una vez al final.
+
+        Como escritura(), pero el diario retiene los registros del bloque y
+        los escribe juntos al salir (ver DiarioTareas.lote); sin diario no
+        hace nada.
+
+        Retorna:
+            context manager: Contexto para usar con with.
+        """
+        if self.diario is None:
+            return nullcontext()
+        return self.diario.lote()
+
+    def asegurar_cambios(self):
+        """
+        Deja en disco los cambios ya hechos, aunque el diario no los
+        sincronice por su modo de durabilidad (ver DiarioTareas.asegurar).
+
+        Sin diario no hace nada: los cambios solo existen en memoria hasta
+        que se guarda el almacén.
+        """
+        if self.diario is not None:
+            self.diario.asegurar()
+
+    def version_de(self, tarea_id):
+        """
+        Retorna la versión actual de una tarea.
+
+        Parámetros:
+            tarea_id (int): ID de la tarea.
+
+        Retorna:
+            int: Versión del último cambio conocido (0 si no cambió desde la
+                carga).
+        """
+        return self._versiones.get(tarea_id, 0)
+
+    def ids_cambiados_desde(self, version):
+        """
+        Retorna los IDs de las tareas creadas o modificadas después de una
+        versión (las eliminadas no aparecen).
+
+        Parámetros:
+            version (int): Versión de referencia (por ejemplo, self.version
+                en un momento anterior).
+
+        Retorna:
+            list: IDs con versión mayor que la indicada.
+        """
+        return [tarea_id for tarea_id, v in self._versiones.items() if v > version]
+
+    def _sellar(self, tarea_id, campos=(), version=None):
+        """
+        Registra la versión de un cambio de una tarea y de sus campos.
+
+        Parámetros:
+            tarea_id (int): ID de la tarea cambiada.
+            campos (iterable, optional): Campos modificados.
+            version (int, optional): Versión del cambio; por defecto, la
+                siguiente a la última asignada.
+
+        Retorna:
+            int: Versión registrada.
+        """
+        if version is None:
+            self.version += 1
+            version = self.version
+        elif version > self.version:
+            self.version = version
+        self._versiones[tarea_id] = version
+        if campos:
+            versiones_campo = self._versiones_campo.setdefault(tarea_id, {})
+            for campo in campos:
+                versiones_campo[campo] = version
+        return version
+
+    def _comprobar_version(self, tarea_id, version, cambios=None):
+        """
+        Comprueba que un cambio hecho sobre una versión leída no pise otro.
+
+        Parámetros:
+            tarea_id (int): ID de la tarea (existente).
+            version (int o None): Versión leída; None para no comprobar.
+            cambios (dict, optional): Campos a modificar; None si se elimina.
+
+        Lanza:
+            ConflictoEscritura: Si la tarea cambió y los cambios no se pueden
+                combinar.
+        """
+        if version is None or self._versiones.get(tarea_id, 0) == version:
+            return
+        if cambios is None:
+            raise ConflictoEscritura(tarea_id)
+        tarea = self._tareas[tarea_id]
+        versiones_campo = self._versiones_campo.get(tarea_id, {})
+        en_conflicto = [
+            campo
+            for campo, valor in cambios.items()
+            if versiones_campo.get(campo, 0) > version and tarea[campo] != valor
+        ]
+        if en_conflicto:
+            raise ConflictoEscritura(tarea_id, en_conflicto)
+
+    def _modificar(self, tarea, cambios):
+        """
+        Aplica cambios a una tarea manteniendo los índices.
+
+        Parámetros:
+            tarea (Tarea): Tarea almacenada.
+            cambios (dict): Campos y sus nuevos valores.
+        """
+        reindexar = "estado" in cambios or "prioridad" in cambios
+        retexto = self.indice_texto is not None and (
+            "titulo" in cambios or "descripcion" in cambios
+        )
+        if reindexar:
+            orden = self._desindexar(tarea)
+        if retexto:
+            self.indice_texto.quitar(tarea)
+        tarea.update(cambios)
+        if reindexar:
+            self._indexar(tarea, orden)
+        if retexto:
+            self.indice_texto.agregar(tarea)
+        self._invalidar_consultas(cambios)
+
+    def _tarea_modificable(self, tarea_id):
+        """
+        Retorna la tarea almacenada que se va a modificar.
+
+        Parámetros:
+            tarea_id (int): ID de la tarea.
+
+        Retorna:
+            Tarea o None: La tarea, o None si no existe.
+        """
+        return self._tareas.get(tarea_id)
+
+    def _quitar(self, tarea_id):
+        """
+        Quita una tarea y sus índices, sin anotarlo en el diario.
+
+        Parámetros:
+            tarea_id (int): ID de la tarea.
+
+        Retorna:
+            Tarea o None: La tarea quitada, o None si no existía.
+        """
+        tarea = self._tareas.pop(tarea_id, None)
+        if tarea is None:
+            return None
+        self._desindexar(tarea)
+        if self.indice_texto is not None:
+            self.indice_texto.quitar(tarea)
+        self._versiones.pop(tarea_id, None)
+        self._versiones_campo.pop(tarea_id, None)
+        self._invalidar_consultas(("id",))
+        return tarea
+
+    def _invalidar_consultas(self, campos=CAMPOS):
+        """
+        Invalida los resultados de consultas que dependen de los campos
+        modificados (ver CacheConsultas.invalidar).
+
+        Parámetros:
+            campos (iterable, optional): Campos modificados ("id" para altas
+                y bajas); por defecto, todos.
+        """
+        if self.cache_consultas is not None:
+            self.cache_consultas.invalidar(campos)
+
+    def aplicar_registros(self, registros):
+        """
+        Aplica registros del diario (pendientes al cargar o escritos por otro
+        proceso) sin volver a anotarlos, con la versión de cada registro.
+
+        Parámetros:
+            registros (iterable): Registros leídos del diario (ver
+                leer_registros en funciones.py).
+        """
+        for registro in registros:
+            operacion = registro.get("op")
+            version = registro.get("v", 0)
+            if operacion == "crear":
+                tarea = self.agregar(registro["tarea"])
+                self._sellar(tarea.id, CAMPOS[1:], version)
+            elif operacion == "actualizar":
+                tarea = self._tareas.get(registro["id"])
+                if tarea is not None:
+                    self._modificar(tarea, registro["cambios"])
+                    self._sellar(tarea.id, registro["cambios"], version)
+            elif operacion == "eliminar":
+                self._quitar(registro["id"])
+                self.version = max(self.version, version)
+
+    def reemplazar(self, tareas, version):
+        """
+        Deja el almacén igual a un estado recargado de disco aplicando solo
+        las diferencias, sin anotarlas.
+
+        Se conservan el objeto, sus índices y el orden de las tareas que no
+        cambiaron. Los campos que difieren reciben una versión nueva, de modo
+        que quien leyó la versión anterior detecta el conflicto.
+
+        Parámetros:
+            tareas (iterable): Tareas del estado recargado (diccionarios o Tarea).
+            version (int): Última versión que contiene ese estado.
+
+        Retorna:
+            bool: True si había alguna diferencia.
+        """
+        nuevas = {}
+        for tarea in tareas:
+            if not isinstance(tarea, Tarea):
+                tarea = Tarea.desde_dict(tarea)
+            nuevas[tarea.id] = tarea
+        self.version = max(self.version, version)
+
+        eliminadas = [tarea_id for tarea_id in self._tareas if tarea_id not in nuevas]
+        for tarea_id in eliminadas:
+            self._quitar(tarea_id)
+        distintas = bool(eliminadas)
+        for tarea_id, nueva in nuevas.items():
+            actual = self._tareas.get(tarea_id)
+            if actual is None:
+                self.agregar(nueva)
+                self._sellar(tarea_id, CAMPOS[1:], self.version)
+                distintas = True
+            elif VALORES_TAREA(actual) != VALORES_TAREA(nueva):
+                cambios = {
+                    campo: nueva[campo]
+                    for campo in CAMPOS[1:]
+                    if actual[campo] != nueva[campo]
+                }
+                self._modificar(actual, cambios)
+                self._sellar(tarea_id, cambios, self.version)
+                distintas = True
+        return distintas
+
+    def _indexar(self, tarea, orden):
+        """
+        Agrega una tarea a los índices de estado y prioridad.
+
+        Parámetros:
+            tarea (Tarea): Tarea a indexar.
+            orden (int): Posición de la tarea en el orden de inserción.
+        """
+        for nombre, indice, codigo in (
+            ("estado", self._por_estado, tarea.codigo_estado),
+            ("prioridad", self._por_prioridad, tarea.codigo_prioridad),
+        ):
+            cubeta = indice.get(codigo)
+            if cubeta is None:
+                cubeta = indice[codigo] = {}
+            elif orden != self._orden:
+                # No es la última insertada: la cubeta queda desordenada
+                self._desordenadas.add((nombre, codigo))
+            cubeta[tarea.id] = orden
+        self._conteos[tarea.codigo_estado, tarea.codigo_prioridad] += 1
+
+    def _desindexar(self, tarea):
+        """
+        Quita una tarea de los índices de estado y prioridad.
+
+        Parámetros:
+            tarea (Tarea): Tarea a quitar.
+
+        Retorna:
+            int: Posición que tenía la tarea en el orden de inserción.
+        """
+        orden = self._por_estado[tarea.codigo_estado].pop(tarea.id)
+        del self._por_prioridad[tarea.codigo_prioridad][tarea.id]
+        self._conteos[tarea.codigo_estado, tarea.codigo_prioridad] -= 1
+        return orden
+
+    def _cubeta(self, nombre, indice, codigo):
+        """
+        Retorna la cubeta de un índice, reordenándola si hace falta.
+
+        Parámetros:
+            nombre (str): 'estado' o 'prioridad'.
+            indice (dict): Índice correspondiente.
+            codigo (int o str): Código buscado.
+
+        Retorna:
+            dict: {id: orden} en orden de inserción (vacío si no hay tareas).
+        """
+        cubeta = indice.get(codigo)
+        if cubeta is None:
+            return {}
+        if (nombre, codigo) in self._desordenadas:
+            cubeta = indice[codigo] = dict(sorted(cubeta.items(), key=itemgetter(1)))
+            self._desordenadas.discard((nombre, codigo))
+        return cubeta
+
+    def filtrar(self, estado=None, prioridad=None):
+        """
+        Retorna las tareas que cumplen todos los criterios indicados.
+
+        Parámetros:
+            estado (str, optional): Estado buscado (no distingue mayúsculas).
+            prioridad (str, optional): Prioridad buscada.
+
+        Retorna:
+            list: Tareas que coinciden, en orden de inserción.
+        """
+        # Se retorna una copia: quien la reciba puede modificarla
+        return list(self.iterar_filtradas(estado, prioridad))
+
+    def iterar_filtradas(self, estado=None, prioridad=None):
+        """
+        Versión perezosa de filtrar(): produce las tareas de una en una.
+
+        Pasa por la caché de consultas (ver CacheConsultas.iterar): un
+        resultado guardado se recorre sin recalcularlo y uno nuevo se guarda
+        cuando se consume completo. El almacén no debe modificarse mientras
+        se consume.
+
+        Parámetros:
+            estado (str, optional): Estado buscado (no distingue mayúsculas).
+            prioridad (str, optional): Prioridad buscada.
+
+        Retorna:
+            iterator: Tareas que coinciden, en orden de inserción.
+        """
+        if self.cache_consultas is None:
+            return self._recorrer_filtradas(estado, prioridad)
+        estado = estado.lower() if estado is not None else None
+        prioridad = prioridad.lower() if prioridad is not None else None
+        campos = ("id",)
+        if estado is not None:
+            campos += ("estado",)
+        if prioridad is not None:
+            campos += ("prioridad",)
+        return self.cache_consultas.iterar(
+            ("filtrar", estado, prioridad),
+            campos,
+            lambda: self._recorrer_filtradas(estado, prioridad),
+        )
+
+    def _recorrer_filtradas(self, estado=None, prioridad=None):
+        """
+        Calcula iterar_filtradas() sin pasar por la caché.
+
+        Con varios criterios se recorre la cubeta más pequeña y se comprueba
+        la pertenencia a las demás (intersección), conservando el orden de
+        inserción.
+
+        Parámetros:
+            estado (str, optional): Estado buscado (no distingue mayúsculas).
+            prioridad (str, optional): Prioridad buscada.
+
+        Retorna:
+            iterator: Tareas que coinciden, en orden de inserción.
+        """
+        cubetas = []
+        if estado is not None:
+            estado = estado.lower()
+            codigo = CODIGOS_ESTADO.get(estado, estado)
+            cubetas.append(self._cubeta("estado", self._por_estado, codigo))
+        if prioridad is not None:
+            prioridad = prioridad.lower()
+            codigo = CODIGOS_PRIORIDAD.get(prioridad, prioridad)
+            cubetas.append(self._cubeta("prioridad", self._por_prioridad, codigo))
+        if not cubetas:
+            return iter(self._tareas.values())
+
+        cubetas.sort(key=len)
+        menor, resto = cubetas[0], cubetas[1:]
+        tareas = self._tareas
+        if not resto:
+            return (tareas[tarea_id] for tarea_id in menor)
+        return (
+            tareas[tarea_id]
+            for tarea_id in menor
+            if all(tarea_id in cubeta for cubeta in resto)
+        )
+
+    def buscar(self, termino, campos=("titulo",)):
+        """
+        Busca tareas que contengan el término (parcial, sin distinguir
+        mayúsculas) en alguno de los campos indicados.
+
+        Parámetros:
+            termino (str): Término a buscar.
+            campos (tuple, optional): Campos donde buscar.
+
+        Retorna:
+            list: Tareas que coinciden, en orden de inserción.
+        """
+        return list(self.iterar_busqueda(termino, campos))
+
+    def iterar_busqueda(self, termino, campos=("titulo",)):
+        """
+        Versión perezosa de buscar(): produce las tareas de una en una.
+
+        Pasa por la caché de consultas como iterar_filtradas(). El almacén
+        no debe modificarse mientras se consume.
+
+        Parámetros:
+            termino (str): Término a buscar.
+            campos (tuple, optional): Campos donde buscar.
+
+        Retorna:
+            iterator: Tareas que coinciden, en orden de inserción.
+        """
+        if self.cache_consultas is None:
+            return self._recorrer_busqueda(termino, campos)
+        termino = termino.lower()
+        campos = tuple(campos)
+        return self.cache_consultas.iterar(
+            ("buscar", termino, campos),
+            ("id",) + campos,
+            lambda: self._recorrer_busqueda(termino, campos),
+        )
+
+    def _recorrer_busqueda(self, termino, campos=("titulo",)):
+        """
+        Calcula iterar_busqueda() sin pasar por la caché.
+
+        Si hay un índice de texto que cubre los campos, solo se comprueban
+        las tareas candidatas; si no, se recorren todas.
+
+        Parámetros:
+            termino (str): Término a buscar.
+            campos (tuple, optional): Campos donde buscar.
+
+        Retorna:
+            iterator: Tareas que coinciden, en orden de inserción.
+        """
+        if self.indice_pendiente is not None:
+            activar, self.indice_pendiente = self.indice_pendiente, None
+            activar()
+        termino = termino.lower()
+        candidatos = None
+        indice = self.indice_texto
+        if indice is not None and set(campos) <= set(indice.campos):
+            candidatos = indice.candidatos(termino)
+
+        if candidatos is None:
+            if self.procesos_escaneo and len(self) >= UMBRAL_ESCANEO_PARALELO:
+                encontradas = self._buscar_en_paralelo(termino, campos)
+                if encontradas is not None:
+                    return iter(encontradas)
+            return (
+                tarea
+                for tarea in self
+                if any(termino in tarea[campo].lower() for campo in campos)
+            )
+
+        if len(candidatos) * 8 > len(self._tareas):
+            # Muchas candidatas: recorrer en orden es más barato que ordenar
+            tareas = (
+                tarea for tarea in self._tareas.values() if tarea.id in candidatos
+            )
+        else:
+            tareas = sorted(
+                (self._tareas[tarea_id] for tarea_id in candidatos),
+                key=self._orden_de,
+            )
+        if len(termino) == 3 and set(campos) == set(indice.campos):
+            # Un único trigrama de los mismos campos: todas coinciden
+            return iter(tareas)
+        if len(campos) == 1:
+            campo = campos[0]
+            return (
+                tarea for tarea in tareas if termino in getattr(tarea, campo).lower()
+            )
+        return (
+            tarea
+            for tarea in tareas
+            if any(termino in getattr(tarea, campo).lower() for campo in campos)
+        )
+
+    def _buscar_en_paralelo(self, termino, campos):
+        """
+        Resuelve una búsqueda sin índice con EscaneoParalelo.
+
+        El escaneo (y su instantánea en columnas) se crea en la primera
+        búsqueda que lo necesita y se reutiliza en las siguientes. Si falla
+        (no se pueden crear los procesos o los archivos temporales), se
+        cierra y las búsquedas vuelven a recorrer el almacén en serie.
+
+        Parámetros:
+            termino (str): Término en minúsculas.
+            campos (tuple): Campos donde buscar.
+
+        Retorna:
+            list o None: Tareas que coinciden en orden de inserción, o None
+                si el escaneo falló.
+        """
+        if self._escaneo is None:
+            from escaneo import EscaneoParalelo
+
+            self._escaneo = EscaneoParalelo(
+                self, self.procesos_escaneo, umbral=UMBRAL_ESCANEO_PARALELO
+            )
+        try:
+            encontradas = self._escaneo.escanear(termino, campos)
+        except (OSError, RuntimeError):
+            # RuntimeError incluye BrokenProcessPool
+            self.cerrar_escaneo()
+            self.procesos_escaneo = None
+            return None
+        # El escaneo las da en orden de ID, casi siempre el de inserción
+        encontradas.sort(key=self._orden_de)
+        return encontradas
+
+    def cerrar_escaneo(self):
+        """
+        Detiene los procesos del escaneo en paralelo y borra su instantánea,
+        si se llegó a crear (ver procesos_escaneo).
+        """
+        if self._escaneo is not None:
+            escaneo, self._escaneo = self._escaneo, None
+            escaneo.cerrar()
+
+    def ordenar(self, orden, limite=None, estado=None, prioridad=None):
+        """
+        Retorna las tareas (opcionalmente filtradas) en el orden indicado.
+
+        Parámetros:
+            orden (str o iterable): Claves de orden (ver leer_orden).
+            limite (int, optional): Cantidad de tareas (las primeras del
+                orden); None para todas.
+            estado (str, optional): Estado buscado (no distingue mayúsculas).
+            prioridad (str, optional): Prioridad buscada.
+
+        Retorna:
+            list: Tareas ordenadas; a igual clave, en orden de inserción.
+
+        Lanza:
+            ValueError: Si el orden no es válido.
+        """
+        criterios = leer_orden(orden)
+        if self.cache_consultas is None:
+            return list(self.iterar_ordenadas(orden, limite, estado, prioridad))
+        estado = estado.lower() if estado is not None else None
+        prioridad = prioridad.lower() if prioridad is not None else None
+        campos = ("id",) + tuple(campo for campo, _ in criterios)
+        if estado is not None:
+            campos += ("estado",)
+        if prioridad is not None:
+            campos += ("prioridad",)
+        return list(
+            self.cache_consultas.consultar(
+                ("ordenar", criterios, limite, estado, prioridad),
+                campos,
+                lambda: self.iterar_ordenadas(orden, limite, estado, prioridad),
+            )
+        )
+
+    def iterar_ordenadas(self, orden, limite=None, estado=None, prioridad=None):
+        """
+        Versión de ordenar() que produce las tareas de una en una.
+
+        Si la primera clave es el estado o la prioridad, las tareas salen del
+        índice correspondiente, que ya las agrupa por código: se recorren las
+        cubetas en orden y solo se ordena cada una por las claves restantes
+        (con heapq hasta completar el límite), o se recorre el otro índice
+        dentro de ella si la segunda clave es el otro campo. Las 20
+        pendientes de mayor prioridad se obtienen así leyendo solo la cubeta
+        'alta' (y las siguientes si no alcanza), sin ordenar nada. Con otra
+        primera clave se seleccionan con heapq sobre las filtradas. El
+        almacén no debe modificarse mientras se consume.
+
+        Parámetros:
+            orden (str o iterable): Claves de orden (ver leer_orden).
+            limite (int, optional): Cantidad de tareas; None para todas.
+            estado (str, optional): Estado buscado (no distingue mayúsculas).
+            prioridad (str, optional): Prioridad buscada.
+
+        Retorna:
+            iterator: Tareas ordenadas; a igual clave, en orden de inserción.
+
+        Lanza:
+            ValueError: Si el orden no es válido.
+        """
+        criterios = leer_orden(orden)
+        campo = criterios[0][0]
+        valores = self._valores_indice(campo) if campo in CODIGOS_ORDEN else None
+        if valores is None:
+            tareas = self._recorrer_filtradas(estado, prioridad)
+            return iter(
+                seleccionar_ordenadas(tareas, criterios, limite, VALORES_ORDEN_TAREA)
+            )
+        return self._recorrer_indice(criterios, valores, limite, estado, prioridad)
+
+    def _recorrer_indice(self, criterios, valores, limite, estado, prioridad):
+        """
+        Produce las tareas ordenadas recorriendo un índice por código.
+
+        Parámetros:
+            criterios (tuple): Pares (campo, descendente); el primer campo es
+                'estado' o 'prioridad'.
+            valores (list): Valores presentes en el índice de ese campo.
+            limite (int o None): Cantidad de tareas; None para todas.
+            estado (str o None): Estado buscado.
+            prioridad (str o None): Prioridad buscada.
+
+        Retorna:
+            generator: Tareas ordenadas.
+        """
+        (campo, descendente), resto = criterios[0], criterios[1:]
+        filtro = {"estado": estado, "prioridad": prioridad}
+        fijo = filtro.pop(campo)
+        if fijo is not None:
+            valores = [valor for valor in valores if valor == fijo.lower()]
+        # Valores con el mismo código de orden (los desconocidos valen 0)
+        grupos = {}
+        for valor in valores:
+            grupos.setdefault(CODIGOS_ORDEN[campo].get(valor, 0), []).append(valor)
+        clave = clave_orden(resto, VALORES_ORDEN_TAREA) if resto else None
+
+        faltan = limite
+        for codigo in sorted(grupos, reverse=descendente):
+            if faltan is not None and faltan <= 0:
+                return
+            grupo = grupos[codigo]
+            ordenadas = clave is None
+            if len(grupo) == 1 and resto and resto[0][0] in CODIGOS_ORDEN:
+                # La siguiente clave también tiene índice: se recorre dentro
+                # de la cubeta en lugar de ordenarla
+                dentro = dict(filtro, **{campo: grupo[0]})
+                tareas = self._recorrer_indice(
+                    resto,
+                    self._valores_indice(resto[0][0]),
+                    faltan,
+                    dentro["estado"],
+                    dentro["prioridad"],
+                )
+                ordenadas = True
+            elif len(grupo) == 1:
+                tareas = self._recorrer_filtradas(**filtro, **{campo: grupo[0]})
+            else:
+                # Varias cubetas empatadas: recorrerlas juntas en su orden
+                tareas = (
+                    tarea
+                    for tarea in self._recorrer_filtradas(**filtro)
+                    if tarea[campo] in grupo
+                )
+            if ordenadas:
+                tareas = tareas if faltan is None else islice(tareas, faltan)
+            elif faltan is None:
+                tareas = sorted(tareas, key=clave)
+            else:
+                tareas = heapq.nsmallest(faltan, tareas, key=clave)
+            for tarea in tareas:
+                if faltan is not None:
+                    faltan -= 1
+                yield tarea
+
+    def _valores_indice(self, campo):
+        """
+        Retorna los valores presentes en el índice de estado o prioridad.
+
+        Parámetros:
+            campo (str): 'estado' o 'prioridad'.
+
+        Retorna:
+            list o None: Valores con alguna tarea; None si el almacén no
+                tiene ese índice (iterar_ordenadas selecciona entonces con
+                heapq).
+        """
+        indice, nombres = (
+            (self._por_estado, ESTADOS)
+            if campo == "estado"
+            else (self._por_prioridad, PRIORIDADES)
+        )
+        return [nombres.get(codigo, codigo) for codigo, ids in indice.items() if ids]
+
+    def _orden_de(self, tarea):
+        """
+        Retorna la posición de una tarea en el orden de inserción.
+
+        Parámetros:
+            tarea (Tarea): Tarea almacenada.
+
+        Retorna:
+            int: Orden de inserción.
+        """
+        return self._por_estado[tarea.codigo_estado][tarea.id]
+
+    def estadisticas(self):
+        """
+        Retorna las estadísticas a partir de los contadores, en O(1).
+
+        Retorna:
+            dict: Estadísticas (ver resumir_conteos).
+        """
+        return resumir_conteos(
+            {
+                (ESTADOS.get(estado, estado), PRIORIDADES.get(prioridad, prioridad)): n
+                for (estado, prioridad), n in self._conteos.items()
+            }
+        )
+
+    def recalcular_estadisticas(self, reparar=False):
+        """
+        Recalcula los contadores recorriendo todas las tareas una sola vez y
+        los compara con los incrementales.
+
+        Sirve para comprobar su consistencia: si difieren, lanza
+        ContadoresInconsistentes con las diferencias y los deja como están,
+        salvo con reparar=True, que los reemplaza por los recalculados.
+
+        Parámetros:
+            reparar (bool, optional): Reemplazar los contadores que no
+                coincidan en lugar de lanzar la excepción.
+
+        Retorna:
+            dict: Estadísticas recalculadas (ver resumir_conteos).
+
+        Lanza:
+            ContadoresInconsistentes: Si los contadores no coinciden y no se
+                pidió repararlos.
+        """
+        conteos = Counter(map(itemgetter("estado", "prioridad"), self))
+        recalculados = Counter()
+        for (estado, prioridad), n in conteos.items():
+            codigos = (
+                CODIGOS_ESTADO.get(estado, estado),
+                CODIGOS_PRIORIDAD.get(prioridad, prioridad),
+            )
+            recalculados[codigos] = n
+
+        diferencias = {
+            (ESTADOS.get(estado, estado), PRIORIDADES.get(prioridad, prioridad)): (
+                self._conteos[estado, prioridad],
+                recalculados[estado, prioridad],
+            )
+            for estado, prioridad in set(self._conteos) | set(recalculados)
+            if self._conteos[estado, prioridad] != recalculados[estado, prioridad]
+        }
+        if diferencias:
+            if not reparar:
+                raise ContadoresInconsistentes(diferencias)
+            self._conteos = recalculados
+        return resumir_conteos(conteos)
@@ -0,0 +1,621 @@
+"""
+almacen_mmap.py - Almacén de tareas perezoso respaldado por mmap.
+
+AlmacenMapeado no carga tareas.txt en memoria: mapea el archivo con mmap y
+usa un índice ordenado ID -> desplazamiento guardado en tareas.txt.idx.
+El índice también se mapea, por lo que abrir un archivo de varios GB solo
+cuesta validar la cabecera del índice; cada tarea se convierte en un objeto
+Tarea cuando se accede a ella y puede desalojarse de la caché.
+
+Los cambios (crear, actualizar, eliminar) se guardan en memoria sobre el
+archivo mapeado y se escriben al llamar a guardar_tareas (o con un
+DiarioTareas, igual que con AlmacenTareas). Los de otros procesos se
+incorporan como en AlmacenTareas: los registros nuevos del diario se aplican
+sobre la capa de cambios y, si otro proceso compactó, se vuelve a mapear el
+archivo (ver AlmacenMapeado.releer). El motor "mmap" de
+almacenamiento.py (TAREAS_MOTOR=mmap, --motor mmap) lo abre con su diario.
+
+Formato de tareas.txt.idx (enteros de 64 bits, orden nativo):
+    MAGIA_INDICE | tamaño del archivo | mtime_ns | cantidad
+    ids ordenados (cantidad) | desplazamientos de cada línea (cantidad)
+
+Compatibilidad: Python 3.8+
+"""
+
+import mmap
+import os
+import re
+import struct
+from array import array
+from bisect import bisect_left
+from collections import Counter, OrderedDict
+from operator import itemgetter
+
+from almacen import AlmacenTareas, Tarea, resumir_conteos
+from funciones import (
+    CABECERA_FORMATO,
+    TAMANO_BLOQUE,
+    archivo_atomico,
+    cargar_secuencia,
+    leer_registros,
+    leer_sin_cerrojos,
+    parsear_bloque,
+    parsear_lineas,
+    ruta_diario,
+)
+
+MAGIA_INDICE = b"TIDX0001"
+CABECERA_INDICE = struct.Struct("=8sqqq")
+PATRON_ID = re.compile(rb"^[ \t]*(\d+)\|", re.MULTILINE)
+
+
+def ruta_indice(archivo="tareas.txt"):
+    """
+    Retorna la ruta del índice de desplazamientos del archivo de tareas.
+
+    Parámetros:
+        archivo (str): Archivo de tareas.
+
+    Retorna:
+        str: Ruta del índice (archivo + '.idx').
+    """
+    return archivo + ".idx"
+
+
+def construir_indice(archivo="tareas.txt", datos=None, estado=None):
+    """
+    Recorre el archivo una vez y guarda el índice ID -> desplazamiento.
+
+    Parámetros:
+        archivo (str): Archivo de tareas.
+        datos (mmap, optional): Contenido ya mapeado del archivo, con su
+            estado; por defecto se abre y se mapea el archivo.
+        estado (os.stat_result, optional): Estado del archivo mapeado en
+            datos (el del descriptor abierto, no el de la ruta, que otro
+            proceso puede haber reemplazado).
+
+    Retorna:
+        tuple: (ids: array, desplazamientos: array) ordenados por ID.
+    """
+    if datos is None:
+        with open(archivo, "rb") as f:
+            estado = os.fstat(f.fileno())
+            if estado.st_size == 0:
+                return construir_indice(archivo, b"", estado)
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as datos:
+                return construir_indice(archivo, datos, estado)
+
+    ids = array("q")
+    desplazamientos = array("q")
+    for coincidencia in PATRON_ID.finditer(datos):
+        ids.append(int(coincidencia.group(1)))
+        desplazamientos.append(coincidencia.start())
+
+    if any(ids[i] > ids[i + 1] for i in range(len(ids) - 1)):
+        pares = sorted(zip(ids, desplazamientos))
+        ids = array("q", [par[0] for par in pares])
+        desplazamientos = array("q", [par[1] for par in pares])
+
+    with archivo_atomico(ruta_indice(archivo), binario=True) as f:
+        f.write(
+            CABECERA_INDICE.pack(
+                MAGIA_INDICE, estado.st_size, estado.st_mtime_ns, len(ids)
+            )
+        )
+        f.write(ids.tobytes())
+        f.write(desplazamientos.tobytes())
+    return ids, desplazamientos
+
+
+class AlmacenMapeado(AlmacenTareas):
+    """
+    Almacén de tareas de solo carga perezosa sobre un archivo mapeado.
+
+    Ofrece la misma interfaz que AlmacenTareas (crear, obtener, actualizar,
+    eliminar, filtrar, recorrer, len). Las tareas nuevas o modificadas viven
+    en el diccionario heredado _tareas; las eliminadas del archivo, en
+    _eliminadas. No mantiene índices secundarios ni índice de texto:
+    filtrar, buscar y estadisticas recorren el archivo.
+
+    Con un diario, sus cambios se anotan con los cerrojos del archivo como
+    los de AlmacenTareas, y los de otros procesos se incorporan al tomar el
+    cerrojo de escritura (ver sincronizar_almacen en funciones.py): los
+    registros nuevos del diario se aplican sobre la capa de cambios y, tras
+    una compactación de otro proceso, se vuelve a mapear el archivo (ver
+    releer) en lugar de cargarlo completo.
+
+    Atributos:
+        archivo (str): Archivo de tareas mapeado.
+        limite_cache (int o None): Máximo de tareas leídas del archivo que se
+            conservan en caché; None para no desalojar nunca.
+    """
+
+    def __init__(self, archivo="tareas.txt", limite_cache=10000):
+        """
+        Abre el archivo y su índice; reconstruye el índice si está desfasado.
+
+        Parámetros:
+            archivo (str): Archivo de tareas (formato versión 2 u original).
+            limite_cache (int o None, optional): Tamaño máximo de la caché.
+        """
+        super().__init__()
+        self.archivo = archivo
+        self.limite_cache = limite_cache
+        self._cache = OrderedDict()
+        self._eliminadas = set()
+        self._nuevas = 0
+        self._datos = None
+        self._mapa_indice = None
+        self._vistas = []
+        self.releer()
+
+    def releer(self):
+        """
+        Vuelve a mapear el archivo y aplica encima el diario pendiente (el
+        rotado y el actual), sin volver a anotarlo.
+
+        Descarta la capa de cambios en memoria: todo lo que contiene ya está
+        en el archivo o en el diario. La lectura se repite si otro proceso
+        compacta mientras tanto (ver leer_sin_cerrojos en funciones.py), de
+        modo que nunca se combina un archivo con el diario de otra generación.
+
+        Retorna:
+            bool: Siempre True (el contenido puede haber cambiado).
+        """
+        posicion, generacion, version = leer_sin_cerrojos(
+            self.archivo, self._releer_archivos
+        )
+        self.version = max(self.version, version)
+        self.ultimo_id = max(self.ultimo_id, cargar_secuencia(self.archivo))
+        self.generacion = generacion
+        self.posicion_diario = posicion
+        return True
+
+    def _releer_archivos(self):
+        """
+        Mapea el archivo y aplica los registros del diario rotado y del actual.
+
+        Retorna:
+            int: Bytes leídos del diario actual.
+        """
+        self.recargar()
+        diario = ruta_diario(self.archivo)
+        registros, _ = leer_registros(diario + ".old")
+        recientes, posicion = leer_registros(diario)
+        self.aplicar_registros(registros + recientes)
+        return posicion
+
+    def _abrir(self):
+        """
+        Mapea el archivo de datos y carga (o reconstruye) el índice.
+        """
+        self._datos = None
+        self._mapa_indice = None
+        self._vistas = []
+        self._inicio = 0
+        self._escapado = True
+        self._ids = array("q")
+        self._desplazamientos = array("q")
+
+        # El estado se toma del archivo abierto: otro proceso puede
+        # reemplazar la ruta al compactar
+        try:
+            with open(self.archivo, "rb") as f:
+                estado = os.fstat(f.fileno())
+                if estado.st_size == 0:
+                    return
+                self._datos = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except FileNotFoundError:
+            return
+
+        # Cabecera de versión (si no hay, es el formato original)
+        primera = self._datos.readline()
+        if primera.startswith(b"#tareas v"):
+            if primera.rstrip(b"\r\n").decode("utf-8") != CABECERA_FORMATO:
+                raise ValueError(f"Formato de archivo no soportado: {primera!r}")
+            self._inicio = len(primera)
+        else:
+            self._escapado = False
+
+        if not self._cargar_indice(estado):
+            self._ids, self._desplazamientos = construir_indice(
+                self.archivo, self._datos, estado
+            )
+        if self._ids:
+            self.ultimo_id = max(self.ultimo_id, self._ids[-1])
+
+    def _cargar_indice(self, estado):
+        """
+        Mapea tareas.txt.idx si corresponde al archivo actual.
+
+        Parámetros:
+            estado (os.stat_result): Estado del archivo de datos.
+
+        Retorna:
+            bool: True si el índice es válido y quedó cargado.
+        """
+        try:
+            with open(ruta_indice(self.archivo), "rb") as f:
+                mapa = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (FileNotFoundError, ValueError):
+            return False
+
+        if len(mapa) < CABECERA_INDICE.size:
+            mapa.close()
+            return False
+        magia, tamano, mtime_ns, cantidad = CABECERA_INDICE.unpack_from(mapa)
+        tamano_esperado = CABECERA_INDICE.size + 16 * cantidad
+        if (
+            magia != MAGIA_INDICE
+            or tamano != estado.st_size
+            or mtime_ns != estado.st_mtime_ns
+            or len(mapa) != tamano_esperado
+        ):
+            mapa.close()
+            return False
+
+        # Vistas sin copia sobre el archivo mapeado
+        base = memoryview(mapa)
+        vista = base[CABECERA_INDICE.size :].cast("q")
+        self._mapa_indice = mapa
+        self._ids = vista[:cantidad]
+        self._desplazamientos = vista[cantidad:]
+        self._vistas = [self._ids, self._desplazamientos, vista, base]
+        return True
+
+    def cerrar(self):
+        """
+        Libera los mapas de memoria del archivo y del índice.
+        """
+        self._ids = array("q")
+        self._desplazamientos = array("q")
+        # Las vistas deben liberarse antes de cerrar el mapa del índice
+        for vista in self._vistas:
+            vista.release()
+        self._vistas = []
+        for mapa in (self._datos, self._mapa_indice):
+            if mapa is not None:
+                mapa.close()
+        self._datos = None
+        self._mapa_indice = None
+
+    def _posicion(self, tarea_id):
+        """
+        Busca un ID en el índice ordenado (búsqueda binaria).
+
+        Parámetros:
+            tarea_id (int): ID a buscar.
+
+        Retorna:
+            int o None: Posición en el índice, o None si no está en el archivo.
+        """
+        posicion = bisect_left(self._ids, tarea_id)
+        if posicion < len(self._ids) and self._ids[posicion] == tarea_id:
+            return posicion
+        return None
+
+    def _leer_del_archivo(self, tarea_id):
+        """
+        Materializa una tarea del archivo, usando la caché si está disponible.
+
+        Parámetros:
+            tarea_id (int): ID de la tarea.
+
+        Retorna:
+            Tarea o None: La tarea, o None si no está en el archivo.
+        """
+        tarea = self._cache.get(tarea_id)
+        if tarea is not None:
+            self._cache.move_to_end(tarea_id)
+            return tarea
+
+        posicion = self._posicion(tarea_id)
+        if posicion is None:
+            return None
+        inicio = self._desplazamientos[posicion]
+        fin = self._datos.find(b"\n", inicio)
+        if fin == -1:
+            fin = len(self._datos)
+        linea = self._datos[inicio:fin].decode("utf-8").rstrip("\r")
+
+        tareas = []
+        parsear_lineas([linea], tareas, self._escapado, Tarea)
+        if not tareas:
+            return None
+        tarea = tareas[0]
+
+        self._cache[tarea_id] = tarea
+        if self.limite_cache is not None and len(self._cache) > self.limite_cache:
+            self._cache.popitem(last=False)
+        return tarea
+
+    def _recorrer_archivo(self):
+        """
+        Recorre las tareas del archivo en orden, por bloques y sin cachearlas.
+
+        Retorna:
+            generator: Tareas leídas del archivo.
+        """
+        if self._datos is None:
+            return
+        posicion = self._inicio
+        total = len(self._datos)
+        while posicion < total:
+            fin = self._datos.rfind(b"\n", posicion, posicion + TAMANO_BLOQUE) + 1
+            if fin <= posicion:
+                # Última línea sin salto final, o línea más larga que un bloque
+                fin = self._datos.find(b"\n", posicion) + 1 or total
+            texto = self._datos[posicion:fin].decode("utf-8")
+            posicion = fin
+
+            tareas = []
+            if not self._escapado:
+                parsear_lineas(texto.split("\n"), tareas, False, Tarea)
+            elif texto.endswith("\n"):
+                parsear_bloque(texto.replace("\r\n", "\n"), tareas, Tarea)
+            else:
+                parsear_lineas([texto.rstrip("\r")], tareas, True, Tarea)
+            yield from tareas
+
+    def __len__(self):
+        return len(self._ids) - len(self._eliminadas) + self._nuevas
+
+    def __iter__(self):
+        for tarea in self._recorrer_archivo():
+            tarea_id = tarea["id"]
+            if tarea_id in self._eliminadas:
+                continue
+            yield self._tareas.get(tarea_id, tarea)
+        for tarea_id, tarea in self._tareas.items():
+            if self._posicion(tarea_id) is None:
+                yield tarea
+
+    def __contains__(self, tarea_id):
+        return self.obtener(tarea_id) is not None
+
+    def __repr__(self):
+        return f"AlmacenMapeado({self.archivo!r}, {len(self)} tareas)"
+
+    def ids(self):
+        """
+        Retorna los IDs en el orden de recorrido.
+
+        Retorna:
+            generator: IDs de las tareas.
+        """
+        return (tarea["id"] for tarea in self)
+
+    def agregar(self, tarea):
+        """
+        Agrega (o reemplaza) una tarea en la capa de cambios en memoria.
+
+        Parámetros:
+            tarea (dict o Tarea): Tarea completa con clave 'id'.
+
+        Retorna:
+            Tarea: La tarea agregada.
+        """
+        tarea_id = tarea["id"]
+        en_archivo = self._posicion(tarea_id) is not None
+        if en_archivo:
+            self._eliminadas.discard(tarea_id)
+        elif tarea_id not in self._tareas:
+            self._nuevas += 1
+        return super().agregar(tarea)
+
+    def obtener(self, tarea_id):
+        """
+        Busca una tarea por su ID: primero en los cambios, luego en el archivo.
+
+        Parámetros:
+            tarea_id (int): ID de la tarea a buscar.
+
+        Retorna:
+            Tarea o None: La tarea si existe, None en caso contrario.
+        """
+        tarea = self._tareas.get(tarea_id)
+        if tarea is not None:
+            return tarea
+        if tarea_id in self._eliminadas:
+            return None
+        return self._leer_del_archivo(tarea_id)
+
+    def actualizar(
+        self,
+        tarea_id,
+        titulo=None,
+        descripcion=None,
+        estado=None,
+        prioridad=None,
+        version=None,
+    ):
+        """
+        Actualiza una tarea; si venía del archivo, pasa a la capa de cambios.
+
+        Parámetros:
+            tarea_id (int): ID de la tarea a actualizar.
+            titulo (str, optional): Nuevo título.
+            descripcion (str, optional): Nueva descripción.
+            estado (str, optional): Nuevo estado.
+            prioridad (str, optional): Nueva prioridad.
+            version (int, optional): Versión leída (ver AlmacenTareas.actualizar).
+
+        Retorna:
+            bool: True si la tarea fue actualizada, False si no existe.
+        """
+        # Dentro del cerrojo: incorporar cambios ajenos descarta la capa de
+        # cambios si hay que volver a mapear el archivo (ver releer)
+        with self.escritura():
+            if self._tarea_modificable(tarea_id) is None:
+                return False
+            return super().actualizar(
+                tarea_id, titulo, descripcion, estado, prioridad, version=version
+            )
+
+    def eliminar(self, tarea_id, version=None):
+        """
+        Elimina una tarea de la capa de cambios o la marca como eliminada.
+
+        Parámetros:
+            tarea_id (int): ID de la tarea a eliminar.
+            version (int, optional): Versión leída (ver AlmacenTareas.eliminar).
+
+        Retorna:
+            bool: True si la tarea fue eliminada, False si no existe.
+        """
+        with self.escritura():
+            if self.obtener(tarea_id) is None:
+                return False
+            self._comprobar_version(tarea_id, version)
+            self._quitar(tarea_id)
+            self.version += 1
+            if self.diario is not None:
+                self.diario.registrar_eliminacion(tarea_id, self.version)
+        return True
+
+    def aplicar_registros(self, registros):
+        """
+        Aplica registros del diario (ver AlmacenTareas.aplicar_registros);
+        las tareas que se actualizan pasan antes a la capa de cambios.
+
+        Parámetros:
+            registros (iterable): Registros leídos del diario.
+        """
+        for registro in registros:
+            if registro.get("op") == "actualizar":
+                self._tarea_modificable(registro["id"])
+            super().aplicar_registros((registro,))
+
+    def _tarea_modificable(self, tarea_id):
+        """
+        Retorna la tarea a modificar; si venía del archivo, la pasa a la
+        capa de cambios.
+
+        Parámetros:
+            tarea_id (int): ID de la tarea.
+
+        Retorna:
+            Tarea o None: La tarea, o None si no existe.
+        """
+        tarea = self._tareas.get(tarea_id)
+        if tarea is None:
+            tarea = self.obtener(tarea_id)
+            if tarea is None:
+                return None
+            self._cache.pop(tarea_id, None)
+            self._tareas[tarea_id] = tarea
+            # Los resultados guardados tienen otra copia de la tarea
+            self._invalidar_consultas()
+        return tarea
+
+    def _quitar(self, tarea_id):
+        """
+        Quita una tarea de la capa de cambios o la marca como eliminada del
+        archivo, sin anotarlo en el diario.
+
+        Parámetros:
+            tarea_id (int): ID de la tarea.
+
+        Retorna:
+            Tarea o None: La tarea quitada, o None si no existía.
+        """
+        tarea = self.obtener(tarea_id)
+        if tarea is None:
+            return None
+        self._tareas.pop(tarea_id, None)
+        self._cache.pop(tarea_id, None)
+        if self._posicion(tarea_id) is not None:
+            self._eliminadas.add(tarea_id)
+        else:
+            self._nuevas -= 1
+        self._versiones.pop(tarea_id, None)
+        self._versiones_campo.pop(tarea_id, None)
+        self._invalidar_consultas(("id",))
+        return tarea
+
+    def _indexar(self, tarea, orden):
+        # Sin índices secundarios: mantenerlos exigiría leer todo el archivo
+        pass
+
+    def _desindexar(self, tarea):
+        return 0
+
+    def _valores_indice(self, campo):
+        # Sin índices: iterar_ordenadas selecciona con heapq sobre el archivo
+        return None
+
+    def _recorrer_filtradas(self, estado=None, prioridad=None):
+        """
+        Produce las tareas que cumplen los criterios recorriendo el archivo.
+
+        Parámetros:
+            estado (str, optional): Estado buscado (no distingue mayúsculas).
+            prioridad (str, optional): Prioridad buscada.
+
+        Retorna:
+            iterator: Tareas que coinciden, en orden.
+        """
+        estado = estado.lower() if estado is not None else None
+        prioridad = prioridad.lower() if prioridad is not None else None
+        return (
+            tarea
+            for tarea in self
+            if (estado is None or tarea["estado"] == estado)
+            and (prioridad is None or tarea["prioridad"] == prioridad)
+        )
+
+    def _recorrer_busqueda(self, termino, campos=("titulo",)):
+        """
+        Produce las tareas que contienen el término recorriendo el archivo.
+
+        No usa indice_texto aunque se le asigne: las candidatas del índice
+        se ordenan con los índices secundarios, que este almacén no tiene.
+
+        Parámetros:
+            termino (str): Término a buscar (no distingue mayúsculas).
+            campos (tuple, optional): Campos donde buscar.
+
+        Retorna:
+            iterator: Tareas que coinciden, en orden.
+        """
+        termino = termino.lower()
+        return (
+            tarea
+            for tarea in self
+            if any(termino in tarea[campo].lower() for campo in campos)
+        )
+
+    def estadisticas(self):
+        """
+        Retorna las estadísticas recorriendo el archivo (sin contadores).
+
+        Retorna:
+            dict: Estadísticas (ver resumir_conteos).
+        """
+        return resumir_conteos(Counter(map(itemgetter("estado", "prioridad"), self)))
+
+    def recalcular_estadisticas(self, reparar=False):
+        """
+        Sin contadores incrementales que verificar: equivale a estadisticas().
+
+        Parámetros:
+            reparar (bool, optional): Sin efecto.
+
+        Retorna:
+            dict: Estadísticas (ver resumir_conteos).
+        """
+        return self.estadisticas()
+
+    def recargar(self):
+        """
+        Vuelve a mapear el archivo tras guardarlo y descarta los cambios ya
+        escritos en él (para incorporar también el diario, ver releer).
+        """
+        self.cerrar()
+        self._tareas.clear()
+        self._cache.clear()
+        self._eliminadas.clear()
+        self._nuevas = 0
+        self._abrir()
+        # Los resultados guardados apuntan a las tareas de antes de recargar
+        self._invalidar_consultas()
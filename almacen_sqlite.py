@@ -0,0 +1,814 @@
+"""
+almacen_sqlite.py - Almacén de tareas sobre una base SQLite.
+
+AlmacenSQLite no mantiene las tareas en memoria: cada operación es una
+consulta a tareas.db, de modo que la cantidad de tareas no está limitada por
+la RAM y varios procesos comparten la base sin diario ni cerrojos propios.
+
+- Modo WAL: los lectores no esperan al escritor, y cada confirmación añade
+  páginas a tareas.db-wal en lugar de reescribir la base.
+- Índices por (estado, prioridad) y por prioridad: filtrar() se resuelve con
+  WHERE, estadisticas() con un GROUP BY que solo lee el índice y ordenar()
+  por prioridad o estado consulta un valor del índice tras otro.
+- Índice FTS5 con el tokenizador trigram sobre el título: buscar() da las
+  mismas coincidencias parciales que el índice de trigramas de
+  indice_texto.py. Si SQLite no incluye FTS5 o trigram, buscar() recorre la
+  tabla.
+- Las sentencias son constantes y sqlite3 las reutiliza ya preparadas (caché
+  de sentencias de la conexión); las cargas masivas usan executemany.
+
+Como en AlmacenTareas, cada cambio recibe una versión global. Cada fila
+guarda la versión de la tarea y la de cada campo, de modo que
+actualizar(..., version=v) combina o rechaza (ConflictoEscritura) los
+cambios concurrentes con las mismas reglas.
+
+Compatibilidad: Python 3.8+ (SQLite 3.24+; buscar con FTS5 requiere 3.34+)
+"""
+
+import sqlite3
+from contextlib import contextmanager
+from itertools import islice, starmap
+
+from almacen import (
+    CAMPOS,
+    AlmacenTareas,
+    ConflictoEscritura,
+    Tarea,
+    resumir_conteos,
+    reunir_cambios,
+)
+from concurrencia import CerrojoOcupado
+from diario import MODOS_DURABILIDAD
+
+# PRAGMA synchronous de cada modo de durabilidad del diario. En modo WAL,
+# NORMAL solo hace fsync en los checkpoints: equivale a confirmar en grupo.
+SINCRONIZACION = {"ninguna": "OFF", "grupo": "NORMAL", "inmediata": "FULL"}
+
+# Segundos que una escritura espera a que otro proceso suelte la base
+TIEMPO_ESPERA = 30.0
+
+# Filas por executemany al cargar la base completa (ver reemplazar_todo)
+TAMANO_LOTE_SQLITE = 50000
+
+# IDs por consulta al resolver un lote (SQLite limita los parámetros)
+TAMANO_LOTE_IDS = 500
+
+CAMPOS_TEXTO = CAMPOS[1:]
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS tareas (
+    id INTEGER PRIMARY KEY,
+    titulo TEXT NOT NULL,
+    descripcion TEXT NOT NULL,
+    estado TEXT NOT NULL,
+    prioridad TEXT NOT NULL,
+    version INTEGER NOT NULL DEFAULT 0,
+    version_titulo INTEGER NOT NULL DEFAULT 0,
+    version_descripcion INTEGER NOT NULL DEFAULT 0,
+    version_estado INTEGER NOT NULL DEFAULT 0,
+    version_prioridad INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS tareas_estado_prioridad ON tareas (estado, prioridad);
+CREATE INDEX IF NOT EXISTS tareas_prioridad ON tareas (prioridad);
+CREATE TABLE IF NOT EXISTS contadores (
+    clave INTEGER PRIMARY KEY CHECK (clave = 0),
+    ultimo_id INTEGER NOT NULL,
+    version INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO contadores VALUES (0, 0, 0);
+"""
+
+# Índice externo sobre tareas.titulo, mantenido por disparadores
+ESQUEMA_FTS = """
+CREATE VIRTUAL TABLE tareas_fts USING fts5(
+    titulo, content='tareas', content_rowid='id', tokenize='trigram'
+);
+CREATE TRIGGER tareas_fts_insertar AFTER INSERT ON tareas BEGIN
+    INSERT INTO tareas_fts (rowid, titulo) VALUES (new.id, new.titulo);
+END;
+CREATE TRIGGER tareas_fts_eliminar AFTER DELETE ON tareas BEGIN
+    INSERT INTO tareas_fts (tareas_fts, rowid, titulo)
+    VALUES ('delete', old.id, old.titulo);
+END;
+CREATE TRIGGER tareas_fts_actualizar AFTER UPDATE OF titulo ON tareas BEGIN
+    INSERT INTO tareas_fts (tareas_fts, rowid, titulo)
+    VALUES ('delete', old.id, old.titulo);
+    INSERT INTO tareas_fts (rowid, titulo) VALUES (new.id, new.titulo);
+END;
+INSERT INTO tareas_fts (tareas_fts) VALUES ('rebuild');
+"""
+
+# Mantener el índice fila a fila multiplica por ~7 el costo de una carga
+# completa: reemplazar_todo lo borra y lo reconstruye de una vez
+BORRAR_FTS = """
+DROP TRIGGER IF EXISTS tareas_fts_insertar;
+DROP TRIGGER IF EXISTS tareas_fts_eliminar;
+DROP TRIGGER IF EXISTS tareas_fts_actualizar;
+DROP TABLE IF EXISTS tareas_fts;
+"""
+
+COLUMNAS = "id, titulo, descripcion, estado, prioridad"
+
+# Inserta una tarea (o la reemplaza conservando la fila) con todos sus
+# campos en la versión ?6. ON CONFLICT en lugar de INSERT OR REPLACE para
+# que el reemplazo dispare el disparador de actualización del índice FTS5.
+INSERTAR = f"""
+INSERT INTO tareas (
+    {COLUMNAS}, version,
+    version_titulo, version_descripcion, version_estado, version_prioridad
+) VALUES (?1, ?2, ?3, ?4, ?5, ?6, ?6, ?6, ?6, ?6)
+ON CONFLICT (id) DO UPDATE SET
+    titulo = excluded.titulo,
+    descripcion = excluded.descripcion,
+    estado = excluded.estado,
+    prioridad = excluded.prioridad,
+    version = excluded.version,
+    version_titulo = excluded.version,
+    version_descripcion = excluded.version,
+    version_estado = excluded.version,
+    version_prioridad = excluded.version
+"""
+
+SELECCIONAR = f"SELECT {COLUMNAS} FROM tareas"
+OBTENER = f"{SELECCIONAR} WHERE id = ?"
+OBTENER_VERSIONES = """
+SELECT titulo, descripcion, estado, prioridad, version,
+       version_titulo, version_descripcion, version_estado, version_prioridad
+FROM tareas WHERE id = ?
+"""
+FILTRAR = {
+    (False, False): f"{SELECCIONAR} ORDER BY id",
+    (True, False): f"{SELECCIONAR} WHERE estado = ? ORDER BY id",
+    (False, True): f"{SELECCIONAR} WHERE prioridad = ? ORDER BY id",
+    (True, True): f"{SELECCIONAR} WHERE estado = ? AND prioridad = ? ORDER BY id",
+}
+BUSCAR_FTS = (
+    f"{SELECCIONAR} WHERE id IN "
+    "(SELECT rowid FROM tareas_fts WHERE tareas_fts MATCH ?) ORDER BY id"
+)
+CONTAR_POR_PAR = "SELECT estado, prioridad, count(*) FROM tareas GROUP BY 1, 2"
+# Valores presentes de cada columna indexada (ver _valores_indice)
+VALORES_INDICE = {
+    "estado": "SELECT DISTINCT estado FROM tareas",
+    "prioridad": "SELECT DISTINCT prioridad FROM tareas",
+}
+
+
+def sentencia_actualizar(campos):
+    """
+    Construye el UPDATE que cambia los campos indicados de una tarea y les
+    asigna la versión nueva.
+
+    Parámetros:
+        campos (iterable): Campos a cambiar, en el orden de sus valores.
+
+    Retorna:
+        str: Sentencia con los parámetros (version, id, valores...). Como
+            mucho hay 15 combinaciones de campos: todas quedan preparadas.
+    """
+    asignaciones = "".join(
+        f"{campo} = ?{numero}, version_{campo} = ?1, "
+        for numero, campo in enumerate(campos, 3)
+    )
+    return f"UPDATE tareas SET {asignaciones}version = ?1 WHERE id = ?2"
+
+
+def sentencias(script):
+    """
+    Divide un script SQL en sentencias completas.
+
+    A diferencia de separar por ';', respeta los cuerpos de los disparadores
+    (BEGIN ... END).
+
+    Parámetros:
+        script (str): Sentencias separadas por ';'.
+
+    Retorna:
+        generator: Cada sentencia del script.
+    """
+    actual = ""
+    for linea in script.splitlines(keepends=True):
+        actual += linea
+        if sqlite3.complete_statement(actual):
+            yield actual.strip()
+            actual = ""
+
+
+class AlmacenSQLite(AlmacenTareas):
+    """
+    Almacén de tareas persistido en una base SQLite.
+
+    Ofrece la misma interfaz que AlmacenTareas (crear, obtener, actualizar,
+    eliminar, filtrar, buscar, estadisticas, recorrer, len), por lo que las
+    funciones de funciones.py lo aceptan igual. Las tareas que retorna son
+    copias: modificarlas no cambia la base (use actualizar()).
+
+    Cada cambio se confirma en la base al terminar; escritura() agrupa
+    varios cambios en una sola transacción. No usa DiarioTareas.
+
+    Atributos:
+        archivo (str): Ruta de la base.
+        durabilidad (str): Uno de MODOS_DURABILIDAD (ver SINCRONIZACION).
+        texto_completo (bool): Si la base tiene el índice FTS5 de títulos.
+    """
+
+    # Siempre lee de la base: no necesita incorporar cambios de otros
+    # procesos con sincronizar_almacen
+    sincronizable = False
+    # Sus consultas ya se resuelven en SQLite: sin escaneo en paralelo
+    escaneable = False
+
+    def __init__(self, archivo="tareas.db", durabilidad="grupo"):
+        """
+        Abre (o crea) la base y su esquema.
+
+        Parámetros:
+            archivo (str): Ruta de la base SQLite.
+            durabilidad (str, optional): Modo de durabilidad.
+        """
+        if durabilidad not in MODOS_DURABILIDAD:
+            raise ValueError(f"Modo de durabilidad inválido: {durabilidad}")
+        self.archivo = archivo
+        self.durabilidad = durabilidad
+        self._nivel_escritura = 0
+
+        # Sin transacciones implícitas: escritura() las abre y confirma
+        self._conexion = sqlite3.connect(
+            archivo, timeout=TIEMPO_ESPERA, isolation_level=None
+        )
+        self._conexion.execute("PRAGMA journal_mode = WAL")
+        self._conexion.execute(f"PRAGMA synchronous = {SINCRONIZACION[durabilidad]}")
+        with self.escritura():
+            for sentencia in sentencias(ESQUEMA):
+                self._conexion.execute(sentencia)
+            self.texto_completo = self._crear_texto_completo()
+
+        # Sin super().__init__(): las tareas, sus índices, la marca de agua y
+        # las versiones viven en la base, no en atributos
+        self.diario = None
+        self.indice_texto = None
+        self.generacion = None
+        self.posicion_diario = None
+        # Otros procesos cambian la base sin avisar: no se guardan resultados
+        self.cache_consultas = None
+
+    def _crear_texto_completo(self):
+        """
+        Crea el índice FTS5 de títulos si no existe y SQLite lo permite.
+
+        Retorna:
+            bool: True si la base tiene el índice.
+        """
+        existe = self._conexion.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = 'tareas_fts'"
+        ).fetchone()
+        if existe:
+            return True
+        self._conexion.execute("SAVEPOINT texto_completo")
+        try:
+            for sentencia in sentencias(ESQUEMA_FTS):
+                self._conexion.execute(sentencia)
+        except sqlite3.OperationalError:
+            # Sin FTS5 o sin el tokenizador trigram (SQLite < 3.34)
+            self._conexion.execute("ROLLBACK TO texto_completo")
+            self._conexion.execute("RELEASE texto_completo")
+            return False
+        self._conexion.execute("RELEASE texto_completo")
+        return True
+
+    def cerrar(self, compactar=True):
+        """
+        Cierra la conexión.
+
+        Parámetros:
+            compactar (bool, optional): Antes de cerrar, actualizar las
+                estadísticas del planificador e integrar el WAL en la base.
+        """
+        if self._conexion is None:
+            return
+        if compactar:
+            self._conexion.execute("PRAGMA optimize")
+            self._conexion.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        self._conexion.close()
+        self._conexion = None
+
+    def lote(self):
+        """
+        Retorna el contexto para aplicar muchos cambios y persistirlos una
+        vez: la transacción de escritura() ya los confirma juntos al salir.
+
+        Retorna:
+            context manager: Contexto para usar con with.
+        """
+        return self.escritura()
+
+    def asegurar_cambios(self):
+        """
+        Deja en disco los cambios confirmados, aunque el modo de durabilidad
+        no los sincronice: integra el WAL en la base con synchronous = FULL,
+        que hace fsync del WAL y de la base.
+
+        Dentro de un bloque escritura() no hace nada: los cambios del bloque
+        aún no están confirmados.
+        """
+        if self._nivel_escritura:
+            return
+        modo = SINCRONIZACION[self.durabilidad]
+        self._conexion.execute("PRAGMA synchronous = FULL")
+        try:
+            self._conexion.execute("PRAGMA wal_checkpoint(FULL)")
+        finally:
+            self._conexion.execute(f"PRAGMA synchronous = {modo}")
+
+    @property
+    def ultimo_id(self):
+        """
+        int: Marca de agua de IDs asignados (compartida entre procesos).
+        """
+        return self._conexion.execute(
+            "SELECT ultimo_id FROM contadores"
+        ).fetchone()[0]
+
+    @ultimo_id.setter
+    def ultimo_id(self, valor):
+        # Como en AlmacenTareas, la marca de agua nunca disminuye
+        self._conexion.execute(
+            "UPDATE contadores SET ultimo_id = max(ultimo_id, ?)", (valor,)
+        )
+
+    @property
+    def version(self):
+        """
+        int: Última versión de cambio asignada (compartida entre procesos).
+        """
+        return self._conexion.execute("SELECT version FROM contadores").fetchone()[0]
+
+    @version.setter
+    def version(self, valor):
+        self._conexion.execute(
+            "UPDATE contadores SET version = max(version, ?)", (valor,)
+        )
+
+    def __len__(self):
+        return self._conexion.execute("SELECT count(*) FROM tareas").fetchone()[0]
+
+    def __iter__(self):
+        return self._recorrer_filtradas()
+
+    def __contains__(self, tarea_id):
+        return (
+            self._conexion.execute(
+                "SELECT 1 FROM tareas WHERE id = ?", (tarea_id,)
+            ).fetchone()
+            is not None
+        )
+
+    def __repr__(self):
+        return f"AlmacenSQLite({self.archivo!r}, {len(self)} tareas)"
+
+    def ids(self):
+        """
+        Retorna los IDs en orden.
+
+        Retorna:
+            generator: IDs de las tareas.
+        """
+        filas = self._conexion.execute("SELECT id FROM tareas ORDER BY id")
+        return (fila[0] for fila in filas)
+
+    def _avanzar(self, ids=0):
+        """
+        Asigna la siguiente versión y, opcionalmente, un rango de IDs nuevos.
+        Solo dentro de escritura().
+
+        Parámetros:
+            ids (int, optional): Cantidad de IDs a reservar.
+
+        Retorna:
+            tuple: (ultimo_id, version) tras el avance.
+        """
+        self._conexion.execute(
+            "UPDATE contadores SET ultimo_id = ultimo_id + ?, version = version + 1",
+            (ids,),
+        )
+        return self._conexion.execute(
+            "SELECT ultimo_id, version FROM contadores"
+        ).fetchone()
+
+    def agregar(self, tarea):
+        """
+        Agrega (o reemplaza) una tarea que ya tiene ID, sin asignar versión.
+
+        Parámetros:
+            tarea (dict o Tarea): Tarea completa con clave 'id'.
+
+        Retorna:
+            Tarea: La tarea agregada.
+        """
+        if not isinstance(tarea, Tarea):
+            tarea = Tarea.desde_dict(tarea)
+        with self.escritura():
+            self._conexion.execute(INSERTAR, (*tarea.values(), 0))
+            self.ultimo_id = tarea.id
+        return tarea
+
+    def crear(self, titulo, descripcion, estado, prioridad):
+        """
+        Crea una nueva tarea con el próximo ID disponible.
+
+        Parámetros:
+            titulo (str): Título de la tarea.
+            descripcion (str): Descripción de la tarea.
+            estado (str): Estado inicial de la tarea.
+            prioridad (str): Prioridad de la tarea.
+
+        Retorna:
+            Tarea: La tarea creada.
+        """
+        with self.escritura():
+            tarea_id, version = self._avanzar(ids=1)
+            nueva_tarea = Tarea(
+                tarea_id, titulo, descripcion, estado.lower(), prioridad.lower()
+            )
+            self._conexion.execute(INSERTAR, (*nueva_tarea.values(), version))
+        return nueva_tarea
+
+    def agregar_lote(self, tareas):
+        """
+        Agrega tareas nuevas que ya tienen ID con una sola versión y un único
+        executemany.
+
+        Los IDs deben calcularse dentro de escritura() para que no coincidan
+        con los que crea otro proceso al mismo tiempo.
+
+        Parámetros:
+            tareas (list): Tareas (diccionarios o Tarea) con IDs nuevos.
+
+        Retorna:
+            list: Las tareas agregadas.
+        """
+        agregadas = [
+            tarea if isinstance(tarea, Tarea) else Tarea.desde_dict(tarea)
+            for tarea in tareas
+        ]
+        if not agregadas:
+            return agregadas
+        with self.escritura():
+            _, version = self._avanzar()
+            self._conexion.executemany(
+                INSERTAR, [(*tarea.values(), version) for tarea in agregadas]
+            )
+            self.ultimo_id = max(tarea.id for tarea in agregadas)
+        return agregadas
+
+    def obtener(self, tarea_id):
+        """
+        Busca una tarea por su ID (clave primaria de la tabla).
+
+        Parámetros:
+            tarea_id (int): ID de la tarea a buscar.
+
+        Retorna:
+            Tarea o None: Copia de la tarea si existe, None en caso contrario.
+        """
+        fila = self._conexion.execute(OBTENER, (tarea_id,)).fetchone()
+        return Tarea(*fila) if fila is not None else None
+
+    def actualizar(
+        self,
+        tarea_id,
+        titulo=None,
+        descripcion=None,
+        estado=None,
+        prioridad=None,
+        version=None,
+    ):
+        """
+        Actualiza los campos indicados de una tarea existente.
+
+        Parámetros:
+            tarea_id (int): ID de la tarea a actualizar.
+            titulo (str, optional): Nuevo título.
+            descripcion (str, optional): Nueva descripción.
+            estado (str, optional): Nuevo estado.
+            prioridad (str, optional): Nueva prioridad.
+            version (int, optional): Versión leída (ver AlmacenTareas.actualizar).
+
+        Retorna:
+            bool: True si la tarea fue actualizada, False si no existe.
+
+        Lanza:
+            ConflictoEscritura: Si otro proceso cambió los mismos campos.
+        """
+        cambios = reunir_cambios(titulo, descripcion, estado, prioridad)
+        with self.escritura():
+            fila = self._conexion.execute(OBTENER_VERSIONES, (tarea_id,)).fetchone()
+            if fila is None:
+                return False
+            if version is not None and fila[4] != version:
+                actuales = dict(zip(CAMPOS_TEXTO, fila[:4]))
+                versiones_campo = dict(zip(CAMPOS_TEXTO, fila[5:]))
+                en_conflicto = [
+                    campo
+                    for campo, valor in cambios.items()
+                    if versiones_campo[campo] > version and actuales[campo] != valor
+                ]
+                if en_conflicto:
+                    raise ConflictoEscritura(tarea_id, en_conflicto)
+            if cambios:
+                _, nueva = self._avanzar()
+                self._conexion.execute(
+                    sentencia_actualizar(cambios),
+                    (nueva, tarea_id, *cambios.values()),
+                )
+        return True
+
+    def eliminar(self, tarea_id, version=None):
+        """
+        Elimina una tarea por su ID.
+
+        Parámetros:
+            tarea_id (int): ID de la tarea a eliminar.
+            version (int, optional): Versión leída (ver AlmacenTareas.eliminar).
+
+        Retorna:
+            bool: True si la tarea fue eliminada, False si no existe.
+
+        Lanza:
+            ConflictoEscritura: Si otro proceso la modificó desde esa versión.
+        """
+        with self.escritura():
+            fila = self._conexion.execute(
+                "SELECT version FROM tareas WHERE id = ?", (tarea_id,)
+            ).fetchone()
+            if fila is None:
+                return False
+            if version is not None and fila[0] != version:
+                raise ConflictoEscritura(tarea_id)
+            self._conexion.execute("DELETE FROM tareas WHERE id = ?", (tarea_id,))
+            self._avanzar()
+        return True
+
+    def actualizar_lote(
+        self, ids, titulo=None, descripcion=None, estado=None, prioridad=None
+    ):
+        """
+        Aplica el mismo cambio a varias tareas con una sola versión y un
+        único executemany. Se omiten los IDs que no existen y las tareas que
+        ya tienen esos valores.
+
+        Parámetros:
+            ids (iterable): IDs de las tareas a actualizar.
+            titulo (str, optional): Nuevo título.
+            descripcion (str, optional): Nueva descripción.
+            estado (str, optional): Nuevo estado.
+            prioridad (str, optional): Nueva prioridad.
+
+        Retorna:
+            list: IDs de las tareas modificadas.
+        """
+        cambios = reunir_cambios(titulo, descripcion, estado, prioridad)
+        if not cambios:
+            return []
+        with self.escritura():
+            modificadas = self._ids_existentes(ids, cambios)
+            if modificadas:
+                _, version = self._avanzar()
+                self._conexion.executemany(
+                    sentencia_actualizar(cambios),
+                    [(version, i, *cambios.values()) for i in modificadas],
+                )
+        return modificadas
+
+    def eliminar_lote(self, ids):
+        """
+        Elimina varias tareas con una sola versión y un único executemany.
+        Se omiten los IDs que no existen.
+
+        Parámetros:
+            ids (iterable): IDs de las tareas a eliminar.
+
+        Retorna:
+            list: IDs de las tareas eliminadas.
+        """
+        with self.escritura():
+            eliminadas = self._ids_existentes(ids)
+            if eliminadas:
+                self._conexion.executemany(
+                    "DELETE FROM tareas WHERE id = ?",
+                    [(tarea_id,) for tarea_id in eliminadas],
+                )
+                self._avanzar()
+        return eliminadas
+
+    def _ids_existentes(self, ids, cambios=None):
+        """
+        Retorna los IDs de un lote que existen en la base.
+
+        Parámetros:
+            ids (iterable): IDs pedidos.
+            cambios (dict, optional): Si se indica, solo los de tareas en las
+                que algún campo difiere del nuevo valor.
+
+        Retorna:
+            list: IDs existentes, en el orden pedido y sin repetir.
+        """
+        ids = list(dict.fromkeys(ids))
+        condicion, valores = "", ()
+        if cambios:
+            iguales = " AND ".join(f"{campo} = ?" for campo in cambios)
+            condicion, valores = f" AND NOT ({iguales})", tuple(cambios.values())
+        encontrados = set()
+        for inicio in range(0, len(ids), TAMANO_LOTE_IDS):
+            parte = ids[inicio : inicio + TAMANO_LOTE_IDS]
+            marcas = ", ".join("?" * len(parte))
+            encontrados.update(
+                fila[0]
+                for fila in self._conexion.execute(
+                    f"SELECT id FROM tareas WHERE id IN ({marcas}){condicion}",
+                    (*parte, *valores),
+                )
+            )
+        return [tarea_id for tarea_id in ids if tarea_id in encontrados]
+
+    @contextmanager
+    def escritura(self, esperar=True):
+        """
+        Agrupa los cambios del bloque with en una transacción.
+
+        La transacción se abre con BEGIN IMMEDIATE (toma el cerrojo de
+        escritura de la base, como DiarioTareas.escritura con el archivo de
+        texto) y se confirma al salir del bloque más externo; si el bloque
+        lanza una excepción se deshace. Los bloques se pueden anidar.
+
+        Parámetros:
+            esperar (bool, optional): Si es False y otra conexión tiene el
+                cerrojo de escritura, lanzar CerrojoOcupado en lugar de
+                esperar hasta TIEMPO_ESPERA segundos.
+
+        Retorna:
+            context manager: Contexto para usar con with.
+        """
+        if self._nivel_escritura:
+            self._nivel_escritura += 1
+            try:
+                yield
+            finally:
+                self._nivel_escritura -= 1
+            return
+
+        if esperar:
+            self._conexion.execute("BEGIN IMMEDIATE")
+        else:
+            self._conexion.execute("PRAGMA busy_timeout = 0")
+            try:
+                self._conexion.execute("BEGIN IMMEDIATE")
+            except sqlite3.OperationalError as e:
+                # SQLITE_BUSY: "database is locked"
+                if "locked" not in str(e):
+                    raise
+                raise CerrojoOcupado(self.archivo) from e
+            finally:
+                tiempo = int(TIEMPO_ESPERA * 1000)
+                self._conexion.execute(f"PRAGMA busy_timeout = {tiempo}")
+        self._nivel_escritura = 1
+        try:
+            yield
+        except BaseException:
+            self._conexion.execute("ROLLBACK")
+            raise
+        else:
+            self._conexion.execute("COMMIT")
+        finally:
+            self._nivel_escritura = 0
+
+    def version_de(self, tarea_id):
+        """
+        Retorna la versión actual de una tarea.
+
+        Parámetros:
+            tarea_id (int): ID de la tarea.
+
+        Retorna:
+            int: Versión del último cambio (0 si no existe o es anterior a
+                la migración).
+        """
+        fila = self._conexion.execute(
+            "SELECT version FROM tareas WHERE id = ?", (tarea_id,)
+        ).fetchone()
+        return fila[0] if fila is not None else 0
+
+    def reemplazar_todo(self, tareas, ultimo_id=0):
+        """
+        Reemplaza el contenido de la base por las tareas dadas en una sola
+        transacción (ver migrar_almacenamiento).
+
+        Parámetros:
+            tareas (iterable): Tareas (diccionarios o Tarea) a guardar.
+            ultimo_id (int, optional): Marca de agua de IDs del origen.
+
+        Retorna:
+            int: Cantidad de tareas guardadas.
+        """
+        cantidad = 0
+        with self.escritura():
+            for sentencia in sentencias(BORRAR_FTS):
+                self._conexion.execute(sentencia)
+            self._conexion.execute("DELETE FROM tareas")
+            _, version = self._avanzar()
+            iterador = iter(tareas)
+            for lote in iter(lambda: list(islice(iterador, TAMANO_LOTE_SQLITE)), []):
+                self._conexion.executemany(
+                    INSERTAR,
+                    [(*(tarea[campo] for campo in CAMPOS), version) for tarea in lote],
+                )
+                cantidad += len(lote)
+            self.ultimo_id = ultimo_id
+            self._conexion.execute(
+                "UPDATE contadores SET ultimo_id = max(ultimo_id, "
+                "(SELECT ifnull(max(id), 0) FROM tareas))"
+            )
+            self.texto_completo = self._crear_texto_completo()
+        return cantidad
+
+    def _recorrer_filtradas(self, estado=None, prioridad=None):
+        """
+        Produce las tareas que cumplen los criterios (WHERE sobre los índices).
+
+        Parámetros:
+            estado (str, optional): Estado buscado (no distingue mayúsculas).
+            prioridad (str, optional): Prioridad buscada.
+
+        Retorna:
+            iterator: Tareas que coinciden, en orden de ID.
+        """
+        parametros = [
+            valor.lower() for valor in (estado, prioridad) if valor is not None
+        ]
+        consulta = FILTRAR[estado is not None, prioridad is not None]
+        return starmap(Tarea, self._conexion.execute(consulta, parametros))
+
+    def _valores_indice(self, campo):
+        """
+        Retorna los valores presentes de estado o prioridad (solo lee el
+        índice de esa columna).
+
+        Parámetros:
+            campo (str): 'estado' o 'prioridad'.
+
+        Retorna:
+            list: Valores con alguna tarea.
+        """
+        return [fila[0] for fila in self._conexion.execute(VALORES_INDICE[campo])]
+
+    def _recorrer_busqueda(self, termino, campos=("titulo",)):
+        """
+        Produce las tareas que contienen el término en alguno de los campos.
+
+        Con el índice FTS5 y un término de 3 o más caracteres sobre el título,
+        SQLite da las candidatas y solo se comprueban esas; si no, se
+        recorren todas.
+
+        Parámetros:
+            termino (str): Término a buscar (no distingue mayúsculas).
+            campos (tuple, optional): Campos donde buscar.
+
+        Retorna:
+            iterator: Tareas que coinciden, en orden de ID.
+        """
+        termino = termino.lower()
+        if self.texto_completo and len(termino) >= 3 and tuple(campos) == ("titulo",):
+            # Frase entre comillas: el término se busca tal cual
+            frase = '"' + termino.replace('"', '""') + '"'
+            candidatas = starmap(Tarea, self._conexion.execute(BUSCAR_FTS, (frase,)))
+            return (tarea for tarea in candidatas if termino in tarea.titulo.lower())
+        return (
+            tarea
+            for tarea in self
+            if any(termino in tarea[campo].lower() for campo in campos)
+        )
+
+    def estadisticas(self):
+        """
+        Retorna las estadísticas con un único GROUP BY sobre el índice.
+
+        Retorna:
+            dict: Estadísticas (ver resumir_conteos).
+        """
+        conteos = {
+            (estado, prioridad): n
+            for estado, prioridad, n in self._conexion.execute(CONTAR_POR_PAR)
+        }
+        return resumir_conteos(conteos)
+
+    def recalcular_estadisticas(self, reparar=False):
+        """
+        Sin contadores incrementales que verificar: equivale a estadisticas().
+
+        Parámetros:
+            reparar (bool, optional): Sin efecto.
+
+        Retorna:
+            dict: Estadísticas (ver resumir_conteos).
+        """
+        return self.estadisticas()
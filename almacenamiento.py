@@ -0,0 +1,420 @@
+"""
+almacenamiento.py - Motores de almacenamiento intercambiables.
+
+Un motor sabe abrir un almacén sobre su archivo, ponerlo al día con los
+cambios de otros procesos, cerrarlo y guardar en él un conjunto completo de
+tareas:
+
+    texto  - tareas.txt con su diario (cargar_almacen + DiarioTareas); el
+             almacén vive en memoria. Es el motor por defecto.
+    sqlite - tareas.db (AlmacenSQLite, ver almacen_sqlite.py); las tareas se
+             consultan en la base y no se cargan en memoria.
+    mmap   - tareas.txt mapeado en memoria (AlmacenMapeado, ver
+             almacen_mmap.py) con el mismo diario que el motor de texto; las
+             tareas se leen del archivo al pedirlas, sin índices.
+
+El motor se elige con la opción --motor de la línea de comandos o con la
+variable de entorno TAREAS_MOTOR (el menú solo usa la variable). Para pasar
+los datos de un motor a otro:
+
+    python app.py migrar sqlite          (tareas.txt -> tareas.db)
+    python app.py --motor sqlite migrar texto --destino copia.txt
+
+La variable de entorno TAREAS_CACHE fija cuántos resultados de búsquedas y
+filtros conserva el almacén del motor de texto (ver CacheConsultas; 0 la
+desactiva). TAREAS_PROCESOS fija cuántos procesos usan sus búsquedas sin
+índice sobre almacenes grandes (ver escaneo.py; por defecto, uno por núcleo;
+0 las deja en el recorrido en serie).
+
+Compatibilidad: Python 3.8+
+"""
+
+import os
+
+from diario import DiarioTareas
+from funciones import (
+    cargar_almacen,
+    guardar_tareas,
+    ruta_diario,
+    sincronizar_almacen,
+)
+from indice_texto import activar_indice_texto, guardar_indice_texto
+
+MOTORES = ("texto", "sqlite", "mmap")
+VARIABLE_MOTOR = "TAREAS_MOTOR"
+VARIABLE_CACHE = "TAREAS_CACHE"
+VARIABLE_PROCESOS = "TAREAS_PROCESOS"
+ARCHIVOS_POR_DEFECTO = {
+    "texto": "tareas.txt",
+    "sqlite": "tareas.db",
+    "mmap": "tareas.txt",
+}
+
+
+def elegir_motor(motor=None):
+    """
+    Determina el motor a usar: el indicado, el de TAREAS_MOTOR o 'texto'.
+
+    Parámetros:
+        motor (str, optional): Nombre explícito del motor.
+
+    Retorna:
+        str: Uno de MOTORES.
+    """
+    motor = motor or os.environ.get(VARIABLE_MOTOR) or "texto"
+    if motor not in MOTORES:
+        raise ValueError(
+            f"Motor no soportado: {motor} (use {', '.join(MOTORES)})"
+        )
+    return motor
+
+
+def capacidad_cache():
+    """
+    Lee la capacidad de la caché de consultas de TAREAS_CACHE.
+
+    Retorna:
+        int o None: Capacidad indicada, o None si la variable no está.
+
+    Lanza:
+        ValueError: Si el valor no es un entero no negativo.
+    """
+    valor = os.environ.get(VARIABLE_CACHE)
+    if not valor:
+        return None
+    if not valor.strip().isdigit():
+        raise ValueError(f"{VARIABLE_CACHE} inválida: {valor!r} (use un entero >= 0)")
+    return int(valor)
+
+
+def procesos_escaneo():
+    """
+    Lee de TAREAS_PROCESOS los procesos del escaneo en paralelo.
+
+    Retorna:
+        int o None: Procesos indicados (None si es 0, sin escaneo), o uno
+            por núcleo si la variable no está.
+
+    Lanza:
+        ValueError: Si el valor no es un entero no negativo.
+    """
+    valor = os.environ.get(VARIABLE_PROCESOS)
+    if not valor:
+        return os.cpu_count() or 1
+    if not valor.strip().isdigit():
+        raise ValueError(
+            f"{VARIABLE_PROCESOS} inválida: {valor!r} (use un entero >= 0)"
+        )
+    return int(valor) or None
+
+
+def obtener_motor(motor=None, archivo=None):
+    """
+    Crea el motor configurado sobre su archivo.
+
+    Parámetros:
+        motor (str, optional): Nombre del motor (ver elegir_motor).
+        archivo (str, optional): Archivo de datos; por defecto, el del motor
+            (ARCHIVOS_POR_DEFECTO).
+
+    Retorna:
+        MotorTexto, MotorSQLite o MotorMapeado: Motor listo para abrir().
+    """
+    nombre = elegir_motor(motor)
+    clase = {"sqlite": MotorSQLite, "mmap": MotorMapeado}.get(nombre, MotorTexto)
+    return clase(archivo or ARCHIVOS_POR_DEFECTO[nombre])
+
+
+class MotorTexto:
+    """
+    Motor de archivo de texto: instantánea tareas.txt más diario de cambios.
+
+    Atributos:
+        archivo (str): Archivo de tareas.
+        diario (DiarioTareas o None): Diario del almacén abierto.
+        capacidad_cache (int o None): Capacidad de la caché de consultas
+            (TAREAS_CACHE); None para la de AlmacenTareas.
+        procesos (int o None): Procesos de las búsquedas sin índice sobre
+            almacenes grandes (TAREAS_PROCESOS, ver escaneo.py).
+    """
+
+    nombre = "texto"
+
+    def __init__(self, archivo="tareas.txt"):
+        self.archivo = archivo
+        self.capacidad_cache = capacidad_cache()
+        self.procesos = procesos_escaneo()
+        self.diario = None
+        self._guardar_indice = False
+
+    def __repr__(self):
+        return f"MotorTexto({self.archivo!r})"
+
+    def existe(self):
+        """
+        Indica si hay datos guardados: la instantánea o solo el diario.
+
+        Retorna:
+            bool: True si existe tareas.txt o tareas.txt.log.
+        """
+        return os.path.exists(self.archivo) or os.path.exists(
+            ruta_diario(self.archivo)
+        )
+
+    def abrir(self, diario=True, indice_texto=False, perezoso=True, **opciones):
+        """
+        Carga el almacén y, si se pide, le conecta su diario.
+
+        Parámetros:
+            diario (bool, optional): Anotar los cambios en tareas.txt.log.
+                Sin diario, los cambios solo quedan en memoria.
+            indice_texto (bool, optional): Activar el índice de trigramas
+                (se guarda al cerrar si llegó a usarse).
+            perezoso (bool, optional): Cargar el índice de trigramas en la
+                primera búsqueda en lugar de al abrir.
+            **opciones: Opciones de DiarioTareas (umbral, durabilidad, ...).
+
+        Retorna:
+            AlmacenTareas: Almacén cargado, con la caché de consultas de la
+                capacidad que indique TAREAS_CACHE y los procesos de
+                escaneo de TAREAS_PROCESOS.
+        """
+        almacen = cargar_almacen(self.archivo)
+        if self.capacidad_cache is not None:
+            almacen.cache_consultas.redimensionar(self.capacidad_cache)
+        almacen.procesos_escaneo = self.procesos
+        if diario:
+            self.diario = DiarioTareas(self.archivo, almacen, **opciones)
+        if indice_texto:
+            activar_indice_texto(almacen, self.archivo, perezoso=perezoso)
+            self._guardar_indice = True
+        return almacen
+
+    def sincronizar(self, almacen):
+        """
+        Incorpora los cambios de otros procesos (ver sincronizar_almacen).
+
+        Parámetros:
+            almacen (AlmacenTareas): Almacén abierto con abrir().
+
+        Retorna:
+            bool: True si el almacén cambió.
+        """
+        return sincronizar_almacen(almacen, self.archivo)
+
+    def cerrar(self, almacen, compactar=True):
+        """
+        Cierra el diario, guarda el índice de texto si se activó y detiene
+        el escaneo en paralelo si se llegó a usar.
+
+        Parámetros:
+            almacen (AlmacenTareas): Almacén abierto con abrir().
+            compactar (bool, optional): Integrar el diario en tareas.txt.
+        """
+        almacen.cerrar_escaneo()
+        if self.diario is not None:
+            self.diario.cerrar(compactar=compactar)
+            self.diario = None
+        if self._guardar_indice and almacen.indice_texto is not None:
+            guardar_indice_texto(almacen.indice_texto, self.archivo)
+
+    def guardar(self, tareas):
+        """
+        Escribe una instantánea completa (ver guardar_tareas).
+
+        Parámetros:
+            tareas (iterable o AlmacenTareas): Tareas a guardar.
+
+        Retorna:
+            bool: True si se guardó correctamente.
+        """
+        return guardar_tareas(tareas, self.archivo)
+
+
+class MotorMapeado(MotorTexto):
+    """
+    Motor de archivo de texto mapeado en memoria (ver almacen_mmap.py).
+
+    Usa los mismos archivos que MotorTexto (tareas.txt y su diario), más el
+    índice de desplazamientos tareas.txt.idx. Abrir un archivo grande no lo
+    carga en memoria; a cambio, filtrar y buscar lo recorren entero. Tras
+    una compactación de otro proceso, el archivo se vuelve a mapear (ver
+    AlmacenMapeado.releer).
+
+    Atributos:
+        archivo (str): Archivo de tareas.
+        diario (DiarioTareas o None): Diario del almacén abierto.
+        capacidad_cache (int o None): Capacidad de la caché de consultas
+            (TAREAS_CACHE); None para la de AlmacenTareas.
+    """
+
+    nombre = "mmap"
+
+    def __repr__(self):
+        return f"MotorMapeado({self.archivo!r})"
+
+    def abrir(
+        self,
+        diario=True,
+        indice_texto=False,
+        perezoso=True,
+        limite_cache=10000,
+        **opciones,
+    ):
+        """
+        Mapea el archivo y, si se pide, le conecta su diario.
+
+        indice_texto y perezoso se aceptan para abrir todos los motores
+        igual, pero no se usan: construir el índice de trigramas exigiría
+        leer el archivo completo, que es lo que este motor evita.
+
+        Parámetros:
+            diario (bool, optional): Anotar los cambios en tareas.txt.log.
+            indice_texto (bool, optional): Sin efecto.
+            perezoso (bool, optional): Sin efecto.
+            limite_cache (int o None, optional): Tareas leídas del archivo
+                que se conservan en memoria (ver AlmacenMapeado).
+            **opciones: Opciones de DiarioTareas (umbral, durabilidad, ...).
+
+        Retorna:
+            AlmacenMapeado: Almacén sobre el archivo mapeado.
+        """
+        # Import diferido, como el de AlmacenSQLite
+        from almacen_mmap import AlmacenMapeado
+
+        almacen = AlmacenMapeado(self.archivo, limite_cache)
+        if self.capacidad_cache is not None:
+            almacen.cache_consultas.redimensionar(self.capacidad_cache)
+        if diario:
+            self.diario = DiarioTareas(self.archivo, almacen, **opciones)
+        return almacen
+
+    def cerrar(self, almacen, compactar=True):
+        """
+        Cierra el diario y libera los mapas del archivo y de su índice.
+
+        Parámetros:
+            almacen (AlmacenMapeado): Almacén abierto con abrir().
+            compactar (bool, optional): Integrar el diario en tareas.txt.
+        """
+        super().cerrar(almacen, compactar)
+        almacen.cerrar()
+
+
+class MotorSQLite:
+    """
+    Motor de base SQLite (ver almacen_sqlite.py).
+
+    Atributos:
+        archivo (str): Ruta de la base.
+    """
+
+    nombre = "sqlite"
+
+    def __init__(self, archivo="tareas.db"):
+        self.archivo = archivo
+
+    def __repr__(self):
+        return f"MotorSQLite({self.archivo!r})"
+
+    def existe(self):
+        """
+        Indica si la base existe (abrirla la crearía vacía).
+
+        Retorna:
+            bool: True si existe el archivo de la base.
+        """
+        return os.path.exists(self.archivo)
+
+    def abrir(self, diario=True, indice_texto=False, durabilidad="grupo", **opciones):
+        """
+        Abre la base.
+
+        SQLite confirma cada cambio en su propio registro (WAL) y busca con
+        su índice FTS5, así que diario, indice_texto y las demás opciones del
+        diario no se usan; se aceptan para abrir ambos motores igual.
+
+        Parámetros:
+            diario (bool, optional): Sin efecto.
+            indice_texto (bool, optional): Sin efecto.
+            durabilidad (str, optional): Modo de durabilidad (ver
+                almacen_sqlite.SINCRONIZACION).
+
+        Retorna:
+            AlmacenSQLite: Almacén sobre la base.
+        """
+        # Import diferido: sqlite3 solo se carga si se usa este motor
+        from almacen_sqlite import AlmacenSQLite
+
+        return AlmacenSQLite(self.archivo, durabilidad)
+
+    def sincronizar(self, almacen):
+        """
+        Sin efecto: cada consulta ya lee el estado actual de la base.
+
+        Retorna:
+            bool: Siempre False.
+        """
+        return False
+
+    def cerrar(self, almacen, compactar=True):
+        """
+        Cierra la base.
+
+        Parámetros:
+            almacen (AlmacenSQLite): Almacén abierto con abrir().
+            compactar (bool, optional): Integrar el WAL en la base.
+        """
+        almacen.cerrar(compactar)
+
+    def guardar(self, tareas):
+        """
+        Reemplaza el contenido de la base por las tareas dadas.
+
+        Parámetros:
+            tareas (iterable o AlmacenTareas): Tareas a guardar.
+
+        Retorna:
+            bool: True si se guardó correctamente.
+        """
+        from almacen_sqlite import AlmacenSQLite
+
+        ultimo_id = getattr(tareas, "ultimo_id", 0)
+        almacen = AlmacenSQLite(self.archivo)
+        try:
+            almacen.reemplazar_todo(tareas, ultimo_id)
+        finally:
+            almacen.cerrar()
+        return True
+
+
+def migrar_almacenamiento(origen, destino):
+    """
+    Copia todas las tareas y la marca de agua de IDs de un motor a otro.
+
+    El origen debe existir y no se modifica. El destino no debe existir,
+    para no mezclar sus datos (o su diario) con los migrados.
+
+    Parámetros:
+        origen (MotorTexto, MotorSQLite o MotorMapeado): Motor con los
+            datos actuales.
+        destino (MotorTexto, MotorSQLite o MotorMapeado): Motor nuevo.
+
+    Retorna:
+        int: Cantidad de tareas migradas.
+
+    Lanza:
+        FileNotFoundError: Si el archivo de origen no existe.
+        FileExistsError: Si el archivo de destino ya existe.
+    """
+    if not origen.existe():
+        raise FileNotFoundError(f"No existe el origen: {origen.archivo}")
+    if destino.existe():
+        raise FileExistsError(f"El destino ya existe: {destino.archivo}")
+    almacen = origen.abrir(diario=False)
+    try:
+        if not destino.guardar(almacen):
+            raise OSError(f"No se pudo guardar {destino.archivo}")
+        return len(almacen)
+    finally:
+        origen.cerrar(almacen, compactar=False)
@@ -5,38 +5,96 @@ Este archivo contiene el programa principal que utiliza las funciones
 del módulo funciones.py para manejar el sistema de tareas.
 
 Compatibilidad: Python 3.8+
-Uso: python app.py
+Uso: python app.py                    (menú interactivo)
+     python app.py <subcomando> ...   (línea de comandos, ver cli.py)
 """
 
-# Importar todas las funciones del módulo centralizado
+import gc
+import sys
+
+# Importar el motor de almacenamiento y todas las funciones del módulo centralizado
+from almacen import ConflictoEscritura, leer_orden
+from almacenamiento import obtener_motor
 from funciones import (
     validar_titulo,
     validar_descripcion,
     validar_estado,
     validar_prioridad,
     validar_id,
-    guardar_tareas,
-    cargar_tareas,
     crear_tarea,
     obtener_tarea_por_id,
     actualizar_tarea,
     eliminar_tarea,
-    buscar_por_titulo,
-    filtrar_por_estado,
-    filtrar_por_prioridad,
+    iterar_por_titulo,
+    iterar_por_estado,
+    iterar_por_prioridad,
+    ordenar_tareas,
     obtener_estadisticas,
     mostrar_tarea,
     mostrar_tareas,
+    mostrar_paginas,
+    mostrar_estadisticas,
     mostrar_menu,
 )
 
+# Órdenes predefinidos de la opción 9: (descripción, claves de ordenar_tareas)
+ORDENES_MENU = {
+    "1": ("Prioridad (alta primero)", "-prioridad"),
+    "2": ("Estado (pendientes primero) y prioridad", "estado,-prioridad"),
+    "3": ("ID", "id"),
+    "4": ("Título", "titulo,id"),
+}
+
 
 def main():
     """
     Función principal que ejecuta el programa.
     """
-    # Cargar tareas existentes al iniciar
-    tareas = cargar_tareas("tareas.txt")
+    # Motor elegido con TAREAS_MOTOR: tareas.txt (por defecto, o mapeado con
+    # mmap) o tareas.db
+    motor = obtener_motor()
+
+    # Con tareas.txt: almacén indexado por ID en memoria, un diario donde se
+    # anota cada cambio en lugar de reescribir el archivo y un índice de
+    # trigramas para la búsqueda por título (se reutiliza el guardado en
+    # tareas.txt.trg si los datos no cambiaron)
+    tareas = motor.abrir(indice_texto=True)
+    # Congelar lo cargado una sola vez: las recolecciones de la sesión ya no
+    # recorren el millón de tareas (ver recolector_pausado)
+    gc.freeze()
+    try:
+        menu_principal(tareas, motor)
+    finally:
+        # Integrar el diario en tareas.txt (o el WAL en tareas.db) al salir
+        motor.cerrar(tareas)
+
+
+def listar(tareas, titulo):
+    """
+    Muestra un listado de tareas según dónde se ejecuta el programa.
+
+    En una terminal interactiva se pagina (tabla compacta si no cabe en una
+    página); si la entrada o la salida están redirigidas, se vuelca de
+    corrido en bloques.
+
+    Parámetros:
+        tareas (iterable): Tareas a mostrar.
+        titulo (str): Título del listado.
+    """
+    if sys.stdin.isatty() and sys.stdout.isatty():
+        mostrar_paginas(tareas, titulo)
+    else:
+        mostrar_tareas(tareas, titulo)
+
+
+def menu_principal(tareas, motor):
+    """
+    Ejecuta el bucle del menú principal sobre el almacén de tareas.
+
+    Parámetros:
+        tareas (AlmacenTareas): Almacén de tareas abierto.
+        motor (MotorTexto o MotorSQLite): Motor que abrió el almacén.
+    """
 
     # Mostrar bienvenida
     print("\n" + "=" * 70)
@@ -50,7 +108,10 @@ def main():
         mostrar_menu()
 
         # Obtener opción del usuario
-        opcion = input("\nSeleccione una opción (0-8): ").strip()
+        opcion = input("\nSeleccione una opción (0-9): ").strip()
+
+        # Incorporar lo que otros procesos guardaron mientras tanto
+        motor.sincronizar(tareas)
 
         # OPCIÓN 1: Crear nueva tarea
         if opcion == "1":
@@ -101,11 +162,10 @@ def main():
             # Crear la tarea
             tarea = crear_tarea(tareas, titulo, descripcion, estado, prioridad)
             print(f"\n✓ Tarea creada exitosamente con ID: {tarea['id']}\n")
-            guardar_tareas(tareas, "tareas.txt")
 
         # OPCIÓN 2: Ver todas las tareas
         elif opcion == "2":
-            mostrar_tareas(tareas, "TODAS LAS TAREAS")
+            listar(tareas, "TODAS LAS TAREAS")
 
         # OPCIÓN 3: Buscar tarea por título
         elif opcion == "3":
@@ -119,8 +179,8 @@ def main():
                 print("⚠ El término de búsqueda no puede estar vacío.\n")
                 continue
 
-            resultados = buscar_por_titulo(tareas, termino)
-            mostrar_tareas(resultados, f'RESULTADOS DE BÚSQUEDA: "{termino}"')
+            resultados = iterar_por_titulo(tareas, termino)
+            listar(resultados, f'RESULTADOS DE BÚSQUEDA: "{termino}"')
 
         # OPCIÓN 4: Filtrar por estado
         elif opcion == "4":
@@ -139,8 +199,8 @@ def main():
                     break
                 print("⚠ Estado inválido. Ingrese un número entre 1 y 3.")
 
-            resultados = filtrar_por_estado(tareas, estado)
-            mostrar_tareas(resultados, f"TAREAS CON ESTADO: {estado.upper()}")
+            resultados = iterar_por_estado(tareas, estado)
+            listar(resultados, f"TAREAS CON ESTADO: {estado.upper()}")
 
         # OPCIÓN 5: Filtrar por prioridad
         elif opcion == "5":
@@ -159,8 +219,8 @@ def main():
                     break
                 print("⚠ Prioridad inválida. Ingrese un número entre 1 y 3.")
 
-            resultados = filtrar_por_prioridad(tareas, prioridad)
-            mostrar_tareas(resultados, f"TAREAS CON PRIORIDAD: {prioridad.upper()}")
+            resultados = iterar_por_prioridad(tareas, prioridad)
+            listar(resultados, f"TAREAS CON PRIORIDAD: {prioridad.upper()}")
 
         # OPCIÓN 6: Actualizar tarea
         elif opcion == "6":
@@ -184,6 +244,7 @@ def main():
 
             print("\nTarea actual:")
             mostrar_tarea(tarea)
+            version = tareas.version_de(tarea_id)
 
             # Obtener nuevos datos
             print(
@@ -228,17 +289,23 @@ def main():
                         break
                     print("⚠ Prioridad inválida. Ingrese un número entre 1 y 3.")
 
-            # Actualizar tarea
-            if actualizar_tarea(
-                tareas,
-                tarea_id,
-                nuevo_titulo,
-                nueva_descripcion,
-                nuevo_estado,
-                nueva_prioridad,
-            ):
+            # Actualizar tarea (se combina con lo que otro proceso haya
+            # cambiado mientras tanto, salvo que toque los mismos campos)
+            try:
+                actualizada = actualizar_tarea(
+                    tareas,
+                    tarea_id,
+                    nuevo_titulo,
+                    nueva_descripcion,
+                    nuevo_estado,
+                    nueva_prioridad,
+                    version=version,
+                )
+            except ConflictoEscritura as e:
+                print(f"⚠ {e} Revise la tarea y vuelva a intentarlo.\n")
+                continue
+            if actualizada:
                 print("\n✓ Tarea actualizada exitosamente.\n")
-                guardar_tareas(tareas, "tareas.txt")
                 tarea_actualizada = obtener_tarea_por_id(tareas, tarea_id)
                 mostrar_tarea(tarea_actualizada)
             else:
@@ -266,6 +333,7 @@ def main():
 
             print("\nTarea a eliminar:")
             mostrar_tarea(tarea)
+            version = tareas.version_de(tarea_id)
 
             # Confirmación
             confirmacion = (
@@ -275,9 +343,13 @@ def main():
             )
 
             if confirmacion == "s":
-                if eliminar_tarea(tareas, tarea_id):
+                try:
+                    eliminada = eliminar_tarea(tareas, tarea_id, version=version)
+                except ConflictoEscritura as e:
+                    print(f"⚠ {e} No se eliminó.\n")
+                    continue
+                if eliminada:
                     print(f"\n✓ Tarea con ID {tarea_id} eliminada exitosamente.\n")
-                    guardar_tareas(tareas, "tareas.txt")
                 else:
                     print("⚠ Error al eliminar la tarea.\n")
             else:
@@ -289,18 +361,56 @@ def main():
             print("ESTADÍSTICAS DEL SISTEMA")
             print("=" * 70)
 
-            stats = obtener_estadisticas(tareas)
+            # Incluye las tareas archivadas, leídas del índice de segmentos
+            # (import diferido: archivado.py carga gzip y lzma)
+            from archivado import ArchivoTareas
 
-            print(f"\nTotal de tareas: {stats['total_tareas']}")
-            print(f"\nTareas por estado:")
-            print(f"  • Pendientes: {stats['pendientes']}")
-            print(f"  • En progreso: {stats['en_progreso']}")
-            print(f"  • Completadas: {stats['completadas']}")
-            print(f"\nTareas por prioridad:")
-            print(f"  • Baja: {stats['baja']}")
-            print(f"  • Media: {stats['media']}")
-            print(f"  • Alta: {stats['alta']}")
-            print(f"\nTasa de finalización: {stats['tasa_finalizacion']:.1f}%\n")
+            stats = obtener_estadisticas(tareas, ArchivoTareas(motor.archivo))
+            mostrar_estadisticas(stats)
+
+        # OPCIÓN 9: Ver tareas ordenadas (las primeras N con heapq)
+        elif opcion == "9":
+            print("\n" + "=" * 70)
+            print("VER TAREAS ORDENADAS")
+            print("=" * 70)
+
+            while True:
+                print("\nOrdenar por:")
+                for numero, (descripcion, _) in ORDENES_MENU.items():
+                    print(f"  {numero}. {descripcion}")
+                print("  O escriba las claves (p. ej. -prioridad,titulo)")
+                orden_opcion = input("Seleccione el orden: ").strip()
+                if orden_opcion in ORDENES_MENU:
+                    orden = ORDENES_MENU[orden_opcion][1]
+                    break
+                try:
+                    leer_orden(orden_opcion)
+                except ValueError as e:
+                    print(f"⚠ {e}")
+                    continue
+                orden = orden_opcion
+                break
+
+            estado = None
+            estado_opcion = input(
+                "Filtrar por estado (1-3, Enter para todos): "
+            ).strip()
+            if estado_opcion:
+                es_valido, estado = validar_estado(estado_opcion)
+                if not es_valido:
+                    print("⚠ Estado inválido. Ingrese un número entre 1 y 3.\n")
+                    continue
+
+            limite = None
+            limite_opcion = input("¿Cuántas tareas? (Enter para todas): ").strip()
+            if limite_opcion:
+                if not limite_opcion.isdigit() or int(limite_opcion) == 0:
+                    print("⚠ Cantidad inválida. Ingrese un número positivo.\n")
+                    continue
+                limite = int(limite_opcion)
+
+            resultados = ordenar_tareas(tareas, orden, limite, estado)
+            listar(resultados, f"TAREAS ORDENADAS POR: {orden}")
 
         # OPCIÓN 0: Salir
         elif opcion == "0":
@@ -313,11 +423,17 @@ def main():
         # Opción no válida
         else:
             print(
-                "\n⚠ Opción no válida. Por favor, seleccione una opción entre 0 y 8.\n"
+                "\n⚠ Opción no válida. Por favor, seleccione una opción entre 0 y 9.\n"
             )
 
 
 if __name__ == "__main__":
+    # Con argumentos, modo no interactivo (ver cli.py)
+    if len(sys.argv) > 1:
+        from cli import main as main_cli
+
+        sys.exit(main_cli(sys.argv[1:]))
+
     try:
         main()
     except KeyboardInterrupt:
@@ -0,0 +1,438 @@
+"""
+archivado.py - Archivo de tareas completadas en segmentos comprimidos.
+
+Las tareas completadas se acumulan en tareas.txt y cada carga, guardado,
+filtro o estadística las vuelve a recorrer. ArchivoTareas.archivar las
+mueve a un nivel "frío": segmentos comprimidos con gzip o lzma en el
+directorio tareas.txt.archivo/, con el mismo formato de líneas que
+tareas.txt (versión 2). El almacén queda solo con las tareas vigentes.
+
+Las tareas no guardan fechas, así que la antigüedad se mide en IDs: los IDs
+son crecientes y no se reutilizan (ver guardar_secuencia), de modo que una
+tarea tiene antigüedad N cuando después de ella se crearon al menos N
+tareas.
+
+El índice de segmentos (segmentos.json) guarda, por segmento, cuántas
+tareas tiene de cada par (estado, prioridad), su rango de IDs y su tamaño
+comprimido. Las estadísticas del archivo salen de ahí sin descomprimir
+nada, y las consultas por estado o prioridad saltan los segmentos que no
+tienen tareas de ese valor. Los segmentos solo se descomprimen al
+consultarlos:
+
+    archivo = ArchivoTareas("tareas.txt")
+    archivo.archivar(tareas, antiguedad=1000, compresion="lzma")
+    buscar_por_titulo(archivo, "informe")
+    filtrar_por_prioridad(archivo, "alta")
+    archivo.iterar_filtradas(prioridad="alta")   # salta segmentos sin "alta"
+    obtener_estadisticas(tareas, archivo)        # incluye 'archivadas'
+
+Mover las tareas tiene dos fases: primero se escriben los segmentos y se
+anotan en el índice como pendientes; después se eliminan las tareas del
+almacén (un único registro del diario, ver eliminar_tareas_masivo), la
+eliminación se lleva a disco aunque el modo de durabilidad no lo haga
+(AlmacenTareas.asegurar_cambios) y solo entonces los segmentos se marcan
+como confirmados. Las consultas ignoran los segmentos pendientes. Si el
+proceso se interrumpe entre las dos fases, el siguiente archivado lo
+resuelve: como la eliminación es atómica, o siguen en el almacén todas las
+tareas del segmento (se descarta el segmento) o no queda ninguna (se
+confirma).
+
+Compatibilidad: Python 3.8+
+"""
+
+import gzip
+import json
+import lzma
+import os
+import re
+from contextlib import nullcontext
+from functools import partial
+from operator import itemgetter
+
+from almacen import AlmacenTareas, resumir_conteos
+from funciones import (
+    CABECERA_FORMATO,
+    archivo_atomico,
+    eliminar_tareas_masivo,
+    formatear_lote,
+    iterar_filtradas,
+    obtener_proximo_id,
+    parsear_bloque,
+)
+from importacion import lotes
+
+# Compresión -> (extensión de los segmentos, comprimir, descomprimir). gzip
+# con nivel 6: casi el mismo tamaño que con 9 en dos tercios del tiempo; lzma
+# deja segmentos un 30 % más pequeños, pero comprime unas 20 veces más lento
+COMPRESIONES = {
+    "gzip": (".gz", partial(gzip.compress, compresslevel=6), gzip.decompress),
+    "lzma": (".xz", lzma.compress, lzma.decompress),
+}
+
+# Tareas por segmento: acota la memoria al descomprimir y permite saltar
+# segmentos enteros al filtrar
+TAMANO_SEGMENTO = 50000
+
+# Antigüedad (en IDs) por defecto para archivar una tarea completada
+ANTIGUEDAD_ARCHIVO = 1000
+
+VERSION_INDICE_SEGMENTOS = 1
+
+# Nombre de los segmentos; el número se guarda también en segmentos.json
+PATRON_SEGMENTO = re.compile(r"segmento-(\d+)\.")
+
+
+def ruta_archivo(archivo="tareas.txt"):
+    """
+    Retorna el directorio de segmentos asociado a un archivo de tareas.
+
+    Parámetros:
+        archivo (str): Archivo de tareas (tareas.txt o tareas.db).
+
+    Retorna:
+        str: Ruta del directorio (archivo + '.archivo').
+    """
+    return archivo + ".archivo"
+
+
+def numero_segmento(segmento):
+    """
+    Retorna el número de un segmento del índice.
+
+    Parámetros:
+        segmento (dict): Datos del segmento en segmentos.json.
+
+    Retorna:
+        int: Su número ('numero', o el que lleva su nombre en los índices
+            escritos antes de guardarlo).
+    """
+    if "numero" in segmento:
+        return segmento["numero"]
+    return int(PATRON_SEGMENTO.match(segmento["nombre"]).group(1))
+
+
+class ArchivoTareas:
+    """
+    Tareas archivadas en segmentos comprimidos, consultables bajo demanda.
+
+    Se puede recorrer con for, de modo que las funciones de funciones.py que
+    reciben una lista de tareas (buscar_por_titulo, filtrar_por_estado,
+    filtrar_por_prioridad, ordenar_tareas...) funcionan igual con el
+    archivo: cada segmento se descomprime al llegar a él. len() y
+    estadisticas() se leen del índice de segmentos.
+
+    El índice se vuelve a leer cuando cambia en disco, por ejemplo porque
+    otro proceso archivó tareas.
+
+    Atributos:
+        archivo (str): Archivo de tareas al que pertenece el archivo.
+        directorio (str): Directorio de los segmentos.
+    """
+
+    def __init__(self, archivo="tareas.txt"):
+        """
+        Inicializa el archivo asociado a un archivo de tareas.
+
+        Parámetros:
+            archivo (str, optional): Archivo de tareas (tareas.txt o
+                tareas.db según el motor).
+        """
+        self.archivo = archivo
+        self.directorio = ruta_archivo(archivo)
+        self._segmentos = []
+        self._firma = None
+
+    def __repr__(self):
+        return f"ArchivoTareas({self.directorio!r}, {len(self)} tareas)"
+
+    def __len__(self):
+        return sum(segmento["tareas"] for segmento in self.segmentos())
+
+    def __iter__(self):
+        return self.iterar_filtradas()
+
+    def _ruta(self, nombre):
+        """
+        Retorna la ruta de un archivo del directorio de segmentos.
+        """
+        return os.path.join(self.directorio, nombre)
+
+    def segmentos(self, pendientes=False):
+        """
+        Retorna los datos de los segmentos según el índice en disco.
+
+        Parámetros:
+            pendientes (bool, optional): Incluir los segmentos cuyas tareas
+                todavía no se eliminaron del almacén.
+
+        Retorna:
+            list: Diccionarios con 'numero', 'nombre', 'compresion', 'tareas',
+                'primer_id', 'ultimo_id', 'bytes', 'conteos' (lista de
+                [estado, prioridad, cantidad]) y 'confirmado'.
+        """
+        ruta = self._ruta("segmentos.json")
+        try:
+            estado = os.stat(ruta)
+        except FileNotFoundError:
+            self._segmentos, self._firma = [], None
+        else:
+            firma = (estado.st_size, estado.st_mtime_ns)
+            if firma != self._firma:
+                with open(ruta, "r", encoding="utf-8") as f:
+                    datos = json.load(f)
+                if datos.get("version") != VERSION_INDICE_SEGMENTOS:
+                    raise ValueError(f"Índice de segmentos no soportado: {ruta}")
+                self._segmentos, self._firma = datos["segmentos"], firma
+        if pendientes:
+            return list(self._segmentos)
+        return [segmento for segmento in self._segmentos if segmento["confirmado"]]
+
+    def _guardar_indice(self, segmentos):
+        """
+        Reemplaza el índice de segmentos de forma atómica.
+
+        Parámetros:
+            segmentos (list): Datos de todos los segmentos (ver segmentos).
+        """
+        with archivo_atomico(self._ruta("segmentos.json")) as f:
+            json.dump(
+                {"version": VERSION_INDICE_SEGMENTOS, "segmentos": segmentos},
+                f,
+                ensure_ascii=False,
+                indent=1,
+            )
+        self._firma = None
+
+    def estadisticas(self):
+        """
+        Retorna las estadísticas de las tareas archivadas sin descomprimir
+        ningún segmento.
+
+        Retorna:
+            dict: Estadísticas (ver resumir_conteos), más 'segmentos' y
+                'bytes_comprimidos'.
+        """
+        conteos = {}
+        segmentos = self.segmentos()
+        for segmento in segmentos:
+            for estado, prioridad, cantidad in segmento["conteos"]:
+                par = (estado, prioridad)
+                conteos[par] = conteos.get(par, 0) + cantidad
+        resumen = resumir_conteos(conteos)
+        resumen["segmentos"] = len(segmentos)
+        resumen["bytes_comprimidos"] = sum(s["bytes"] for s in segmentos)
+        return resumen
+
+    def leer_segmento(self, segmento, fabrica=None):
+        """
+        Descomprime un segmento y retorna sus tareas.
+
+        Parámetros:
+            segmento (dict): Datos del segmento (ver segmentos).
+            fabrica (callable, optional): Constructor de cada tarea (ver
+                parsear_lineas); por defecto, diccionarios.
+
+        Retorna:
+            list: Tareas del segmento en orden de ID.
+        """
+        descomprimir = COMPRESIONES[segmento["compresion"]][2]
+        with open(self._ruta(segmento["nombre"]), "rb") as f:
+            texto = descomprimir(f.read()).decode("utf-8")
+        tareas = []
+        parsear_bloque(texto.partition("\n")[2], tareas, fabrica)
+        return tareas
+
+    def iterar_filtradas(self, estado=None, prioridad=None):
+        """
+        Recorre las tareas archivadas, opcionalmente filtradas.
+
+        Solo se descomprimen los segmentos que, según el índice, tienen
+        alguna tarea con ese estado y prioridad.
+
+        Parámetros:
+            estado (str, optional): Estado por el cual filtrar.
+            prioridad (str, optional): Prioridad por la cual filtrar.
+
+        Retorna:
+            iterator: Tareas (diccionarios) en orden de segmento y de ID.
+        """
+        estado = estado.lower() if estado is not None else None
+        prioridad = prioridad.lower() if prioridad is not None else None
+        for segmento in self.segmentos():
+            if not any(
+                cantidad
+                and estado in (None, estado_par)
+                and prioridad in (None, prioridad_par)
+                for estado_par, prioridad_par, cantidad in segmento["conteos"]
+            ):
+                continue
+            yield from iterar_filtradas(
+                self.leer_segmento(segmento), estado, prioridad
+            )
+
+    def archivar(
+        self,
+        tareas,
+        antiguedad=ANTIGUEDAD_ARCHIVO,
+        compresion="gzip",
+        tamano_segmento=TAMANO_SEGMENTO,
+    ):
+        """
+        Mueve al archivo las tareas completadas con cierta antigüedad.
+
+        Las tareas se eligen, se archivan y se eliminan dentro del bloque de
+        escritura del almacén, sin que otro proceso las cambie en medio.
+        Los segmentos se confirman en un segundo bloque, después de llevar
+        la eliminación a disco (con SQLite, después de confirmar su
+        transacción; si archivar se llama dentro de otro bloque escritura(),
+        la eliminación solo llega a disco al salir de ese bloque).
+
+        Con una lista, la eliminación solo llega a disco cuando quien llama
+        la guarda: los segmentos quedan pendientes hasta que se confirman
+        con confirmar() (después de guardarla) o en el siguiente archivado.
+
+        Parámetros:
+            tareas (list o AlmacenTareas): Tareas registradas; las archivadas
+                se eliminan de ellas.
+            antiguedad (int, optional): Tareas creadas después de una tarea
+                para que se pueda archivar; 0 archiva todas las completadas.
+            compresion (str, optional): 'gzip' o 'lzma'.
+            tamano_segmento (int, optional): Máximo de tareas por segmento.
+
+        Retorna:
+            list: IDs de las tareas archivadas.
+
+        Lanza:
+            ValueError: Si la compresión no es válida o la antigüedad es
+                negativa.
+            OSError: Si no se pudieron escribir los segmentos (el almacén
+                queda intacto).
+        """
+        if compresion not in COMPRESIONES:
+            opciones = ", ".join(COMPRESIONES)
+            raise ValueError(f"Compresión no soportada: {compresion} (use {opciones})")
+        if antiguedad < 0:
+            raise ValueError("La antigüedad no puede ser negativa")
+
+        if isinstance(tareas, AlmacenTareas):
+            contexto = tareas.escritura()
+        else:
+            contexto = nullcontext()
+        with contexto:
+            segmentos = self._resolver_pendientes(tareas)
+            limite = obtener_proximo_id(tareas) - antiguedad
+            elegidas = sorted(
+                (
+                    tarea
+                    for tarea in iterar_filtradas(tareas, estado="completada")
+                    if tarea["id"] < limite
+                ),
+                key=itemgetter("id"),
+            )
+            if not elegidas:
+                return []
+
+            os.makedirs(self.directorio, exist_ok=True)
+            numero = max(map(numero_segmento, segmentos), default=0)
+            nuevos = []
+            for lote in lotes(elegidas, tamano_segmento):
+                numero += 1
+                nuevos.append(self._escribir_segmento(lote, numero, compresion))
+            self._guardar_indice(segmentos + nuevos)
+
+            archivadas = eliminar_tareas_masivo(
+                tareas, [tarea["id"] for tarea in elegidas]
+            )
+
+        if not isinstance(tareas, AlmacenTareas):
+            return archivadas
+
+        # Confirmar con la eliminación ya en disco: si el proceso se
+        # interrumpe antes, el segmento queda pendiente y no duplica tareas
+        tareas.asegurar_cambios()
+        with tareas.escritura():
+            self._resolver_pendientes(tareas)
+        return archivadas
+
+    def confirmar(self, tareas):
+        """
+        Confirma los segmentos pendientes cuyas tareas ya no están en tareas
+        y descarta los demás (ver _resolver_pendientes).
+
+        Tras archivar desde una lista, se llama después de guardarla.
+
+        Parámetros:
+            tareas (list o AlmacenTareas): Tareas registradas, ya guardadas.
+
+        Retorna:
+            int: Cantidad de segmentos vigentes.
+        """
+        return len(self._resolver_pendientes(tareas))
+
+    def _escribir_segmento(self, tareas, numero, compresion):
+        """
+        Comprime y guarda un segmento.
+
+        Parámetros:
+            tareas (list): Tareas del segmento, en orden de ID.
+            numero (int): Número del segmento.
+            compresion (str): 'gzip' o 'lzma'.
+
+        Retorna:
+            dict: Datos del segmento, todavía sin confirmar.
+        """
+        extension, comprimir, _ = COMPRESIONES[compresion]
+        nombre = f"segmento-{numero:06d}.txt{extension}"
+        texto = CABECERA_FORMATO + "\n" + formatear_lote(tareas)
+        datos = comprimir(texto.encode("utf-8"))
+        with archivo_atomico(self._ruta(nombre), binario=True) as f:
+            f.write(datos)
+
+        conteos = {}
+        for tarea in tareas:
+            par = (tarea["estado"], tarea["prioridad"])
+            conteos[par] = conteos.get(par, 0) + 1
+        return {
+            "numero": numero,
+            "nombre": nombre,
+            "compresion": compresion,
+            "tareas": len(tareas),
+            "primer_id": tareas[0]["id"],
+            "ultimo_id": tareas[-1]["id"],
+            "bytes": len(datos),
+            "conteos": [[e, p, cantidad] for (e, p), cantidad in conteos.items()],
+            "confirmado": False,
+        }
+
+    def _resolver_pendientes(self, tareas):
+        """
+        Termina o deshace un archivado interrumpido (ver el docstring del
+        módulo) y retorna los segmentos que quedan.
+
+        Parámetros:
+            tareas (list o AlmacenTareas): Tareas registradas.
+
+        Retorna:
+            list: Datos de los segmentos, todos confirmados.
+        """
+        segmentos = self.segmentos(pendientes=True)
+        if all(segmento["confirmado"] for segmento in segmentos):
+            return segmentos
+
+        if isinstance(tareas, AlmacenTareas):
+            existe = tareas.__contains__
+        else:
+            existe = {tarea["id"] for tarea in tareas}.__contains__
+        vigentes = []
+        for segmento in segmentos:
+            if not segmento["confirmado"]:
+                ids = map(itemgetter("id"), self.leer_segmento(segmento))
+                if any(map(existe, ids)):
+                    # La eliminación no llegó a hacerse: las tareas siguen
+                    # en el almacén y el segmento sobra
+                    os.remove(self._ruta(segmento["nombre"]))
+                    continue
+                segmento["confirmado"] = True
+            vigentes.append(segmento)
+        self._guardar_indice(vigentes)
+        return vigentes
@@ -0,0 +1,1144 @@
+"""
+benchmark.py - Mediciones de rendimiento del Sistema de Gestión de Tareas.
+
+Cada prueba es una función bench_<nombre>(n) que imprime sus resultados.
+
+La prueba "suite" mide el tiempo y el pico de memoria de cada función
+pública sobre tareas sintéticas reproducibles (ver generador.py) y puede
+guardar los resultados en JSON; "comparar" contrasta dos de esos archivos y
+termina con código 1 si alguna función empeoró más de la tolerancia.
+
+Compatibilidad: Python 3.8+
+Uso:
+    python benchmark.py <prueba> [--n CANTIDAD]
+    python benchmark.py suite [--tamanos 10000 100000] [--semilla 0]
+        [--repeticiones 3] [--salida resultados.json]
+    python benchmark.py comparar base.json actual.json [--tolerancia 0.25]
+"""
+
+import argparse
+import datetime
+import io
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from statistics import median
+
+from almacen import (
+    CAPACIDAD_CACHE_CONSULTAS,
+    AlmacenTareas,
+    Tarea,
+    clave_orden,
+    leer_orden,
+)
+from almacen_mmap import AlmacenMapeado
+from almacenamiento import MOTORES, obtener_motor
+from archivado import ANTIGUEDAD_ARCHIVO, COMPRESIONES, ArchivoTareas
+from diario import DiarioTareas
+from funciones import (
+    actualizar_tarea,
+    actualizar_tareas_masivo,
+    buscar_por_titulo,
+    calcular_estadisticas,
+    cargar_almacen,
+    cargar_instantanea,
+    cargar_tareas,
+    crear_tarea,
+    eliminar_tarea,
+    eliminar_tareas_masivo,
+    filtrar_por_estado,
+    filtrar_por_prioridad,
+    filtrar_tareas,
+    formatear_lote,
+    guardar_tareas,
+    iterar_por_estado,
+    mostrar_tareas,
+    obtener_estadisticas,
+    obtener_proximo_id,
+    obtener_tarea_por_id,
+    ordenar_tareas,
+    paginar,
+    validar_descripcion,
+    validar_estado,
+    validar_id,
+    validar_prioridad,
+    validar_titulo,
+)
+from escaneo import EscaneoParalelo
+from generador import (
+    DISTRIBUCION_ESTADOS,
+    DISTRIBUCION_PRIORIDADES,
+    generar_almacen,
+    generar_archivo,
+    generar_tareas,
+)
+from importacion import exportar_tareas, importar_tareas
+
+ESTADOS = ("pendiente", "en_progreso", "completada")
+PRIORIDADES = ("baja", "media", "alta")
+
+
+def medir_memoria(funcion, *args):
+    """
+    Ejecuta una función y mide el pico de memoria asignada con tracemalloc.
+
+    tracemalloc hace mucho más lenta la ejecución, por lo que los tiempos
+    deben medirse aparte con medir().
+
+    Parámetros:
+        funcion (callable): Función a medir.
+        *args: Argumentos para la función.
+
+    Retorna:
+        tuple: (resultado, pico_bytes: int)
+    """
+    tracemalloc.start()
+    try:
+        resultado = funcion(*args)
+        _, pico = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return resultado, pico
+
+
+def medir(funcion, *args):
+    """
+    Ejecuta una función y mide su duración.
+
+    Parámetros:
+        funcion (callable): Función a medir.
+        *args: Argumentos para la función.
+
+    Retorna:
+        tuple: (resultado, segundos: float)
+    """
+    inicio = time.perf_counter()
+    resultado = funcion(*args)
+    return resultado, time.perf_counter() - inicio
+
+
+def bench_ids(n=1_000_000):
+    """
+    Crea n tareas seguidas con crear_tarea sobre un AlmacenTareas.
+
+    Con la secuencia de IDs cada creación es O(1); con la antigua versión
+    recursiva el programa fallaba a partir de ~1000 tareas.
+
+    Parámetros:
+        n (int): Cantidad de tareas a crear.
+    """
+
+    def crear_muchas(almacen):
+        for i in range(n):
+            crear_tarea(almacen, f"Tarea {i}", "Descripción", "pendiente", "media")
+        return almacen
+
+    almacen, segundos = medir(crear_muchas, AlmacenTareas())
+    print(f"crear_tarea x {n}: {segundos:.3f} s ({n / segundos:,.0f} tareas/s)")
+    print(f"Último ID asignado: {almacen.ultimo_id}")
+
+
+def cargar_tareas_original(archivo):
+    """
+    Cargador original (línea por línea), conservado como referencia.
+
+    Parámetros:
+        archivo (str): Archivo en formato original o versión 2.
+
+    Retorna:
+        list: Lista de tareas.
+    """
+    tareas = []
+    with open(archivo, "r", encoding="utf-8") as f:
+        for linea in f:
+            linea = linea.strip()
+            if linea:
+                partes = linea.split("|")
+                if len(partes) == 5:
+                    tareas.append(
+                        {
+                            "id": int(partes[0]),
+                            "titulo": partes[1],
+                            "descripcion": partes[2],
+                            "estado": partes[3],
+                            "prioridad": partes[4],
+                        }
+                    )
+    return tareas
+
+
+PROGRAMA = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py")
+PROMPT_MENU = b"Seleccione una opci"
+
+
+def medir_programa(argumentos, directorio, marca=None):
+    """
+    Ejecuta python app.py en otro proceso y mide su duración.
+
+    Parámetros:
+        argumentos (list): Argumentos de app.py (vacío para el menú).
+        directorio (str): Directorio de trabajo (con tareas.txt).
+        marca (bytes, optional): Si se indica, se mide hasta que aparece en
+            la salida y luego se responde 0 (salir) al menú.
+
+    Retorna:
+        float: Segundos hasta el final del programa o hasta la marca.
+    """
+    comando = [sys.executable, PROGRAMA, *argumentos]
+    inicio = time.perf_counter()
+    if marca is None:
+        subprocess.run(comando, cwd=directorio, stdout=subprocess.DEVNULL, check=True)
+        return time.perf_counter() - inicio
+
+    proceso = subprocess.Popen(
+        comando, cwd=directorio, stdin=subprocess.PIPE, stdout=subprocess.PIPE
+    )
+    salida = b""
+    while marca not in salida:
+        bloque = os.read(proceso.stdout.fileno(), 65536)
+        if not bloque:
+            raise RuntimeError("El programa terminó sin mostrar el menú")
+        salida += bloque
+    segundos = time.perf_counter() - inicio
+    proceso.communicate(b"0\n")
+    return segundos
+
+
+def bench_arranque(n=1_000_000):
+    """
+    Mide el arranque de app.py sobre n tareas: tiempo hasta el resultado de
+    un subcomando y hasta el primer menú, con y sin la instantánea binaria
+    (tareas.txt.bin, ver cargar_binaria). La primera ejecución lee el texto
+    y escribe la instantánea; las siguientes la usan.
+
+    Parámetros:
+        n (int): Cantidad de tareas.
+    """
+    with tempfile.TemporaryDirectory() as directorio:
+        generar_archivo(n, os.path.join(directorio, "tareas.txt"))
+        casos = (
+            ("ver 1 (sin .bin)", ["ver", "1"], None),
+            ("ver 1", ["ver", "1"], None),
+            ("estadisticas", ["estadisticas"], None),
+            ("buscar presupuesto", ["buscar", "presupuesto"], None),
+            ("primer menú", [], PROMPT_MENU),
+        )
+        print(f"{n:,} tareas")
+        for nombre, argumentos, marca in casos:
+            segundos = medir_programa(argumentos, directorio, marca)
+            print(f"  {nombre:<24}{segundos:8.2f} s")
+
+
+def bench_carga(n=1_000_000):
+    """
+    Compara el cargador original con cargar_instantanea sobre n tareas.
+
+    Parámetros:
+        n (int): Cantidad de tareas del archivo de prueba.
+    """
+    with tempfile.TemporaryDirectory() as directorio:
+        archivo = os.path.join(directorio, "tareas.txt")
+        _, segundos = medir(generar_archivo, n, archivo)
+        print(f"generar y guardar ({n} tareas): {segundos:.3f} s")
+
+        original, t_original = medir(cargar_tareas_original, archivo)
+        nuevo, t_nuevo = medir(cargar_instantanea, archivo)
+
+    print(f"cargador original:  {t_original:.3f} s ({len(original)} tareas)")
+    print(f"cargar_instantanea: {t_nuevo:.3f} s ({len(nuevo)} tareas)")
+    print(f"aceleración: {t_original / t_nuevo:.2f}x")
+
+
+def bench_mmap(n=1_000_000):
+    """
+    Compara el arranque de cargar_almacen con AlmacenMapeado sobre n tareas.
+
+    Parámetros:
+        n (int): Cantidad de tareas del archivo de prueba.
+    """
+    with tempfile.TemporaryDirectory() as directorio:
+        archivo = os.path.join(directorio, "tareas.txt")
+        generar_archivo(n, archivo)
+        tamano = os.path.getsize(archivo) / 1024 / 1024
+        print(f"Archivo: {n} tareas, {tamano:.1f} MB")
+
+        almacen, segundos = medir(cargar_almacen, archivo)
+        del almacen
+        almacen, pico = medir_memoria(cargar_almacen, archivo)
+        del almacen
+        print(f"cargar_almacen:            {segundos:.3f} s, pico {pico / 1e6:.1f} MB")
+
+        mapeado, segundos = medir(AlmacenMapeado, archivo)
+        mapeado.cerrar()
+        print(f"AlmacenMapeado (sin .idx): {segundos:.3f} s (construye el índice)")
+
+        mapeado, segundos = medir(AlmacenMapeado, archivo)
+        mapeado.cerrar()
+        mapeado, pico = medir_memoria(AlmacenMapeado, archivo)
+        print(
+            f"AlmacenMapeado (con .idx): {segundos * 1000:.2f} ms, "
+            f"pico {pico / 1e3:.1f} KB"
+        )
+
+        ids = [random.randint(1, n) for _ in range(10000)]
+        _, segundos = medir(lambda: [mapeado.obtener(i) for i in ids])
+        print(f"obtener x {len(ids)} (aleatorio): {segundos * 1000:.1f} ms")
+        mapeado.cerrar()
+
+
+def bench_memoria(n=1_000_000):
+    """
+    Mide los bytes por tarea con diccionarios y con objetos Tarea compactos.
+
+    Parámetros:
+        n (int): Cantidad de tareas del archivo de prueba.
+    """
+    with tempfile.TemporaryDirectory() as directorio:
+        archivo = os.path.join(directorio, "tareas.txt")
+        generar_archivo(n, archivo)
+
+        for nombre, fabrica in (("dict", None), ("Tarea", Tarea)):
+            tracemalloc.start()
+            tareas = cargar_instantanea(archivo, fabrica=fabrica)
+            actual, _ = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            print(f"{nombre:>6}: {actual / len(tareas):.0f} bytes por tarea")
+            del tareas
+
+
+def estadisticas_original(tareas):
+    """
+    Estadísticas con seis recorridos (versión original), como referencia.
+
+    Parámetros:
+        tareas (list): Lista de tareas.
+
+    Retorna:
+        dict: Conteos por estado y prioridad.
+    """
+    return {
+        "total_tareas": len(tareas),
+        "pendientes": len(filtrar_por_estado(tareas, "pendiente")),
+        "en_progreso": len(filtrar_por_estado(tareas, "en_progreso")),
+        "completadas": len(filtrar_por_estado(tareas, "completada")),
+        "baja": len(filtrar_por_prioridad(tareas, "baja")),
+        "media": len(filtrar_por_prioridad(tareas, "media")),
+        "alta": len(filtrar_por_prioridad(tareas, "alta")),
+    }
+
+
+def bench_estadisticas(n=None):
+    """
+    Compara seis recorridos, un recorrido y los contadores del almacén.
+
+    Sin n se mide con 100.000, 1.000.000 y 10.000.000 de tareas (la última
+    necesita varios GB de memoria).
+
+    Parámetros:
+        n (int, optional): Cantidad de tareas.
+    """
+    for cantidad in (100_000, 1_000_000, 10_000_000) if n is None else (n,):
+        almacen = AlmacenTareas(
+            Tarea(i, f"Tarea {i}", "", ESTADOS[i % 3], PRIORIDADES[i * 7 % 3])
+            for i in range(1, cantidad + 1)
+        )
+        lista = list(almacen)
+
+        original, t_original = medir(estadisticas_original, lista)
+        un_recorrido, t_recorrido = medir(calcular_estadisticas, lista)
+        contadores, t_contadores = medir(obtener_estadisticas, almacen)
+        for clave, valor in original.items():
+            assert un_recorrido[clave] == contadores[clave] == valor, clave
+
+        print(f"{cantidad:,} tareas")
+        print(f"  seis recorridos:   {t_original * 1000:10.2f} ms")
+        print(f"  un recorrido:      {t_recorrido * 1000:10.2f} ms")
+        print(f"  contadores (O(1)): {t_contadores * 1000:10.4f} ms")
+        del almacen, lista
+
+
+def bench_importacion(n=1_000_000):
+    """
+    Mide filas por segundo al importar y exportar CSV y JSON Lines.
+
+    El 1% de las filas generadas es inválido (título vacío) para incluir el
+    costo del informe de rechazos. La importación se hace sobre un almacén
+    con diario, como en python app.py importar.
+
+    Parámetros:
+        n (int): Cantidad de filas.
+    """
+    with tempfile.TemporaryDirectory() as directorio:
+        origen = AlmacenTareas(
+            Tarea(
+                i,
+                "" if i % 100 == 0 else f"Tarea {i}",
+                f"Descripción de la tarea {i}",
+                ESTADOS[i % 3],
+                PRIORIDADES[i * 7 % 3],
+            )
+            for i in range(1, n + 1)
+        )
+        for formato in ("csv", "jsonl"):
+            ruta = os.path.join(directorio, f"tareas.{formato}")
+            _, segundos = medir(exportar_tareas, origen, ruta)
+            print(f"exportar {formato:>5}: {n / segundos:12,.0f} filas/s")
+
+            archivo = os.path.join(directorio, f"destino_{formato}.txt")
+            destino = AlmacenTareas()
+            diario = DiarioTareas(archivo, destino, umbral=float("inf"))
+            informe = os.path.join(directorio, f"rechazadas_{formato}.csv")
+            resumen, segundos = medir(importar_tareas, destino, ruta, None, informe)
+            diario.cerrar(compactar=False)
+            print(
+                f"importar {formato:>5}: {n / segundos:12,.0f} filas/s "
+                f"({resumen['importadas']} importadas, "
+                f"{resumen['rechazadas']} rechazadas)"
+            )
+
+
+def bench_almacenamiento(n=200_000):
+    """
+    Compara los motores de texto y SQLite (ver almacenamiento.py) sobre n
+    tareas: escritura completa, apertura, cambios sueltos y consultas.
+
+    Parámetros:
+        n (int): Cantidad de tareas.
+    """
+    origen = AlmacenTareas(
+        Tarea(
+            i,
+            f"Tarea {i}",
+            f"Descripción de la tarea {i}",
+            ESTADOS[i % 3],
+            PRIORIDADES[i * 7 % 3],
+        )
+        for i in range(1, n + 1)
+    )
+    ids = [random.randint(1, n) for _ in range(10000)]
+    cambios = 1000
+    resultados = {}
+
+    def crear_y_actualizar(almacen):
+        for i in range(cambios):
+            tarea = crear_tarea(almacen, f"Nueva {i}", "", "pendiente", "alta")
+            almacen.actualizar(tarea["id"], estado="completada")
+
+    with tempfile.TemporaryDirectory() as directorio:
+        for nombre in MOTORES:
+            motor = obtener_motor(nombre, os.path.join(directorio, f"tareas_{nombre}"))
+            tiempos = resultados[nombre] = {}
+            _, tiempos["guardar todo"] = medir(motor.guardar, origen)
+            almacen, tiempos["abrir"] = medir(motor.abrir)
+            _, tiempos[f"{cambios} crear + actualizar"] = medir(
+                crear_y_actualizar, almacen
+            )
+            _, tiempos[f"obtener x {len(ids)}"] = medir(
+                lambda: [almacen.obtener(i) for i in ids]
+            )
+            filtradas, tiempos["filtrar estado+prioridad"] = medir(
+                almacen.filtrar, "pendiente", "baja"
+            )
+            _, tiempos["estadisticas"] = medir(almacen.estadisticas)
+            encontradas, tiempos["buscar 'rea 123'"] = medir(almacen.buscar, "rea 123")
+            _, tiempos["cerrar"] = medir(motor.cerrar, almacen)
+            print(
+                f"{nombre}: {len(filtradas)} filtradas, "
+                f"{len(encontradas)} encontradas"
+            )
+
+    print(f"\n{n:,} tareas{'texto':>25}{'sqlite':>12}")
+    for operacion in resultados["texto"]:
+        fila = "".join(
+            f"{resultados[nombre][operacion] * 1000:9.1f} ms" for nombre in MOTORES
+        )
+        print(f"  {operacion:<30}{fila}")
+
+
+def bench_masivo(n=100_000):
+    """
+    Compara cambios uno a uno con las operaciones masivas (ver
+    actualizar_tareas_masivo y eliminar_tareas_masivo): eliminar IDs de una
+    lista y, en cada motor, repriorizar las pendientes y eliminar las
+    completadas.
+
+    Parámetros:
+        n (int): Cantidad de tareas.
+    """
+    azar = random.Random(0)
+    ids = azar.sample(range(1, n + 1), min(2000, n))
+    lista = [dict(tarea) for tarea in generar_tareas(n)]
+    copia = [dict(tarea) for tarea in lista]
+    _, uno_a_uno = medir(lambda: [eliminar_tarea(lista, i) for i in ids])
+    _, masivo = medir(eliminar_tareas_masivo, copia, ids)
+    print(f"{n:,} tareas")
+    print(
+        f"  lista, eliminar {len(ids)} IDs: uno a uno {uno_a_uno:8.3f} s, "
+        f"masivo {masivo:8.3f} s"
+    )
+
+    with tempfile.TemporaryDirectory() as directorio:
+        for nombre in MOTORES:
+            tiempos = []
+            for masiva in (False, True):
+                ruta = os.path.join(directorio, f"tareas_{nombre}_{masiva}")
+                motor = obtener_motor(nombre, ruta)
+                motor.guardar(generar_almacen(n))
+                almacen = motor.abrir()
+
+                def repriorizar():
+                    if masiva:
+                        return actualizar_tareas_masivo(
+                            almacen, predicado={"estado": "pendiente"}, prioridad="alta"
+                        )
+                    for tarea_id in [t["id"] for t in almacen.filtrar("pendiente")]:
+                        almacen.actualizar(tarea_id, prioridad="alta")
+
+                def eliminar_completadas():
+                    if masiva:
+                        return eliminar_tareas_masivo(
+                            almacen, predicado={"estado": "completada"}
+                        )
+                    for tarea_id in [t["id"] for t in almacen.filtrar("completada")]:
+                        almacen.eliminar(tarea_id)
+
+                tiempos.append((medir(repriorizar)[1], medir(eliminar_completadas)[1]))
+                motor.cerrar(almacen, compactar=False)
+            (actualizar_uno, eliminar_uno), (actualizar_lote, eliminar_lote) = tiempos
+            print(
+                f"  {nombre:<6} repriorizar pendientes: uno a uno "
+                f"{actualizar_uno:7.3f} s, masivo {actualizar_lote:7.3f} s; "
+                f"eliminar completadas: {eliminar_uno:7.3f} s, "
+                f"{eliminar_lote:7.3f} s"
+            )
+
+
+def bench_archivo(n=500_000):
+    """
+    Mide el archivado de las tareas completadas (ver archivado.py) sobre un
+    archivo donde el 80 % lo están: carga y guardado de tareas.txt antes y
+    después de archivar, tamaño de los segmentos con gzip y lzma,
+    estadísticas (leídas del índice de segmentos) y una búsqueda entre las
+    archivadas.
+
+    Parámetros:
+        n (int): Cantidad de tareas.
+    """
+    estados = {"pendiente": 1, "en_progreso": 1, "completada": 8}
+    mb = 1024 * 1024
+    print(f"{n:,} tareas, 80 % completadas")
+    with tempfile.TemporaryDirectory() as directorio:
+        for compresion in COMPRESIONES:
+            archivo = os.path.join(directorio, f"tareas_{compresion}.txt")
+            generar_archivo(n, archivo, estados=estados)
+            tamano = os.path.getsize(archivo)
+            almacen, carga = medir(cargar_almacen, archivo)
+            _, guardado = medir(guardar_tareas, almacen, archivo)
+
+            archivo_frio = ArchivoTareas(archivo)
+            archivadas, archivado = medir(
+                archivo_frio.archivar, almacen, ANTIGUEDAD_ARCHIVO, compresion
+            )
+            _, guardado_despues = medir(guardar_tareas, almacen, archivo)
+            _, carga_despues = medir(cargar_almacen, archivo)
+            stats, t_stats = medir(obtener_estadisticas, almacen, archivo_frio)
+            encontradas, busqueda = medir(buscar_por_titulo, archivo_frio, "informe")
+
+            print(
+                f"  {compresion}: archivar {len(archivadas):,} tareas en "
+                f"{archivado:.3f} s ({stats['archivadas']['segmentos']} segmentos, "
+                f"{stats['archivadas']['bytes_comprimidos'] / mb:.1f} MB)"
+            )
+            print(
+                f"    tareas.txt {tamano / mb:.1f} MB -> "
+                f"{os.path.getsize(archivo) / mb:.1f} MB; cargar {carga:.3f} s -> "
+                f"{carga_despues:.3f} s; guardar {guardado:.3f} s -> "
+                f"{guardado_despues:.3f} s"
+            )
+            print(
+                f"    estadísticas con el archivo: {t_stats * 1000:.2f} ms; buscar "
+                f"'informe' entre las archivadas: {busqueda:.3f} s "
+                f"({len(encontradas):,} tareas)"
+            )
+
+
+def bench_consultas(n=100_000):
+    """
+    Mide consultas repetidas (como las opciones 3, 4 y 5 del menú) con y
+    sin la caché de consultas (ver CacheConsultas).
+
+    Se ejecutan 1.000 consultas elegidas entre unas pocas búsquedas y
+    filtros; cada 20 consultas se cambia el estado de una tarea, lo que
+    invalida los filtros por estado pero no las búsquedas ni los filtros
+    por prioridad.
+
+    Parámetros:
+        n (int): Cantidad de tareas.
+    """
+    consultas = [
+        (buscar_por_titulo, "Tarea 12"),
+        (buscar_por_titulo, "Tarea 7"),
+        (filtrar_por_prioridad, "alta"),
+        (filtrar_por_prioridad, "baja"),
+        (filtrar_por_estado, "pendiente"),
+        (filtrar_por_estado, "completada"),
+    ]
+    random.seed(0)
+    secuencia = [random.choice(consultas) for _ in range(1000)]
+
+    for capacidad in (0, CAPACIDAD_CACHE_CONSULTAS):
+        almacen = AlmacenTareas(
+            (
+                Tarea(i, f"Tarea {i}", "", ESTADOS[i % 3], PRIORIDADES[i * 7 % 3])
+                for i in range(1, n + 1)
+            ),
+            capacidad_cache=capacidad,
+        )
+
+        def ejecutar():
+            for i, (consulta, argumento) in enumerate(secuencia, 1):
+                consulta(almacen, argumento)
+                if i % 20 == 0:
+                    tarea_id = random.randint(1, n)
+                    actualizar_tarea(almacen, tarea_id, estado=ESTADOS[i % 3])
+
+        _, segundos = medir(ejecutar)
+        uso = almacen.cache_consultas.estadisticas()
+        print(
+            f"capacidad {capacidad:>4}: {segundos:8.3f} s "
+            f"({len(secuencia) / segundos:10,.0f} consultas/s, "
+            f"{uso['aciertos']} aciertos, {uso['fallos']} fallos)"
+        )
+        del almacen
+
+
+def bench_orden(n=1_000_000):
+    """
+    Compara formas de obtener las primeras tareas de un orden (como la
+    opción 9 del menú): ordenar todas con sorted, seleccionar con heapq y
+    recorrer el índice por prioridad del almacén (ver iterar_ordenadas).
+
+    Parámetros:
+        n (int): Cantidad de tareas.
+    """
+    almacen = generar_almacen(n, capacidad_cache=0)
+    lista = list(almacen)
+    print(f"{n:,} tareas")
+    for orden, estado, limite in (
+        ("-prioridad,id", "pendiente", 20),
+        ("-prioridad,titulo", None, 20),
+        ("estado,-prioridad,id", None, 1000),
+        ("titulo,id", None, 20),
+        ("-prioridad,id", None, None),
+    ):
+        clave = clave_orden(leer_orden(orden))
+        filtradas = [t for t in lista if estado is None or t.estado == estado]
+        esperado, completo = medir(lambda: sorted(filtradas, key=clave)[:limite])
+        seleccion, heap = medir(ordenar_tareas, filtradas, orden, limite)
+        indice_, indice = medir(almacen.ordenar, orden, limite, estado)
+        assert [t.id for t in seleccion] == [t.id for t in esperado]
+        assert [t.id for t in indice_] == [t.id for t in esperado]
+        print(
+            f"  {orden:<22} {estado or '':<10} k={limite or 'todas':<6} "
+            f"sorted {completo:7.3f} s, heapq {heap:7.3f} s, "
+            f"almacén {indice:7.3f} s"
+        )
+
+
+def es_urgente(tarea):
+    """
+    Predicado de ejemplo para bench_escaneo (a nivel de módulo para poder
+    enviarlo a otros procesos).
+    """
+    return tarea["prioridad"] == "alta" and tarea["titulo"].endswith("7")
+
+
+def bench_escaneo(n=1_000_000):
+    """
+    Compara el recorrido en serie del almacén con EscaneoParalelo (ver
+    escaneo.py) para 1, 2, 4, ... procesos hasta la cantidad de núcleos.
+
+    Parámetros:
+        n (int): Cantidad de tareas.
+    """
+    almacen = AlmacenTareas(
+        Tarea(
+            i,
+            f"Tarea {i}",
+            f"Descripción de la tarea {i} para el cliente {i % 997}",
+            ESTADOS[i % 3],
+            PRIORIDADES[i * 7 % 3],
+        )
+        for i in range(1, n + 1)
+    )
+    campos = ("titulo", "descripcion")
+    termino = "cliente 99"
+
+    encontradas, segundos = medir(almacen.buscar, termino, campos)
+    print(f"{n:,} tareas, {len(encontradas)} coincidencias de {termino!r}")
+    print(f"  recorrido en serie:          {segundos:8.3f} s")
+    _, segundos = medir(
+        lambda: [tarea for tarea in almacen if es_urgente(tarea)]
+    )
+    print(f"  predicado en serie:          {segundos:8.3f} s")
+
+    procesos = 1
+    while procesos <= (os.cpu_count() or 1):
+        with EscaneoParalelo(almacen, procesos=procesos, umbral=0) as escaneo:
+            _, construir = medir(escaneo.escanear, termino, campos)
+            resultado, segundos = medir(escaneo.escanear, termino, campos)
+            assert [t["id"] for t in resultado] == [t["id"] for t in encontradas]
+            _, predicado = medir(escaneo.escanear, None, campos, None, None, es_urgente)
+            _, predicado = medir(escaneo.escanear, None, campos, None, None, es_urgente)
+        print(
+            f"  {procesos:>2} procesos: término {segundos:8.3f} s, "
+            f"predicado {predicado:8.3f} s (construir columnas {construir:.2f} s)"
+        )
+        procesos *= 2
+
+
+# Tamaños por defecto de la suite y llamadas de las funciones de una tarea
+TAMANOS_SUITE = (10_000, 100_000)
+LLAMADAS_SUELTAS = 1000
+FORMATO_RESULTADOS = 2
+# Diferencias menores que estas se consideran ruido al comparar
+MINIMO_SEGUNDOS = 0.005
+MINIMO_MEMORIA = 64 * 1024
+# Mediciones de tiempo necesarias en ambos resultados para juzgar un caso
+MINIMO_REPETICIONES = 3
+
+
+def casos_suite(n, directorio, semilla=0):
+    """
+    Define los casos de la suite para n tareas sintéticas.
+
+    Cada caso tiene una función preparar que se ejecuta antes de cada
+    medición (fuera del tiempo medido) y retorna la función sin argumentos
+    a medir. Los casos que modifican tareas preparan un almacén nuevo cada
+    vez; el resto comparte uno. Los almacenes se crean sin caché de
+    consultas para medir el trabajo real de cada llamada.
+
+    Parámetros:
+        n (int): Cantidad de tareas.
+        directorio (str): Directorio para los archivos de la suite.
+        semilla (int, optional): Semilla de los datos y de los IDs elegidos.
+
+    Retorna:
+        dict: nombre -> (llamadas: int, preparar: callable)
+    """
+    archivo = os.path.join(directorio, f"tareas_{n}.txt")
+    generar_archivo(n, archivo, semilla)
+    almacen = generar_almacen(n, semilla, capacidad_cache=0)
+    lista = cargar_tareas(archivo)
+    objetos = list(almacen)
+    llamadas = min(LLAMADAS_SUELTAS, n)
+    azar = random.Random(semilla)
+    ids = [azar.randint(1, n) for _ in range(llamadas)]
+    distintos = azar.sample(range(1, n + 1), llamadas)
+    muestra = [lista[i - 1] for i in ids]
+    salida = os.path.join(directorio, "salida.txt")
+    exportados = {}
+    for formato in ("csv", "jsonl"):
+        exportados[formato] = os.path.join(directorio, f"tareas_{n}.{formato}")
+        exportar_tareas(almacen, exportados[formato])
+
+    def nuevo():
+        return generar_almacen(n, semilla, capacidad_cache=0)
+
+    def crear():
+        destino = nuevo()
+
+        def ejecutar():
+            for tarea in muestra:
+                crear_tarea(
+                    destino,
+                    tarea["titulo"],
+                    tarea["descripcion"],
+                    tarea["estado"],
+                    tarea["prioridad"],
+                )
+
+        return ejecutar
+
+    def actualizar():
+        destino = nuevo()
+
+        def ejecutar():
+            for i, tarea_id in enumerate(ids):
+                actualizar_tarea(destino, tarea_id, estado=ESTADOS[i % 3])
+
+        return ejecutar
+
+    def eliminar():
+        destino = nuevo()
+
+        def ejecutar():
+            for tarea_id in distintos:
+                eliminar_tarea(destino, tarea_id)
+
+        return ejecutar
+
+    def masivo(operacion, **argumentos):
+        def preparar():
+            destino = nuevo()
+            return lambda: operacion(destino, **argumentos)
+
+        return preparar
+
+    def archivar():
+        destino = nuevo()
+        archivo_frio = ArchivoTareas(
+            os.path.join(tempfile.mkdtemp(dir=directorio), "tareas.txt")
+        )
+        return lambda: archivo_frio.archivar(destino, 0)
+
+    # Las completadas, ya archivadas, para las consultas sobre el archivo
+    archivadas = ArchivoTareas(os.path.join(directorio, f"archivadas_{n}.txt"))
+    archivadas.archivar(nuevo(), 0)
+
+    def validar(funcion, valores):
+        def ejecutar():
+            for valor in valores:
+                funcion(valor)
+
+        return lambda: ejecutar
+
+    casos = {
+        "cargar_tareas": (1, lambda: lambda: cargar_tareas(archivo)),
+        "cargar_instantanea": (1, lambda: lambda: cargar_instantanea(archivo)),
+        "cargar_almacen": (1, lambda: lambda: cargar_almacen(archivo)),
+        "guardar_tareas": (1, lambda: lambda: guardar_tareas(almacen, salida)),
+        "formatear_lote": (1, lambda: lambda: formatear_lote(objetos)),
+        "crear_tarea": (llamadas, crear),
+        "obtener_tarea_por_id": (
+            llamadas,
+            lambda: lambda: [obtener_tarea_por_id(almacen, i) for i in ids],
+        ),
+        "actualizar_tarea": (llamadas, actualizar),
+        "eliminar_tarea": (llamadas, eliminar),
+        "actualizar_tareas_masivo": (
+            1,
+            masivo(
+                actualizar_tareas_masivo,
+                predicado={"estado": "pendiente"},
+                prioridad="alta",
+            ),
+        ),
+        "eliminar_tareas_masivo": (
+            1,
+            masivo(eliminar_tareas_masivo, predicado={"estado": "completada"}),
+        ),
+        "ArchivoTareas.archivar": (1, archivar),
+        "obtener_proximo_id": (1, lambda: lambda: obtener_proximo_id(lista)),
+        "buscar_por_titulo": (
+            1,
+            lambda: lambda: buscar_por_titulo(almacen, "presupuesto"),
+        ),
+        "buscar_por_titulo[archivo]": (
+            1,
+            lambda: lambda: buscar_por_titulo(archivadas, "presupuesto"),
+        ),
+        "filtrar_por_estado": (
+            1,
+            lambda: lambda: filtrar_por_estado(almacen, "pendiente"),
+        ),
+        "filtrar_por_prioridad": (
+            1,
+            lambda: lambda: filtrar_por_prioridad(almacen, "alta"),
+        ),
+        "filtrar_tareas": (
+            1,
+            lambda: lambda: filtrar_tareas(almacen, "en_progreso", "alta"),
+        ),
+        "ordenar_tareas": (
+            1,
+            lambda: lambda: ordenar_tareas(almacen, "-prioridad,id", 20, "pendiente"),
+        ),
+        "ordenar_tareas[heapq]": (
+            1,
+            lambda: lambda: ordenar_tareas(lista, "titulo,id", 20),
+        ),
+        "paginar": (
+            1,
+            lambda: lambda: list(
+                paginar(iterar_por_estado(almacen, "completada"), 20, n // 10)
+            ),
+        ),
+        "obtener_estadisticas": (1, lambda: lambda: obtener_estadisticas(almacen)),
+        "obtener_estadisticas[archivo]": (
+            1,
+            lambda: lambda: obtener_estadisticas(almacen, archivadas),
+        ),
+        "calcular_estadisticas": (1, lambda: lambda: calcular_estadisticas(lista)),
+        "mostrar_tareas": (
+            1,
+            lambda: lambda: mostrar_tareas(
+                almacen, compacto=True, salida=io.StringIO()
+            ),
+        ),
+        "validar_titulo": (
+            llamadas,
+            validar(validar_titulo, [t["titulo"] for t in muestra]),
+        ),
+        "validar_descripcion": (
+            llamadas,
+            validar(validar_descripcion, [t["descripcion"] for t in muestra]),
+        ),
+        "validar_estado": (
+            llamadas,
+            validar(validar_estado, [t["estado"] for t in muestra]),
+        ),
+        "validar_prioridad": (
+            llamadas,
+            validar(validar_prioridad, [t["prioridad"] for t in muestra]),
+        ),
+        "validar_id": (llamadas, validar(validar_id, [str(i) for i in ids])),
+    }
+    for formato, ruta in exportados.items():
+        destino = os.path.join(directorio, f"salida.{formato}")
+        casos[f"exportar_tareas[{formato}]"] = (
+            1,
+            lambda destino=destino: lambda: exportar_tareas(almacen, destino),
+        )
+        casos[f"importar_tareas[{formato}]"] = (
+            1,
+            lambda ruta=ruta: lambda: importar_tareas(
+                AlmacenTareas(capacidad_cache=0), ruta
+            ),
+        )
+    return casos
+
+
+def medir_caso(preparar, repeticiones=3):
+    """
+    Mide un caso de la suite: el tiempo de varias repeticiones y, en una
+    ejecución aparte, el pico de memoria.
+
+    Parámetros:
+        preparar (callable): Retorna la función a medir (ver casos_suite).
+        repeticiones (int, optional): Mediciones de tiempo.
+
+    Retorna:
+        tuple: (tiempos: list de segundos, uno por repetición, pico_bytes: int)
+    """
+    tiempos = [medir(preparar())[1] for _ in range(max(1, repeticiones))]
+    _, pico = medir_memoria(preparar())
+    return tiempos, pico
+
+
+def bench_suite(tamanos=TAMANOS_SUITE, semilla=0, repeticiones=3, salida=None):
+    """
+    Mide el tiempo y el pico de memoria de cada función pública (ver
+    casos_suite) para cada tamaño y, opcionalmente, guarda los resultados
+    en JSON para compararlos después con comparar_resultados.
+
+    Parámetros:
+        tamanos (iterable, optional): Cantidades de tareas.
+        semilla (int, optional): Semilla de los datos sintéticos.
+        repeticiones (int, optional): Mediciones de tiempo por caso.
+        salida (str, optional): Archivo JSON de resultados.
+
+    Retorna:
+        dict: Resultados (el mismo contenido que el archivo JSON).
+    """
+    resultados = []
+    print(f"{'función':<26}{'tareas':>10}{'llamadas':>10}{'ms':>12}{'pico KB':>12}")
+    for n in tamanos:
+        with tempfile.TemporaryDirectory() as directorio:
+            for nombre, (llamadas, preparar) in casos_suite(
+                n, directorio, semilla
+            ).items():
+                tiempos, pico = medir_caso(preparar, repeticiones)
+                segundos = min(tiempos)
+                resultados.append(
+                    {
+                        "funcion": nombre,
+                        "tareas": n,
+                        "llamadas": llamadas,
+                        "segundos": segundos,
+                        "mediana": median(tiempos),
+                        "tiempos": tiempos,
+                        "memoria_pico": pico,
+                    }
+                )
+                print(
+                    f"{nombre:<26}{n:>10}{llamadas:>10}"
+                    f"{segundos * 1000:>12.3f}{pico / 1024:>12.1f}"
+                )
+
+    datos = {
+        "formato": FORMATO_RESULTADOS,
+        "fecha": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "semilla": semilla,
+        "repeticiones": repeticiones,
+        "distribucion": {
+            "estado": DISTRIBUCION_ESTADOS,
+            "prioridad": DISTRIBUCION_PRIORIDADES,
+        },
+        "resultados": resultados,
+    }
+    if salida:
+        with open(salida, "w", encoding="utf-8") as f:
+            json.dump(datos, f, ensure_ascii=False, indent=2)
+        print(f"\n✓ Resultados guardados en {salida}")
+    return datos
+
+
+def leer_resultados(ruta):
+    """
+    Lee un archivo de resultados guardado por bench_suite.
+
+    Parámetros:
+        ruta (str): Archivo JSON.
+
+    Retorna:
+        dict: Resultados.
+    """
+    with open(ruta, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def tiempos_comparables(anterior, resultado):
+    """
+    Retorna los tiempos de un caso a comparar y su margen de ruido.
+
+    Se comparan las medianas de las repeticiones, que una medición suelta
+    lenta no mueve. El ruido es la dispersión (máximo menos mínimo) de las
+    mediciones de la base, de modo que crece con la duración del caso, y
+    como mínimo MINIMO_SEGUNDOS.
+
+    Parámetros:
+        anterior (dict): Fila del caso en los resultados de referencia.
+        resultado (dict): Fila del caso en los resultados nuevos.
+
+    Retorna:
+        tuple o None: (antes: float, ahora: float, ruido: float), o None si
+            alguno tiene menos de MINIMO_REPETICIONES mediciones (o es del
+            formato 1, que solo guardaba el mínimo).
+    """
+    base, nuevos = anterior.get("tiempos", []), resultado.get("tiempos", [])
+    if min(len(base), len(nuevos)) < MINIMO_REPETICIONES:
+        return None
+    ruido = max(MINIMO_SEGUNDOS, max(base) - min(base))
+    return median(base), median(nuevos), ruido
+
+
+def comparar_resultados(base, actual, tolerancia=0.25):
+    """
+    Compara dos resultados de bench_suite y muestra la variación por caso.
+
+    Un caso empeora si la mediana de su tiempo crece más que la tolerancia
+    relativa y, a la vez, más que el ruido de sus repeticiones (ver
+    tiempos_comparables), o si su pico de memoria crece más que la
+    tolerancia y que MINIMO_MEMORIA. El tiempo de un caso con menos de
+    MINIMO_REPETICIONES mediciones no se juzga (se muestra '-'). Los casos
+    que solo están en uno de los dos se ignoran.
+
+    Parámetros:
+        base (dict): Resultados de referencia.
+        actual (dict): Resultados nuevos.
+        tolerancia (float, optional): Aumento relativo admitido (0.25 = 25%).
+
+    Retorna:
+        list: Descripción de cada regresión encontrada.
+    """
+    anteriores = {(r["funcion"], r["tareas"]): r for r in base["resultados"]}
+    regresiones = []
+    print(f"{'función':<26}{'tareas':>10}{'tiempo':>10}{'memoria':>10}")
+    for resultado in actual["resultados"]:
+        clave = (resultado["funcion"], resultado["tareas"])
+        anterior = anteriores.get(clave)
+        if anterior is None:
+            continue
+        columnas = []
+        for campo, comparables in (
+            ("mediana", tiempos_comparables(anterior, resultado)),
+            (
+                "memoria_pico",
+                (anterior["memoria_pico"], resultado["memoria_pico"], MINIMO_MEMORIA),
+            ),
+        ):
+            if comparables is None:
+                columnas.append(f"{'-':>10}")
+                continue
+            antes, ahora, minimo = comparables
+            variacion = (ahora - antes) / antes if antes else 0.0
+            columnas.append(f"{variacion:>+10.0%}")
+            if variacion > tolerancia and ahora - antes > minimo:
+                regresiones.append(
+                    f"{clave[0]} ({clave[1]} tareas): {campo} "
+                    f"{antes:.6g} -> {ahora:.6g} ({variacion:+.0%})"
+                )
+        print(f"{clave[0]:<26}{clave[1]:>10}" + "".join(columnas))
+    return regresiones
+
+
+PRUEBAS = {
+    "almacenamiento": bench_almacenamiento,
+    "archivo": bench_archivo,
+    "arranque": bench_arranque,
+    "carga": bench_carga,
+    "consultas": bench_consultas,
+    "escaneo": bench_escaneo,
+    "estadisticas": bench_estadisticas,
+    "ids": bench_ids,
+    "importacion": bench_importacion,
+    "masivo": bench_masivo,
+    "memoria": bench_memoria,
+    "mmap": bench_mmap,
+    "orden": bench_orden,
+}
+
+
+def main():
+    """
+    Punto de entrada de la línea de comandos.
+
+    Retorna:
+        int: Código de salida (1 si comparar encuentra regresiones).
+    """
+    parser = argparse.ArgumentParser(description="Benchmarks de gestión de tareas")
+    parser.add_argument("prueba", choices=sorted([*PRUEBAS, "suite", "comparar"]))
+    parser.add_argument(
+        "archivos", nargs="*", help="comparar: resultados base y actual (JSON)"
+    )
+    parser.add_argument("--n", type=int, default=None, help="Cantidad de tareas")
+    parser.add_argument("--tamanos", type=int, nargs="+", help="suite: cantidades")
+    parser.add_argument("--semilla", type=int, default=0)
+    parser.add_argument("--repeticiones", type=int, default=3)
+    parser.add_argument("--salida", help="suite: archivo JSON de resultados")
+    parser.add_argument(
+        "--tolerancia", type=float, default=0.25, help="comparar: aumento admitido"
+    )
+    args = parser.parse_args()
+
+    if args.prueba == "comparar":
+        if len(args.archivos) != 2:
+            parser.error("comparar necesita dos archivos: base.json actual.json")
+        base, actual = (leer_resultados(ruta) for ruta in args.archivos)
+        regresiones = comparar_resultados(base, actual, args.tolerancia)
+        for regresion in regresiones:
+            print(f"⚠ {regresion}")
+        if regresiones:
+            return 1
+        print("✓ Sin regresiones")
+    elif args.prueba == "suite":
+        tamanos = args.tamanos or ([args.n] if args.n else TAMANOS_SUITE)
+        bench_suite(tamanos, args.semilla, args.repeticiones, args.salida)
+    elif args.n is None:
+        PRUEBAS[args.prueba]()
+    else:
+        PRUEBAS[args.prueba](args.n)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
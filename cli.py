@@ -0,0 +1,740 @@
+"""
+cli.py - Línea de comandos no interactiva del Sistema de Gestión de Tareas.
+
+Cada operación del menú está disponible como subcomando, con un alias en
+inglés:
+
+    python app.py crear "Título" "Descripción" -e pendiente -p alta    (add)
+    python app.py ver 3                                                (get)
+    python app.py actualizar 3 -e completada                           (update)
+    python app.py eliminar 3                                           (delete)
+    python app.py actualizar-masivo 3 4 5 -p alta                      (bulk-update)
+    python app.py eliminar-masivo --con-estado completada              (bulk-delete)
+    python app.py listar --estado pendiente --compacto                 (list)
+    python app.py listar -e pendiente --orden=-prioridad,id --limite 20
+    python app.py buscar informe                                       (search)
+    python app.py buscar informe --archivadas
+    python app.py estadisticas                                         (stats)
+    python app.py archivar --antiguedad 1000 --compresion lzma         (archive)
+    python app.py importar tareas.csv --informe rechazadas.csv         (import)
+    python app.py exportar tareas.jsonl --estado pendiente             (export)
+    python app.py lote [archivo]                                       (batch)
+    python app.py migrar sqlite                                        (migrate)
+
+Un subcomando suelto anota su cambio en el diario (tareas.txt.log). El modo
+lote lee un subcomando por línea (sintaxis de shell, '#' para comentarios)
+desde un archivo o la entrada estándar, los aplica en memoria y al terminar
+escribe todos sus registros del diario de una vez (con SQLite, una sola
+transacción). El cerrojo de escritura queda tomado todo el tiempo: otros
+procesos pueden leer, pero sus cambios esperan a que el lote termine (ver
+concurrencia.py).
+
+Las opciones generales --motor (texto, sqlite o mmap, por defecto la variable
+TAREAS_MOTOR) y --archivo eligen dónde se guardan las tareas (ver
+almacenamiento.py); migrar copia los datos del motor actual a otro.
+
+Compatibilidad: Python 3.8+
+"""
+
+import argparse
+import os
+import shlex
+import sys
+
+from almacen import ESTADOS, PRIORIDADES, leer_orden
+from almacenamiento import MOTORES, migrar_almacenamiento, obtener_motor
+from funciones import (
+    actualizar_tarea,
+    actualizar_tareas_masivo,
+    convertir_estado,
+    convertir_prioridad,
+    crear_tarea,
+    eliminar_tarea,
+    eliminar_tareas_masivo,
+    iterar_filtradas,
+    iterar_por_estado,
+    iterar_por_prioridad,
+    iterar_por_titulo,
+    mostrar_estadisticas,
+    mostrar_tarea,
+    mostrar_tareas,
+    obtener_estadisticas,
+    obtener_tarea_por_id,
+    ordenar_tareas,
+    validar_descripcion,
+    validar_id,
+    validar_titulo,
+)
+from importacion import FORMATOS, exportar_tareas, importar_tareas
+from indice_texto import cargar_indice_texto
+
+
+class ErrorComando(Exception):
+    """
+    Error de un subcomando: argumentos inválidos o tarea inexistente.
+    """
+
+
+class ParserLote(argparse.ArgumentParser):
+    """
+    Parser que lanza ErrorComando en lugar de terminar el programa, para
+    que una línea inválida del lote no detenga las demás.
+    """
+
+    def error(self, message):
+        raise ErrorComando(message)
+
+    def exit(self, status=0, message=None):
+        raise ErrorComando(message or "Comando interrumpido")
+
+
+def tipo_valor(nombre, valores, convertir_valor):
+    """
+    Crea un conversor de argparse para estado o prioridad.
+
+    Acepta el nombre ('en_progreso', sin distinguir mayúsculas) o el número
+    del menú (1-3).
+
+    Parámetros:
+        nombre (str): 'Estado' o 'Prioridad', para el mensaje de error.
+        valores (dict): Códigos -> nombres válidos.
+        convertir_valor (callable): convertir_estado o convertir_prioridad.
+
+    Retorna:
+        callable: Función texto -> nombre válido.
+    """
+
+    def convertir(texto):
+        es_valido, valor = convertir_valor(texto)
+        if es_valido:
+            return valor
+        opciones = ", ".join(valores.values())
+        raise argparse.ArgumentTypeError(
+            f"{nombre} inválido: {texto!r} (use {opciones} o 1-3)"
+        )
+
+    return convertir
+
+
+def tipo_id(texto):
+    """
+    Conversor de argparse para IDs de tarea.
+
+    Parámetros:
+        texto (str): ID escrito por el usuario.
+
+    Retorna:
+        int: ID válido.
+    """
+    es_valido, tarea_id = validar_id(texto)
+    if not es_valido:
+        raise argparse.ArgumentTypeError(f"ID inválido: {texto!r}")
+    return tarea_id
+
+
+def tipo_orden(texto):
+    """
+    Conversor de argparse para claves de orden ('-prioridad,id').
+
+    Parámetros:
+        texto (str): Claves escritas por el usuario.
+
+    Retorna:
+        str: Las mismas claves, ya validadas (ver leer_orden).
+    """
+    try:
+        leer_orden(texto)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e)) from None
+    return texto
+
+
+def validar_texto(validar, texto):
+    """
+    Aplica validar_titulo o validar_descripcion y lanza ErrorComando.
+
+    Parámetros:
+        validar (callable): Función de validación del módulo funciones.
+        texto (str o None): Texto a validar; None se acepta sin validar.
+
+    Retorna:
+        str o None: El texto sin espacios sobrantes.
+    """
+    if texto is None:
+        return None
+    texto = texto.strip()
+    es_valido, mensaje = validar(texto)
+    if not es_valido:
+        raise ErrorComando(mensaje)
+    return texto
+
+
+def comando_crear(tareas, args):
+    """
+    Crea una tarea.
+
+    Los subcomandos reciben el almacén y los argumentos ya convertidos;
+    retornan True si modificaron el almacén y lanzan ErrorComando si fallan.
+    """
+    titulo = validar_texto(validar_titulo, args.titulo)
+    descripcion = validar_texto(validar_descripcion, args.descripcion)
+    tarea = crear_tarea(tareas, titulo, descripcion, args.estado, args.prioridad)
+    print(f"✓ Tarea creada con ID {tarea['id']}")
+    return True
+
+
+def comando_ver(tareas, args):
+    """
+    Muestra una tarea por su ID.
+    """
+    tarea = obtener_tarea_por_id(tareas, args.id)
+    if tarea is None:
+        raise ErrorComando(f"No existe tarea con ID {args.id}")
+    mostrar_tarea(tarea)
+    return False
+
+
+def comando_actualizar(tareas, args):
+    """
+    Modifica los campos indicados de una tarea.
+    """
+    titulo = validar_texto(validar_titulo, args.titulo)
+    descripcion = validar_texto(validar_descripcion, args.descripcion)
+    if not actualizar_tarea(
+        tareas, args.id, titulo, descripcion, args.estado, args.prioridad
+    ):
+        raise ErrorComando(f"No existe tarea con ID {args.id}")
+    print(f"✓ Tarea con ID {args.id} actualizada")
+    return True
+
+
+def comando_eliminar(tareas, args):
+    """
+    Elimina una tarea (sin pedir confirmación).
+    """
+    if not eliminar_tarea(tareas, args.id):
+        raise ErrorComando(f"No existe tarea con ID {args.id}")
+    print(f"✓ Tarea con ID {args.id} eliminada")
+    return True
+
+
+def seleccion_masiva(args):
+    """
+    Retorna los IDs o los criterios de un subcomando masivo.
+
+    Parámetros:
+        args (argparse.Namespace): Argumentos con ids, con_estado y
+            con_prioridad.
+
+    Retorna:
+        tuple: (ids, criterios) para actualizar/eliminar_tareas_masivo; uno
+            de los dos es None.
+    """
+    criterios = {
+        campo: valor
+        for campo, valor in (
+            ("estado", args.con_estado),
+            ("prioridad", args.con_prioridad),
+        )
+        if valor is not None
+    }
+    if args.ids and criterios:
+        raise ErrorComando("Indique IDs o --con-estado/--con-prioridad, no ambos")
+    if args.ids:
+        return args.ids, None
+    if not criterios:
+        raise ErrorComando("Indique IDs o un criterio (--con-estado, --con-prioridad)")
+    return None, criterios
+
+
+def comando_actualizar_masivo(tareas, args):
+    """
+    Aplica el mismo cambio a varias tareas (un único registro del diario).
+    """
+    titulo = validar_texto(validar_titulo, args.titulo)
+    descripcion = validar_texto(validar_descripcion, args.descripcion)
+    if (titulo, descripcion, args.estado, args.prioridad) == (None,) * 4:
+        raise ErrorComando("Indique algún campo a cambiar (-t, -d, -e o -p)")
+    ids, criterios = seleccion_masiva(args)
+    modificadas = actualizar_tareas_masivo(
+        tareas, ids, criterios, titulo, descripcion, args.estado, args.prioridad
+    )
+    print(f"✓ {len(modificadas)} tareas actualizadas")
+    return bool(modificadas)
+
+
+def comando_eliminar_masivo(tareas, args):
+    """
+    Elimina varias tareas (sin pedir confirmación; un único registro del
+    diario).
+    """
+    ids, criterios = seleccion_masiva(args)
+    eliminadas = eliminar_tareas_masivo(tareas, ids, criterios)
+    print(f"✓ {len(eliminadas)} tareas eliminadas")
+    return bool(eliminadas)
+
+
+def comando_listar(tareas, args):
+    """
+    Lista las tareas, opcionalmente filtradas, ordenadas y paginadas.
+
+    Con --orden y --limite solo se seleccionan las tareas de la página (las
+    primeras del orden, ver ordenar_tareas), sin ordenar todas. Con
+    --archivadas se listan las tareas archivadas (ver archivado.py),
+    descomprimiendo solo los segmentos con ese estado y prioridad.
+    """
+    if args.archivadas:
+        from archivado import ArchivoTareas
+
+        archivo = ArchivoTareas(args.archivo)
+        tareas = archivo.iterar_filtradas(args.estado, args.prioridad)
+    if args.orden is not None:
+        limite = None if args.limite is None else args.desplazamiento + args.limite
+        resultados = ordenar_tareas(
+            tareas, args.orden, limite, args.estado, args.prioridad
+        )
+        mostrar_tareas(
+            resultados, "TAREAS", args.compacto, args.limite, args.desplazamiento
+        )
+        return False
+
+    # Un único filtro combinado: con un almacén, una sola entrada de la caché
+    resultados = iterar_filtradas(tareas, args.estado, args.prioridad)
+    mostrar_tareas(
+        resultados, "TAREAS", args.compacto, args.limite, args.desplazamiento
+    )
+    return False
+
+
+def comando_buscar(tareas, args):
+    """
+    Busca tareas por título (con --archivadas, entre las archivadas).
+    """
+    if args.archivadas:
+        from archivado import ArchivoTareas
+
+        tareas = ArchivoTareas(args.archivo)
+    resultados = iterar_por_titulo(tareas, args.termino)
+    mostrar_tareas(
+        resultados,
+        f'RESULTADOS DE BÚSQUEDA: "{args.termino}"',
+        args.compacto,
+        args.limite,
+        args.desplazamiento,
+    )
+    return False
+
+
+def comando_estadisticas(tareas, args):
+    """
+    Muestra las estadísticas del sistema, con las de las tareas archivadas.
+    """
+    from archivado import ArchivoTareas
+
+    mostrar_estadisticas(obtener_estadisticas(tareas, ArchivoTareas(args.archivo)))
+    return False
+
+
+def comando_archivar(tareas, args):
+    """
+    Mueve las tareas completadas antiguas a segmentos comprimidos (ver
+    archivado.py).
+    """
+    from archivado import ANTIGUEDAD_ARCHIVO, ArchivoTareas
+
+    if args.antiguedad is None:
+        args.antiguedad = ANTIGUEDAD_ARCHIVO
+    archivo = ArchivoTareas(args.archivo)
+    try:
+        archivadas = archivo.archivar(tareas, args.antiguedad, args.compresion)
+    except (OSError, ValueError) as e:
+        raise ErrorComando(str(e))
+    stats = archivo.estadisticas()
+    print(
+        f"✓ {len(archivadas)} tareas archivadas en {archivo.directorio} "
+        f"({stats['total_tareas']} en total, "
+        f"{stats['bytes_comprimidos'] / 1024:.1f} KB comprimidos)"
+    )
+    return bool(archivadas)
+
+
+def comando_importar(tareas, args):
+    """
+    Importa tareas de un archivo CSV o JSON Lines (ver importacion.py).
+    """
+    try:
+        resumen = importar_tareas(
+            tareas, args.ruta, args.formato, args.informe, args.conservar_ids
+        )
+    except (OSError, ValueError) as e:
+        raise ErrorComando(str(e))
+    print(
+        f"✓ {resumen['importadas']} tareas importadas, "
+        f"{resumen['rechazadas']} rechazadas de {resumen['leidas']} filas"
+    )
+    if resumen["rechazadas"] and args.informe:
+        print(f"  Detalle de las filas rechazadas en {args.informe}")
+    return resumen["importadas"] > 0
+
+
+def comando_exportar(tareas, args):
+    """
+    Exporta las tareas, opcionalmente filtradas, a CSV o JSON Lines.
+    """
+    resultados = tareas
+    if args.estado is not None:
+        resultados = iterar_por_estado(resultados, args.estado)
+    if args.prioridad is not None:
+        resultados = iterar_por_prioridad(resultados, args.prioridad)
+    try:
+        cantidad = exportar_tareas(resultados, args.ruta, args.formato)
+    except (OSError, ValueError) as e:
+        raise ErrorComando(str(e))
+    print(f"✓ {cantidad} tareas exportadas a {args.ruta}")
+    return False
+
+
+def agregar_paginacion(parser):
+    """
+    Agrega las opciones de listado (--compacto, --limite, --desplazamiento).
+
+    Parámetros:
+        parser (argparse.ArgumentParser): Parser del subcomando.
+    """
+    parser.add_argument("--compacto", action="store_true", help="Una línea por tarea")
+    parser.add_argument("--limite", type=int, default=None, help="Máximo de tareas")
+    parser.add_argument(
+        "--desplazamiento", type=int, default=0, help="Tareas a saltar al principio"
+    )
+
+
+def agregar_seleccion(parser, estado, prioridad):
+    """
+    Agrega las opciones que eligen las tareas de un subcomando masivo.
+
+    Parámetros:
+        parser (argparse.ArgumentParser): Parser del subcomando.
+        estado (callable): Conversor de estados (ver tipo_valor).
+        prioridad (callable): Conversor de prioridades.
+    """
+    parser.add_argument("ids", nargs="*", type=tipo_id, help="IDs de las tareas")
+    parser.add_argument("--con-estado", type=estado, help="Tareas con este estado")
+    parser.add_argument(
+        "--con-prioridad", type=prioridad, help="Tareas con esta prioridad"
+    )
+
+
+def comando_migrar(motor, args):
+    """
+    Copia las tareas del motor actual a otro (ver migrar_almacenamiento).
+
+    A diferencia de los demás subcomandos, recibe el motor de origen sin
+    abrir: la migración lo abre por su cuenta.
+    """
+    destino = obtener_motor(args.motor_destino, args.destino)
+    try:
+        cantidad = migrar_almacenamiento(motor, destino)
+    except (OSError, ValueError) as e:
+        raise ErrorComando(str(e))
+    print(f"✓ {cantidad} tareas migradas de {motor.archivo} a {destino.archivo}")
+    return False
+
+
+def construir_parser(clase=argparse.ArgumentParser, con_lote=True):
+    """
+    Construye el parser de subcomandos.
+
+    Parámetros:
+        clase (type, optional): Clase del parser (ParserLote dentro del lote).
+        con_lote (bool, optional): Incluir el subcomando lote.
+
+    Retorna:
+        argparse.ArgumentParser: Parser configurado.
+    """
+    estado = tipo_valor("Estado", ESTADOS, convertir_estado)
+    prioridad = tipo_valor("Prioridad", PRIORIDADES, convertir_prioridad)
+
+    parser = clase(
+        prog="app.py", description="Sistema de Gestión de Tareas (sin menú)"
+    )
+    parser.add_argument(
+        "--motor",
+        choices=MOTORES,
+        help="Motor de almacenamiento (por defecto, $TAREAS_MOTOR o texto)",
+    )
+    parser.add_argument(
+        "--archivo", help="Archivo de tareas (tareas.txt o tareas.db según el motor)"
+    )
+    subparsers = parser.add_subparsers(dest="comando", required=True)
+
+    sub = subparsers.add_parser("crear", aliases=["add"], help="Crear una tarea")
+    sub.add_argument("titulo")
+    sub.add_argument("descripcion")
+    sub.add_argument("-e", "--estado", type=estado, default="pendiente")
+    sub.add_argument("-p", "--prioridad", type=prioridad, default="media")
+    sub.set_defaults(funcion=comando_crear)
+
+    sub = subparsers.add_parser("ver", aliases=["get"], help="Mostrar una tarea")
+    sub.add_argument("id", type=tipo_id)
+    sub.set_defaults(funcion=comando_ver)
+
+    sub = subparsers.add_parser(
+        "actualizar", aliases=["update"], help="Modificar una tarea"
+    )
+    sub.add_argument("id", type=tipo_id)
+    sub.add_argument("-t", "--titulo")
+    sub.add_argument("-d", "--descripcion")
+    sub.add_argument("-e", "--estado", type=estado)
+    sub.add_argument("-p", "--prioridad", type=prioridad)
+    sub.set_defaults(funcion=comando_actualizar)
+
+    sub = subparsers.add_parser(
+        "eliminar", aliases=["delete"], help="Eliminar una tarea"
+    )
+    sub.add_argument("id", type=tipo_id)
+    sub.set_defaults(funcion=comando_eliminar)
+
+    sub = subparsers.add_parser(
+        "actualizar-masivo",
+        aliases=["bulk-update"],
+        help="Modificar varias tareas por ID o por estado/prioridad",
+    )
+    agregar_seleccion(sub, estado, prioridad)
+    sub.add_argument("-t", "--titulo")
+    sub.add_argument("-d", "--descripcion")
+    sub.add_argument("-e", "--estado", type=estado)
+    sub.add_argument("-p", "--prioridad", type=prioridad)
+    sub.set_defaults(funcion=comando_actualizar_masivo)
+
+    sub = subparsers.add_parser(
+        "eliminar-masivo",
+        aliases=["bulk-delete"],
+        help="Eliminar varias tareas por ID o por estado/prioridad",
+    )
+    agregar_seleccion(sub, estado, prioridad)
+    sub.set_defaults(funcion=comando_eliminar_masivo)
+
+    sub = subparsers.add_parser("listar", aliases=["list"], help="Listar tareas")
+    sub.add_argument("-e", "--estado", type=estado)
+    sub.add_argument("-p", "--prioridad", type=prioridad)
+    sub.add_argument(
+        "-o",
+        "--orden",
+        type=tipo_orden,
+        help="Claves de orden (prioridad, estado, id, titulo; '-' = descendente)",
+    )
+    sub.add_argument(
+        "--archivadas", action="store_true", help="Listar las tareas archivadas"
+    )
+    agregar_paginacion(sub)
+    sub.set_defaults(funcion=comando_listar)
+
+    sub = subparsers.add_parser(
+        "buscar", aliases=["search"], help="Buscar tareas por título"
+    )
+    sub.add_argument("termino")
+    sub.add_argument(
+        "--archivadas", action="store_true", help="Buscar entre las tareas archivadas"
+    )
+    agregar_paginacion(sub)
+    sub.set_defaults(funcion=comando_buscar)
+
+    sub = subparsers.add_parser(
+        "estadisticas", aliases=["stats"], help="Mostrar estadísticas"
+    )
+    sub.set_defaults(funcion=comando_estadisticas)
+
+    sub = subparsers.add_parser(
+        "archivar",
+        aliases=["archive"],
+        help="Mover las tareas completadas antiguas a segmentos comprimidos",
+    )
+    # Sin importar archivado.py (gzip, lzma) al construir el parser: los
+    # valores repiten ANTIGUEDAD_ARCHIVO y las claves de COMPRESIONES
+    sub.add_argument(
+        "--antiguedad",
+        type=int,
+        help="Tareas creadas después de una tarea para archivarla "
+        "(por defecto, 1000; 0 = todas las completadas)",
+    )
+    sub.add_argument("--compresion", choices=("gzip", "lzma"), default="gzip")
+    sub.set_defaults(funcion=comando_archivar)
+
+    sub = subparsers.add_parser(
+        "importar", aliases=["import"], help="Importar tareas de CSV o JSON Lines"
+    )
+    sub.add_argument("ruta")
+    sub.add_argument("--formato", choices=FORMATOS, help="Por defecto, la extensión")
+    sub.add_argument("--informe", help="Archivo CSV para las filas rechazadas")
+    sub.add_argument(
+        "--conservar-ids", action="store_true", help="Usar la columna id del archivo"
+    )
+    sub.set_defaults(funcion=comando_importar)
+
+    sub = subparsers.add_parser(
+        "exportar", aliases=["export"], help="Exportar tareas a CSV o JSON Lines"
+    )
+    sub.add_argument("ruta")
+    sub.add_argument("--formato", choices=FORMATOS, help="Por defecto, la extensión")
+    sub.add_argument("-e", "--estado", type=estado)
+    sub.add_argument("-p", "--prioridad", type=prioridad)
+    sub.set_defaults(funcion=comando_exportar)
+
+    if con_lote:
+        sub = subparsers.add_parser(
+            "lote",
+            aliases=["batch"],
+            help="Ejecutar subcomandos leídos de un archivo o de la entrada estándar",
+        )
+        sub.add_argument(
+            "entrada", nargs="?", default="-", help="Archivo de comandos ('-': stdin)"
+        )
+        sub.set_defaults(funcion=None)
+
+        sub = subparsers.add_parser(
+            "migrar",
+            aliases=["migrate"],
+            help="Copiar las tareas del motor actual a otro motor",
+        )
+        sub.add_argument("motor_destino", choices=MOTORES)
+        sub.add_argument(
+            "--destino", help="Archivo de destino (por defecto, el del motor)"
+        )
+        sub.set_defaults(funcion=comando_migrar)
+
+    return parser
+
+
+def ejecutar_lote(tareas, lineas, archivo=None):
+    """
+    Ejecuta en memoria un subcomando por línea.
+
+    Una línea inválida o que falla se informa en stderr y no detiene las
+    demás.
+
+    Parámetros:
+        tareas (AlmacenTareas): Almacén sobre el que se aplican los comandos.
+        lineas (iterable): Líneas de texto con un subcomando cada una.
+        archivo (str, optional): Archivo de tareas del almacén (para las
+            tareas archivadas, ver archivado.py).
+
+    Retorna:
+        tuple: (modificado: bool, errores: int)
+    """
+    parser = construir_parser(ParserLote, con_lote=False)
+    modificado = False
+    errores = 0
+    for numero, linea in enumerate(lineas, 1):
+        try:
+            argumentos = shlex.split(linea, comments=True)
+            if not argumentos:
+                continue
+            args = parser.parse_args(argumentos)
+            args.archivo = archivo
+            if args.funcion(tareas, args):
+                modificado = True
+        except (ErrorComando, ValueError) as e:
+            errores += 1
+            print(f"⚠ Línea {numero}: {e}", file=sys.stderr)
+    return modificado, errores
+
+
+def main(argv=None):
+    """
+    Punto de entrada de la línea de comandos.
+
+    Si la salida se cierra antes de tiempo (python app.py listar | head),
+    termina sin traza: la salida estándar se redirige a os.devnull para que
+    el vaciado final del intérprete no vuelva a fallar.
+
+    Parámetros:
+        argv (list, optional): Argumentos (por defecto, sys.argv[1:]).
+
+    Retorna:
+        int: Código de salida (0 si todo fue bien, 1 si hubo errores o se
+            cerró la salida).
+    """
+    try:
+        codigo = ejecutar(argv)
+        # Vaciar aquí: un error al vaciar durante la salida no se captura
+        sys.stdout.flush()
+    except BrokenPipeError:
+        nulo = os.open(os.devnull, os.O_WRONLY)
+        os.dup2(nulo, sys.stdout.fileno())
+        return 1
+    return codigo
+
+
+def ejecutar(argv=None):
+    """
+    Interpreta los argumentos y ejecuta el subcomando o el lote (ver main).
+
+    Parámetros:
+        argv (list, optional): Argumentos (por defecto, sys.argv[1:]).
+
+    Retorna:
+        int: Código de salida (0 si todo fue bien, 1 si hubo errores).
+    """
+    args = construir_parser().parse_args(argv)
+    try:
+        motor = obtener_motor(args.motor, args.archivo)
+    except ValueError as e:
+        # Variables TAREAS_* inválidas (--motor lo valida argparse)
+        print(f"⚠ {e}", file=sys.stderr)
+        return 1
+    args.archivo = motor.archivo
+
+    if args.funcion is comando_migrar:
+        try:
+            comando_migrar(motor, args)
+        except ErrorComando as e:
+            print(f"⚠ {e}", file=sys.stderr)
+            return 1
+        return 0
+
+    if args.funcion is None:
+        # Lote: los comandos se aplican en memoria y sus cambios se escriben
+        # juntos al final, con un único cerrojo de escritura (o transacción)
+        # para todo el lote, de modo que ningún otro proceso escribe en medio
+        tareas = motor.abrir()
+        try:
+            with tareas.lote():
+                if args.entrada == "-":
+                    _, errores = ejecutar_lote(tareas, sys.stdin, motor.archivo)
+                else:
+                    with open(args.entrada, "r", encoding="utf-8") as f:
+                        _, errores = ejecutar_lote(tareas, f, motor.archivo)
+        finally:
+            motor.cerrar(tareas, compactar=False)
+        return 1 if errores else 0
+
+    # Subcomando suelto: los cambios se anotan en el diario, sin reescribir
+    # tareas.txt (se compacta al superar el umbral o al cerrar la aplicación).
+    # Importar y archivar compactan al cerrar, de modo que las tareas
+    # importadas o archivadas ya no pasan por el diario en la próxima carga
+    compactar = args.funcion in (comando_importar, comando_archivar)
+    if args.funcion is comando_importar:
+        # Un registro en el diario por lote; sin compactar hasta el final
+        tareas = motor.abrir(umbral=float("inf"))
+    else:
+        tareas = motor.abrir(
+            diario=args.funcion
+            in (
+                comando_crear,
+                comando_actualizar,
+                comando_eliminar,
+                comando_actualizar_masivo,
+                comando_eliminar_masivo,
+                comando_archivar,
+            )
+        )
+    if args.funcion is comando_buscar:
+        tareas.indice_texto = cargar_indice_texto(motor.archivo)
+    try:
+        args.funcion(tareas, args)
+    except ErrorComando as e:
+        print(f"⚠ {e}", file=sys.stderr)
+        return 1
+    finally:
+        motor.cerrar(tareas, compactar=compactar)
+    return 0
@@ -0,0 +1,310 @@
+"""
+concurrencia.py - Acceso de varios procesos al mismo archivo de tareas.
+
+Varios procesos (el menú, la línea de comandos, importaciones) pueden
+trabajar a la vez sobre tareas.txt. Se coordinan con cerrojos consultivos
+(fcntl) sobre tareas.txt.lock:
+
+    escritura    - Exclusivo y breve: lo toma quien anota un cambio en el
+                   diario, después de incorporar los cambios de los demás.
+    compactación - Exclusivo: lo toma quien reescribe la instantánea, que es
+                   la operación larga. No impide anotar cambios.
+
+Quien solo lee no toma ningún cerrojo, de modo que un escritor largo nunca
+lo bloquea. Para leer un estado consistente se usan los contadores que
+tareas.txt.lock guarda en su primera línea (enteros de ancho fijo):
+
+    marca      - Es impar mientras un escritor cambia qué archivos forman el
+                 estado (rotar el diario o retirar el diario ya integrado).
+                 Un lector que ve la misma marca par antes y después de leer
+                 sabe que nadie la cambió en medio.
+    generacion - Cantidad de rotaciones del diario. Mientras no cambie, a un
+                 proceso le basta leer lo que se añadió al diario desde la
+                 última vez; si cambia, debe recargar todo.
+    version    - Última versión de tarea asignada al rotar el diario (las
+                 siguientes se leen de los registros del diario).
+
+En sistemas sin fcntl (Windows) solo se coordinan los hilos del proceso.
+
+Compatibilidad: Python 3.8+
+"""
+
+import os
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+FORMATO_CONTADORES = "{:020d} {:020d} {:020d}\n"
+TAMANO_CONTADORES = len(FORMATO_CONTADORES.format(0, 0, 0))
+
+# Byte de tareas.txt.lock que representa cada cerrojo
+BYTE_ESCRITURA = 0
+BYTE_COMPACTACION = 1
+
+# Un único cerrojo por archivo y proceso (ver obtener_cerrojo)
+_CERROJOS = {}
+_CERROJO_REGISTRO = threading.Lock()
+
+
+class CerrojoOcupado(Exception):
+    """
+    El cerrojo de escritura lo tiene otro hilo o proceso y se pidió no
+    esperarlo (ver CerrojoArchivo.tomar_escritura).
+    """
+
+
+def ruta_cerrojo(archivo="tareas.txt"):
+    """
+    Retorna la ruta del archivo de cerrojos asociado al archivo de tareas.
+
+    Parámetros:
+        archivo (str): Archivo de tareas.
+
+    Retorna:
+        str: Ruta del archivo de cerrojos (archivo + '.lock').
+    """
+    return archivo + ".lock"
+
+
+def obtener_cerrojo(archivo="tareas.txt"):
+    """
+    Retorna el CerrojoArchivo del archivo de tareas, creándolo si hace falta.
+
+    Los cerrojos de fcntl pertenecen al proceso y se pierden al cerrar
+    cualquier descriptor del archivo, por lo que cada proceso abre
+    tareas.txt.lock una sola vez y lo comparte entre todos sus usos.
+
+    Parámetros:
+        archivo (str): Archivo de tareas.
+
+    Retorna:
+        CerrojoArchivo: Cerrojo compartido del archivo.
+    """
+    ruta = os.path.abspath(ruta_cerrojo(archivo))
+    with _CERROJO_REGISTRO:
+        cerrojo = _CERROJOS.get(ruta)
+        if cerrojo is None:
+            cerrojo = _CERROJOS[ruta] = CerrojoArchivo(ruta)
+        return cerrojo
+
+
+class CerrojoArchivo:
+    """
+    Cerrojos de escritura y compactación de un archivo de tareas, entre
+    procesos (fcntl) y entre los hilos de cada proceso.
+
+    El cerrojo de escritura es reentrante: un mismo hilo puede anidar
+    escritura() (por ejemplo, un lote de cambios que contiene cambios
+    sueltos). El de compactación lo puede soltar otro hilo, porque la
+    instantánea se escribe en segundo plano.
+
+    Atributos:
+        ruta (str): Ruta de tareas.txt.lock.
+        contadores (tuple): (marca, generacion, version) leídos al tomar el
+            cerrojo de escritura o escritos después; con el cerrojo tomado no
+            los cambia nadie más.
+    """
+
+    def __init__(self, ruta):
+        """
+        Abre (o crea) el archivo de cerrojos.
+
+        Parámetros:
+            ruta (str): Ruta de tareas.txt.lock.
+        """
+        self.ruta = ruta
+        self._descriptor = os.open(ruta, os.O_RDWR | os.O_CREAT, 0o666)
+        self._cerrojo_descriptor = threading.Lock()
+        self._cerrojo_escritura = threading.RLock()
+        self._nivel_escritura = 0
+        self._dueno = None
+        self._cerrojo_compactacion = threading.Lock()
+        self.contadores = (0, 0, 0)
+
+    def __repr__(self):
+        return f"CerrojoArchivo({self.ruta!r})"
+
+    def _bloquear(self, byte, esperar=True):
+        """
+        Toma el cerrojo de fcntl de un byte del archivo.
+
+        Parámetros:
+            byte (int): BYTE_ESCRITURA o BYTE_COMPACTACION.
+            esperar (bool, optional): Si es False, no espera a que se libere.
+
+        Retorna:
+            bool: True si se tomó, False si lo tiene otro proceso.
+        """
+        if fcntl is None:
+            return True
+        operacion = fcntl.LOCK_EX if esperar else fcntl.LOCK_EX | fcntl.LOCK_NB
+        try:
+            fcntl.lockf(self._descriptor, operacion, 1, byte, os.SEEK_SET)
+        except (BlockingIOError, PermissionError):
+            return False
+        return True
+
+    def _desbloquear(self, byte):
+        """
+        Suelta el cerrojo de fcntl de un byte del archivo.
+
+        Parámetros:
+            byte (int): BYTE_ESCRITURA o BYTE_COMPACTACION.
+        """
+        if fcntl is not None:
+            fcntl.lockf(self._descriptor, fcntl.LOCK_UN, 1, byte, os.SEEK_SET)
+
+    def tomar_escritura(self, esperar=True):
+        """
+        Toma el cerrojo de escritura (reentrante en el mismo hilo).
+
+        Al tomarlo se leen los contadores (ver contadores); si la marca quedó
+        impar (un escritor terminó de forma abrupta a mitad de un cambio), se
+        vuelve a dejar par.
+
+        Parámetros:
+            esperar (bool, optional): Si es False y el cerrojo lo tiene otro
+                hilo o proceso, no esperar a que se libere.
+
+        Retorna:
+            bool: True si se tomó ahora, False si el hilo ya lo tenía.
+
+        Lanza:
+            CerrojoOcupado: Si esperar es False y el cerrojo está tomado.
+        """
+        if not self._cerrojo_escritura.acquire(blocking=esperar):
+            raise CerrojoOcupado(self.ruta)
+        self._nivel_escritura += 1
+        if self._nivel_escritura > 1:
+            return False
+        try:
+            if not self._bloquear(BYTE_ESCRITURA, esperar):
+                raise CerrojoOcupado(self.ruta)
+            marca, generacion, version = self.leer_contadores()
+            self.contadores = (marca, generacion, version)
+            if marca % 2:
+                self.escribir_contadores(marca + 1, generacion, version)
+        except BaseException:
+            self._nivel_escritura -= 1
+            self._cerrojo_escritura.release()
+            raise
+        self._dueno = threading.get_ident()
+        return True
+
+    def soltar_escritura(self):
+        """
+        Suelta una toma del cerrojo de escritura (ver tomar_escritura).
+        """
+        self._nivel_escritura -= 1
+        if self._nivel_escritura == 0:
+            self._dueno = None
+            self._desbloquear(BYTE_ESCRITURA)
+        self._cerrojo_escritura.release()
+
+    def escritura_tomada(self):
+        """
+        Indica si el hilo actual tiene el cerrojo de escritura.
+
+        Retorna:
+            bool: True si lo tiene.
+        """
+        return self._dueno == threading.get_ident()
+
+    @contextmanager
+    def escritura(self):
+        """
+        Toma el cerrojo de escritura durante el bloque with.
+
+        Retorna:
+            bool: True si el bloque tomó el cerrojo, False si ya lo tenía
+                el mismo hilo (bloque anidado).
+        """
+        externo = self.tomar_escritura()
+        try:
+            yield externo
+        finally:
+            self.soltar_escritura()
+
+    def adquirir_compactacion(self, esperar=True):
+        """
+        Toma el cerrojo de compactación.
+
+        Parámetros:
+            esperar (bool, optional): Si es False, retorna de inmediato
+                cuando otro hilo o proceso está compactando.
+
+        Retorna:
+            bool: True si se tomó; hay que soltarlo con liberar_compactacion().
+        """
+        if not self._cerrojo_compactacion.acquire(blocking=esperar):
+            return False
+        if not self._bloquear(BYTE_COMPACTACION, esperar):
+            self._cerrojo_compactacion.release()
+            return False
+        return True
+
+    def liberar_compactacion(self):
+        """
+        Suelta el cerrojo de compactación (desde cualquier hilo).
+        """
+        self._desbloquear(BYTE_COMPACTACION)
+        self._cerrojo_compactacion.release()
+
+    def leer_contadores(self):
+        """
+        Lee los contadores del archivo de cerrojos.
+
+        Retorna:
+            tuple: (marca, generacion, version); ceros si el archivo está
+                vacío o dañado.
+        """
+        with self._cerrojo_descriptor:
+            os.lseek(self._descriptor, 0, os.SEEK_SET)
+            datos = os.read(self._descriptor, TAMANO_CONTADORES)
+        try:
+            marca, generacion, version = map(int, datos.split())
+        except ValueError:
+            return 0, 0, 0
+        return marca, generacion, version
+
+    def escribir_contadores(self, marca, generacion, version):
+        """
+        Escribe los contadores; solo con el cerrojo de escritura tomado.
+
+        Parámetros:
+            marca (int): Contador de cambios de estructura.
+            generacion (int): Cantidad de rotaciones del diario.
+            version (int): Última versión asignada.
+        """
+        datos = FORMATO_CONTADORES.format(marca, generacion, version).encode()
+        with self._cerrojo_descriptor:
+            os.lseek(self._descriptor, 0, os.SEEK_SET)
+            os.write(self._descriptor, datos)
+        self.contadores = (marca, generacion, version)
+
+    @contextmanager
+    def cambio_de_estructura(self):
+        """
+        Marca (impar) el bloque with como un cambio de los archivos que forman
+        el estado; al terminar, la marca vuelve a ser par.
+
+        Debe usarse con el cerrojo de escritura tomado. Los valores de
+        generación y versión que se quieran guardar se asignan en el
+        diccionario que retorna el with.
+
+        Retorna:
+            dict: {'generacion': int, 'version': int} con los valores actuales.
+        """
+        marca, generacion, version = self.leer_contadores()
+        self.escribir_contadores(marca + 1, generacion, version)
+        nuevos = {"generacion": generacion, "version": version}
+        try:
+            yield nuevos
+        finally:
+            self.escribir_contadores(
+                marca + 2, nuevos["generacion"], max(version, nuevos["version"])
+            )
@@ -0,0 +1,597 @@
+"""
+diario.py - Diario de cambios (write-ahead log) para la persistencia de tareas.
+
+En lugar de reescribir tareas.txt completo tras cada cambio, cada creación,
+actualización o eliminación se anota como una línea JSON al final de
+tareas.txt.log. Al cargar, cargar_tareas aplica el diario sobre la última
+instantánea. Cuando el diario supera un tamaño umbral se compacta en segundo
+plano: se escribe una nueva instantánea y se descarta el diario anterior.
+
+Varios procesos pueden compartir el diario (ver concurrencia.py): cada
+registro se escribe con el cerrojo de escritura tomado, después de
+incorporar al almacén lo que otros procesos añadieron, y la instantánea se
+escribe con el cerrojo de compactación, que no detiene a los demás.
+
+Formato de los registros (una línea JSON por registro; "v" es la versión
+del cambio, ver AlmacenTareas.version_de):
+    {"op": "crear", "tarea": {...}, "v": 7}
+    {"op": "actualizar", "id": 3, "cambios": {"estado": "completada"}, "v": 8}
+    {"op": "eliminar", "id": 3, "v": 9}
+    {"op": "crear_lote", "tareas": [[id, titulo, descripcion, estado, prioridad], ...],
+     "v": 10}
+    {"op": "actualizar_lote", "ids": [3, 5], "cambios": {"estado": "completada"},
+     "v": 11}
+    {"op": "eliminar_lote", "ids": [3, 5], "v": 12}
+
+Modos de durabilidad:
+    "ninguna"   - Solo se vacía el búfer; el sistema operativo decide cuándo
+                  llega al disco (modo por defecto).
+    "inmediata" - fsync después de cada registro.
+    "grupo"     - Confirmación en grupo: un hilo hace un único fsync para
+                  todos los registros escritos dentro de la ventana de
+                  latencia; cada escritor espera a que su registro esté en
+                  disco, pero ráfagas de cambios comparten el mismo fsync.
+                  Si quien escribe serializa los cambios con su propio
+                  cerrojo, conviene crear el diario con esperar_escritura=False y
+                  llamar a esperar() después de soltarlo.
+
+Compatibilidad: Python 3.8+
+"""
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from operator import itemgetter
+
+from almacen import CAMPOS
+from concurrencia import obtener_cerrojo
+from funciones import (
+    guardar_secuencia,
+    guardar_tareas,
+    ruta_diario,
+    sincronizar_almacen,
+)
+from instrumentacion import METRICAS_ACTIVAS, registrar_bytes
+
+# Tamaño del diario (en bytes) a partir del cual se compacta
+UMBRAL_COMPACTACION = 1024 * 1024
+
+# Ventana de latencia (en segundos) de la confirmación en grupo
+VENTANA_COMMIT = 0.005
+
+MODOS_DURABILIDAD = ("ninguna", "inmediata", "grupo")
+
+# Un solo codificador para todos los registros (json.dumps crea uno por llamada)
+CODIFICADOR = json.JSONEncoder(ensure_ascii=False)
+
+
+class DiarioTareas:
+    """
+    Diario de cambios asociado a un AlmacenTareas.
+
+    Al crearse se asigna como diario del almacén, de modo que cada mutación
+    del almacén añade un único registro al final del archivo: el costo de
+    E/S de un cambio no depende del número de tareas.
+
+    Atributos:
+        archivo (str): Archivo de tareas (instantánea).
+        almacen (AlmacenTareas): Almacén cuyos cambios se registran.
+        umbral (int): Tamaño en bytes que dispara la compactación.
+        durabilidad (str): Uno de MODOS_DURABILIDAD.
+        ventana (float): Ventana de latencia de la confirmación en grupo.
+        esperar_escritura (bool): En modo "grupo", si cada registro espera su
+            fsync antes de retornar.
+    """
+
+    def __init__(
+        self,
+        archivo,
+        almacen,
+        umbral=UMBRAL_COMPACTACION,
+        durabilidad="ninguna",
+        ventana=VENTANA_COMMIT,
+        esperar_escritura=True,
+    ):
+        """
+        Abre el diario y lo conecta al almacén.
+
+        Si quedó un diario de una compactación interrumpida, el almacén ya lo
+        incluye (cargar_almacen lo aplica), así que se compacta de inmediato
+        (salvo que otro proceso ya esté compactando).
+
+        Un almacén que no se cargó del archivo (generacion None) se considera
+        al día con lo que hay en disco.
+
+        Parámetros:
+            archivo (str): Archivo de tareas.
+            almacen (AlmacenTareas): Almacén cargado con cargar_almacen.
+            umbral (int, optional): Tamaño máximo del diario en bytes.
+            durabilidad (str, optional): Modo de durabilidad.
+            ventana (float, optional): Segundos que el hilo de confirmación en
+                grupo espera para juntar registros antes de cada fsync.
+            esperar_escritura (bool, optional): Si es False, los registros
+                retornan sin esperar el fsync (ver esperar()).
+        """
+        if durabilidad not in MODOS_DURABILIDAD:
+            raise ValueError(f"Modo de durabilidad inválido: {durabilidad}")
+
+        self.archivo = archivo
+        self.almacen = almacen
+        self.umbral = umbral
+        self.durabilidad = durabilidad
+        self.ventana = ventana
+        self.esperar_escritura = esperar_escritura
+        self._ruta = ruta_diario(archivo)
+        self._hilo = None
+
+        # _cerrojo protege el archivo del diario y los contadores;
+        # _cerrojo_sync evita cerrar el archivo mientras se hace fsync.
+        # Orden de adquisición: _cerrojo_sync antes que _cerrojo.
+        self._cerrojo = threading.Lock()
+        self._cerrojo_sync = threading.Lock()
+        self._condicion = threading.Condition(self._cerrojo)
+        self._escritos = 0
+        self._sincronizados = 0
+        self._cerrado = False
+        # Error del fsync en grupo: los registros sin confirmar pueden no
+        # estar en disco, así que esperar() lo lanza desde entonces
+        self._error_sync = None
+        # Líneas retenidas dentro de lote(); None fuera de él
+        self._pendientes = None
+
+        # Cerrojos entre procesos; _generacion es la del diario abierto
+        self._cerrojo_archivo = obtener_cerrojo(archivo)
+        with self._cerrojo_archivo.escritura():
+            self._generacion = self._cerrojo_archivo.leer_contadores()[1]
+            self._archivo_diario = open(self._ruta, "a", encoding="utf-8")
+            if almacen.generacion is None:
+                almacen.generacion = self._generacion
+                almacen.posicion_diario = self._archivo_diario.tell()
+        almacen.diario = self
+
+        self._hilo_sync = None
+        if durabilidad == "grupo":
+            self._hilo_sync = threading.Thread(
+                target=self._confirmar_en_grupo, daemon=True
+            )
+            self._hilo_sync.start()
+
+        if os.path.exists(self._ruta + ".old"):
+            self.compactar(en_segundo_plano=False, esperar=False)
+
+    def registrar_creacion(self, tarea, version=None):
+        """
+        Anota la creación de una tarea.
+
+        Parámetros:
+            tarea (dict): Tarea creada.
+            version (int, optional): Versión del cambio.
+        """
+        self._escribir({"op": "crear", "tarea": dict(tarea)}, version=version)
+
+    def registrar_actualizacion(self, tarea_id, cambios, version=None):
+        """
+        Anota solo los campos modificados de una tarea.
+
+        Parámetros:
+            tarea_id (int): ID de la tarea actualizada.
+            cambios (dict): Campos modificados con sus nuevos valores.
+            version (int, optional): Versión del cambio.
+        """
+        self._escribir(
+            {"op": "actualizar", "id": tarea_id, "cambios": cambios}, version=version
+        )
+
+    def registrar_eliminacion(self, tarea_id, version=None):
+        """
+        Anota la eliminación de una tarea.
+
+        Parámetros:
+            tarea_id (int): ID de la tarea eliminada.
+            version (int, optional): Versión del cambio.
+        """
+        self._escribir({"op": "eliminar", "id": tarea_id}, version=version)
+
+    def registrar_lote(self, tareas, version=None):
+        """
+        Anota la creación de varias tareas en un único registro, con una sola
+        escritura (y un solo fsync en los modos con durabilidad).
+
+        Parámetros:
+            tareas (list): Tareas creadas.
+            version (int, optional): Versión del cambio (la misma para todas).
+        """
+        if tareas:
+            valores = itemgetter(*CAMPOS)
+            self._escribir(
+                {"op": "crear_lote", "tareas": list(map(valores, tareas))},
+                version=version,
+            )
+
+    def registrar_actualizacion_lote(self, ids, cambios, version=None):
+        """
+        Anota el mismo cambio de varias tareas en un único registro.
+
+        Parámetros:
+            ids (list): IDs de las tareas actualizadas.
+            cambios (dict): Campos modificados con sus nuevos valores.
+            version (int, optional): Versión del cambio (la misma para todas).
+        """
+        if ids:
+            self._escribir(
+                {"op": "actualizar_lote", "ids": list(ids), "cambios": cambios},
+                version=version,
+            )
+
+    def registrar_eliminacion_lote(self, ids, version=None):
+        """
+        Anota la eliminación de varias tareas en un único registro.
+
+        Parámetros:
+            ids (list): IDs de las tareas eliminadas.
+            version (int, optional): Versión del cambio (la misma para todas).
+        """
+        if ids:
+            self._escribir({"op": "eliminar_lote", "ids": list(ids)}, version=version)
+
+    @contextmanager
+    def escritura(self, esperar=True):
+        """
+        Toma el cerrojo de escritura del archivo durante el bloque with.
+
+        Al tomarlo (en el bloque más externo) incorpora antes los cambios de
+        otros procesos, de modo que los cambios del bloque se aplican sobre el
+        estado más reciente y sus IDs y versiones no se repiten. En modo
+        "grupo", la espera del fsync ocurre al salir, con el cerrojo ya
+        suelto, para que los demás procesos no esperen a este disco.
+
+        Parámetros:
+            esperar (bool, optional): Si es False y otro hilo o proceso tiene
+                el cerrojo, lanzar CerrojoOcupado en lugar de esperarlo.
+        """
+        externo = self._cerrojo_archivo.tomar_escritura(esperar)
+        try:
+            if externo:
+                self.sincronizar()
+            yield
+        finally:
+            self._cerrojo_archivo.soltar_escritura()
+        if externo and self.esperar_escritura:
+            self.esperar()
+
+    @contextmanager
+    def lote(self):
+        """
+        Toma el cerrojo de escritura durante el bloque with y retiene los
+        registros del bloque para escribirlos de una vez al salir: un solo
+        write (y un solo fsync en los modos con durabilidad) para todos los
+        cambios, que mientras tanto solo se aplican en memoria.
+
+        Los bloques se pueden anidar (escribe el más externo). Si el bloque
+        lanza una excepción, los cambios ya aplicados se escriben igual: el
+        diario siempre coincide con el almacén.
+        """
+        if self._pendientes is not None:
+            yield
+            return
+        with self.escritura():
+            self._pendientes = []
+            try:
+                yield
+            finally:
+                tamano = self._volcar()
+                self._pendientes = None
+        if tamano >= self.umbral and not self.compactando():
+            self.compactar()
+
+    def sincronizar(self):
+        """
+        Pone al día el almacén y el diario abierto con lo que escribieron
+        otros procesos. Se llama con el cerrojo de escritura tomado.
+
+        Si otro proceso rotó el diario, se abre el nuevo tareas.txt.log. Si el
+        diario termina en una línea incompleta (de un proceso que terminó a
+        mitad de una escritura), se recorta para que el próximo registro no
+        quede pegado a ella.
+        """
+        almacen = self.almacen
+        generacion = self._cerrojo_archivo.contadores[1]
+        if (
+            generacion == self._generacion == almacen.generacion
+            and os.fstat(self._archivo_diario.fileno()).st_size
+            == almacen.posicion_diario
+        ):
+            # Caso habitual: nadie escribió desde el último cambio propio
+            return
+
+        sincronizar_almacen(almacen, self.archivo)
+        if generacion != self._generacion:
+            with self._cerrojo_sync, self._condicion:
+                if self.durabilidad != "ninguna":
+                    os.fsync(self._archivo_diario.fileno())
+                    self._sincronizados = self._escritos
+                    self._condicion.notify_all()
+                self._archivo_diario.close()
+                self._archivo_diario = open(self._ruta, "a", encoding="utf-8")
+                self._generacion = generacion
+
+        if almacen.sincronizable:
+            descriptor = self._archivo_diario.fileno()
+            if os.fstat(descriptor).st_size > almacen.posicion_diario:
+                os.ftruncate(descriptor, almacen.posicion_diario)
+
+    def _escribir(self, *registros, version=None):
+        """
+        Añade registros al final del diario (dentro de lote(), al salir del
+        bloque) y compacta si supera el umbral.
+
+        Según el modo de durabilidad, retorna cuando los registros están en el
+        búfer del sistema operativo o ya sincronizados en disco (en modo
+        "grupo", al salir del bloque escritura() más externo).
+
+        Parámetros:
+            *registros (dict): Registros a escribir.
+            version (int, optional): Versión que se anota en cada registro.
+        """
+        if version is not None:
+            for registro in registros:
+                registro["v"] = version
+        if not self._cerrojo_archivo.escritura_tomada():
+            # Llamada fuera de AlmacenTareas.escritura()
+            with self.escritura():
+                self._escribir(*registros)
+            return
+
+        codificar = CODIFICADOR.encode
+        lineas = "".join(codificar(registro) + "\n" for registro in registros)
+        if self._pendientes is not None:
+            # Dentro de lote(): se escribe al salir del bloque
+            self._pendientes.append(lineas)
+            return
+        if self._anotar(lineas) >= self.umbral and not self.compactando():
+            self.compactar()
+
+    def _volcar(self):
+        """
+        Escribe de una vez los registros retenidos por lote().
+
+        Retorna:
+            int: Tamaño del diario después de escribirlos (0 si no había).
+        """
+        if not self._pendientes:
+            return 0
+        lineas = "".join(self._pendientes)
+        self._pendientes.clear()
+        return self._anotar(lineas)
+
+    def _anotar(self, lineas):
+        """
+        Añade líneas ya codificadas al final del diario según el modo de
+        durabilidad. Se llama con el cerrojo de escritura tomado.
+
+        Parámetros:
+            lineas (str): Registros codificados, uno por línea.
+
+        Retorna:
+            int: Tamaño del diario después de escribirlas.
+        """
+        if METRICAS_ACTIVAS:
+            registrar_bytes("diario", escritos=len(lineas.encode("utf-8")))
+        with self._condicion:
+            self._archivo_diario.write(lineas)
+            self._archivo_diario.flush()
+            if self.durabilidad == "inmediata":
+                os.fsync(self._archivo_diario.fileno())
+            self._escritos += 1
+            tamano = self._archivo_diario.tell()
+            self.almacen.posicion_diario = tamano
+            if self.durabilidad == "grupo":
+                self._condicion.notify_all()
+        return tamano
+
+    def esperar(self):
+        """
+        Espera a que todos los registros escritos hasta ahora estén en disco.
+
+        Solo tiene efecto en modo "grupo"; en los demás modos retorna de
+        inmediato.
+
+        Lanza:
+            OSError: Si falló el fsync del hilo de confirmación en grupo.
+        """
+        if self.durabilidad != "grupo":
+            return
+        with self._condicion:
+            numero = self._escritos
+            while self._sincronizados < numero:
+                if self._error_sync is not None:
+                    raise self._error_sync
+                self._condicion.wait()
+
+    def asegurar(self):
+        """
+        Escribe en disco (fsync) todos los registros anotados hasta ahora,
+        sea cual sea el modo de durabilidad.
+
+        Sirve para operaciones que, tras un cambio, escriben otro archivo que
+        da ese cambio por hecho (ver ArchivoTareas.archivar). Dentro de
+        lote() escribe antes los registros retenidos.
+        """
+        self._volcar()
+        with self._cerrojo_sync, self._condicion:
+            os.fsync(self._archivo_diario.fileno())
+            self._sincronizados = self._escritos
+            self._condicion.notify_all()
+
+    def _confirmar_en_grupo(self):
+        """
+        Bucle del hilo de confirmación en grupo.
+
+        Espera registros pendientes, deja pasar la ventana de latencia para
+        acumular más, y hace un solo fsync que confirma todos los escritos
+        hasta ese momento. Si el fsync falla, guarda el error, despierta a
+        quienes esperan (ver esperar) y termina.
+        """
+        while True:
+            with self._condicion:
+                while self._escritos == self._sincronizados and not self._cerrado:
+                    self._condicion.wait()
+                if self._cerrado and self._escritos == self._sincronizados:
+                    return
+
+            time.sleep(self.ventana)
+
+            with self._cerrojo_sync:
+                with self._condicion:
+                    objetivo = self._escritos
+                    descriptor = self._archivo_diario.fileno()
+                try:
+                    os.fsync(descriptor)
+                except OSError as e:
+                    with self._condicion:
+                        self._error_sync = e
+                        self._condicion.notify_all()
+                    return
+                with self._condicion:
+                    self._sincronizados = max(self._sincronizados, objetivo)
+                    self._condicion.notify_all()
+
+    def compactando(self):
+        """
+        Indica si hay una compactación en curso.
+
+        Retorna:
+            bool: True si el hilo de compactación sigue activo.
+        """
+        return self._hilo is not None and self._hilo.is_alive()
+
+    def compactar(self, en_segundo_plano=True, esperar=None):
+        """
+        Integra el diario en una nueva instantánea de tareas.txt.
+
+        Con el cerrojo de escritura tomado se pone al día el almacén, se
+        toma una instantánea de referencias (la lista de sus tareas, sin
+        copiar sus campos) y se rota el diario (tareas.txt.log pasa a
+        tareas.txt.log.old). Convertir las tareas a texto y escribirlas, que
+        es la parte costosa, ocurre después, solo con el cerrojo de
+        compactación, y puede hacerse en un hilo. Si la escritura falla, el
+        diario rotado se conserva y se vuelve a aplicar en la siguiente
+        carga.
+
+        Un cambio hecho mientras tanto puede quedar ya en la instantánea
+        (las tareas se modifican en su lugar), pero también está en el
+        diario nuevo, que al cargar se aplica encima en orden: el resultado
+        es el mismo que con una copia exacta.
+
+        No debe llamarse dentro de escritura() (salvo desde _escribir, que no
+        espera): la compactación anterior podría estar esperando ese cerrojo.
+
+        Parámetros:
+            en_segundo_plano (bool): Si es True, escribe la instantánea en un
+                hilo aparte y retorna de inmediato.
+            esperar (bool, optional): Si otro proceso está compactando, esperar
+                a que termine (True) o no compactar (False). Por defecto se
+                espera solo cuando no es en segundo plano.
+
+        Retorna:
+            bool: True si se compactó, False si ya compactaba otro proceso.
+        """
+        if self._hilo is not None:
+            self._hilo.join()
+        if esperar is None:
+            esperar = not en_segundo_plano
+        if not self._cerrojo_archivo.adquirir_compactacion(esperar):
+            return False
+        # Dentro de lote(): los registros retenidos van al diario que se rota
+        self._volcar()
+
+        try:
+            with self.escritura(), self._cerrojo_sync, self._condicion:
+                # Solo referencias: con un millón de tareas, copiar cada una
+                # retenía el cerrojo de escritura un par de segundos
+                copia = list(self.almacen)
+                ultimo_id = self.almacen.ultimo_id
+
+                # El diario rotado debe quedar en disco antes de cerrarlo
+                if self.durabilidad != "ninguna":
+                    os.fsync(self._archivo_diario.fileno())
+                    self._sincronizados = self._escritos
+                    self._condicion.notify_all()
+                self._archivo_diario.close()
+
+                with self._cerrojo_archivo.cambio_de_estructura() as contadores:
+                    viejo = self._ruta + ".old"
+                    if os.path.exists(viejo):
+                        # Compactación anterior interrumpida: conservar ambos
+                        with open(viejo, "a", encoding="utf-8") as destino:
+                            with open(self._ruta, "r", encoding="utf-8") as origen:
+                                destino.write(origen.read())
+                        os.remove(self._ruta)
+                    else:
+                        os.replace(self._ruta, viejo)
+                    self._archivo_diario = open(self._ruta, "a", encoding="utf-8")
+                    contadores["generacion"] += 1
+                    contadores["version"] = self.almacen.version
+
+                self._generacion = contadores["generacion"]
+                self.almacen.generacion = contadores["generacion"]
+                self.almacen.posicion_diario = 0
+        except BaseException:
+            self._cerrojo_archivo.liberar_compactacion()
+            raise
+
+        if en_segundo_plano:
+            self._hilo = threading.Thread(
+                target=self._escribir_instantanea, args=(copia, ultimo_id), daemon=True
+            )
+            self._hilo.start()
+        else:
+            self._hilo = None
+            self._escribir_instantanea(copia, ultimo_id)
+        return True
+
+    def _escribir_instantanea(self, copia, ultimo_id):
+        """
+        Guarda la instantánea, elimina el diario ya integrado y suelta el
+        cerrojo de compactación.
+
+        Parámetros:
+            copia (list): Tareas a guardar (las del almacén, ver compactar).
+            ultimo_id (int): Marca de agua de IDs del almacén.
+        """
+        try:
+            if guardar_tareas(copia, self.archivo):
+                guardar_secuencia(ultimo_id, self.archivo)
+                cerrojo = self._cerrojo_archivo
+                with cerrojo.escritura(), cerrojo.cambio_de_estructura():
+                    os.remove(self._ruta + ".old")
+        finally:
+            self._cerrojo_archivo.liberar_compactacion()
+
+    def cerrar(self, compactar=True):
+        """
+        Espera a la compactación en curso y cierra el diario.
+
+        Parámetros:
+            compactar (bool): Si es True, deja tareas.txt al día antes de cerrar.
+        """
+        if self._hilo is not None:
+            self._hilo.join()
+            self._hilo = None
+
+        pendiente = self._archivo_diario.tell() > 0 or os.path.exists(
+            self._ruta + ".old"
+        )
+        if compactar and pendiente:
+            self.compactar(en_segundo_plano=False)
+
+        with self._condicion:
+            self._cerrado = True
+            self._condicion.notify_all()
+        if self._hilo_sync is not None:
+            self._hilo_sync.join()
+
+        self._archivo_diario.close()
+        self.almacen.diario = None
@@ -0,0 +1,590 @@
+"""
+escaneo.py - Escaneo en paralelo de almacenes grandes.
+
+Cuando ningún índice sirve (búsqueda de una subcadena cualquiera en títulos
+y descripciones, o un predicado arbitrario), recorrer las tareas una a una
+en un solo hilo es lento. EscaneoParalelo toma en cambio una instantánea del
+almacén en columnas, escritas en archivos de un directorio temporal y
+mapeadas en memoria (mmap), de modo que todos los procesos comparten las
+mismas páginas sin copiarlas:
+
+    <campo>.min      - Texto del campo en minúsculas (UTF-8), una fila tras
+                       otra separadas por un byte nulo; se busca con find.
+    <campo>.txt      - Texto original, para reconstruir tareas (predicados).
+    <columna>.pos    - Posición (int64) del comienzo de cada fila en una
+                       columna de texto, más el final.
+    ids, estado, prioridad - ID (int64) y códigos (int8) de cada fila.
+
+Las filas están en orden de ID. Cada escaneo divide las filas en partes
+contiguas que evalúa un ProcessPoolExecutor; al unir los resultados en el
+orden de las partes quedan en orden de ID. Las columnas se construyen una
+vez (cada una cuando se necesita por primera vez) y se reutilizan: las
+tareas creadas, modificadas o eliminadas después de la instantánea se
+evalúan en el proceso principal (ver AlmacenTareas.ids_cambiados_desde)
+hasta que son más de FRACCION_RECONSTRUCCION del total y se vuelve a
+construir.
+
+AlmacenTareas.buscar() lo usa cuando el índice de texto no resuelve la
+búsqueda y el almacén tiene UMBRAL_PARALELO tareas o más (ver
+procesos_escaneo, que el motor de texto toma de TAREAS_PROCESOS); si el
+escaneo falla, vuelve al recorrido en serie.
+
+Ejemplo:
+    with EscaneoParalelo(tareas) as escaneo:
+        encontradas = escaneo.escanear("informe", campos=("titulo", "descripcion"))
+
+Compatibilidad: Python 3.8+
+"""
+
+import heapq
+import mmap
+import os
+import shutil
+import tempfile
+import weakref
+from array import array
+from bisect import bisect_right
+from concurrent.futures import ProcessPoolExecutor
+from itertools import accumulate, islice
+
+from almacen import (
+    CODIGOS_ESTADO,
+    CODIGOS_PRIORIDAD,
+    ESTADOS,
+    PRIORIDADES,
+    UMBRAL_ESCANEO_PARALELO,
+)
+
+# Con menos filas se escanea en el proceso principal: crear y coordinar los
+# procesos cuesta más de lo que ahorran
+UMBRAL_PARALELO = UMBRAL_ESCANEO_PARALELO
+
+# Partes por proceso, para repartir bien la carga si unas tardan más
+PARTES_POR_PROCESO = 4
+
+# Fracción de tareas cambiadas desde la instantánea a partir de la cual se
+# reconstruyen las columnas
+FRACCION_RECONSTRUCCION = 0.05
+
+# Filas que se codifican y escriben de una vez al construir una columna
+TAMANO_BLOQUE_COLUMNA = 100_000
+
+SEPARADOR = b"\x00"
+CAMPOS_TEXTO = ("titulo", "descripcion")
+
+# Columnas mapeadas por este proceso (ver columnas_de)
+_ABIERTAS = None
+
+
+class ColumnasMapeadas:
+    """
+    Columnas de una instantánea mapeadas en memoria, abiertas a medida que
+    se piden.
+
+    Atributos:
+        directorio (str): Directorio de la instantánea.
+    """
+
+    def __init__(self, directorio):
+        self.directorio = directorio
+        self._mapas = {}
+        self._vistas = {}
+
+    def _mapa(self, nombre):
+        mapa = self._mapas.get(nombre)
+        if mapa is None:
+            ruta = os.path.join(self.directorio, nombre)
+            with open(ruta, "rb") as f:
+                if os.fstat(f.fileno()).st_size == 0:
+                    mapa = b""  # mmap no admite archivos vacíos
+                else:
+                    mapa = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self._mapas[nombre] = mapa
+        return mapa
+
+    def texto(self, nombre):
+        """
+        Retorna una columna de texto (bytes o mmap, admite find).
+        """
+        return self._mapa(nombre)
+
+    def numeros(self, nombre, tipo):
+        """
+        Retorna una columna numérica como memoryview del tipo indicado
+        ('q' para int64, 'b' para int8).
+        """
+        vista = self._vistas.get(nombre)
+        if vista is None:
+            vista = self._vistas[nombre] = memoryview(self._mapa(nombre)).cast(tipo)
+        return vista
+
+    def textos(self, nombre, inicio, fin):
+        """
+        Decodifica las filas [inicio, fin) de una columna de texto.
+
+        Parámetros:
+            nombre (str): Columna de texto ('titulo.txt', ...).
+            inicio (int): Primera fila.
+            fin (int): Fila siguiente a la última.
+
+        Retorna:
+            list: Texto de cada fila.
+        """
+        posiciones = self.numeros(nombre + ".pos", "q")
+        texto = self.texto(nombre)
+        # Todas las filas de una vez; el último separador deja un '' de más
+        bloque = bytes(texto[posiciones[inicio] : posiciones[fin]]).decode("utf-8")
+        textos = bloque.split("\x00")[:-1]
+        if len(textos) != fin - inicio:
+            # Algún texto contiene un byte nulo: fila por fila
+            textos = [
+                bytes(texto[posiciones[fila] : posiciones[fila + 1] - 1]).decode("utf-8")
+                for fila in range(inicio, fin)
+            ]
+        return textos
+
+    def tareas(self, inicio, fin):
+        """
+        Reconstruye las tareas de las filas [inicio, fin) a partir de las
+        columnas originales.
+
+        Se crean diccionarios (como las tareas de una lista en funciones.py)
+        y no objetos Tarea: crearlos cuesta bastante menos.
+
+        Parámetros:
+            inicio (int): Primera fila.
+            fin (int): Fila siguiente a la última.
+
+        Retorna:
+            list: Tareas (estado o prioridad desconocidos quedan vacíos).
+        """
+        return [
+            {
+                "id": tarea_id,
+                "titulo": titulo,
+                "descripcion": descripcion,
+                "estado": ESTADOS.get(estado, ""),
+                "prioridad": PRIORIDADES.get(prioridad, ""),
+            }
+            for tarea_id, titulo, descripcion, estado, prioridad in zip(
+                self.numeros("ids", "q")[inicio:fin].tolist(),
+                self.textos("titulo.txt", inicio, fin),
+                self.textos("descripcion.txt", inicio, fin),
+                self.numeros("estado", "b")[inicio:fin].tolist(),
+                self.numeros("prioridad", "b")[inicio:fin].tolist(),
+            )
+        ]
+
+    def cerrar(self):
+        """
+        Suelta las vistas y cierra los mapas.
+        """
+        for vista in self._vistas.values():
+            vista.release()
+        self._vistas.clear()
+        for mapa in self._mapas.values():
+            if isinstance(mapa, mmap.mmap):
+                mapa.close()
+        self._mapas.clear()
+
+
+def columnas_de(directorio):
+    """
+    Retorna las columnas mapeadas de un directorio, reutilizando las de la
+    llamada anterior del mismo proceso (cada trabajador mapea la instantánea
+    una sola vez).
+
+    Parámetros:
+        directorio (str): Directorio de la instantánea.
+
+    Retorna:
+        ColumnasMapeadas: Columnas abiertas.
+    """
+    global _ABIERTAS
+    if _ABIERTAS is None or _ABIERTAS.directorio != directorio:
+        if _ABIERTAS is not None:
+            _ABIERTAS.cerrar()
+        _ABIERTAS = ColumnasMapeadas(directorio)
+    return _ABIERTAS
+
+
+def cerrar_columnas(directorio):
+    """
+    Cierra las columnas de un directorio si este proceso las tiene abiertas.
+
+    Parámetros:
+        directorio (str): Directorio de la instantánea.
+    """
+    global _ABIERTAS
+    if _ABIERTAS is not None and _ABIERTAS.directorio == directorio:
+        _ABIERTAS.cerrar()
+        _ABIERTAS = None
+
+
+def buscar_en_columna(texto, posiciones, termino, inicio, fin):
+    """
+    Retorna las filas de [inicio, fin) cuyo texto contiene el término.
+
+    Busca con find sobre el texto completo de las filas, sin recorrerlas una
+    a una; tras cada coincidencia salta al comienzo de la fila siguiente.
+
+    Parámetros:
+        texto (bytes o mmap): Columna de texto en minúsculas.
+        posiciones (memoryview): Comienzo de cada fila (y el final).
+        termino (bytes): Término en minúsculas, codificado en UTF-8.
+        inicio (int): Primera fila.
+        fin (int): Fila siguiente a la última.
+
+    Retorna:
+        list: Filas que contienen el término, en orden.
+    """
+    filas = []
+    limite = posiciones[fin]
+    posicion = texto.find(termino, posiciones[inicio], limite)
+    # Un término vacío coincide también en el límite, que no es de la parte
+    while 0 <= posicion < limite:
+        fila = bisect_right(posiciones, posicion, inicio, fin) - 1
+        filas.append(fila)
+        posicion = texto.find(termino, posiciones[fila + 1], limite)
+    return filas
+
+
+def escanear_parte(directorio, inicio, fin, consulta):
+    """
+    Evalúa una consulta sobre las filas [inicio, fin) de una instantánea.
+
+    Se ejecuta en los procesos del ProcessPoolExecutor (o en el principal
+    con pocas filas).
+
+    Parámetros:
+        directorio (str): Directorio de la instantánea.
+        inicio (int): Primera fila.
+        fin (int): Fila siguiente a la última.
+        consulta (tuple): (termino: bytes o None, campos, código de estado o
+            None, código de prioridad o None, predicado o None).
+
+    Retorna:
+        array: Filas que cumplen la consulta, en orden.
+    """
+    columnas = columnas_de(directorio)
+    termino, campos, estado, prioridad, predicado = consulta
+
+    if termino is None:
+        filas = range(inicio, fin)
+    else:
+        filas = None
+        for campo in campos:
+            encontradas = buscar_en_columna(
+                columnas.texto(campo + ".min"),
+                columnas.numeros(campo + ".min.pos", "q"),
+                termino,
+                inicio,
+                fin,
+            )
+            filas = encontradas if filas is None else sorted({*filas, *encontradas})
+    if estado is not None:
+        codigos = columnas.numeros("estado", "b")
+        filas = [fila for fila in filas if codigos[fila] == estado]
+    if prioridad is not None:
+        codigos = columnas.numeros("prioridad", "b")
+        filas = [fila for fila in filas if codigos[fila] == prioridad]
+    if predicado is not None:
+        tareas = columnas.tareas(inicio, fin)
+        filas = [fila for fila in filas if predicado(tareas[fila - inicio])]
+    return array("q", filas)
+
+
+class EscaneoParalelo:
+    """
+    Motor de escaneo en paralelo sobre una instantánea en columnas de un
+    almacén (ver la descripción del módulo).
+
+    Los almacenes que no lo admiten (escaneable = False, como AlmacenSQLite,
+    que resuelve sus consultas en la base) se recorren en serie.
+
+    Atributos:
+        almacen (AlmacenTareas): Almacén a escanear.
+        procesos (int): Procesos del ProcessPoolExecutor.
+        umbral (int): Filas a partir de las cuales se escanea en paralelo.
+    """
+
+    def __init__(self, almacen, procesos=None, umbral=UMBRAL_PARALELO):
+        """
+        Parámetros:
+            almacen (AlmacenTareas): Almacén a escanear.
+            procesos (int, optional): Procesos a usar; por defecto, uno por
+                núcleo.
+            umbral (int, optional): Filas a partir de las cuales se escanea
+                en paralelo.
+        """
+        self.almacen = almacen
+        self.procesos = procesos or os.cpu_count() or 1
+        self.umbral = umbral
+        self._directorio = None
+        self._borrar_directorio = None
+        self._ids = None
+        self._version = 0
+        self._construidas = set()
+        self._ejecutor = None
+
+    def __repr__(self):
+        filas = 0 if self._ids is None else len(self._ids)
+        return f"EscaneoParalelo({filas} filas, {self.procesos} procesos)"
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *excepcion):
+        self.cerrar()
+
+    def cerrar(self):
+        """
+        Detiene los procesos y borra la instantánea.
+        """
+        if self._ejecutor is not None:
+            self._ejecutor.shutdown()
+            self._ejecutor = None
+        self._descartar_instantanea()
+
+    def escanear(
+        self,
+        termino=None,
+        campos=("titulo",),
+        estado=None,
+        prioridad=None,
+        predicado=None,
+    ):
+        """
+        Retorna las tareas que cumplen todos los criterios indicados.
+
+        Parámetros:
+            termino (str, optional): Subcadena a buscar (sin distinguir
+                mayúsculas) en alguno de los campos.
+            campos (tuple, optional): Campos de texto donde buscar el término
+                ('titulo' y/o 'descripcion').
+            estado (str, optional): Estado de las tareas.
+            prioridad (str, optional): Prioridad de las tareas.
+            predicado (callable, optional): Función tarea -> bool; recibe
+                una tarea con acceso tipo diccionario (tarea['estado']). Para
+                evaluarse en otros procesos debe poder serializarse con
+                pickle (una función definida a nivel de módulo).
+
+        Retorna:
+            list: Tareas del almacén que cumplen la consulta, en orden de ID.
+        """
+        campos = tuple(campos)
+        termino = termino.lower() if termino is not None else None
+        estado = estado.lower() if estado is not None else None
+        prioridad = prioridad.lower() if prioridad is not None else None
+        criterios = (termino, campos, estado, prioridad, predicado)
+
+        if (
+            not getattr(self.almacen, "escaneable", False)
+            or not set(campos) <= set(CAMPOS_TEXTO)
+            or (termino is not None and "\x00" in termino)
+            or (estado is not None and estado not in CODIGOS_ESTADO)
+            or (prioridad is not None and prioridad not in CODIGOS_PRIORIDAD)
+        ):
+            return self._escanear_en_serie(criterios)
+
+        necesarias = []
+        if termino is not None:
+            necesarias += [campo + ".min" for campo in campos]
+        if predicado is not None:
+            necesarias += [campo + ".txt" for campo in CAMPOS_TEXTO]
+        cambiadas = self._preparar(necesarias)
+
+        consulta = (
+            termino.encode("utf-8") if termino is not None else None,
+            campos,
+            CODIGOS_ESTADO.get(estado),
+            CODIGOS_PRIORIDAD.get(prioridad),
+            predicado,
+        )
+        obtener = self.almacen.obtener
+        ids = self._ids
+        # Coincidencias de la instantánea que siguen igual en el almacén...
+        de_instantanea = (
+            ids[fila]
+            for fila in self._escanear_filas(consulta)
+            if ids[fila] not in cambiadas and obtener(ids[fila]) is not None
+        )
+        # ...y las tareas cambiadas desde entonces, evaluadas aquí
+        recientes = sorted(
+            tarea_id
+            for tarea_id in cambiadas
+            if cumple_criterios(obtener(tarea_id), criterios)
+        )
+        return [
+            obtener(tarea_id) for tarea_id in heapq.merge(de_instantanea, recientes)
+        ]
+
+    def _escanear_en_serie(self, criterios):
+        """
+        Recorre el almacén en este proceso (almacenes no escaneables o
+        criterios que las columnas no representan).
+        """
+        _, _, estado, prioridad, _ = criterios
+        if estado is not None or prioridad is not None:
+            tareas = self.almacen.iterar_filtradas(estado, prioridad)
+        else:
+            tareas = iter(self.almacen)
+        return sorted(
+            (tarea for tarea in tareas if cumple_criterios(tarea, criterios)),
+            key=lambda tarea: tarea["id"],
+        )
+
+    def _escanear_filas(self, consulta):
+        """
+        Evalúa la consulta sobre todas las filas: en partes contiguas en el
+        ProcessPoolExecutor, o aquí si son menos que el umbral.
+
+        Retorna:
+            array: Filas que cumplen la consulta, en orden.
+        """
+        filas = len(self._ids)
+        if filas < self.umbral or self.procesos == 1:
+            return escanear_parte(self._directorio, 0, filas, consulta)
+
+        if self._ejecutor is None:
+            self._ejecutor = ProcessPoolExecutor(max_workers=self.procesos)
+        partes = self.procesos * PARTES_POR_PROCESO
+        limites = [filas * i // partes for i in range(partes + 1)]
+        futuros = [
+            self._ejecutor.submit(
+                escanear_parte, self._directorio, inicio, fin, consulta
+            )
+            for inicio, fin in zip(limites, limites[1:])
+        ]
+        resultado = array("q")
+        for futuro in futuros:
+            resultado.extend(futuro.result())
+        return resultado
+
+    def _preparar(self, columnas):
+        """
+        Deja lista la instantánea con las columnas indicadas.
+
+        Parámetros:
+            columnas (list): Columnas de texto necesarias ('titulo.min', ...).
+
+        Retorna:
+            set: IDs cambiados desde la instantánea (se evalúan aparte).
+        """
+        cambiadas = None
+        if self._ids is not None:
+            cambiadas = set(self.almacen.ids_cambiados_desde(self._version))
+            if len(cambiadas) > FRACCION_RECONSTRUCCION * max(len(self._ids), 1):
+                cambiadas = None
+        if cambiadas is None:
+            self._tomar_instantanea()
+            cambiadas = set()
+        for nombre in columnas:
+            if nombre not in self._construidas:
+                self._construir_texto(nombre)
+        return cambiadas
+
+    def _tomar_instantanea(self):
+        """
+        Escribe en un directorio nuevo los IDs (en orden) y los códigos de
+        estado y prioridad del almacén.
+        """
+        self._descartar_instantanea()
+        self._directorio = tempfile.mkdtemp(prefix="tareas-escaneo-")
+        # Se borra aunque no se llame a cerrar() (al recolectar o al salir)
+        self._borrar_directorio = weakref.finalize(
+            self, shutil.rmtree, self._directorio, True
+        )
+        self._version = self.almacen.version
+        self._ids = array("q", sorted(self.almacen.ids()))
+
+        estados = array("b")
+        prioridades = array("b")
+        obtener = self.almacen.obtener
+        for tarea_id in self._ids:
+            tarea = obtener(tarea_id)
+            estados.append(CODIGOS_ESTADO.get(tarea["estado"], 0))
+            prioridades.append(CODIGOS_PRIORIDAD.get(tarea["prioridad"], 0))
+        for nombre, columna in (
+            ("ids", self._ids),
+            ("estado", estados),
+            ("prioridad", prioridades),
+        ):
+            with open(os.path.join(self._directorio, nombre), "wb") as f:
+                columna.tofile(f)
+
+    def _construir_texto(self, nombre):
+        """
+        Escribe una columna de texto y sus posiciones ('<nombre>.pos').
+
+        Las tareas eliminadas desde la instantánea quedan como texto vacío
+        (sus coincidencias se descartan al unir los resultados).
+
+        Parámetros:
+            nombre (str): '<campo>.min' o '<campo>.txt'.
+        """
+        campo, tipo = nombre.split(".")
+        obtener = self.almacen.obtener
+
+        def textos():
+            for tarea_id in self._ids:
+                tarea = obtener(tarea_id)
+                texto = tarea[campo] if tarea is not None else ""
+                yield texto.lower() if tipo == "min" else texto
+
+        posiciones = array("q", [0])
+        iterador = textos()
+        with open(os.path.join(self._directorio, nombre), "wb") as f:
+            while True:
+                bloque = [
+                    texto.encode("utf-8")
+                    for texto in islice(iterador, TAMANO_BLOQUE_COLUMNA)
+                ]
+                if not bloque:
+                    break
+                f.write(SEPARADOR.join(bloque) + SEPARADOR)
+                # Comienzo de la fila siguiente a cada una del bloque
+                finales = accumulate(
+                    (len(texto) + 1 for texto in bloque), initial=posiciones[-1]
+                )
+                posiciones.extend(islice(finales, 1, None))
+        with open(os.path.join(self._directorio, nombre + ".pos"), "wb") as f:
+            posiciones.tofile(f)
+        self._construidas.add(nombre)
+
+    def _descartar_instantanea(self):
+        """
+        Cierra las columnas mapeadas por este proceso y borra la instantánea.
+        """
+        if self._directorio is not None:
+            cerrar_columnas(self._directorio)
+            self._borrar_directorio()
+        self._directorio = None
+        self._ids = None
+        self._construidas.clear()
+
+
+def cumple_criterios(tarea, criterios):
+    """
+    Evalúa los criterios de EscaneoParalelo.escanear sobre una tarea.
+
+    Parámetros:
+        tarea (dict o Tarea o None): Tarea a evaluar (None si no existe).
+        criterios (tuple): (termino, campos, estado, prioridad, predicado),
+            con el texto ya en minúsculas.
+
+    Retorna:
+        bool: True si la tarea existe y cumple todos los criterios.
+    """
+    if tarea is None:
+        return False
+    termino, campos, estado, prioridad, predicado = criterios
+    if termino is not None and not any(
+        termino in tarea[campo].lower() for campo in campos
+    ):
+        return False
+    if estado is not None and tarea["estado"] != estado:
+        return False
+    if prioridad is not None and tarea["prioridad"] != prioridad:
+        return False
+    return predicado is None or predicado(tarea)
@@ -5,6 +5,33 @@ Contiene funciones para CRUD, validación, búsqueda y persistencia de tareas.
 Compatibilidad: Python 3.8+
 """
 
+import gc
+import json
+import marshal
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from itertools import islice
+from operator import attrgetter, itemgetter
+
+from almacen import (
+    CAMPOS,
+    CODIGOS_ESTADO,
+    CODIGOS_PRIORIDAD,
+    AlmacenTareas,
+    Tarea,
+    leer_orden,
+    resumir_conteos,
+    reunir_cambios,
+    seleccionar_ordenadas,
+)
+from concurrencia import obtener_cerrojo
+from instrumentacion import METRICAS_ACTIVAS, instrumentar_modulo, registrar_bytes
+
 # ============================================================================
 # FUNCIONES DE VALIDACIÓN
 # ============================================================================
@@ -90,6 +117,44 @@ def validar_prioridad(prioridad):
         return False, None
 
 
+def convertir_estado(estado):
+    """
+    Valida un estado escrito como número del menú (1-3) o por su nombre.
+
+    Parámetros:
+        estado (str): '2', 'en_progreso', 'EN_PROGRESO', etc.
+
+    Retorna:
+        tuple: (es_válido: bool, estado_convertido: str o None)
+    """
+    es_valido, convertido = validar_estado(estado)
+    if es_valido:
+        return True, convertido
+    convertido = estado.strip().lower()
+    if convertido in CODIGOS_ESTADO:
+        return True, convertido
+    return False, None
+
+
+def convertir_prioridad(prioridad):
+    """
+    Valida una prioridad escrita como número del menú (1-3) o por su nombre.
+
+    Parámetros:
+        prioridad (str): '3', 'alta', 'ALTA', etc.
+
+    Retorna:
+        tuple: (es_válido: bool, prioridad_convertida: str o None)
+    """
+    es_valido, convertida = validar_prioridad(prioridad)
+    if es_valido:
+        return True, convertida
+    convertida = prioridad.strip().lower()
+    if convertida in CODIGOS_PRIORIDAD:
+        return True, convertida
+    return False, None
+
+
 def validar_id(id_str):
     """
     Valida que el ID sea un número entero válido.
@@ -114,60 +179,898 @@ def validar_id(id_str):
 # ============================================================================
 
 
+# Formato de tareas.txt (versión 2):
+#   primera línea: "#tareas v2"
+#   resto: id|titulo|descripcion|estado|prioridad, con los campos escapados
+#   (\\ = barra invertida, \p = '|', \n = salto de línea, \r = retorno)
+# Un archivo sin cabecera se interpreta con el formato original (versión 1).
+VERSION_FORMATO = 2
+CABECERA_FORMATO = f"#tareas v{VERSION_FORMATO}"
+TAMANO_BLOQUE = 8 * 1024 * 1024
+# Instantánea binaria (tareas.txt.bin): versión y tamaño mínimo de
+# tareas.txt para crearla (por debajo, leer el texto ya es inmediato)
+VERSION_BINARIA = 1
+TAMANO_MINIMO_BINARIA = 1024 * 1024
+
+TAMANO_LOTE_ESCRITURA = 50000
+
+# Lecturas sin cerrojo que se intentan antes de esperar a los escritores, y
+# pausa (en segundos) cuando uno está cambiando los archivos
+INTENTOS_LECTURA = 3
+ESPERA_LECTURA = 0.001
+
+PATRON_ESCAPE = re.compile(r"\\(.)")
+DESESCAPES = {"\\": "\\", "p": "|", "n": "\n", "r": "\r"}
+
+
+def escapar_campo(texto):
+    """
+    Escapa un campo para guardarlo en una línea del formato versión 2.
+
+    Parámetros:
+        texto (str): Valor del campo.
+
+    Retorna:
+        str: Valor sin '|' ni saltos de línea literales.
+    """
+    return (
+        texto.replace("\\", "\\\\")
+        .replace("|", "\\p")
+        .replace("\n", "\\n")
+        .replace("\r", "\\r")
+    )
+
+
+def desescapar_campo(texto):
+    """
+    Revierte escapar_campo.
+
+    Parámetros:
+        texto (str): Campo leído del archivo.
+
+    Retorna:
+        str: Valor original del campo.
+    """
+    if "\\" not in texto:
+        return texto
+    return PATRON_ESCAPE.sub(lambda m: DESESCAPES.get(m.group(1), m.group(1)), texto)
+
+
+def formatear_linea(tarea):
+    """
+    Convierte una tarea en una línea del formato versión 2.
+
+    Parámetros:
+        tarea (dict): Tarea a convertir.
+
+    Retorna:
+        str: Línea terminada en salto de línea.
+    """
+    return (
+        f"{tarea['id']}|{escapar_campo(tarea['titulo'])}"
+        f"|{escapar_campo(tarea['descripcion'])}"
+        f"|{escapar_campo(tarea['estado'])}|{escapar_campo(tarea['prioridad'])}\n"
+    )
+
+
+def formatear_lote(tareas):
+    """
+    Convierte un lote de tareas en el texto del formato versión 2.
+
+    Primero se arma el texto sin escapar y se comprueba en bloque que no
+    contenga caracteres especiales (caso habitual); solo si los hay se
+    vuelve a formatear el lote escapando cada campo.
+
+    Parámetros:
+        tareas (list): Lote de tareas.
+
+    Retorna:
+        str: Líneas del lote, cada una terminada en salto de línea.
+    """
+    if isinstance(tareas[0], Tarea):
+        # Acceso directo a los atributos, sin pasar por __getitem__
+        texto = "".join(
+            [
+                f"{t.id}|{t.titulo}|{t.descripcion}|{t.estado}|{t.prioridad}\n"
+                for t in tareas
+            ]
+        )
+    else:
+        texto = "".join(
+            [
+                f"{t['id']}|{t['titulo']}|{t['descripcion']}|{t['estado']}|{t['prioridad']}\n"
+                for t in tareas
+            ]
+        )
+    if (
+        texto.count("|") == 4 * len(tareas)
+        and texto.count("\n") == len(tareas)
+        and "\\" not in texto
+        and "\r" not in texto
+    ):
+        return texto
+    return "".join([formatear_linea(tarea) for tarea in tareas])
+
+
+def parsear_lineas(lineas, tareas, escapado=True, fabrica=None):
+    """
+    Convierte líneas del archivo en tareas y las agrega a la lista.
+
+    Las líneas vacías o con un número de campos distinto de 5 se ignoran.
+
+    Parámetros:
+        lineas (list): Líneas sin el salto de línea final.
+        tareas (list): Lista donde se agregan las tareas.
+        escapado (bool): True para el formato versión 2, False para el original.
+        fabrica (callable, optional): Constructor de cada tarea a partir de
+            (id, titulo, descripcion, estado, prioridad), por ejemplo Tarea.
+            Por defecto se crean diccionarios.
+    """
+    agregar = tareas.append
+    for linea in lineas:
+        partes = linea.split("|")
+        if len(partes) != 5:
+            continue
+        if escapado:
+            if "\\" in linea:
+                partes = [desescapar_campo(parte) for parte in partes]
+        else:
+            # Formato original: se recortan los espacios de los extremos
+            partes[0] = partes[0].strip()
+            partes[4] = partes[4].strip()
+        if fabrica is not None:
+            agregar(fabrica(int(partes[0]), partes[1], partes[2], partes[3], partes[4]))
+            continue
+        agregar(
+            {
+                "id": int(partes[0]),
+                "titulo": partes[1],
+                "descripcion": partes[2],
+                "estado": partes[3],
+                "prioridad": partes[4],
+            }
+        )
+
+
+def parsear_bloque(texto, tareas, fabrica=None):
+    """
+    Convierte un bloque de líneas completas (formato versión 2) en tareas.
+
+    El bloque se divide en campos con un único split; si el número de campos
+    es exactamente 5 por línea, las tareas se arman directamente a partir de
+    los campos. Si no (líneas vacías o dañadas), se procesa línea por línea.
+
+    Parámetros:
+        texto (str): Líneas completas, cada una terminada en salto de línea.
+        tareas (list): Lista donde se agregan las tareas.
+        fabrica (callable, optional): Constructor de cada tarea (ver
+            parsear_lineas).
+    """
+    cantidad = texto.count("\n")
+    campos = texto.replace("\n", "|").split("|")
+    # El salto de línea final deja un campo vacío extra al final
+    if len(campos) != 5 * cantidad + 1:
+        parsear_lineas(texto.split("\n"), tareas, True, fabrica)
+        return
+
+    campos.pop()
+    if "\\" in texto:
+        campos = [desescapar_campo(campo) for campo in campos]
+    iterador = iter(campos)
+    if fabrica is not None:
+        tareas.extend(
+            [
+                fabrica(int(tarea_id), titulo, descripcion, estado, prioridad)
+                for tarea_id, titulo, descripcion, estado, prioridad in zip(
+                    iterador, iterador, iterador, iterador, iterador
+                )
+            ]
+        )
+        return
+    tareas.extend(
+        [
+            {
+                "id": int(tarea_id),
+                "titulo": titulo,
+                "descripcion": descripcion,
+                "estado": estado,
+                "prioridad": prioridad,
+            }
+            for tarea_id, titulo, descripcion, estado, prioridad in zip(
+                iterador, iterador, iterador, iterador, iterador
+            )
+        ]
+    )
+
+
+@contextmanager
+def archivo_atomico(ruta, binario=False):
+    """
+    Abre un archivo temporal que reemplaza a 'ruta' de forma atómica.
+
+    Se escribe en un temporal del mismo directorio; al salir del bloque sin
+    errores se hace fsync, se renombra sobre 'ruta' y se sincroniza el
+    directorio. Si hay un error (o una caída) el archivo original queda
+    intacto y el temporal se elimina.
+
+    Parámetros:
+        ruta (str): Archivo de destino.
+        binario (bool, optional): Abrir en modo binario en lugar de texto.
+
+    Retorna:
+        file: Archivo temporal abierto (dentro del with).
+    """
+    directorio = os.path.dirname(os.path.abspath(ruta))
+    # Nombre único por proceso e hilo; los permisos siguen la umask como open()
+    temporal = f"{ruta}.{os.getpid()}.{threading.get_ident()}.tmp"
+    descriptor = os.open(temporal, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o666)
+    try:
+        if binario:
+            f = os.fdopen(descriptor, "wb")
+        else:
+            f = os.fdopen(descriptor, "w", encoding="utf-8")
+        with f:
+            if os.path.exists(ruta):
+                # Conservar los permisos del archivo que se reemplaza
+                os.chmod(temporal, os.stat(ruta).st_mode & 0o7777)
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporal, ruta)
+    except BaseException:
+        try:
+            os.remove(temporal)
+        except OSError:
+            pass
+        raise
+    sincronizar_directorio(directorio)
+
+
+def sincronizar_directorio(directorio):
+    """
+    Hace fsync del directorio para que un renombrado sobreviva a una caída.
+
+    En sistemas que no lo permiten (por ejemplo, Windows) no hace nada.
+
+    Parámetros:
+        directorio (str): Directorio a sincronizar.
+    """
+    try:
+        descriptor = os.open(directorio, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(descriptor)
+    except OSError:
+        pass
+    finally:
+        os.close(descriptor)
+
+
 def guardar_tareas(tareas, archivo="tareas.txt"):
     """
     Guarda las tareas en un archivo de texto.
 
+    Junto al archivo se guarda también la secuencia de IDs (ver
+    guardar_secuencia) para que los IDs eliminados no se reutilicen.
+    La escritura es atómica (ver archivo_atomico): si falla a mitad de
+    camino, el archivo anterior se conserva completo. Siempre se escribe el
+    formato versión 2 (ver CABECERA_FORMATO).
+
     Parámetros:
-        tareas (list): Lista de diccionarios con las tareas.
+        tareas (list o AlmacenTareas): Tareas a guardar.
         archivo (str): Nombre del archivo donde guardar. Por defecto 'tareas.txt'.
+
+    Retorna:
+        bool: True si se guardó correctamente, False si hubo un error.
     """
     try:
-        with open(archivo, "w", encoding="utf-8") as f:
-            for tarea in tareas:
-                # Formato: id|titulo|descripcion|estado|prioridad
-                linea = f"{tarea['id']}|{tarea['titulo']}|{tarea['descripcion']}|{tarea['estado']}|{tarea['prioridad']}\n"
-                f.write(linea)
-    except IOError as e:
+        ultimo_id = 0
+        with archivo_atomico(archivo) as f:
+            f.write(CABECERA_FORMATO + "\n")
+            # Formato: id|titulo|descripcion|estado|prioridad (escapados),
+            # escrito por lotes para reducir las llamadas a write()
+            iterador = iter(tareas)
+            lote = list(islice(iterador, TAMANO_LOTE_ESCRITURA))
+            while lote:
+                f.write(formatear_lote(lote))
+                ultimo_id = max(ultimo_id, max(tarea["id"] for tarea in lote))
+                lote = list(islice(iterador, TAMANO_LOTE_ESCRITURA))
+        if METRICAS_ACTIVAS:
+            registrar_bytes("guardar_tareas", escritos=os.path.getsize(archivo))
+
+        if isinstance(tareas, AlmacenTareas):
+            ultimo_id = max(ultimo_id, tareas.ultimo_id)
+        guardar_secuencia(max(ultimo_id, cargar_secuencia(archivo)), archivo)
+        return True
+    except OSError as e:
         print(f"Error al guardar tareas: {e}")
+        return False
 
 
-def cargar_tareas(archivo="tareas.txt"):
+def cargar_instantanea(archivo="tareas.txt", fabrica=None):
     """
-    Carga las tareas desde un archivo de texto.
+    Carga las tareas desde el archivo de texto, sin aplicar el diario.
+
+    El archivo se lee en bloques grandes (TAMANO_BLOQUE) que se dividen en
+    líneas de una vez, en lugar de iterar y recortar línea por línea.
+    Acepta el formato versión 2 y el formato original sin cabecera.
+
+    Con fabrica=Tarea se usa la instantánea binaria (tareas.txt.bin) si
+    corresponde a tareas.txt; si no, tras leer el texto se escribe una
+    nueva cuando el archivo supera TAMANO_MINIMO_BINARIA.
 
     Parámetros:
         archivo (str): Nombre del archivo a cargar. Por defecto 'tareas.txt'.
+        fabrica (callable, optional): Constructor de cada tarea (ver
+            parsear_lineas). Por defecto se crean diccionarios.
 
     Retorna:
         list: Lista de diccionarios con las tareas cargadas.
+
+    Lanza:
+        ValueError: Si el archivo declara una versión de formato desconocida.
     """
+    if fabrica is Tarea:
+        tareas = cargar_binaria(archivo)
+        if tareas is not None:
+            return tareas
+
     tareas = []
     try:
         with open(archivo, "r", encoding="utf-8") as f:
-            for linea in f:
-                linea = linea.strip()
-                if linea:
-                    # Desglosar formato: id|titulo|descripcion|estado|prioridad
-                    partes = linea.split("|")
-                    if len(partes) == 5:
-                        tarea = {
-                            "id": int(partes[0]),
-                            "titulo": partes[1],
-                            "descripcion": partes[2],
-                            "estado": partes[3],
-                            "prioridad": partes[4],
-                        }
-                        tareas.append(tarea)
+            estado = os.fstat(f.fileno())
+            registrar_bytes("cargar_instantanea", leidos=estado.st_size)
+            bloque = f.read(TAMANO_BLOQUE)
+            escapado = False
+            if bloque.startswith("#tareas v"):
+                cabecera, _, bloque = bloque.partition("\n")
+                if cabecera != CABECERA_FORMATO:
+                    raise ValueError(f"Formato de archivo no soportado: {cabecera}")
+                escapado = True
+
+            resto = ""
+            while bloque:
+                texto = resto + bloque
+                # La última línea puede estar incompleta: se completa en el
+                # siguiente bloque
+                corte = texto.rfind("\n") + 1
+                resto = texto[corte:]
+                if escapado:
+                    parsear_bloque(texto[:corte], tareas, fabrica)
+                else:
+                    parsear_lineas(texto[:corte].split("\n"), tareas, False, fabrica)
+                bloque = f.read(TAMANO_BLOQUE)
+            if resto:
+                parsear_lineas([resto], tareas, escapado, fabrica)
     except FileNotFoundError:
         # Si el archivo no existe, retorna lista vacía
-        pass
+        return tareas
     except IOError as e:
         print(f"Error al cargar tareas: {e}")
+        return tareas
+
+    if fabrica is Tarea and estado.st_size >= TAMANO_MINIMO_BINARIA:
+        # La firma es la del archivo abierto: aunque otro proceso ya lo haya
+        # reemplazado, la instantánea binaria corresponde a lo leído
+        guardar_binaria(tareas, archivo, (estado.st_size, estado.st_mtime_ns))
+    return tareas
+
+
+def ruta_binaria(archivo="tareas.txt"):
+    """
+    Retorna la ruta de la instantánea binaria de un archivo de tareas.
+
+    Parámetros:
+        archivo (str): Archivo de tareas.
+
+    Retorna:
+        str: Ruta de la instantánea binaria (archivo + '.bin').
+    """
+    return archivo + ".bin"
+
+
+def firma_binaria(firma):
+    """
+    Cabecera que identifica a qué tareas.txt corresponde una instantánea
+    binaria y con qué formato se escribió.
+
+    Parámetros:
+        firma (tuple): (tamaño, mtime_ns) de tareas.txt.
+
+    Retorna:
+        tuple: Versión, versión de marshal y de Python, tamaño y mtime_ns.
+    """
+    return (VERSION_BINARIA, marshal.version, sys.version_info[:2], *firma)
+
+
+def guardar_binaria(tareas, archivo="tareas.txt", firma=None):
+    """
+    Guarda las tareas de tareas.txt en columnas con marshal.
+
+    Volver a leerlas así evita interpretar el texto línea por línea (ver
+    cargar_binaria). Es una caché: si no se puede escribir, no pasa nada.
+
+    Parámetros:
+        tareas (list): Tareas (Tarea) tal como están en tareas.txt.
+        archivo (str): Archivo de tareas.
+        firma (tuple, optional): (tamaño, mtime_ns) de tareas.txt al leer
+            las tareas; por defecto, los actuales.
+
+    Retorna:
+        bool: True si se guardó.
+    """
+    try:
+        if firma is None:
+            estado = os.stat(archivo)
+            firma = (estado.st_size, estado.st_mtime_ns)
+        columnas = [
+            list(map(attrgetter(campo), tareas))
+            for campo in ("id", "titulo", "descripcion")
+        ]
+        for atributo in ("codigo_estado", "codigo_prioridad"):
+            codigos = list(map(attrgetter(atributo), tareas))
+            try:
+                # Caso habitual: todos son códigos 1-3
+                codigos = bytes(codigos)
+            except (TypeError, ValueError):
+                pass
+            columnas.append(codigos)
+        with archivo_atomico(ruta_binaria(archivo), binario=True) as f:
+            f.write(marshal.dumps((firma_binaria(firma), *columnas)))
+        return True
+    except OSError:
+        return False
+
+
+def cargar_binaria(archivo="tareas.txt"):
+    """
+    Carga la instantánea binaria si corresponde al tareas.txt actual.
+
+    Se compara el tamaño y la fecha de modificación (en nanosegundos) de
+    tareas.txt con los guardados; si difieren, la instantánea está vencida.
+
+    Parámetros:
+        archivo (str): Archivo de tareas.
+
+    Retorna:
+        list o None: Tareas (Tarea) de tareas.txt, o None si no hay
+            instantánea binaria válida.
+    """
+    try:
+        estado = os.stat(archivo)
+        with open(ruta_binaria(archivo), "rb") as f:
+            datos = f.read()
+    except OSError:
+        return None
+    try:
+        firma, ids, titulos, descripciones, estados, prioridades = marshal.loads(datos)
+    except (EOFError, ValueError, TypeError):
+        return None
+    if firma != firma_binaria((estado.st_size, estado.st_mtime_ns)):
+        return None
+    registrar_bytes("cargar_binaria", leidos=len(datos))
+    del datos
+    return list(map(Tarea, ids, titulos, descripciones, estados, prioridades))
+
+
+@contextmanager
+def recolector_pausado():
+    """
+    Pausa el recolector de ciclos mientras se cargan muchas tareas.
+
+    Cada millón de objetos nuevos dispara recolecciones que recorren todos
+    los anteriores, lo que multiplica el tiempo de carga. Anidado, no hace
+    nada.
+
+    No congela lo cargado (gc.freeze): los objetos congelados ya no se
+    recolectan, y cada recarga dejaría los de la anterior para siempre. El
+    menú de app.py congela una sola vez, al arrancar.
+    """
+    if not gc.isenabled():
+        yield
+        return
+    gc.disable()
+    try:
+        yield
+    finally:
+        gc.enable()
 
+
+def migrar_formato(archivo="tareas.txt"):
+    """
+    Convierte un archivo del formato original al formato versión 2.
+
+    Antes de reescribirlo se guarda una copia del original en
+    archivo + '.v1.bak'. Las líneas que el formato original ya no podía
+    interpretar (títulos o descripciones con '|') no se pueden recuperar.
+
+    Parámetros:
+        archivo (str): Archivo de tareas a migrar.
+
+    Retorna:
+        bool: True si se migró, False si ya estaba en versión 2 o no existe.
+    """
+    try:
+        with open(archivo, "r", encoding="utf-8") as f:
+            if f.readline().rstrip("\n") == CABECERA_FORMATO:
+                return False
+    except FileNotFoundError:
+        return False
+
+    tareas = cargar_instantanea(archivo)
+    with open(archivo, "r", encoding="utf-8") as origen:
+        with archivo_atomico(archivo + ".v1.bak") as copia:
+            copia.write(origen.read())
+    return guardar_tareas(tareas, archivo)
+
+
+def cargar_tareas(archivo="tareas.txt"):
+    """
+    Carga las tareas desde un archivo de texto.
+
+    Si existe un diario de cambios (ver DiarioTareas en diario.py), sus
+    registros se aplican sobre la última instantánea guardada. La lectura es
+    consistente aunque otro proceso esté escribiendo (ver leer_estado).
+
+    Parámetros:
+        archivo (str): Nombre del archivo a cargar. Por defecto 'tareas.txt'.
+
+    Retorna:
+        list: Lista de diccionarios con las tareas cargadas.
+    """
+    tareas, registros, _, _, _ = leer_estado(archivo)
+    tareas, _ = reproducir_registros(tareas, registros)
     return tareas
 
 
+def ruta_diario(archivo="tareas.txt"):
+    """
+    Retorna la ruta del diario de cambios asociado al archivo de tareas.
+
+    Durante una compactación el diario anterior se renombra a
+    archivo + '.log.old' hasta que la nueva instantánea queda guardada.
+
+    Parámetros:
+        archivo (str): Archivo de tareas.
+
+    Retorna:
+        str: Ruta del diario (archivo + '.log').
+    """
+    return archivo + ".log"
+
+
+def leer_registros(ruta, desde=0):
+    """
+    Lee los registros completos de un archivo de diario.
+
+    Solo cuentan las líneas terminadas en salto de línea: una línea a medio
+    escribir (por otro proceso, o la última tras una caída) queda para la
+    próxima lectura. Un registro 'crear_lote' se entrega como un registro
+    'crear' por tarea, con la versión del lote; 'actualizar_lote' y
+    'eliminar_lote', como un 'actualizar' o 'eliminar' por ID.
+
+    Parámetros:
+        ruta (str): Archivo del diario.
+        desde (int, optional): Posición en bytes desde la que leer.
+
+    Retorna:
+        tuple: (registros: list, posicion: int tras la última línea completa);
+            ([], desde) si el archivo no existe.
+    """
+    try:
+        with open(ruta, "rb") as f:
+            f.seek(desde)
+            datos = f.read()
+    except FileNotFoundError:
+        return [], desde
+    registrar_bytes("leer_registros", leidos=len(datos))
+
+    completos = datos.rfind(b"\n") + 1
+    registros = []
+    for linea in datos[:completos].decode("utf-8").split("\n"):
+        try:
+            registro = json.loads(linea)
+        except ValueError:
+            continue
+        operacion = registro.get("op")
+        version = registro.get("v", 0)
+        if operacion == "crear_lote":
+            registros.extend(
+                {"op": "crear", "tarea": dict(zip(CAMPOS, fila)), "v": version}
+                for fila in registro["tareas"]
+            )
+        elif operacion == "actualizar_lote":
+            cambios = registro["cambios"]
+            registros.extend(
+                {"op": "actualizar", "id": tarea_id, "cambios": cambios, "v": version}
+                for tarea_id in registro["ids"]
+            )
+        elif operacion == "eliminar_lote":
+            registros.extend(
+                {"op": "eliminar", "id": tarea_id, "v": version}
+                for tarea_id in registro["ids"]
+            )
+        else:
+            registros.append(registro)
+    return registros, desde + completos
+
+
+def leer_diario(archivo="tareas.txt"):
+    """
+    Lee los registros del diario en orden de escritura.
+
+    Primero se lee el diario de una compactación interrumpida o en curso
+    (si existe) y luego el diario actual (ver leer_registros).
+
+    Parámetros:
+        archivo (str): Archivo de tareas.
+
+    Retorna:
+        generator: Registros del diario (diccionarios).
+    """
+    diario = ruta_diario(archivo)
+    for ruta in (diario + ".old", diario):
+        registros, _ = leer_registros(ruta)
+        yield from registros
+
+
+def leer_archivos_estado(archivo="tareas.txt", fabrica=None):
+    """
+    Lee la instantánea, el diario rotado (si existe) y el diario actual.
+
+    Parámetros:
+        archivo (str): Archivo de tareas.
+        fabrica (callable, optional): Constructor de cada tarea (ver
+            parsear_lineas).
+
+    Retorna:
+        tuple: (tareas: list, registros: list, posicion: int bytes leídos del
+            diario actual)
+    """
+    diario = ruta_diario(archivo)
+    tareas = cargar_instantanea(archivo, fabrica)
+    registros, _ = leer_registros(diario + ".old")
+    recientes, posicion = leer_registros(diario)
+    registros.extend(recientes)
+    return tareas, registros, posicion
+
+
+def leer_sin_cerrojos(archivo, leer):
+    """
+    Ejecuta una lectura de los archivos de tareas sin tomar cerrojos.
+
+    Otro proceso puede rotar el diario mientras se lee: se comparan los
+    contadores de tareas.txt.lock antes y después de leer (ver
+    concurrencia.py) y, si cambiaron, se vuelve a leer. Tras
+    INTENTOS_LECTURA intentos se lee con el cerrojo de escritura tomado.
+
+    Parámetros:
+        archivo (str): Archivo de tareas.
+        leer (callable): Función sin argumentos que hace la lectura; puede
+            llamarse más de una vez.
+
+    Retorna:
+        tuple: (resultado de leer(), generacion: int, version: int última
+            versión guardada en los contadores)
+    """
+    try:
+        cerrojo = obtener_cerrojo(archivo)
+    except OSError:
+        # Sin permiso para crear tareas.txt.lock: nadie más puede escribir
+        return leer(), 0, 0
+
+    for _ in range(INTENTOS_LECTURA):
+        marca, generacion, version = cerrojo.leer_contadores()
+        if marca % 2 == 0:
+            resultado = leer()
+            if cerrojo.leer_contadores()[0] == marca:
+                return resultado, generacion, version
+        time.sleep(ESPERA_LECTURA)
+
+    with cerrojo.escritura():
+        _, generacion, version = cerrojo.leer_contadores()
+        return leer(), generacion, version
+
+
+def leer_estado(archivo="tareas.txt", fabrica=None):
+    """
+    Lee la instantánea y los registros del diario sin tomar cerrojos (ver
+    leer_sin_cerrojos).
+
+    Parámetros:
+        archivo (str): Archivo de tareas.
+        fabrica (callable, optional): Constructor de cada tarea (ver
+            parsear_lineas).
+
+    Retorna:
+        tuple: (tareas de la instantánea: list, registros del diario: list,
+            generacion: int, posicion: int bytes leídos del diario actual,
+            version: int última versión guardada en los contadores)
+    """
+    estado, generacion, version = leer_sin_cerrojos(
+        archivo, lambda: leer_archivos_estado(archivo, fabrica)
+    )
+    tareas, registros, posicion = estado
+    return tareas, registros, generacion, posicion, version
+
+
+def reproducir_registros(tareas, registros):
+    """
+    Aplica registros del diario sobre una lista de tareas.
+
+    Los registros guardan valores absolutos, por lo que volver a aplicar un
+    diario ya incluido en la instantánea no altera el resultado.
+
+    Parámetros:
+        tareas (list): Tareas de la última instantánea.
+        registros (iterable): Registros del diario en orden de escritura.
+
+    Retorna:
+        tuple: (tareas: list, ultimo_id: int mayor ID creado en los registros)
+    """
+    por_id = {tarea["id"]: tarea for tarea in tareas}
+    ultimo_id = 0
+    for registro in registros:
+        operacion = registro.get("op")
+        if operacion == "crear":
+            tarea = registro["tarea"]
+            por_id[tarea["id"]] = tarea
+            ultimo_id = max(ultimo_id, tarea["id"])
+        elif operacion == "actualizar" and registro["id"] in por_id:
+            por_id[registro["id"]].update(registro["cambios"])
+        elif operacion == "eliminar":
+            por_id.pop(registro["id"], None)
+
+    return list(por_id.values()), ultimo_id
+
+
+def reproducir_diario(tareas, archivo="tareas.txt"):
+    """
+    Aplica los registros del diario sobre una lista de tareas.
+
+    Parámetros:
+        tareas (list): Tareas de la última instantánea.
+        archivo (str): Archivo de tareas.
+
+    Retorna:
+        tuple: (tareas: list, ultimo_id: int mayor ID visto en el diario)
+    """
+    diario = ruta_diario(archivo)
+    if not os.path.exists(diario) and not os.path.exists(diario + ".old"):
+        return tareas, 0
+    return reproducir_registros(tareas, leer_diario(archivo))
+
+
+def ruta_secuencia(archivo="tareas.txt"):
+    """
+    Retorna la ruta del archivo que guarda la secuencia de IDs.
+
+    Parámetros:
+        archivo (str): Archivo de tareas.
+
+    Retorna:
+        str: Ruta del archivo de secuencia (archivo + '.seq').
+    """
+    return archivo + ".seq"
+
+
+def guardar_secuencia(ultimo_id, archivo="tareas.txt"):
+    """
+    Guarda la marca de agua de IDs junto al archivo de tareas.
+
+    Parámetros:
+        ultimo_id (int): Mayor ID asignado hasta ahora.
+        archivo (str): Archivo de tareas.
+    """
+    with archivo_atomico(ruta_secuencia(archivo)) as f:
+        f.write(f"{ultimo_id}\n")
+
+
+def cargar_secuencia(archivo="tareas.txt"):
+    """
+    Lee la marca de agua de IDs guardada junto al archivo de tareas.
+
+    Parámetros:
+        archivo (str): Archivo de tareas.
+
+    Retorna:
+        int: Mayor ID asignado hasta ahora, o 0 si no hay secuencia.
+    """
+    try:
+        with open(ruta_secuencia(archivo), "r", encoding="utf-8") as f:
+            return int(f.read().strip() or 0)
+    except (FileNotFoundError, ValueError):
+        return 0
+
+
+def cargar_almacen(archivo="tareas.txt"):
+    """
+    Carga las tareas en un AlmacenTareas con su secuencia de IDs.
+
+    La marca de agua se calcula una sola vez aquí (máximo entre la secuencia
+    persistida, el mayor ID del archivo y el mayor ID creado en el diario);
+    a partir de ahí cada crear_tarea obtiene su ID en O(1). Las tareas se
+    leen directamente como objetos Tarea compactos, de la instantánea
+    binaria si está al día (ver cargar_binaria), y con el recolector de
+    ciclos pausado (ver recolector_pausado).
+
+    Parámetros:
+        archivo (str): Nombre del archivo a cargar. Por defecto 'tareas.txt'.
+
+    Retorna:
+        AlmacenTareas: Almacén con las tareas cargadas.
+    """
+    with recolector_pausado():
+        tareas, registros, generacion, posicion, version = leer_estado(
+            archivo, fabrica=Tarea
+        )
+        almacen = AlmacenTareas(tareas, cargar_secuencia(archivo))
+        del tareas
+        almacen.aplicar_registros(registros)
+    almacen.version = max(almacen.version, version)
+    almacen.generacion = generacion
+    almacen.posicion_diario = posicion
+    return almacen
+
+
+def sincronizar_almacen(almacen, archivo="tareas.txt"):
+    """
+    Incorpora al almacén los cambios que otros procesos guardaron desde que
+    se cargó o se sincronizó por última vez. No toma cerrojos.
+
+    Mientras la generación del diario no cambie (ver concurrencia.py) solo se
+    leen los registros añadidos al final del diario, y nada si su tamaño no
+    cambió. Solo si otro proceso rotó el diario al compactar se recarga todo
+    el archivo y se aplican las diferencias (ver AlmacenTareas.reemplazar);
+    un almacén con método releer (AlmacenMapeado) se recarga con él.
+
+    Parámetros:
+        almacen (AlmacenTareas): Almacén obtenido con cargar_almacen.
+        archivo (str): Archivo de tareas.
+
+    Retorna:
+        bool: True si el almacén cambió.
+    """
+    if almacen.generacion is None or not almacen.sincronizable:
+        return False
+    try:
+        cerrojo = obtener_cerrojo(archivo)
+    except OSError:
+        return False
+
+    diario = ruta_diario(archivo)
+    generacion = cerrojo.leer_contadores()[1]
+    if generacion == almacen.generacion:
+        try:
+            tamano = os.path.getsize(diario)
+        except OSError:
+            tamano = 0
+        if tamano == almacen.posicion_diario:
+            return False
+        registros, posicion = leer_registros(diario, almacen.posicion_diario)
+        # Si el diario se rotó mientras se leía, lo leído no sirve
+        if cerrojo.leer_contadores()[1] == generacion:
+            almacen.aplicar_registros(registros)
+            almacen.posicion_diario = posicion
+            return bool(registros)
+
+    releer = getattr(almacen, "releer", None)
+    if releer is not None:
+        # AlmacenMapeado vuelve a mapear el archivo en lugar de cargarlo
+        return releer()
+    tareas, registros, generacion, posicion, version = leer_estado(
+        archivo, fabrica=Tarea
+    )
+    version = max([version] + [registro.get("v", 0) for registro in registros])
+    tareas, _ = reproducir_registros(tareas, registros)
+    cambio = almacen.reemplazar(tareas, version)
+    almacen.ultimo_id = max(almacen.ultimo_id, cargar_secuencia(archivo))
+    almacen.generacion = generacion
+    almacen.posicion_diario = posicion
+    return cambio
+
+
 # ============================================================================
 # FUNCIONES CRUD
 # ============================================================================
@@ -178,21 +1081,28 @@ def obtener_proximo_id(tareas):
     Obtiene el próximo ID disponible para una nueva tarea.
 
     Parámetros:
-        tareas (list): Lista actual de tareas.
+        tareas (list o AlmacenTareas): Lista actual de tareas.
 
     Retorna:
         int: Próximo ID a utilizar.
     """
+    if isinstance(tareas, AlmacenTareas):
+        return tareas.proximo_id()
     if not tareas:
         return 1
-    # Usar recursión para encontrar el máximo ID
-    return max_id_recursivo(tareas, 0) + 1
+    # Recorrido iterativo: la versión recursiva supera el límite de
+    # recursión de Python con listas de más de ~1000 tareas
+    return max(tarea["id"] for tarea in tareas) + 1
 
 
 def max_id_recursivo(tareas, indice=0, max_actual=0):
     """
     Función recursiva para encontrar el ID máximo en la lista.
 
+    Nota: cada tarea añade un nivel de recursión, por lo que solo sirve para
+    listas pequeñas (límite de recursión de Python). obtener_proximo_id usa
+    un recorrido iterativo o la marca de agua de AlmacenTareas.
+
     Parámetros:
         tareas (list): Lista de tareas.
         indice (int): Índice actual en la recursión.
@@ -218,7 +1128,7 @@ def crear_tarea(tareas, titulo, descripcion, estado, prioridad):
     Crea una nueva tarea y la agrega a la lista.
 
     Parámetros:
-        tareas (list): Lista actual de tareas.
+        tareas (list o AlmacenTareas): Lista actual de tareas.
         titulo (str): Título de la tarea.
         descripcion (str): Descripción de la tarea.
         estado (str): Estado inicial de la tarea.
@@ -227,6 +1137,9 @@ def crear_tarea(tareas, titulo, descripcion, estado, prioridad):
     Retorna:
         dict: La tarea creada.
     """
+    if isinstance(tareas, AlmacenTareas):
+        return tareas.crear(titulo, descripcion, estado, prioridad)
+
     nueva_tarea = {
         "id": obtener_proximo_id(tareas),
         "titulo": titulo,
@@ -243,12 +1156,15 @@ def obtener_tarea_por_id(tareas, tarea_id):
     Busca una tarea específica por su ID.
 
     Parámetros:
-        tareas (list): Lista de tareas.
+        tareas (list o AlmacenTareas): Lista de tareas.
         tarea_id (int): ID de la tarea a buscar.
 
     Retorna:
         dict o None: La tarea si existe, None en caso contrario.
     """
+    if isinstance(tareas, AlmacenTareas):
+        return tareas.obtener(tarea_id)
+
     for tarea in tareas:
         if tarea["id"] == tarea_id:
             return tarea
@@ -256,22 +1172,38 @@ def obtener_tarea_por_id(tareas, tarea_id):
 
 
 def actualizar_tarea(
-    tareas, tarea_id, titulo=None, descripcion=None, estado=None, prioridad=None
+    tareas,
+    tarea_id,
+    titulo=None,
+    descripcion=None,
+    estado=None,
+    prioridad=None,
+    version=None,
 ):
     """
     Actualiza los datos de una tarea existente.
 
     Parámetros:
-        tareas (list): Lista de tareas.
+        tareas (list o AlmacenTareas): Lista de tareas.
         tarea_id (int): ID de la tarea a actualizar.
         titulo (str, optional): Nuevo título.
         descripcion (str, optional): Nueva descripción.
         estado (str, optional): Nuevo estado.
         prioridad (str, optional): Nueva prioridad.
+        version (int, optional): Con un AlmacenTareas, versión con la que se
+            leyó la tarea (ver AlmacenTareas.actualizar).
 
     Retorna:
         bool: True si la tarea fue actualizada, False si no existe.
+
+    Lanza:
+        ConflictoEscritura: Si otro proceso cambió los mismos campos.
     """
+    if isinstance(tareas, AlmacenTareas):
+        return tareas.actualizar(
+            tarea_id, titulo, descripcion, estado, prioridad, version=version
+        )
+
     tarea = obtener_tarea_por_id(tareas, tarea_id)
 
     if tarea is None:
@@ -290,17 +1222,25 @@ def actualizar_tarea(
     return True
 
 
-def eliminar_tarea(tareas, tarea_id):
+def eliminar_tarea(tareas, tarea_id, version=None):
     """
     Elimina una tarea del sistema.
 
     Parámetros:
-        tareas (list): Lista de tareas.
+        tareas (list o AlmacenTareas): Lista de tareas.
         tarea_id (int): ID de la tarea a eliminar.
+        version (int, optional): Con un AlmacenTareas, versión con la que se
+            leyó la tarea (ver AlmacenTareas.eliminar).
 
     Retorna:
         bool: True si la tarea fue eliminada, False si no existe.
+
+    Lanza:
+        ConflictoEscritura: Si otro proceso modificó la tarea entretanto.
     """
+    if isinstance(tareas, AlmacenTareas):
+        return tareas.eliminar(tarea_id, version=version)
+
     for i, tarea in enumerate(tareas):
         if tarea["id"] == tarea_id:
             tareas.pop(i)
@@ -308,6 +1248,124 @@ def eliminar_tarea(tareas, tarea_id):
     return False
 
 
+def seleccionar_ids(tareas, ids=None, predicado=None):
+    """
+    Resuelve las tareas a las que se aplica una operación masiva.
+
+    Parámetros:
+        tareas (list o AlmacenTareas): Tareas registradas.
+        ids (iterable, optional): IDs elegidos.
+        predicado (callable o dict, optional): Función tarea -> bool, o
+            criterios de filtrar_tareas ({"estado": "completada"}), que con
+            un AlmacenTareas se resuelven con sus índices.
+
+    Retorna:
+        list: IDs elegidos, sin repetir.
+
+    Lanza:
+        ValueError: Si no se indica exactamente uno de ids y predicado.
+    """
+    if (ids is None) == (predicado is None):
+        raise ValueError("Indique los IDs o un predicado (solo uno de los dos)")
+    if ids is not None:
+        return list(dict.fromkeys(ids))
+    if isinstance(predicado, dict):
+        elegidas = iterar_filtradas(tareas, **predicado)
+    else:
+        elegidas = filter(predicado, tareas)
+    return [tarea["id"] for tarea in elegidas]
+
+
+def actualizar_tareas_masivo(
+    tareas,
+    ids=None,
+    predicado=None,
+    titulo=None,
+    descripcion=None,
+    estado=None,
+    prioridad=None,
+):
+    """
+    Aplica el mismo cambio a varias tareas (cierre o repriorización masiva).
+
+    Con un AlmacenTareas los cambios se aplican en un solo recorrido y se
+    anotan con una única versión y un único registro del diario (un solo
+    fsync); la selección por predicado se hace dentro del mismo bloque de
+    escritura, sin que otro proceso cambie las tareas entre medias.
+
+    Ejemplo (completar todas las pendientes de prioridad baja):
+        actualizar_tareas_masivo(
+            tareas, predicado={"estado": "pendiente", "prioridad": "baja"},
+            estado="completada",
+        )
+
+    Parámetros:
+        tareas (list o AlmacenTareas): Tareas registradas.
+        ids (iterable, optional): IDs de las tareas a actualizar.
+        predicado (callable o dict, optional): Alternativa a ids (ver
+            seleccionar_ids).
+        titulo (str, optional): Nuevo título.
+        descripcion (str, optional): Nueva descripción.
+        estado (str, optional): Nuevo estado.
+        prioridad (str, optional): Nueva prioridad.
+
+    Retorna:
+        list: IDs de las tareas modificadas (se omiten las que no existen o
+            ya tenían esos valores).
+
+    Lanza:
+        ValueError: Si no se indica exactamente uno de ids y predicado.
+    """
+    if isinstance(tareas, AlmacenTareas):
+        with tareas.escritura():
+            elegidos = seleccionar_ids(tareas, ids, predicado)
+            return tareas.actualizar_lote(
+                elegidos, titulo, descripcion, estado, prioridad
+            )
+
+    elegidos = set(seleccionar_ids(tareas, ids, predicado))
+    cambios = reunir_cambios(titulo, descripcion, estado, prioridad)
+    modificadas = []
+    for tarea in tareas:
+        if tarea["id"] in elegidos and any(
+            tarea[campo] != valor for campo, valor in cambios.items()
+        ):
+            tarea.update(cambios)
+            modificadas.append(tarea["id"])
+    return modificadas
+
+
+def eliminar_tareas_masivo(tareas, ids=None, predicado=None):
+    """
+    Elimina varias tareas (por ejemplo, todas las completadas).
+
+    Con un AlmacenTareas se eliminan en un solo recorrido con una única
+    versión y un único registro del diario. Con una lista se reconstruye
+    una sola vez en lugar de desplazar los elementos en cada eliminación.
+
+    Parámetros:
+        tareas (list o AlmacenTareas): Tareas registradas.
+        ids (iterable, optional): IDs de las tareas a eliminar.
+        predicado (callable o dict, optional): Alternativa a ids (ver
+            seleccionar_ids).
+
+    Retorna:
+        list: IDs de las tareas eliminadas (se omiten los que no existen).
+
+    Lanza:
+        ValueError: Si no se indica exactamente uno de ids y predicado.
+    """
+    if isinstance(tareas, AlmacenTareas):
+        with tareas.escritura():
+            return tareas.eliminar_lote(seleccionar_ids(tareas, ids, predicado))
+
+    elegidos = set(seleccionar_ids(tareas, ids, predicado))
+    eliminadas = [tarea["id"] for tarea in tareas if tarea["id"] in elegidos]
+    if eliminadas:
+        tareas[:] = [tarea for tarea in tareas if tarea["id"] not in elegidos]
+    return eliminadas
+
+
 # ============================================================================
 # FUNCIONES DE BÚSQUEDA Y FILTRADO
 # ============================================================================
@@ -317,13 +1375,19 @@ def buscar_por_titulo(tareas, titulo_busqueda):
     """
     Busca tareas que contengan el título especificado (búsqueda parcial).
 
+    Con un AlmacenTareas que tiene índice de texto (ver indice_texto.py) solo
+    se comprueban las tareas candidatas.
+
     Parámetros:
-        tareas (list): Lista de tareas.
+        tareas (list o AlmacenTareas): Tareas registradas.
         titulo_busqueda (str): Término a buscar en los títulos.
 
     Retorna:
         list: Lista de tareas que coinciden con la búsqueda.
     """
+    if isinstance(tareas, AlmacenTareas):
+        return tareas.buscar(titulo_busqueda)
+
     titulo_lower = titulo_busqueda.lower()
     resultados = []
 
@@ -339,13 +1403,18 @@ def filtrar_por_estado(tareas, estado):
     """
     Filtra las tareas por estado.
 
+    Con un AlmacenTareas se usa su índice por estado.
+
     Parámetros:
-        tareas (list): Lista de tareas.
+        tareas (list o AlmacenTareas): Tareas registradas.
         estado (str): Estado por el cual filtrar.
 
     Retorna:
         list: Lista de tareas que coinciden con el estado.
     """
+    if isinstance(tareas, AlmacenTareas):
+        return tareas.filtrar(estado=estado)
+
     estado_lower = estado.lower()
     resultados = []
 
@@ -361,13 +1430,18 @@ def filtrar_por_prioridad(tareas, prioridad):
     """
     Filtra las tareas por nivel de prioridad.
 
+    Con un AlmacenTareas se usa su índice por prioridad.
+
     Parámetros:
-        tareas (list): Lista de tareas.
+        tareas (list o AlmacenTareas): Tareas registradas.
         prioridad (str): Prioridad por la cual filtrar.
 
     Retorna:
         list: Lista de tareas que coinciden con la prioridad.
     """
+    if isinstance(tareas, AlmacenTareas):
+        return tareas.filtrar(prioridad=prioridad)
+
     prioridad_lower = prioridad.lower()
     resultados = []
 
@@ -379,46 +1453,235 @@ def filtrar_por_prioridad(tareas, prioridad):
     return resultados
 
 
+def filtrar_tareas(tareas, estado=None, prioridad=None, orden=None, limite=None):
+    """
+    Filtra las tareas por estado y prioridad a la vez.
+
+    Con un AlmacenTareas se intersectan sus índices recorriendo el más
+    pequeño; con una lista se hace un solo recorrido.
+
+    Parámetros:
+        tareas (list o AlmacenTareas): Tareas registradas.
+        estado (str, optional): Estado por el cual filtrar.
+        prioridad (str, optional): Prioridad por la cual filtrar.
+        orden (str, optional): Claves de orden del resultado (ver
+            ordenar_tareas); por defecto, el orden de las tareas.
+        limite (int, optional): Máximo de tareas (con orden, las primeras
+            del orden).
+
+    Retorna:
+        list: Lista de tareas que cumplen todos los criterios indicados.
+
+    Lanza:
+        ValueError: Si el orden no es válido.
+    """
+    if orden is not None:
+        return ordenar_tareas(tareas, orden, limite, estado, prioridad)
+    if limite is not None:
+        return list(paginar(iterar_filtradas(tareas, estado, prioridad), limite))
+    if isinstance(tareas, AlmacenTareas):
+        return tareas.filtrar(estado=estado, prioridad=prioridad)
+
+    estado_lower = estado.lower() if estado is not None else None
+    prioridad_lower = prioridad.lower() if prioridad is not None else None
+    return [
+        tarea
+        for tarea in tareas
+        if (estado_lower is None or tarea["estado"] == estado_lower)
+        and (prioridad_lower is None or tarea["prioridad"] == prioridad_lower)
+    ]
+
+
+def ordenar_tareas(tareas, orden, limite=None, estado=None, prioridad=None):
+    """
+    Ordena las tareas por una o varias claves, opcionalmente filtradas.
+
+    Las claves son prioridad, estado, id y titulo, separadas por comas y con
+    '-' delante para orden descendente: '-prioridad,id' da primero las de
+    prioridad alta y, entre ellas, las de menor ID. Con límite solo se
+    seleccionan las primeras del orden con heapq (O(n log limite)) en lugar
+    de ordenar todo; con un AlmacenTareas y la prioridad o el estado como
+    primera clave, las tareas salen ya agrupadas de su índice (ver
+    AlmacenTareas.iterar_ordenadas).
+
+    Ejemplo (las 20 pendientes de mayor prioridad):
+        ordenar_tareas(tareas, "-prioridad,id", limite=20, estado="pendiente")
+
+    Parámetros:
+        tareas (list o AlmacenTareas): Tareas registradas.
+        orden (str o iterable): Claves de orden.
+        limite (int, optional): Cantidad de tareas; None para todas.
+        estado (str, optional): Estado por el cual filtrar.
+        prioridad (str, optional): Prioridad por la cual filtrar.
+
+    Retorna:
+        list: Tareas ordenadas; a igual clave, en el orden original.
+
+    Lanza:
+        ValueError: Si el orden no es válido.
+    """
+    if isinstance(tareas, AlmacenTareas):
+        return tareas.ordenar(orden, limite, estado, prioridad)
+    criterios = leer_orden(orden)
+    return seleccionar_ordenadas(
+        iterar_filtradas(tareas, estado, prioridad), criterios, limite
+    )
+
+
+# ============================================================================
+# CONSULTAS PEREZOSAS
+# ============================================================================
+#
+# Variantes con generadores de la búsqueda y los filtros: no construyen la
+# lista de resultados, sino que producen las tareas de una en una. Se pueden
+# encadenar (cada una acepta cualquier iterable de tareas) y terminar con
+# paginar(); mostrar_tareas y los exportadores las consumen igual que una
+# lista, con memoria acotada y deteniéndose al completar la página.
+#
+# Ejemplo:
+#     paginar(iterar_por_estado(iterar_por_titulo(tareas, "informe"),
+#                               "pendiente"), limite=20, desplazamiento=40)
+#
+# Solo el primer paso usa los índices y la caché de consultas del
+# AlmacenTareas (un resultado consumido completo queda guardado); el almacén
+# no debe modificarse mientras se consume el resultado.
+
+
+def iterar_por_titulo(tareas, titulo_busqueda):
+    """
+    Versión perezosa de buscar_por_titulo.
+
+    Parámetros:
+        tareas (iterable o AlmacenTareas): Tareas en las que buscar.
+        titulo_busqueda (str): Término a buscar en los títulos.
+
+    Retorna:
+        iterator: Tareas cuyo título contiene el término.
+    """
+    if isinstance(tareas, AlmacenTareas):
+        return tareas.iterar_busqueda(titulo_busqueda)
+    titulo_lower = titulo_busqueda.lower()
+    return (tarea for tarea in tareas if titulo_lower in tarea["titulo"].lower())
+
+
+def iterar_por_estado(tareas, estado):
+    """
+    Versión perezosa de filtrar_por_estado.
+
+    Parámetros:
+        tareas (iterable o AlmacenTareas): Tareas a filtrar.
+        estado (str): Estado por el cual filtrar.
+
+    Retorna:
+        iterator: Tareas con ese estado.
+    """
+    if isinstance(tareas, AlmacenTareas):
+        return tareas.iterar_filtradas(estado=estado)
+    estado_lower = estado.lower()
+    return (tarea for tarea in tareas if tarea["estado"] == estado_lower)
+
+
+def iterar_por_prioridad(tareas, prioridad):
+    """
+    Versión perezosa de filtrar_por_prioridad.
+
+    Parámetros:
+        tareas (iterable o AlmacenTareas): Tareas a filtrar.
+        prioridad (str): Prioridad por la cual filtrar.
+
+    Retorna:
+        iterator: Tareas con esa prioridad.
+    """
+    if isinstance(tareas, AlmacenTareas):
+        return tareas.iterar_filtradas(prioridad=prioridad)
+    prioridad_lower = prioridad.lower()
+    return (tarea for tarea in tareas if tarea["prioridad"] == prioridad_lower)
+
+
+def iterar_filtradas(tareas, estado=None, prioridad=None):
+    """
+    Versión perezosa de filtrar_tareas (sin orden).
+
+    Parámetros:
+        tareas (iterable o AlmacenTareas): Tareas a filtrar.
+        estado (str, optional): Estado por el cual filtrar.
+        prioridad (str, optional): Prioridad por la cual filtrar.
+
+    Retorna:
+        iterator: Tareas que cumplen todos los criterios indicados.
+    """
+    if isinstance(tareas, AlmacenTareas):
+        return tareas.iterar_filtradas(estado, prioridad)
+    if estado is not None:
+        tareas = iterar_por_estado(tareas, estado)
+    if prioridad is not None:
+        tareas = iterar_por_prioridad(tareas, prioridad)
+    return iter(tareas)
+
+
+def paginar(tareas, limite=None, desplazamiento=0):
+    """
+    Limita un iterable de tareas a una página.
+
+    Se detiene al completar la página, sin consumir el resto de la consulta.
+
+    Parámetros:
+        tareas (iterable): Tareas (por ejemplo, el resultado de iterar_*).
+        limite (int, optional): Máximo de tareas; None para no limitar.
+        desplazamiento (int, optional): Tareas a saltar al principio.
+
+    Retorna:
+        iterator: Tareas de la página.
+    """
+    fin = None if limite is None else desplazamiento + limite
+    return islice(tareas, desplazamiento, fin)
+
+
 # ============================================================================
 # FUNCIONES DE ESTADÍSTICAS
 # ============================================================================
 
 
-def obtener_estadisticas(tareas):
+def obtener_estadisticas(tareas, archivo=None):
     """
     Calcula estadísticas sobre las tareas registradas.
 
+    Con un AlmacenTareas se leen sus contadores incrementales (O(1)); con
+    una lista se usa calcular_estadisticas.
+
     Parámetros:
-        tareas (list): Lista de tareas.
+        tareas (list o AlmacenTareas): Tareas registradas.
+        archivo (ArchivoTareas, optional): Tareas archivadas (ver
+            archivado.py); sus estadísticas se agregan en 'archivadas', leídas
+            del índice de segmentos sin descomprimirlos.
 
     Retorna:
         dict: Diccionario con estadísticas del sistema.
     """
-    total_tareas = len(tareas)
-
-    # Contar tareas por estado
-    pendientes = len(filtrar_por_estado(tareas, "pendiente"))
-    en_progreso = len(filtrar_por_estado(tareas, "en_progreso"))
-    completadas = len(filtrar_por_estado(tareas, "completada"))
-
-    # Contar tareas por prioridad
-    baja = len(filtrar_por_prioridad(tareas, "baja"))
-    media = len(filtrar_por_prioridad(tareas, "media"))
-    alta = len(filtrar_por_prioridad(tareas, "alta"))
-
-    # Calcular tasa de finalización
-    tasa_finalizacion = (completadas / total_tareas * 100) if total_tareas > 0 else 0
-
-    return {
-        "total_tareas": total_tareas,
-        "pendientes": pendientes,
-        "en_progreso": en_progreso,
-        "completadas": completadas,
-        "baja": baja,
-        "media": media,
-        "alta": alta,
-        "tasa_finalizacion": tasa_finalizacion,
-    }
+    if isinstance(tareas, AlmacenTareas):
+        stats = tareas.estadisticas()
+    else:
+        stats = calcular_estadisticas(tareas)
+    if archivo is not None:
+        stats = {**stats, "archivadas": archivo.estadisticas()}
+    return stats
+
+
+def calcular_estadisticas(tareas):
+    """
+    Calcula las estadísticas recorriendo las tareas una sola vez.
+
+    Cuenta cada par (estado, prioridad) en un único recorrido, sin crear
+    listas intermedias. También sirve para comprobar los contadores de un
+    AlmacenTareas.
+
+    Parámetros:
+        tareas (iterable): Tareas (diccionarios o Tarea).
+
+    Retorna:
+        dict: Diccionario con estadísticas del sistema.
+    """
+    return resumir_conteos(Counter(map(itemgetter("estado", "prioridad"), tareas)))
 
 
 # ============================================================================
@@ -426,6 +1689,52 @@ def obtener_estadisticas(tareas):
 # ============================================================================
 
 
+# Tareas que se acumulan antes de cada escritura en la salida
+TAMANO_LOTE_SALIDA = 1000
+
+# Tareas por página al listar en la terminal
+TAMANO_PAGINA = 20
+
+CABECERA_TABLA = f"{'ID':>6}  {'TÍTULO':<40}  {'ESTADO':<11}  PRIORIDAD\n" + "-" * 70
+
+
+def formatear_tarea(tarea):
+    """
+    Retorna una tarea con el formato de mostrar_tarea, sin imprimirla.
+
+    Parámetros:
+        tarea (dict): Diccionario con los datos de la tarea.
+
+    Retorna:
+        str: Texto de la tarea (sin salto de línea final).
+    """
+    return (
+        f"\n  ID: {tarea['id']}\n"
+        f"  Título: {tarea['titulo']}\n"
+        f"  Descripción: {tarea['descripcion']}\n"
+        f"  Estado: {tarea['estado'].replace('_', ' ').upper()}\n"
+        f"  Prioridad: {tarea['prioridad'].upper()}\n"
+        "  " + "-" * 60
+    )
+
+
+def formatear_fila(tarea):
+    """
+    Retorna una tarea como fila de la tabla compacta (una línea).
+
+    Parámetros:
+        tarea (dict): Diccionario con los datos de la tarea.
+
+    Retorna:
+        str: Fila con ID, título (recortado a 40 caracteres), estado y prioridad.
+    """
+    return (
+        f"{tarea['id']:>6}  {tarea['titulo']:<40.40}  "
+        f"{tarea['estado'].replace('_', ' ').upper():<11}  "
+        f"{tarea['prioridad'].upper()}"
+    )
+
+
 def mostrar_tarea(tarea):
     """
     Muestra una tarea con formato legible.
@@ -433,33 +1742,110 @@ def mostrar_tarea(tarea):
     Parámetros:
         tarea (dict): Diccionario con los datos de la tarea.
     """
-    print(f"\n  ID: {tarea['id']}")
-    print(f"  Título: {tarea['titulo']}")
-    print(f"  Descripción: {tarea['descripcion']}")
-    print(f"  Estado: {tarea['estado'].replace('_', ' ').upper()}")
-    print(f"  Prioridad: {tarea['prioridad'].upper()}")
-    print("  " + "-" * 60)
+    print(formatear_tarea(tarea))
 
 
-def mostrar_tareas(tareas, titulo="TAREAS"):
+def mostrar_tareas(
+    tareas, titulo="TAREAS", compacto=False, limite=None, desplazamiento=0, salida=None
+):
     """
     Muestra múltiples tareas con formato.
 
+    Acepta cualquier iterable (por ejemplo, una consulta perezosa). Las
+    tareas se formatean en un búfer que se escribe de una vez cada
+    TAMANO_LOTE_SALIDA tareas, en lugar de varias llamadas a print por
+    tarea; así también se vuelca eficientemente a una tubería o archivo.
+
     Parámetros:
-        tareas (list): Lista de tareas a mostrar.
+        tareas (iterable): Tareas a mostrar.
         titulo (str): Título de la sección.
+        compacto (bool, optional): Una línea por tarea en forma de tabla.
+        limite (int, optional): Máximo de tareas a mostrar (tamaño de página).
+        desplazamiento (int, optional): Tareas a saltar al principio.
+        salida (file, optional): Destino; por defecto sys.stdout.
+
+    Retorna:
+        int: Cantidad de tareas mostradas.
     """
-    print("\n" + "=" * 70)
-    print(titulo)
-    print("=" * 70)
+    if salida is None:
+        salida = sys.stdout
+    formatear = formatear_fila if compacto else formatear_tarea
+
+    bufer = ["\n" + "=" * 70, titulo, "=" * 70]
+    mostradas = 0
+    for tarea in paginar(tareas, limite, desplazamiento):
+        if mostradas == 0 and compacto:
+            bufer.append(CABECERA_TABLA)
+        bufer.append(formatear(tarea))
+        mostradas += 1
+        if len(bufer) >= TAMANO_LOTE_SALIDA:
+            salida.write("\n".join(bufer) + "\n")
+            bufer = []
+
+    if mostradas == 0:
+        bufer.append("\nNo hay tareas para mostrar.\n")
+    else:
+        bufer.append("")
+    salida.write("\n".join(bufer) + "\n")
+    salida.flush()
+    return mostradas
+
+
+def mostrar_paginas(tareas, titulo="TAREAS", tamano_pagina=TAMANO_PAGINA):
+    """
+    Muestra las tareas página por página, preguntando antes de cada una.
 
-    if not tareas:
-        print("\nNo hay tareas para mostrar.\n")
-        return
+    Si caben en una página se muestran con el formato detallado; si no, en
+    la tabla compacta. La consulta se consume de a una página (más una de
+    anticipación para saber si hay más).
 
-    for tarea in tareas:
-        mostrar_tarea(tarea)
-    print()
+    Parámetros:
+        tareas (iterable): Tareas a mostrar.
+        titulo (str): Título de la sección.
+        tamano_pagina (int, optional): Tareas por página.
+    """
+    iterador = iter(tareas)
+    siguiente = list(islice(iterador, tamano_pagina))
+    numero = 1
+    while True:
+        actual = siguiente
+        siguiente = list(islice(iterador, tamano_pagina))
+        if numero == 1 and not siguiente:
+            mostrar_tareas(actual, titulo)
+            return
+        mostrar_tareas(actual, f"{titulo} (página {numero})", compacto=True)
+        if not siguiente:
+            return
+        respuesta = input("Enter: siguiente página, q: volver al menú: ")
+        if respuesta.strip().lower() == "q":
+            return
+        numero += 1
+
+
+def mostrar_estadisticas(stats):
+    """
+    Muestra las estadísticas calculadas por obtener_estadisticas.
+
+    Parámetros:
+        stats (dict): Diccionario de estadísticas.
+    """
+    print(f"\nTotal de tareas: {stats['total_tareas']}")
+    print("\nTareas por estado:")
+    print(f"  • Pendientes: {stats['pendientes']}")
+    print(f"  • En progreso: {stats['en_progreso']}")
+    print(f"  • Completadas: {stats['completadas']}")
+    print("\nTareas por prioridad:")
+    print(f"  • Baja: {stats['baja']}")
+    print(f"  • Media: {stats['media']}")
+    print(f"  • Alta: {stats['alta']}")
+    print(f"\nTasa de finalización: {stats['tasa_finalizacion']:.1f}%\n")
+    archivadas = stats.get("archivadas")
+    if archivadas and archivadas["total_tareas"]:
+        print(
+            f"Archivadas: {archivadas['total_tareas']} tareas en "
+            f"{archivadas['segmentos']} segmentos "
+            f"({archivadas['bytes_comprimidos'] / 1024:.1f} KB comprimidos)\n"
+        )
 
 
 def mostrar_menu():
@@ -477,5 +1863,11 @@ def mostrar_menu():
     print("6. Actualizar tarea")
     print("7. Eliminar tarea")
     print("8. Ver estadísticas")
+    print("9. Ver tareas ordenadas")
     print("0. Salir")
     print("=" * 70)
+
+
+# Con TAREAS_METRICAS, cada función pública registra llamadas y latencias
+# (ver instrumentacion.py); sin ella no se modifica nada
+instrumentar_modulo(globals())
@@ -0,0 +1,250 @@
+"""
+generador.py - Generador de tareas sintéticas reproducibles.
+
+Produce tareas con títulos y descripciones realistas en español ("Revisar el
+presupuesto del proyecto Atlas", ...) y estados y prioridades según una
+distribución configurable. Con la misma semilla se obtienen siempre las
+mismas tareas, de modo que las mediciones de benchmark.py se pueden comparar
+entre ejecuciones.
+
+Compatibilidad: Python 3.8+
+Uso:
+    python generador.py 100000 datos.txt [--semilla 0]
+        [--estados pendiente=5,en_progreso=3,completada=2]
+        [--prioridades baja=3,media=5,alta=2]
+"""
+
+import argparse
+import os
+import random
+import sys
+
+from almacen import AlmacenTareas
+from funciones import guardar_tareas
+
+VERBOS = (
+    "Revisar",
+    "Preparar",
+    "Enviar",
+    "Actualizar",
+    "Organizar",
+    "Comprar",
+    "Pagar",
+    "Redactar",
+    "Corregir",
+    "Estudiar",
+    "Reservar",
+    "Confirmar",
+    "Diseñar",
+    "Planificar",
+    "Terminar",
+    "Renovar",
+    "Archivar",
+    "Llamar por",
+)
+OBJETOS = (
+    "el informe",
+    "la factura",
+    "la reunión",
+    "el presupuesto",
+    "el pedido",
+    "la presentación",
+    "el contrato",
+    "las entradas",
+    "el vuelo",
+    "la base de datos",
+    "el inventario",
+    "los exámenes",
+    "la página web",
+    "el correo",
+    "el seguro",
+    "la nómina",
+    "el acta",
+    "la auditoría",
+)
+COMPLEMENTOS = (
+    "",
+    "",
+    "",
+    "trimestral",
+    "anual",
+    "del proyecto Atlas",
+    "del proyecto Orión",
+    "con el equipo de ventas",
+    "para el lunes",
+    "de la sede de Valencia",
+    "de la oficina de Madrid",
+    "del cliente García",
+    "de mantenimiento",
+    "urgente",
+    "de marzo",
+    "de septiembre",
+)
+MOTIVOS = (
+    "Lo pidió la dirección en la última reunión.",
+    "Hay que tenerlo listo antes del cierre del mes.",
+    "Coordinar con contabilidad antes de enviarlo.",
+    "Revisar también los anexos y las cifras del año anterior.",
+    "El cliente espera una respuesta esta semana.",
+    "Pendiente de la aprobación del responsable del área.",
+    "Usar la plantilla nueva que está en la carpeta compartida.",
+    "Avisar al equipo cuando esté terminado.",
+)
+
+# Pesos por defecto de cada estado y prioridad
+DISTRIBUCION_ESTADOS = {"pendiente": 5, "en_progreso": 3, "completada": 2}
+DISTRIBUCION_PRIORIDADES = {"baja": 3, "media": 5, "alta": 2}
+
+
+def generar_tareas(n, semilla=0, estados=None, prioridades=None, primer_id=1):
+    """
+    Genera n tareas sintéticas de forma reproducible.
+
+    Parámetros:
+        n (int): Cantidad de tareas.
+        semilla (int, optional): Semilla del generador aleatorio.
+        estados (dict, optional): Peso de cada estado (por defecto,
+            DISTRIBUCION_ESTADOS).
+        prioridades (dict, optional): Peso de cada prioridad (por defecto,
+            DISTRIBUCION_PRIORIDADES).
+        primer_id (int, optional): ID de la primera tarea.
+
+    Retorna:
+        generator: Tareas (diccionarios) con IDs consecutivos.
+    """
+    estados = estados or DISTRIBUCION_ESTADOS
+    prioridades = prioridades or DISTRIBUCION_PRIORIDADES
+    azar = random.Random(semilla)
+    nombres_estado, pesos_estado = list(estados), list(estados.values())
+    nombres_prioridad, pesos_prioridad = list(prioridades), list(prioridades.values())
+
+    for tarea_id in range(primer_id, primer_id + n):
+        titulo = f"{azar.choice(VERBOS)} {azar.choice(OBJETOS)}"
+        complemento = azar.choice(COMPLEMENTOS)
+        if complemento:
+            titulo = f"{titulo} {complemento}"
+        descripcion = f"{titulo}. {azar.choice(MOTIVOS)}"
+        if azar.random() < 0.3:
+            descripcion = f"{descripcion} {azar.choice(MOTIVOS)}"
+        yield {
+            "id": tarea_id,
+            "titulo": titulo,
+            "descripcion": descripcion,
+            "estado": azar.choices(nombres_estado, pesos_estado)[0],
+            "prioridad": azar.choices(nombres_prioridad, pesos_prioridad)[0],
+        }
+
+
+def generar_almacen(n, semilla=0, estados=None, prioridades=None, **opciones):
+    """
+    Crea un AlmacenTareas con n tareas sintéticas (ver generar_tareas).
+
+    Parámetros:
+        n (int): Cantidad de tareas.
+        semilla (int, optional): Semilla del generador aleatorio.
+        estados (dict, optional): Peso de cada estado.
+        prioridades (dict, optional): Peso de cada prioridad.
+        **opciones: Argumentos de AlmacenTareas (capacidad_cache, ...).
+
+    Retorna:
+        AlmacenTareas: Almacén con las tareas generadas.
+    """
+    return AlmacenTareas(
+        generar_tareas(n, semilla, estados, prioridades), n, **opciones
+    )
+
+
+def generar_archivo(n, archivo, semilla=0, estados=None, prioridades=None):
+    """
+    Escribe un archivo de tareas con n tareas sintéticas.
+
+    Parámetros:
+        n (int): Cantidad de tareas.
+        archivo (str): Ruta del archivo a crear (se reemplaza si existe).
+        semilla (int, optional): Semilla del generador aleatorio.
+        estados (dict, optional): Peso de cada estado.
+        prioridades (dict, optional): Peso de cada prioridad.
+
+    Retorna:
+        bool: True si se guardó correctamente.
+    """
+    return guardar_tareas(generar_almacen(n, semilla, estados, prioridades), archivo)
+
+
+def leer_distribucion(texto, validos):
+    """
+    Interpreta una distribución escrita como 'nombre=peso,nombre=peso'.
+
+    Parámetros:
+        texto (str): Distribución (por ejemplo 'pendiente=5,completada=1').
+        validos (iterable): Nombres aceptados.
+
+    Retorna:
+        dict: Peso de cada nombre.
+
+    Lanza:
+        ValueError: Si un nombre no es válido o un peso no es un número
+            positivo.
+    """
+    distribucion = {}
+    for parte in texto.split(","):
+        nombre, _, peso = parte.partition("=")
+        nombre = nombre.strip().lower()
+        if nombre not in validos:
+            opciones = ", ".join(validos)
+            raise ValueError(f"Valor desconocido: {nombre!r} (use {opciones})")
+        try:
+            distribucion[nombre] = float(peso)
+        except ValueError:
+            raise ValueError(f"Peso inválido para {nombre}: {peso!r}") from None
+        if distribucion[nombre] < 0:
+            raise ValueError(f"Peso inválido para {nombre}: {peso!r}")
+    if not any(distribucion.values()):
+        raise ValueError("La distribución necesita algún peso positivo")
+    return distribucion
+
+
+def main(argv=None):
+    """
+    Punto de entrada: python generador.py N ARCHIVO [opciones].
+
+    Parámetros:
+        argv (list, optional): Argumentos (por defecto, sys.argv[1:]).
+
+    Retorna:
+        int: Código de salida.
+    """
+    parser = argparse.ArgumentParser(description="Genera tareas sintéticas")
+    parser.add_argument("n", type=int, help="Cantidad de tareas")
+    parser.add_argument("archivo", help="Archivo de tareas a crear")
+    parser.add_argument("--semilla", type=int, default=0)
+    parser.add_argument("--estados", help="Pesos, p. ej. pendiente=5,completada=1")
+    parser.add_argument("--prioridades", help="Pesos, p. ej. baja=1,alta=3")
+    parser.add_argument(
+        "--sobrescribir", action="store_true", help="Reemplazar el archivo si existe"
+    )
+    args = parser.parse_args(argv)
+
+    try:
+        estados = args.estados and leer_distribucion(args.estados, DISTRIBUCION_ESTADOS)
+        prioridades = args.prioridades and leer_distribucion(
+            args.prioridades, DISTRIBUCION_PRIORIDADES
+        )
+    except ValueError as e:
+        print(f"⚠ {e}", file=sys.stderr)
+        return 1
+    if os.path.exists(args.archivo) and not args.sobrescribir:
+        print(
+            f"⚠ {args.archivo} ya existe (use --sobrescribir para reemplazarlo)",
+            file=sys.stderr,
+        )
+        return 1
+
+    if not generar_archivo(args.n, args.archivo, args.semilla, estados, prioridades):
+        return 1
+    print(f"✓ {args.n} tareas generadas en {args.archivo}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
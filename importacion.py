@@ -0,0 +1,361 @@
+"""
+importacion.py - Importación y exportación masiva de tareas (CSV y JSON Lines).
+
+Los archivos se procesan en flujo, sin cargarlos completos en memoria. La
+importación agrupa las filas en lotes de TAMANO_LOTE_IMPORTACION: cada lote
+se valida por columnas con las mismas reglas que el menú (validar_titulo,
+validar_descripcion, convertir_estado, convertir_prioridad), recibe un
+rango de IDs de una sola vez y, si el almacén tiene diario, se anota con una
+única escritura. Las filas rechazadas se pueden volcar a un informe CSV con
+el número de línea y el motivo.
+
+Columnas: id, titulo, descripcion, estado, prioridad. Al importar, el id se
+ignora (se asignan IDs nuevos) salvo con conservar_ids=True, que lo conserva
+si la fila lo trae y no se asignó antes; estado y prioridad vacíos toman
+'pendiente' y 'media', y aceptan el nombre o el número del menú (1-3).
+
+Compatibilidad: Python 3.8+
+"""
+
+import csv
+import json
+from itertools import count, islice
+from operator import itemgetter
+
+from almacen import CAMPOS, Tarea
+from funciones import (
+    archivo_atomico,
+    convertir_estado,
+    convertir_prioridad,
+    validar_descripcion,
+    validar_id,
+    validar_titulo,
+)
+
+FORMATOS = ("csv", "jsonl")
+
+# Filas que se validan, numeran y persisten juntas
+TAMANO_LOTE_IMPORTACION = 10000
+
+COLUMNAS_OBLIGATORIAS = ("titulo", "descripcion")
+
+ESTADO_POR_DEFECTO = "pendiente"
+PRIORIDAD_POR_DEFECTO = "media"
+
+
+def detectar_formato(ruta, formato=None):
+    """
+    Determina el formato de un archivo a partir de su extensión.
+
+    Parámetros:
+        ruta (str): Ruta del archivo.
+        formato (str, optional): Formato explícito ('csv' o 'jsonl').
+
+    Retorna:
+        str: 'csv' o 'jsonl'.
+    """
+    if formato is None:
+        extension = ruta.rsplit(".", 1)[-1].lower()
+        formato = "jsonl" if extension in ("jsonl", "ndjson") else extension
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato no soportado: {formato} (use csv o jsonl)")
+    return formato
+
+
+def lotes(elementos, tamano):
+    """
+    Divide un iterable en listas de hasta 'tamano' elementos.
+
+    Parámetros:
+        elementos (iterable): Elementos a agrupar (se recorren una sola vez).
+        tamano (int): Tamaño de cada lote.
+
+    Retorna:
+        iterator: Listas consecutivas; la última puede ser más corta.
+    """
+    iterador = iter(elementos)
+    return iter(lambda: list(islice(iterador, tamano)), [])
+
+
+def exportar_tareas(tareas, ruta, formato=None):
+    """
+    Escribe las tareas en un archivo CSV o JSON Lines de forma atómica.
+
+    Acepta cualquier iterable, por ejemplo una consulta perezosa
+    (iterar_por_estado, paginar, ...), y la recorre una sola vez.
+
+    Parámetros:
+        tareas (iterable): Tareas a exportar.
+        ruta (str): Archivo de destino.
+        formato (str, optional): 'csv' o 'jsonl'; por defecto, según la extensión.
+
+    Retorna:
+        int: Cantidad de tareas exportadas.
+    """
+    formato = detectar_formato(ruta, formato)
+    valores = itemgetter(*CAMPOS)
+    exportadas = 0
+
+    with archivo_atomico(ruta) as f:
+        if formato == "csv":
+            escritor = csv.writer(f, lineterminator="\n")
+            escritor.writerow(CAMPOS)
+        for lote in lotes(tareas, TAMANO_LOTE_IMPORTACION):
+            if formato == "csv":
+                escritor.writerows(map(valores, lote))
+            else:
+                f.write(
+                    "".join(
+                        json.dumps(dict(zip(CAMPOS, valores(t))), ensure_ascii=False)
+                        + "\n"
+                        for t in lote
+                    )
+                )
+            exportadas += len(lote)
+    return exportadas
+
+
+def leer_filas(f, formato):
+    """
+    Recorre las filas de un archivo abierto.
+
+    Parámetros:
+        f (file): Archivo de texto abierto (con newline='' para CSV).
+        formato (str): 'csv' o 'jsonl'.
+
+    Retorna:
+        iterator: Tuplas (número de línea, fila: dict o None, error: str o None).
+    """
+    if formato == "csv":
+        lector = csv.reader(f)
+        columnas = next(lector, [])
+        faltantes = [c for c in COLUMNAS_OBLIGATORIAS if c not in columnas]
+        if faltantes:
+            raise ValueError(f"Faltan columnas en el CSV: {', '.join(faltantes)}")
+        for fila in lector:
+            if fila:
+                yield lector.line_num, dict(zip(columnas, fila)), None
+        return
+
+    for numero, linea in enumerate(f, 1):
+        if not linea.strip():
+            continue
+        try:
+            fila = json.loads(linea)
+        except ValueError as e:
+            yield numero, None, f"JSON inválido: {e}"
+            continue
+        if not isinstance(fila, dict):
+            yield numero, None, "Se esperaba un objeto JSON"
+        else:
+            yield numero, fila, None
+
+
+def columna_texto(filas, nombre):
+    """
+    Extrae una columna de un lote como textos sin espacios sobrantes.
+
+    Parámetros:
+        filas (list): Tuplas (número de línea, fila: dict).
+        nombre (str): Nombre de la columna.
+
+    Retorna:
+        list: Un texto por fila ('' si falta el valor o es null).
+    """
+    valores = [fila.get(nombre) for _, fila in filas]
+    try:
+        # Caso común (CSV): todos los valores son texto
+        return list(map(str.strip, valores))
+    except TypeError:
+        return ["" if valor is None else str(valor).strip() for valor in valores]
+
+
+def validar_lote(filas, ids_existentes=None):
+    """
+    Valida un lote de filas columna por columna.
+
+    Cada regla se aplica con map sobre la columna completa del lote, y
+    luego se combinan los resultados por fila. Estado y prioridad tienen
+    pocos valores distintos: se valida cada valor distinto una sola vez.
+
+    Parámetros:
+        filas (list): Tuplas (número de línea, fila: dict).
+        ids_existentes (set, optional): Si se indica, se conserva la columna
+            id; los IDs ya usados (o repetidos en el archivo) se rechazan y
+            los aceptados se añaden al conjunto. Las filas sin id se aceptan
+            con id None (se les asigna uno nuevo).
+
+    Retorna:
+        tuple: (validas: list de tuplas (número de línea, id o None, titulo,
+            descripcion, estado, prioridad), rechazadas: list de tuplas
+            (número de línea, motivo, fila))
+    """
+    titulos = columna_texto(filas, "titulo")
+    descripciones = columna_texto(filas, "descripcion")
+    estados = [v or ESTADO_POR_DEFECTO for v in columna_texto(filas, "estado")]
+    prioridades = [
+        v or PRIORIDAD_POR_DEFECTO for v in columna_texto(filas, "prioridad")
+    ]
+
+    r_titulos = map(validar_titulo, titulos)
+    r_descripciones = map(validar_descripcion, descripciones)
+    r_estados = map({v: convertir_estado(v) for v in set(estados)}.get, estados)
+    r_prioridades = map(
+        {v: convertir_prioridad(v) for v in set(prioridades)}.get, prioridades
+    )
+    if ids_existentes is None:
+        r_ids = [(True, None)] * len(filas)
+    else:
+        # Sin id, la fila recibe uno nuevo como en la importación normal
+        r_ids = [
+            validar_id(texto) if texto else (True, None)
+            for texto in columna_texto(filas, "id")
+        ]
+
+    validas = []
+    rechazadas = []
+    for (numero, fila), titulo, descripcion, r_t, r_d, r_e, r_p, r_i in zip(
+        filas,
+        titulos,
+        descripciones,
+        r_titulos,
+        r_descripciones,
+        r_estados,
+        r_prioridades,
+        r_ids,
+    ):
+        if r_t[0] and r_d[0] and r_e[0] and r_p[0] and r_i[0]:
+            tarea_id = r_i[1]
+            if tarea_id is None or tarea_id not in ids_existentes:
+                if tarea_id is not None:
+                    ids_existentes.add(tarea_id)
+                validas.append((numero, tarea_id, titulo, descripcion, r_e[1], r_p[1]))
+                continue
+            motivos = [f"El ID {tarea_id} ya existe."]
+        else:
+            motivos = [r_t[1]] if not r_t[0] else []
+            if not r_d[0]:
+                motivos.append(r_d[1])
+            if not r_e[0]:
+                motivos.append(f"Estado inválido: {fila.get('estado')!r}.")
+            if not r_p[0]:
+                motivos.append(f"Prioridad inválida: {fila.get('prioridad')!r}.")
+            if not r_i[0]:
+                motivos.append(f"ID inválido: {fila.get('id')!r}.")
+        rechazadas.append((numero, " ".join(motivos), fila))
+    return validas, rechazadas
+
+
+def rechazar_ids_usados(almacen, validas, rechazadas):
+    """
+    Descarta las filas cuyo ID conservado ya se asignó en el almacén.
+
+    Se llama con el cerrojo de escritura tomado: otro proceso pudo crear
+    esos IDs después de validarlos. Un ID que no supera la marca de agua
+    tampoco se acepta aunque no exista, porque fue de una tarea eliminada
+    (ver AlmacenTareas.ultimo_id).
+
+    Parámetros:
+        almacen (AlmacenTareas): Almacén de destino.
+        validas (list): Filas válidas (numero, id o None, campos...).
+        rechazadas (list): Filas rechazadas, a la que se añaden las
+            descartadas (numero, motivo, None).
+
+    Retorna:
+        list: Las filas válidas que se pueden importar.
+    """
+    ultimo_id = almacen.ultimo_id
+    aceptadas = []
+    for valida in validas:
+        numero, tarea_id = valida[:2]
+        if tarea_id is None or tarea_id > ultimo_id:
+            aceptadas.append(valida)
+        elif tarea_id in almacen:
+            rechazadas.append((numero, f"El ID {tarea_id} ya existe.", None))
+        else:
+            motivo = f"El ID {tarea_id} ya se usó (tarea eliminada)."
+            rechazadas.append((numero, motivo, None))
+    return aceptadas
+
+
+def importar_tareas(
+    almacen,
+    ruta,
+    formato=None,
+    informe=None,
+    conservar_ids=False,
+    tamano_lote=TAMANO_LOTE_IMPORTACION,
+):
+    """
+    Importa tareas de un archivo CSV o JSON Lines a un almacén.
+
+    Por cada lote: validación por columnas, asignación de un rango de IDs
+    consecutivos y, si el almacén tiene diario, una sola escritura en él.
+    Los IDs se asignan con el cerrojo de escritura tomado (ver
+    AlmacenTareas.escritura), de modo que no coinciden con los que crea otro
+    proceso mientras dura la importación.
+
+    Parámetros:
+        almacen (AlmacenTareas): Almacén de destino.
+        ruta (str): Archivo a importar.
+        formato (str, optional): 'csv' o 'jsonl'; por defecto, según la extensión.
+        informe (str, optional): Archivo CSV donde anotar las filas rechazadas
+            (linea, motivo, fila).
+        conservar_ids (bool, optional): Usar la columna id en lugar de asignar
+            IDs nuevos. Se rechazan los IDs ya asignados, aunque su tarea se
+            haya eliminado; las filas sin id reciben IDs mayores que todos.
+        tamano_lote (int, optional): Filas por lote.
+
+    Retorna:
+        dict: {'leidas': int, 'importadas': int, 'rechazadas': int}
+    """
+    formato = detectar_formato(ruta, formato)
+    a_json = json.JSONEncoder(ensure_ascii=False).encode
+    ids_existentes = set(almacen.ids()) if conservar_ids else None
+    resumen = {"leidas": 0, "importadas": 0, "rechazadas": 0}
+
+    with open(ruta, "r", encoding="utf-8-sig", newline="") as f:
+        filas = leer_filas(f, formato)
+        archivo_informe = None
+        escritor_informe = None
+        if informe is not None:
+            archivo_informe = open(informe, "w", encoding="utf-8", newline="")
+            escritor_informe = csv.writer(archivo_informe, lineterminator="\n")
+            escritor_informe.writerow(("linea", "motivo", "fila"))
+        try:
+            for lote in lotes(filas, tamano_lote):
+                legibles = [(n, fila) for n, fila, error in lote if error is None]
+                rechazadas = [(n, error, None) for n, _, error in lote if error]
+                validas, invalidas = validar_lote(legibles, ids_existentes)
+                rechazadas.extend(invalidas)
+
+                with almacen.escritura():
+                    if conservar_ids:
+                        validas = rechazar_ids_usados(almacen, validas, rechazadas)
+                    # IDs del lote asignados de una vez por encima de la marca
+                    # de agua y de los IDs conservados del lote
+                    explicitos = [v[1] for v in validas if v[1] is not None]
+                    siguiente = count(max([almacen.ultimo_id] + explicitos) + 1)
+                    nuevas = almacen.agregar_lote(
+                        [
+                            Tarea(
+                                next(siguiente) if tarea_id is None else tarea_id,
+                                *campos,
+                            )
+                            for _, tarea_id, *campos in validas
+                        ]
+                    )
+
+                if escritor_informe is not None and rechazadas:
+                    rechazadas.sort(key=itemgetter(0))
+                    escritor_informe.writerows(
+                        (n, motivo, "" if fila is None else a_json(fila))
+                        for n, motivo, fila in rechazadas
+                    )
+                resumen["leidas"] += len(lote)
+                resumen["importadas"] += len(nuevas)
+                resumen["rechazadas"] += len(rechazadas)
+        finally:
+            if archivo_informe is not None:
+                archivo_informe.close()
+    return resumen
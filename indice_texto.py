@@ -0,0 +1,312 @@
+"""
+indice_texto.py - Índice invertido de trigramas para la búsqueda de tareas.
+
+buscar_por_titulo compara el término con cada título. Con el índice, cada
+trigrama (tres caracteres seguidos) del texto en minúsculas apunta al
+conjunto de IDs de las tareas que lo contienen. Para buscar un término de 3
+caracteres o más se intersectan los conjuntos de sus trigramas y solo se
+comprueban esas tareas candidatas. Los términos más cortos no tienen
+trigramas y se resuelven recorriendo todas las tareas.
+
+El índice se guarda junto a los datos (tareas.txt.trg) con la firma de
+tareas.txt y su diario; si al cargarlo la firma no coincide se reconstruye.
+El archivo usa marshal, que solo lee datos (a diferencia de pickle no
+ejecuta código al cargar), precedido de una cabecera propia; si la cabecera,
+la versión o la forma de los datos no son las esperadas, también se
+reconstruye.
+
+Compatibilidad: Python 3.8+
+"""
+
+import marshal
+import os
+
+from funciones import archivo_atomico, recolector_pausado, ruta_diario
+
+VERSION_INDICE_TEXTO = 2
+CABECERA_INDICE_TEXTO = b"TRGM"
+
+
+class IndiceTexto:
+    """
+    Índice de trigramas sobre campos de texto de las tareas.
+
+    El almacén lo mantiene al día: llama a quitar() antes de modificar o
+    eliminar una tarea y a agregar() después de crearla o modificarla.
+
+    Atributos:
+        campos (tuple): Campos indexados, por ejemplo ('titulo',) o
+            ('titulo', 'descripcion').
+    """
+
+    def __init__(self, campos=("titulo",)):
+        """
+        Crea un índice vacío.
+
+        Parámetros:
+            campos (tuple, optional): Campos de texto a indexar.
+        """
+        self.campos = tuple(campos)
+        self._trigramas = {}
+
+    @classmethod
+    def construir(cls, tareas, campos=("titulo",)):
+        """
+        Construye el índice recorriendo las tareas una vez.
+
+        Parámetros:
+            tareas (iterable): Tareas (diccionarios o Tarea).
+            campos (tuple, optional): Campos de texto a indexar.
+
+        Retorna:
+            IndiceTexto: Índice con todas las tareas.
+        """
+        indice = cls(campos)
+        for tarea in tareas:
+            indice.agregar(tarea)
+        return indice
+
+    def __len__(self):
+        return len(self._trigramas)
+
+    def __repr__(self):
+        return f"IndiceTexto({self.campos}, {len(self._trigramas)} trigramas)"
+
+    def _trigramas_de(self, tarea):
+        """
+        Retorna los trigramas de los campos indexados de una tarea.
+
+        Cada campo aporta los suyos por separado, sin trigramas que crucen de
+        un campo a otro.
+
+        Parámetros:
+            tarea (dict o Tarea): Tarea.
+
+        Retorna:
+            set: Trigramas en minúsculas.
+        """
+        trigramas = set()
+        for campo in self.campos:
+            texto = tarea[campo].lower()
+            trigramas.update(texto[i : i + 3] for i in range(len(texto) - 2))
+        return trigramas
+
+    def agregar(self, tarea):
+        """
+        Indexa una tarea.
+
+        Parámetros:
+            tarea (dict o Tarea): Tarea a indexar.
+        """
+        trigramas = self._trigramas
+        tarea_id = tarea["id"]
+        for trigrama in self._trigramas_de(tarea):
+            ids = trigramas.get(trigrama)
+            if ids is None:
+                trigramas[trigrama] = {tarea_id}
+            else:
+                ids.add(tarea_id)
+
+    def quitar(self, tarea):
+        """
+        Quita una tarea del índice (con los valores que tenía al indexarla).
+
+        Parámetros:
+            tarea (dict o Tarea): Tarea a quitar.
+        """
+        trigramas = self._trigramas
+        tarea_id = tarea["id"]
+        for trigrama in self._trigramas_de(tarea):
+            ids = trigramas.get(trigrama)
+            if ids is not None:
+                ids.discard(tarea_id)
+                if not ids:
+                    del trigramas[trigrama]
+
+    def candidatos(self, termino):
+        """
+        Retorna los IDs de las tareas que pueden contener el término.
+
+        Todas las tareas que contienen el término están en el resultado; el
+        llamador debe comprobar cada candidata, porque tener todos los
+        trigramas no garantiza contener el término completo.
+
+        Parámetros:
+            termino (str): Término ya en minúsculas.
+
+        Retorna:
+            set o None: IDs candidatos, o None si el término tiene menos de 3
+                caracteres y hay que recorrer todas las tareas.
+        """
+        if len(termino) < 3:
+            return None
+        listas = []
+        for i in range(len(termino) - 2):
+            ids = self._trigramas.get(termino[i : i + 3])
+            if ids is None:
+                return set()
+            listas.append(ids)
+        listas.sort(key=len)
+        return listas[0].intersection(*listas[1:])
+
+
+def ruta_indice_texto(archivo="tareas.txt"):
+    """
+    Retorna la ruta del índice de texto asociado a un archivo de tareas.
+
+    Parámetros:
+        archivo (str): Archivo de tareas.
+
+    Retorna:
+        str: Ruta del índice (archivo + '.trg').
+    """
+    return archivo + ".trg"
+
+
+def firma_datos(archivo="tareas.txt"):
+    """
+    Resume el estado en disco de las tareas: instantánea y diario.
+
+    Parámetros:
+        archivo (str): Archivo de tareas.
+
+    Retorna:
+        tuple: (tamaño y fecha de tareas.txt, tamaños de .log y .log.old);
+            un archivo que no existe cuenta como vacío.
+    """
+    firma = []
+    for ruta in (archivo, ruta_diario(archivo), ruta_diario(archivo) + ".old"):
+        try:
+            estado = os.stat(ruta)
+        except FileNotFoundError:
+            firma.append((0, 0))
+        else:
+            firma.append((estado.st_size, estado.st_mtime_ns if ruta == archivo else 0))
+    return tuple(firma)
+
+
+def guardar_indice_texto(indice, archivo="tareas.txt"):
+    """
+    Guarda el índice junto al archivo de tareas con la firma actual.
+
+    Debe llamarse cuando el almacén coincide con lo que hay en disco, por
+    ejemplo después de DiarioTareas.cerrar().
+
+    Parámetros:
+        indice (IndiceTexto): Índice a guardar.
+        archivo (str): Archivo de tareas.
+
+    Retorna:
+        bool: True si se guardó exitosamente, False en caso contrario.
+    """
+    datos = {
+        "version": VERSION_INDICE_TEXTO,
+        "firma": firma_datos(archivo),
+        "campos": indice.campos,
+        "trigramas": indice._trigramas,
+    }
+    try:
+        with archivo_atomico(ruta_indice_texto(archivo), binario=True) as f:
+            f.write(CABECERA_INDICE_TEXTO)
+            marshal.dump(datos, f)
+        return True
+    except OSError as e:
+        print(f"✗ Error al guardar el índice de texto: {e}")
+        return False
+
+
+def cargar_indice_texto(archivo="tareas.txt", campos=("titulo",), firma=None):
+    """
+    Carga el índice guardado si sigue correspondiendo a los datos.
+
+    Parámetros:
+        archivo (str): Archivo de tareas.
+        campos (tuple, optional): Campos que debe cubrir el índice.
+        firma (tuple, optional): Firma de los datos con que se cargó el
+            almacén (ver firma_datos); por defecto, la actual.
+
+    Retorna:
+        IndiceTexto o None: El índice, o None si no existe, está dañado, es de
+            otros campos o los datos cambiaron desde que se guardó.
+    """
+    try:
+        with open(ruta_indice_texto(archivo), "rb") as f, recolector_pausado():
+            if f.read(len(CABECERA_INDICE_TEXTO)) != CABECERA_INDICE_TEXTO:
+                return None
+            datos = marshal.load(f)
+    except (OSError, ValueError, TypeError, EOFError):
+        return None
+
+    if (
+        not isinstance(datos, dict)
+        or datos.get("version") != VERSION_INDICE_TEXTO
+        or datos.get("campos") != tuple(campos)
+        or datos.get("firma") != (firma or firma_datos(archivo))
+        or not _trigramas_validos(datos.get("trigramas"))
+    ):
+        return None
+
+    indice = IndiceTexto(campos)
+    indice._trigramas = datos["trigramas"]
+    return indice
+
+
+def _trigramas_validos(trigramas):
+    """
+    Comprueba que los trigramas leídos tienen la forma trigrama → IDs.
+
+    Parámetros:
+        trigramas: Valor leído del archivo del índice.
+
+    Retorna:
+        bool: True si es un diccionario de str a conjuntos.
+    """
+    return isinstance(trigramas, dict) and all(
+        isinstance(trigrama, str) and isinstance(ids, set)
+        for trigrama, ids in trigramas.items()
+    )
+
+
+def activar_indice_texto(
+    almacen, archivo="tareas.txt", campos=("titulo",), perezoso=False
+):
+    """
+    Asigna un índice de texto al almacén, cargándolo o construyéndolo.
+
+    Con perezoso=True no se hace nada hasta la primera búsqueda (ver
+    AlmacenTareas.indice_pendiente): con un millón de tareas, cargar el
+    índice tarda más que cargar las tareas y muchas sesiones no buscan. Si
+    para entonces el almacén cambió, el índice guardado ya no le corresponde
+    y se construye.
+
+    Parámetros:
+        almacen (AlmacenTareas): Almacén recién cargado con cargar_almacen.
+        archivo (str): Archivo de tareas.
+        campos (tuple, optional): Campos de texto a indexar.
+        perezoso (bool, optional): Esperar a la primera búsqueda.
+
+    Retorna:
+        IndiceTexto o None: Índice asignado a almacen.indice_texto (None si
+            es perezoso).
+    """
+    if perezoso:
+        firma, version = firma_datos(archivo), almacen.version
+
+        def activar():
+            indice = None
+            if almacen.version == version:
+                indice = cargar_indice_texto(archivo, campos, firma)
+            if indice is None:
+                with recolector_pausado():
+                    indice = IndiceTexto.construir(almacen, campos)
+            almacen.indice_texto = indice
+
+        almacen.indice_pendiente = activar
+        return None
+
+    indice = cargar_indice_texto(archivo, campos)
+    if indice is None:
+        with recolector_pausado():
+            indice = IndiceTexto.construir(almacen, campos)
+    almacen.indice_texto = indice
+    return indice
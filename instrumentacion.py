@@ -0,0 +1,423 @@
+"""
+instrumentacion.py - Métricas de las funciones de funciones.py y perfiles.
+
+Desactivada por defecto. Con la variable de entorno TAREAS_METRICAS se
+envuelven las funciones públicas de funciones.py (ver instrumentar_modulo)
+para contar llamadas y errores, acumular un histograma de latencias y los
+bytes leídos y escritos en disco:
+
+    TAREAS_METRICAS=1              solo en memoria (ver GET /metricas en
+                                   servidor.py)
+    TAREAS_METRICAS=metricas.json  además, se vuelcan al terminar en JSON
+    TAREAS_METRICAS=metricas.prom  ... o en formato de texto de Prometheus
+
+Sin la variable las funciones no se envuelven: el costo es nulo.
+
+TAREAS_PERFIL captura un perfil de toda la sesión, que se escribe al
+terminar:
+
+    TAREAS_PERFIL=cprofile[:tareas.prof]          (pstats, hilo principal)
+    TAREAS_PERFIL=tracemalloc[:tareas_memoria.txt] (líneas que más asignan)
+
+Compatibilidad: Python 3.8+
+"""
+
+import atexit
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+VARIABLE_METRICAS = "TAREAS_METRICAS"
+VARIABLE_PERFIL = "TAREAS_PERFIL"
+ARCHIVOS_PERFIL = {"cprofile": "tareas.prof", "tracemalloc": "tareas_memoria.txt"}
+# Límites superiores (segundos) de las cubetas del histograma de latencias
+LIMITES_LATENCIA = (
+    0.0001,
+    0.0005,
+    0.001,
+    0.005,
+    0.01,
+    0.05,
+    0.1,
+    0.5,
+    1.0,
+    5.0,
+)
+LINEAS_TRACEMALLOC = 30
+
+METRICAS_ACTIVAS = os.environ.get(VARIABLE_METRICAS, "") not in ("", "0")
+
+
+class MetricaFuncion:
+    """
+    Métricas acumuladas de una función u operación.
+    """
+
+    __slots__ = ("llamadas", "errores", "segundos", "cubetas", "leidos", "escritos")
+
+    def __init__(self):
+        self.llamadas = 0
+        self.errores = 0
+        self.segundos = 0.0
+        # Una cubeta por límite más la de +Inf (no acumuladas)
+        self.cubetas = [0] * (len(LIMITES_LATENCIA) + 1)
+        self.leidos = 0
+        self.escritos = 0
+
+    def a_dict(self):
+        """
+        Retorna:
+            dict: Métricas con el histograma acumulado por límite.
+        """
+        acumulado, histograma = 0, {}
+        for limite, cantidad in zip((*LIMITES_LATENCIA, "+Inf"), self.cubetas):
+            acumulado += cantidad
+            histograma[str(limite)] = acumulado
+        return {
+            "llamadas": self.llamadas,
+            "errores": self.errores,
+            "segundos": self.segundos,
+            "histograma": histograma,
+            "bytes_leidos": self.leidos,
+            "bytes_escritos": self.escritos,
+        }
+
+
+_metricas = {}
+_cerrojo = threading.Lock()
+
+
+def _metrica(nombre):
+    metrica = _metricas.get(nombre)
+    if metrica is None:
+        metrica = _metricas.setdefault(nombre, MetricaFuncion())
+    return metrica
+
+
+def registrar_llamada(nombre, segundos, error=False):
+    """
+    Anota una llamada terminada.
+
+    Parámetros:
+        nombre (str): Función u operación.
+        segundos (float): Duración.
+        error (bool, optional): Si terminó con una excepción.
+    """
+    cubeta = 0
+    for limite in LIMITES_LATENCIA:
+        if segundos <= limite:
+            break
+        cubeta += 1
+    with _cerrojo:
+        metrica = _metrica(nombre)
+        metrica.llamadas += 1
+        metrica.segundos += segundos
+        metrica.cubetas[cubeta] += 1
+        if error:
+            metrica.errores += 1
+
+
+def registrar_bytes(nombre, leidos=0, escritos=0):
+    """
+    Suma bytes leídos o escritos en disco por una función u operación.
+    Sin métricas activas no hace nada.
+
+    Parámetros:
+        nombre (str): Función u operación.
+        leidos (int, optional): Bytes leídos.
+        escritos (int, optional): Bytes escritos.
+    """
+    if not METRICAS_ACTIVAS:
+        return
+    with _cerrojo:
+        metrica = _metrica(nombre)
+        metrica.leidos += leidos
+        metrica.escritos += escritos
+
+
+@contextmanager
+def medir(nombre):
+    """
+    Mide un bloque de código como una llamada a nombre (sin métricas
+    activas no mide nada).
+
+    Ejemplo:
+        with medir("renderizar_menu"):
+            mostrar_menu()
+    """
+    if not METRICAS_ACTIVAS:
+        yield
+        return
+    inicio = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        registrar_llamada(nombre, time.perf_counter() - inicio, error=True)
+        raise
+    registrar_llamada(nombre, time.perf_counter() - inicio)
+
+
+def instrumentar(funcion, nombre=None):
+    """
+    Envuelve una función para registrar sus llamadas. Sin métricas activas
+    retorna la misma función.
+
+    En las funciones generadoras se mide el tiempo pasado dentro del
+    generador (la suma de cada next), no el del código que lo consume.
+
+    Parámetros:
+        funcion (callable): Función a envolver.
+        nombre (str, optional): Nombre en las métricas (por defecto, el de
+            la función).
+
+    Retorna:
+        callable: Función envuelta.
+    """
+    if not METRICAS_ACTIVAS:
+        return funcion
+    # Import diferido: inspect solo hace falta con las métricas activas
+    import inspect
+
+    nombre = nombre or funcion.__name__
+    reloj = time.perf_counter
+
+    if inspect.isgeneratorfunction(funcion):
+
+        @functools.wraps(funcion)
+        def envoltura_generador(*args, **kwargs):
+            generador = funcion(*args, **kwargs)
+            segundos = 0.0
+            try:
+                while True:
+                    inicio = reloj()
+                    try:
+                        valor = next(generador)
+                    except StopIteration:
+                        segundos += reloj() - inicio
+                        break
+                    segundos += reloj() - inicio
+                    yield valor
+            except GeneratorExit:
+                generador.close()
+            except BaseException:
+                registrar_llamada(nombre, segundos, error=True)
+                raise
+            registrar_llamada(nombre, segundos)
+
+        return envoltura_generador
+
+    @functools.wraps(funcion)
+    def envoltura(*args, **kwargs):
+        inicio = reloj()
+        try:
+            resultado = funcion(*args, **kwargs)
+        except BaseException:
+            registrar_llamada(nombre, reloj() - inicio, error=True)
+            raise
+        registrar_llamada(nombre, reloj() - inicio)
+        return resultado
+
+    return envoltura
+
+
+def instrumentar_modulo(espacio):
+    """
+    Envuelve con instrumentar todas las funciones públicas definidas en un
+    módulo. Se llama al final del módulo con instrumentar_modulo(globals()),
+    de modo que tanto las llamadas internas como las de quien importe las
+    funciones después pasan por la envoltura. Sin métricas activas no hace
+    nada.
+
+    Parámetros:
+        espacio (dict): Variables globales del módulo.
+    """
+    if not METRICAS_ACTIVAS:
+        return
+    import inspect
+
+    modulo = espacio["__name__"]
+    for nombre, valor in list(espacio.items()):
+        if (
+            not nombre.startswith("_")
+            and inspect.isfunction(valor)
+            and valor.__module__ == modulo
+        ):
+            espacio[nombre] = instrumentar(valor)
+
+
+def obtener_metricas():
+    """
+    Retorna:
+        dict: nombre -> métricas (ver MetricaFuncion.a_dict), ordenado por
+            nombre.
+    """
+    with _cerrojo:
+        return {nombre: _metricas[nombre].a_dict() for nombre in sorted(_metricas)}
+
+
+def reiniciar_metricas():
+    """
+    Descarta las métricas acumuladas.
+    """
+    with _cerrojo:
+        _metricas.clear()
+
+
+def exportar_json():
+    """
+    Retorna:
+        str: Métricas en JSON, con la fecha de la exportación.
+    """
+    datos = {"fecha": time.time(), "funciones": obtener_metricas()}
+    return json.dumps(datos, ensure_ascii=False, indent=2)
+
+
+def exportar_prometheus():
+    """
+    Retorna:
+        str: Métricas en el formato de texto de Prometheus (versión 0.0.4).
+    """
+    metricas = obtener_metricas()
+    # Las operaciones que solo cuentan bytes (como el diario) no tienen
+    # llamadas ni latencias
+    llamadas = {
+        nombre: datos for nombre, datos in metricas.items() if datos["llamadas"]
+    }
+    lineas = []
+
+    def familia(nombre, tipo, ayuda):
+        lineas.append(f"# HELP {nombre} {ayuda}")
+        lineas.append(f"# TYPE {nombre} {tipo}")
+
+    for campo, ayuda in (
+        ("llamadas", "Llamadas por función."),
+        ("errores", "Llamadas terminadas con excepción."),
+    ):
+        familia(f"tareas_{campo}_total", "counter", ayuda)
+        for funcion, datos in llamadas.items():
+            lineas.append(f'tareas_{campo}_total{{funcion="{funcion}"}} {datos[campo]}')
+    familia("tareas_duracion_segundos", "histogram", "Duración de cada llamada.")
+    for funcion, datos in llamadas.items():
+        for limite, cantidad in datos["histograma"].items():
+            lineas.append(
+                f'tareas_duracion_segundos_bucket{{funcion="{funcion}",le="{limite}"}}'
+                f" {cantidad}"
+            )
+        lineas.append(
+            f'tareas_duracion_segundos_sum{{funcion="{funcion}"}} {datos["segundos"]!r}'
+        )
+        lineas.append(
+            f'tareas_duracion_segundos_count{{funcion="{funcion}"}} {datos["llamadas"]}'
+        )
+    for campo, ayuda in (("leidos", "leídos de"), ("escritos", "escritos en")):
+        familia(f"tareas_bytes_{campo}_total", "counter", f"Bytes {ayuda} disco.")
+        for funcion, datos in metricas.items():
+            if datos[f"bytes_{campo}"]:
+                lineas.append(
+                    f'tareas_bytes_{campo}_total{{funcion="{funcion}"}}'
+                    f' {datos[f"bytes_{campo}"]}'
+                )
+    return "\n".join(lineas) + "\n"
+
+
+def guardar_metricas(ruta):
+    """
+    Escribe las métricas en un archivo: en formato Prometheus si termina en
+    .prom o .txt, en JSON en otro caso.
+
+    Parámetros:
+        ruta (str): Archivo de destino.
+    """
+    if ruta.endswith((".prom", ".txt")):
+        texto = exportar_prometheus()
+    else:
+        texto = exportar_json()
+    with open(ruta, "w", encoding="utf-8") as f:
+        f.write(texto)
+
+
+def leer_perfil(valor):
+    """
+    Interpreta el valor de TAREAS_PERFIL.
+
+    Parámetros:
+        valor (str): 'cprofile', 'tracemalloc' o cualquiera de los dos
+            seguido de ':archivo'.
+
+    Retorna:
+        tuple: (tipo: str, archivo: str)
+
+    Lanza:
+        ValueError: Si el tipo no es cprofile ni tracemalloc.
+    """
+    tipo, _, archivo = valor.partition(":")
+    tipo = tipo.strip().lower()
+    if tipo not in ARCHIVOS_PERFIL:
+        raise ValueError(
+            f"{VARIABLE_PERFIL} inválida: {valor!r} (use cprofile o tracemalloc)"
+        )
+    return tipo, archivo or ARCHIVOS_PERFIL[tipo]
+
+
+def iniciar_perfil(tipo, archivo):
+    """
+    Empieza a capturar un perfil y registra su escritura al terminar el
+    programa.
+
+    cProfile solo mide el hilo que lo inicia. El archivo de cProfile se lee
+    con python -m pstats; el de tracemalloc es texto con las líneas que más
+    memoria asignaron y el pico.
+
+    Parámetros:
+        tipo (str): 'cprofile' o 'tracemalloc'.
+        archivo (str): Archivo donde escribir el perfil.
+    """
+    if tipo == "cprofile":
+        import cProfile
+
+        perfil = cProfile.Profile()
+        perfil.enable()
+
+        def terminar():
+            perfil.disable()
+            perfil.dump_stats(archivo)
+
+    else:
+        import tracemalloc
+
+        tracemalloc.start()
+
+        def terminar():
+            instantanea = tracemalloc.take_snapshot()
+            _, pico = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            with open(archivo, "w", encoding="utf-8") as f:
+                f.write(f"Pico: {pico / 1024:.1f} KB\n")
+                estadisticas = instantanea.statistics("lineno")
+                for estadistica in estadisticas[:LINEAS_TRACEMALLOC]:
+                    f.write(f"{estadistica}\n")
+
+    atexit.register(terminar)
+
+
+def activar_desde_entorno():
+    """
+    Aplica TAREAS_METRICAS (volcado al terminar) y TAREAS_PERFIL. Se llama
+    una vez al importar el módulo.
+    """
+    destino = os.environ.get(VARIABLE_METRICAS, "")
+    if METRICAS_ACTIVAS and destino != "1":
+        atexit.register(guardar_metricas, destino)
+    perfil = os.environ.get(VARIABLE_PERFIL)
+    if perfil:
+        try:
+            iniciar_perfil(*leer_perfil(perfil))
+        except ValueError as e:
+            print(f"⚠ {e}", file=sys.stderr)
+
+
+activar_desde_entorno()
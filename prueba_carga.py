@@ -0,0 +1,226 @@
+"""
+prueba_carga.py - Prueba de carga de la API HTTP (servidor.py).
+
+Abre varias conexiones keep-alive contra un servidor en marcha y, desde cada
+una, envía peticiones seguidas (una mezcla de lecturas y creaciones) hasta
+completar el total pedido. Informa las peticiones por segundo y las
+latencias p50, p99 y máxima de cada tipo de petición.
+
+Compatibilidad: Python 3.8+
+Uso:
+    python servidor.py &
+    python prueba_carga.py [--url http://127.0.0.1:8000] [--conexiones 50]
+                           [--peticiones 20000] [--escrituras 0.2]
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import time
+from urllib.parse import urlsplit
+
+TITULOS = ("Revisar informe", "Llamar cliente", "Preparar reunión", "Pagar factura")
+ESTADOS = ("pendiente", "en_progreso", "completada")
+PRIORIDADES = ("baja", "media", "alta")
+
+
+class ConexionHTTP:
+    """
+    Conexión keep-alive mínima: una petición a la vez.
+    """
+
+    def __init__(self, host, puerto):
+        self.host = host
+        self.puerto = puerto
+        self.lector = None
+        self.escritor = None
+
+    async def abrir(self):
+        self.lector, self.escritor = await asyncio.open_connection(
+            self.host, self.puerto
+        )
+
+    def cerrar(self):
+        if self.escritor is not None:
+            self.escritor.close()
+
+    async def pedir(self, metodo, ruta, datos=None):
+        """
+        Envía una petición y lee la respuesta completa.
+
+        Parámetros:
+            metodo (str): Método HTTP.
+            ruta (str): Ruta con la consulta.
+            datos (dict, optional): Cuerpo JSON.
+
+        Retorna:
+            tuple: (estado: int, cuerpo: bytes)
+        """
+        cuerpo = b"" if datos is None else json.dumps(datos).encode("utf-8")
+        cabecera = (
+            f"{metodo} {ruta} HTTP/1.1\r\nHost: {self.host}\r\n"
+            f"Content-Length: {len(cuerpo)}\r\n"
+        )
+        if cuerpo:
+            cabecera += "Content-Type: application/json\r\n"
+        self.escritor.write(cabecera.encode("latin-1") + b"\r\n" + cuerpo)
+
+        respuesta = await self.lector.readuntil(b"\r\n\r\n")
+        lineas = respuesta.decode("latin-1").split("\r\n")
+        estado = int(lineas[0].split(" ", 2)[1])
+        longitud = 0
+        for linea in lineas[1:]:
+            nombre, _, valor = linea.partition(":")
+            if nombre.strip().lower() == "content-length":
+                longitud = int(valor)
+        return estado, await self.lector.readexactly(longitud) if longitud else b""
+
+
+def elegir_peticion(ids, proporcion_escrituras):
+    """
+    Elige al azar la próxima petición de la mezcla.
+
+    Parámetros:
+        ids (list): IDs de tareas existentes.
+        proporcion_escrituras (float): Fracción de creaciones (0 a 1).
+
+    Retorna:
+        tuple: (tipo, metodo, ruta, datos)
+    """
+    if random.random() < proporcion_escrituras:
+        datos = {
+            "titulo": f"{random.choice(TITULOS)} {random.randrange(10000)}",
+            "descripcion": "Tarea creada por la prueba de carga",
+            "estado": random.choice(ESTADOS),
+            "prioridad": random.choice(PRIORIDADES),
+        }
+        return "crear", "POST", "/tareas", datos
+    tipo = random.choice(("ver", "ver", "filtrar", "buscar"))
+    if tipo == "ver" and ids:
+        return tipo, "GET", f"/tareas/{random.choice(ids)}", None
+    if tipo == "buscar":
+        palabra = random.choice(TITULOS).split()[0]
+        return tipo, "GET", f"/tareas?q={palabra}&limite=20", None
+    estado = random.choice(ESTADOS)
+    return "filtrar", "GET", f"/tareas?estado={estado}&limite=20", None
+
+
+async def cliente(host, puerto, cantidad, ids, proporcion, latencias, errores):
+    """
+    Envía cantidad peticiones por una misma conexión keep-alive.
+
+    Parámetros:
+        host (str): Host del servidor.
+        puerto (int): Puerto del servidor.
+        cantidad (int): Peticiones a enviar.
+        ids (list): IDs existentes (se añaden los creados).
+        proporcion (float): Fracción de creaciones.
+        latencias (dict): Latencias en segundos por tipo (se completa).
+        errores (dict): Cantidad de respuestas >= 400 por estado (se completa).
+    """
+    conexion = ConexionHTTP(host, puerto)
+    await conexion.abrir()
+    try:
+        for _ in range(cantidad):
+            tipo, metodo, ruta, datos = elegir_peticion(ids, proporcion)
+            inicio = time.perf_counter()
+            estado, cuerpo = await conexion.pedir(metodo, ruta, datos)
+            latencias.setdefault(tipo, []).append(time.perf_counter() - inicio)
+            if estado >= 400:
+                errores[estado] = errores.get(estado, 0) + 1
+            elif tipo == "crear":
+                ids.append(json.loads(cuerpo)["id"])
+    finally:
+        conexion.cerrar()
+
+
+def resumir(nombre, valores):
+    """
+    Formatea cantidad y latencias p50/p99/máxima (en milisegundos).
+    """
+    if len(valores) >= 2:
+        cortes = statistics.quantiles(valores, n=100, method="inclusive")
+        p50, p99 = cortes[49], cortes[98]
+    else:
+        p50 = p99 = valores[0]
+    return (
+        f"{nombre:<8} {len(valores):>8} {p50 * 1000:>9.2f} {p99 * 1000:>9.2f}"
+        f" {max(valores) * 1000:>9.2f}"
+    )
+
+
+async def ejecutar(url, conexiones, peticiones, proporcion):
+    """
+    Ejecuta la prueba e imprime el informe.
+
+    Parámetros:
+        url (str): URL base del servidor.
+        conexiones (int): Conexiones simultáneas.
+        peticiones (int): Total de peticiones.
+        proporcion (float): Fracción de creaciones.
+    """
+    partes = urlsplit(url)
+    host, puerto = partes.hostname or "127.0.0.1", partes.port or 80
+
+    # IDs existentes para las lecturas; si no hay tareas, se crean algunas
+    conexion = ConexionHTTP(host, puerto)
+    await conexion.abrir()
+    _, cuerpo = await conexion.pedir("GET", "/tareas?limite=1000")
+    ids = [tarea["id"] for tarea in json.loads(cuerpo)["tareas"]]
+    while len(ids) < 100:
+        _, _, ruta, datos = elegir_peticion(ids, 1.0)
+        _, cuerpo = await conexion.pedir("POST", ruta, datos)
+        ids.append(json.loads(cuerpo)["id"])
+    conexion.cerrar()
+
+    latencias, errores = {}, {}
+    por_conexion, resto = divmod(peticiones, conexiones)
+    inicio = time.perf_counter()
+    await asyncio.gather(
+        *(
+            cliente(
+                host,
+                puerto,
+                por_conexion + (1 if i < resto else 0),
+                ids,
+                proporcion,
+                latencias,
+                errores,
+            )
+            for i in range(conexiones)
+        )
+    )
+    duracion = time.perf_counter() - inicio
+
+    todas = [valor for valores in latencias.values() for valor in valores]
+    print(
+        f"{len(todas)} peticiones en {duracion:.2f} s con {conexiones} conexiones:"
+        f" {len(todas) / duracion:.0f} peticiones/s"
+    )
+    print(f"{'tipo':<8} {'cantidad':>8} {'p50 ms':>9} {'p99 ms':>9} {'máx ms':>9}")
+    for tipo in sorted(latencias):
+        print(resumir(tipo, latencias[tipo]))
+    print(resumir("total", todas))
+    if errores:
+        print(f"Respuestas con error: {errores}")
+
+
+def main(argv=None):
+    """
+    Punto de entrada: python prueba_carga.py [opciones].
+    """
+    parser = argparse.ArgumentParser(description="Prueba de carga de servidor.py")
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--conexiones", type=int, default=50)
+    parser.add_argument("--peticiones", type=int, default=20000)
+    parser.add_argument(
+        "--escrituras", type=float, default=0.2, help="Fracción de creaciones (0-1)"
+    )
+    args = parser.parse_args(argv)
+    asyncio.run(ejecutar(args.url, args.conexiones, args.peticiones, args.escrituras))
+
+
+if __name__ == "__main__":
+    main()
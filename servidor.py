@@ -0,0 +1,769 @@
+"""
+servidor.py - API HTTP/JSON del Sistema de Gestión de Tareas.
+
+Servidor asyncio (solo biblioteca estándar) que expone las funciones de
+funciones.py sobre un único almacén compartido por todas las peticiones:
+
+    GET    /tareas?estado=&prioridad=&q=&orden=&limite=&desplazamiento=
+    POST   /tareas             {"titulo", "descripcion", "estado", "prioridad"}
+    GET    /tareas/<id>
+    PATCH  /tareas/<id>        {campos a cambiar, "version" opcional}
+    DELETE /tareas/<id>[?version=<v>]
+    GET    /estadisticas
+    GET    /metricas[?formato=json]  (con TAREAS_METRICAS, ver instrumentacion.py)
+
+Todas las peticiones se atienden en el bucle de eventos, de modo que cada
+cambio del almacén es atómico respecto de las lecturas sin necesidad de
+cerrojos: las escrituras quedan en serie y una lectura nunca espera a una
+escritura. La parte lenta de escribir, el fsync, no ocurre en el bucle: el
+diario confirma en grupo (un fsync por ventana para todos los cambios
+recientes) y cada escritura responde cuando esa confirmación termina, que
+se espera en un hilo aparte. La compactación del diario también corre en
+segundo plano (ver DiarioTareas). Tampoco se espera en el bucle el
+cerrojo de escritura que comparten los procesos: si otro lo tiene, la
+escritura se reintenta tras una pausa asíncrona (ver escribir).
+
+Las conexiones HTTP/1.1 se mantienen abiertas (keep-alive) hasta
+TIEMPO_INACTIVIDAD segundos sin peticiones; también se cierran si el cuerpo
+de una petición no llega en ese tiempo. Un error inesperado responde 500 y
+cierra la conexión. prueba_carga.py mide su rendimiento.
+
+Compatibilidad: Python 3.8+
+Uso: python servidor.py [--host 127.0.0.1] [--puerto 8000] [--motor texto]
+"""
+
+import argparse
+import asyncio
+import json
+import signal
+import traceback
+from http import HTTPStatus
+from urllib.parse import parse_qs, urlsplit
+
+from almacen import ConflictoEscritura
+from almacenamiento import MOTORES, obtener_motor
+from archivado import ArchivoTareas
+from concurrencia import CerrojoOcupado
+from diario import MODOS_DURABILIDAD
+from funciones import (
+    actualizar_tarea,
+    buscar_por_titulo,
+    convertir_estado,
+    convertir_prioridad,
+    crear_tarea,
+    eliminar_tarea,
+    iterar_por_estado,
+    iterar_por_prioridad,
+    obtener_estadisticas,
+    obtener_tarea_por_id,
+    ordenar_tareas,
+    paginar,
+    validar_descripcion,
+    validar_id,
+    validar_titulo,
+)
+from instrumentacion import (
+    METRICAS_ACTIVAS,
+    VARIABLE_METRICAS,
+    exportar_prometheus,
+    obtener_metricas,
+)
+
+# Segundos que una conexión keep-alive espera la siguiente petición
+TIEMPO_INACTIVIDAD = 15.0
+
+# Segundos que una escritura espera el cerrojo de escritura antes de
+# responder 503, y pausa entre intentos de tomarlo (ver escribir)
+TIEMPO_ESPERA_CERROJO = 30.0
+PAUSA_CERROJO = 0.005
+
+# Tamaño máximo de la línea de petición más las cabeceras, y del cuerpo
+LIMITE_CABECERAS = 64 * 1024
+LIMITE_CUERPO = 1024 * 1024
+
+# Tareas por página de GET /tareas (por defecto y como máximo)
+LIMITE_LISTADO = 100
+LIMITE_LISTADO_MAXIMO = 1000
+
+CODIFICADOR = json.JSONEncoder(ensure_ascii=False)
+
+
+class ErrorHTTP(Exception):
+    """
+    Error de una petición que se responde con un código HTTP y un mensaje.
+
+    Atributos:
+        estado (HTTPStatus): Código de la respuesta.
+        datos (dict): Cuerpo JSON de la respuesta ({'error': mensaje, ...}).
+    """
+
+    def __init__(self, estado, mensaje, **extra):
+        super().__init__(mensaje)
+        self.estado = estado
+        self.datos = {"error": mensaje, **extra}
+
+
+def tarea_a_json(tarea, version=None):
+    """
+    Convierte una tarea en un diccionario serializable.
+
+    Parámetros:
+        tarea (dict o Tarea): Tarea a convertir.
+        version (int, optional): Versión a incluir (para actualizar o
+            eliminar con control de concurrencia).
+
+    Retorna:
+        dict: Campos de la tarea (y 'version' si se indicó).
+    """
+    datos = dict(tarea)
+    if version is not None:
+        datos["version"] = version
+    return datos
+
+
+def leer_json(cuerpo):
+    """
+    Decodifica el cuerpo de una petición como objeto JSON.
+
+    Parámetros:
+        cuerpo (bytes): Cuerpo recibido.
+
+    Retorna:
+        dict: Objeto decodificado.
+
+    Lanza:
+        ErrorHTTP: 400 si no es un objeto JSON válido.
+    """
+    try:
+        datos = json.loads(cuerpo or b"{}")
+    except ValueError as e:
+        raise ErrorHTTP(HTTPStatus.BAD_REQUEST, f"JSON inválido: {e}")
+    if not isinstance(datos, dict):
+        raise ErrorHTTP(HTTPStatus.BAD_REQUEST, "Se esperaba un objeto JSON")
+    return datos
+
+
+def texto_validado(datos, campo, validar, obligatorio=False):
+    """
+    Extrae un campo de texto y lo valida con validar_titulo o
+    validar_descripcion.
+
+    Parámetros:
+        datos (dict): Objeto recibido.
+        campo (str): 'titulo' o 'descripcion'.
+        validar (callable): Función de validación del módulo funciones.
+        obligatorio (bool, optional): Si falta, es un error.
+
+    Retorna:
+        str o None: El texto sin espacios sobrantes (None si falta).
+    """
+    valor = datos.get(campo)
+    if valor is None:
+        if obligatorio:
+            raise ErrorHTTP(HTTPStatus.BAD_REQUEST, f"Falta el campo {campo!r}")
+        return None
+    if not isinstance(valor, str):
+        raise ErrorHTTP(HTTPStatus.BAD_REQUEST, f"El campo {campo!r} debe ser texto")
+    valor = valor.strip()
+    es_valido, mensaje = validar(valor)
+    if not es_valido:
+        raise ErrorHTTP(HTTPStatus.BAD_REQUEST, mensaje)
+    return valor
+
+
+def valor_convertido(datos, campo, convertir):
+    """
+    Extrae estado o prioridad (nombre o número del menú) y lo convierte.
+
+    Parámetros:
+        datos (dict): Objeto recibido o parámetros de la consulta.
+        campo (str): 'estado' o 'prioridad'.
+        convertir (callable): convertir_estado o convertir_prioridad.
+
+    Retorna:
+        str o None: Nombre válido (None si falta).
+    """
+    valor = datos.get(campo)
+    if valor is None:
+        return None
+    es_valido, convertido = convertir(str(valor))
+    if not es_valido:
+        mensaje = f"{campo.capitalize()} inválido: {valor!r}"
+        raise ErrorHTTP(HTTPStatus.BAD_REQUEST, mensaje)
+    return convertido
+
+
+def entero_validado(texto, nombre, minimo=0):
+    """
+    Convierte un parámetro entero de la consulta o del cuerpo.
+
+    Parámetros:
+        texto (str o int): Valor recibido.
+        nombre (str): Nombre del parámetro, para el mensaje de error.
+        minimo (int, optional): Valor mínimo aceptado.
+
+    Retorna:
+        int: Valor convertido.
+    """
+    try:
+        valor = int(texto)
+    except (TypeError, ValueError):
+        valor = None
+    if valor is None or valor < minimo or isinstance(texto, bool):
+        raise ErrorHTTP(HTTPStatus.BAD_REQUEST, f"{nombre} inválido: {texto!r}")
+    return valor
+
+
+def metodo_no_permitido(metodo):
+    """
+    Retorna el error 405 para un método que la ruta no admite.
+
+    Parámetros:
+        metodo (str): Método HTTP recibido.
+
+    Retorna:
+        ErrorHTTP: Error a lanzar.
+    """
+    return ErrorHTTP(HTTPStatus.METHOD_NOT_ALLOWED, f"Método no permitido: {metodo}")
+
+
+def formatear_respuesta(estado, datos=None, mantener=True, extra=()):
+    """
+    Construye una respuesta HTTP/1.1 completa.
+
+    Parámetros:
+        estado (HTTPStatus): Código de la respuesta.
+        datos (dict o str, optional): Cuerpo JSON, o texto plano si es str;
+            None para responder sin cuerpo.
+        mantener (bool, optional): Si la conexión sigue abierta.
+        extra (iterable, optional): Cabeceras adicionales (nombre, valor).
+
+    Retorna:
+        bytes: Respuesta lista para enviar.
+    """
+    if datos is None:
+        cuerpo = b""
+    elif isinstance(datos, str):
+        cuerpo = datos.encode("utf-8")
+    else:
+        cuerpo = CODIFICADOR.encode(datos).encode("utf-8")
+    lineas = [
+        f"HTTP/1.1 {estado.value} {estado.phrase}",
+        f"Content-Length: {len(cuerpo)}",
+        "Connection: keep-alive" if mantener else "Connection: close",
+    ]
+    if isinstance(datos, str):
+        lineas.append("Content-Type: text/plain; version=0.0.4; charset=utf-8")
+    elif datos is not None:
+        lineas.append("Content-Type: application/json; charset=utf-8")
+    lineas.extend(f"{nombre}: {valor}" for nombre, valor in extra)
+    return ("\r\n".join(lineas) + "\r\n\r\n").encode("latin-1") + cuerpo
+
+
+class ServidorTareas:
+    """
+    Aplicación HTTP sobre un almacén abierto con un motor de almacenamiento.
+
+    Atributos:
+        motor (MotorTexto o MotorSQLite): Motor que abrió el almacén.
+        tareas (AlmacenTareas): Almacén compartido por todas las peticiones.
+        archivo (ArchivoTareas): Tareas archivadas (ver archivado.py).
+    """
+
+    def __init__(self, motor, tareas):
+        """
+        Parámetros:
+            motor (MotorTexto o MotorSQLite): Motor que abrió el almacén.
+            tareas (AlmacenTareas): Almacén abierto con esperar_escritura=False,
+                para que las escrituras no esperen el fsync en el bucle.
+        """
+        self.motor = motor
+        self.tareas = tareas
+        self.archivo = ArchivoTareas(motor.archivo)
+        # Escrituras que esperan la próxima confirmación en grupo y la
+        # confirmación en curso (ver confirmar)
+        self._pendientes = []
+        self._confirmando = None
+
+    async def atender(self, lector, escritor):
+        """
+        Atiende una conexión: peticiones sucesivas mientras siga abierta.
+
+        Parámetros:
+            lector (asyncio.StreamReader): Flujo de entrada de la conexión.
+            escritor (asyncio.StreamWriter): Flujo de salida de la conexión.
+        """
+        try:
+            mantener = True
+            while mantener:
+                try:
+                    cabecera = await asyncio.wait_for(
+                        lector.readuntil(b"\r\n\r\n"), TIEMPO_INACTIVIDAD
+                    )
+                except asyncio.LimitOverrunError:
+                    escritor.write(
+                        formatear_respuesta(
+                            HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE,
+                            {"error": "Cabeceras demasiado grandes"},
+                            mantener=False,
+                        )
+                    )
+                    break
+                except (asyncio.IncompleteReadError, asyncio.TimeoutError):
+                    break
+                try:
+                    respuesta, mantener = await self.procesar(cabecera, lector)
+                except (asyncio.IncompleteReadError, asyncio.TimeoutError):
+                    # El cuerpo no llegó completo: el cliente cerró o se detuvo
+                    break
+                escritor.write(respuesta)
+                await escritor.drain()
+        except ConnectionError:
+            pass
+        finally:
+            escritor.close()
+
+    async def procesar(self, cabecera, lector):
+        """
+        Interpreta una petición, lee su cuerpo y la despacha.
+
+        Parámetros:
+            cabecera (bytes): Línea de petición y cabeceras.
+            lector (asyncio.StreamReader): Flujo del que leer el cuerpo.
+
+        Retorna:
+            tuple: (respuesta: bytes, mantener: bool)
+        """
+        linea, _, resto = cabecera.decode("latin-1").partition("\r\n")
+        partes = linea.split(" ")
+        if len(partes) != 3 or not partes[2].startswith("HTTP/1."):
+            datos = {"error": "Petición HTTP inválida"}
+            return formatear_respuesta(HTTPStatus.BAD_REQUEST, datos, False), False
+        metodo, objetivo, version = partes
+
+        cabeceras = {}
+        for linea in resto.split("\r\n"):
+            nombre, _, valor = linea.partition(":")
+            cabeceras[nombre.strip().lower()] = valor.strip()
+        conexion = cabeceras.get("connection", "").lower()
+        if version == "HTTP/1.0":
+            mantener = conexion == "keep-alive"
+        else:
+            mantener = conexion != "close"
+
+        if "chunked" in cabeceras.get("transfer-encoding", "").lower():
+            datos = {"error": "Cuerpo chunked no soportado: use Content-Length"}
+            return formatear_respuesta(HTTPStatus.LENGTH_REQUIRED, datos, False), False
+        try:
+            longitud = entero_validado(
+                cabeceras.get("content-length", 0), "Content-Length"
+            )
+        except ErrorHTTP as e:
+            return formatear_respuesta(e.estado, e.datos, False), False
+        if longitud > LIMITE_CUERPO:
+            datos = {"error": f"Cuerpo demasiado grande (máx. {LIMITE_CUERPO} bytes)"}
+            return (
+                formatear_respuesta(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, datos, False),
+                False,
+            )
+        cuerpo = b""
+        if longitud:
+            cuerpo = await asyncio.wait_for(
+                lector.readexactly(longitud), TIEMPO_INACTIVIDAD
+            )
+
+        partes_url = urlsplit(objetivo)
+        consulta = {
+            nombre: valores[-1]
+            for nombre, valores in parse_qs(partes_url.query).items()
+        }
+        extra = ()
+        try:
+            estado, datos, extra = await self.despachar(
+                metodo, partes_url.path, consulta, cuerpo
+            )
+        except ErrorHTTP as e:
+            estado, datos = e.estado, e.datos
+        except ConflictoEscritura as e:
+            estado = HTTPStatus.CONFLICT
+            datos = {"error": str(e), "campos": e.campos}
+        except Exception:
+            # Error inesperado: se informa y se cierra la conexión en lugar
+            # de cortarla sin respuesta
+            traceback.print_exc()
+            datos = {"error": "Error interno del servidor"}
+            return (
+                formatear_respuesta(HTTPStatus.INTERNAL_SERVER_ERROR, datos, False),
+                False,
+            )
+        return formatear_respuesta(estado, datos, mantener, extra), mantener
+
+    async def despachar(self, metodo, ruta, consulta, cuerpo):
+        """
+        Elige la operación según el método y la ruta.
+
+        Parámetros:
+            metodo (str): Método HTTP.
+            ruta (str): Ruta de la URL.
+            consulta (dict): Parámetros de la consulta (último valor de cada uno).
+            cuerpo (bytes): Cuerpo de la petición.
+
+        Retorna:
+            tuple: (estado: HTTPStatus, datos: dict o None, cabeceras extra)
+        """
+        segmentos = ruta.strip("/").split("/")
+        if segmentos == ["tareas"]:
+            if metodo == "GET":
+                return self.listar(consulta)
+            if metodo == "POST":
+                return await self.crear(leer_json(cuerpo))
+            raise metodo_no_permitido(metodo)
+
+        if len(segmentos) == 2 and segmentos[0] == "tareas":
+            es_valido, tarea_id = validar_id(segmentos[1])
+            if not es_valido:
+                raise ErrorHTTP(HTTPStatus.NOT_FOUND, f"ID inválido: {segmentos[1]!r}")
+            if metodo == "GET":
+                return self.ver(tarea_id)
+            if metodo in ("PATCH", "PUT"):
+                return await self.actualizar(tarea_id, leer_json(cuerpo))
+            if metodo == "DELETE":
+                return await self.eliminar(tarea_id, consulta)
+            raise metodo_no_permitido(metodo)
+
+        if segmentos == ["estadisticas"]:
+            if metodo == "GET":
+                return self.estadisticas()
+            raise metodo_no_permitido(metodo)
+
+        if segmentos == ["metricas"]:
+            if metodo == "GET":
+                return self.metricas(consulta)
+            raise metodo_no_permitido(metodo)
+
+        raise ErrorHTTP(HTTPStatus.NOT_FOUND, f"Ruta desconocida: {ruta}")
+
+    def _sincronizar(self):
+        """
+        Incorpora los cambios de otros procesos antes de una lectura (las
+        escrituras lo hacen al tomar el cerrojo de escritura).
+        """
+        self.motor.sincronizar(self.tareas)
+
+    async def escribir(self, operacion):
+        """
+        Hace una escritura con el cerrojo de escritura tomado, sin bloquear el
+        bucle mientras lo tiene otro proceso (u otro hilo, como el de la
+        compactación).
+
+        El cerrojo se pide sin esperar (escritura(esperar=False)); si está
+        ocupado, se vuelve a pedir tras una pausa asíncrona y, mientras tanto,
+        se siguen atendiendo las demás peticiones. La operación corre en el
+        bucle, de modo que sigue siendo atómica respecto de las lecturas.
+
+        Parámetros:
+            operacion (callable): Función sin argumentos que hace los cambios.
+
+        Retorna:
+            object: Lo que retorne operacion.
+
+        Lanza:
+            ErrorHTTP: 503 si el cerrojo sigue ocupado tras
+                TIEMPO_ESPERA_CERROJO segundos.
+        """
+        bucle = asyncio.get_running_loop()
+        limite = bucle.time() + TIEMPO_ESPERA_CERROJO
+        while True:
+            try:
+                with self.tareas.escritura(esperar=False):
+                    return operacion()
+            except CerrojoOcupado:
+                if bucle.time() >= limite:
+                    raise ErrorHTTP(
+                        HTTPStatus.SERVICE_UNAVAILABLE,
+                        "El almacén está ocupado por otro proceso",
+                    ) from None
+                await asyncio.sleep(PAUSA_CERROJO)
+
+    async def confirmar(self):
+        """
+        Espera a que los cambios hechos hasta ahora estén en disco sin
+        bloquear el bucle.
+
+        Las escrituras que llegan mientras hay una confirmación en curso se
+        juntan y esperan la siguiente: en cada momento hay como mucho un hilo
+        esperando el fsync en grupo del diario (DiarioTareas.esperar).
+        """
+        diario = self.tareas.diario
+        if diario is None or diario.durabilidad != "grupo":
+            return
+        futuro = asyncio.get_running_loop().create_future()
+        self._pendientes.append(futuro)
+        if self._confirmando is None:
+            self._lanzar_confirmacion()
+        await futuro
+
+    def _lanzar_confirmacion(self):
+        """
+        Espera en un hilo el fsync que cubre las escrituras pendientes.
+        """
+        lote, self._pendientes = self._pendientes, []
+        self._confirmando = asyncio.get_running_loop().run_in_executor(
+            None, self.tareas.diario.esperar
+        )
+
+        def confirmado(resultado):
+            self._confirmando = None
+            error = resultado.exception()
+            for futuro in lote:
+                if futuro.done():
+                    continue
+                if error is None:
+                    futuro.set_result(None)
+                else:
+                    futuro.set_exception(error)
+            if self._pendientes:
+                self._lanzar_confirmacion()
+
+        self._confirmando.add_done_callback(confirmado)
+
+    def listar(self, consulta):
+        """
+        GET /tareas: tareas filtradas por estado, prioridad y título, por
+        páginas, opcionalmente ordenadas (orden=-prioridad,id; ver
+        ordenar_tareas).
+        """
+        self._sincronizar()
+        limite = entero_validado(consulta.get("limite", LIMITE_LISTADO), "limite", 1)
+        limite = min(limite, LIMITE_LISTADO_MAXIMO)
+        desplazamiento = entero_validado(
+            consulta.get("desplazamiento", 0), "desplazamiento"
+        )
+        estado = valor_convertido(consulta, "estado", convertir_estado)
+        prioridad = valor_convertido(consulta, "prioridad", convertir_prioridad)
+
+        # El primer filtro usa los índices del almacén (ver iterar_por_*); la
+        # búsqueda por título, la más costosa, se guarda en su caché
+        resultados = self.tareas
+        if consulta.get("q"):
+            resultados = buscar_por_titulo(resultados, consulta["q"])
+        if estado is not None:
+            resultados = iterar_por_estado(resultados, estado)
+        if prioridad is not None:
+            resultados = iterar_por_prioridad(resultados, prioridad)
+        if consulta.get("orden"):
+            # Solo se seleccionan las tareas hasta el final de la página
+            try:
+                if consulta.get("q"):
+                    resultados = ordenar_tareas(
+                        resultados, consulta["orden"], desplazamiento + limite
+                    )
+                else:
+                    resultados = ordenar_tareas(
+                        self.tareas,
+                        consulta["orden"],
+                        desplazamiento + limite,
+                        estado,
+                        prioridad,
+                    )
+            except ValueError as e:
+                raise ErrorHTTP(HTTPStatus.BAD_REQUEST, str(e)) from None
+        pagina = list(map(tarea_a_json, paginar(resultados, limite, desplazamiento)))
+        siguiente = desplazamiento + limite if len(pagina) == limite else None
+        datos = {
+            "tareas": pagina,
+            "limite": limite,
+            "desplazamiento": desplazamiento,
+            "siguiente": siguiente,
+        }
+        return HTTPStatus.OK, datos, ()
+
+    async def crear(self, datos):
+        """
+        POST /tareas: crea una tarea (estado y prioridad por defecto:
+        pendiente y media).
+        """
+        titulo = texto_validado(datos, "titulo", validar_titulo, obligatorio=True)
+        descripcion = texto_validado(
+            datos, "descripcion", validar_descripcion, obligatorio=True
+        )
+        estado = valor_convertido(datos, "estado", convertir_estado) or "pendiente"
+        prioridad = valor_convertido(datos, "prioridad", convertir_prioridad) or "media"
+
+        tarea, version = await self.escribir(
+            lambda: self._crear(titulo, descripcion, estado, prioridad)
+        )
+        await self.confirmar()
+        ubicacion = (("Location", f"/tareas/{tarea['id']}"),)
+        return HTTPStatus.CREATED, tarea_a_json(tarea, version), ubicacion
+
+    def _crear(self, titulo, descripcion, estado, prioridad):
+        """
+        Crea la tarea (dentro de escribir).
+
+        Retorna:
+            tuple: (tarea: Tarea, version: int)
+        """
+        tarea = crear_tarea(self.tareas, titulo, descripcion, estado, prioridad)
+        return tarea, self.tareas.version_de(tarea["id"])
+
+    def ver(self, tarea_id):
+        """
+        GET /tareas/<id>: una tarea con su versión.
+        """
+        self._sincronizar()
+        tarea = obtener_tarea_por_id(self.tareas, tarea_id)
+        if tarea is None:
+            raise ErrorHTTP(HTTPStatus.NOT_FOUND, f"No existe tarea con ID {tarea_id}")
+        return HTTPStatus.OK, tarea_a_json(tarea, self.tareas.version_de(tarea_id)), ()
+
+    async def actualizar(self, tarea_id, datos):
+        """
+        PATCH /tareas/<id>: modifica los campos indicados. Con 'version', un
+        cambio concurrente de los mismos campos responde 409.
+        """
+        titulo = texto_validado(datos, "titulo", validar_titulo)
+        descripcion = texto_validado(datos, "descripcion", validar_descripcion)
+        estado = valor_convertido(datos, "estado", convertir_estado)
+        prioridad = valor_convertido(datos, "prioridad", convertir_prioridad)
+        version = datos.get("version")
+        if version is not None:
+            version = entero_validado(version, "version")
+
+        tarea, version = await self.escribir(
+            lambda: self._actualizar(
+                tarea_id, titulo, descripcion, estado, prioridad, version
+            )
+        )
+        await self.confirmar()
+        return HTTPStatus.OK, tarea_a_json(tarea, version), ()
+
+    def _actualizar(self, tarea_id, titulo, descripcion, estado, prioridad, version):
+        """
+        Actualiza la tarea (dentro de escribir).
+
+        Retorna:
+            tuple: (tarea: Tarea, version: int nueva versión)
+        """
+        if not actualizar_tarea(
+            self.tareas, tarea_id, titulo, descripcion, estado, prioridad, version
+        ):
+            raise ErrorHTTP(HTTPStatus.NOT_FOUND, f"No existe tarea con ID {tarea_id}")
+        tarea = obtener_tarea_por_id(self.tareas, tarea_id)
+        return tarea, self.tareas.version_de(tarea_id)
+
+    async def eliminar(self, tarea_id, consulta):
+        """
+        DELETE /tareas/<id>: elimina la tarea. Con ?version=, responde 409 si
+        otro proceso la modificó desde esa versión.
+        """
+        version = consulta.get("version")
+        if version is not None:
+            version = entero_validado(version, "version")
+        if not await self.escribir(
+            lambda: eliminar_tarea(self.tareas, tarea_id, version)
+        ):
+            raise ErrorHTTP(HTTPStatus.NOT_FOUND, f"No existe tarea con ID {tarea_id}")
+        await self.confirmar()
+        return HTTPStatus.NO_CONTENT, None, ()
+
+    def estadisticas(self):
+        """
+        GET /estadisticas: las estadísticas de obtener_estadisticas (con las
+        de las tareas archivadas) y el uso de la caché de consultas.
+        """
+        self._sincronizar()
+        datos = obtener_estadisticas(self.tareas, self.archivo)
+        for resumen in (datos, datos["archivadas"]):
+            pares = resumen["por_estado_prioridad"]
+            resumen["por_estado_prioridad"] = {
+                f"{estado}/{prioridad}": cantidad
+                for (estado, prioridad), cantidad in pares.items()
+            }
+        if self.tareas.cache_consultas is not None:
+            datos["cache_consultas"] = self.tareas.cache_consultas.estadisticas()
+        return HTTPStatus.OK, datos, ()
+
+    def metricas(self, consulta):
+        """
+        GET /metricas: las métricas de instrumentacion.py en el formato de
+        texto de Prometheus, o en JSON con ?formato=json.
+        """
+        if not METRICAS_ACTIVAS:
+            raise ErrorHTTP(
+                HTTPStatus.NOT_FOUND,
+                f"Métricas desactivadas (defina {VARIABLE_METRICAS}=1)",
+            )
+        formato = consulta.get("formato", "prometheus")
+        if formato == "json":
+            return HTTPStatus.OK, obtener_metricas(), ()
+        if formato != "prometheus":
+            raise ErrorHTTP(
+                HTTPStatus.BAD_REQUEST, f"Formato desconocido: {formato!r}"
+            )
+        return HTTPStatus.OK, exportar_prometheus(), ()
+
+
+async def servir(host="127.0.0.1", puerto=8000, motor=None, **opciones):
+    """
+    Abre el almacén y atiende peticiones hasta que se cancela.
+
+    SIGTERM detiene el servidor igual que Ctrl+C: al terminar cierra el
+    almacén (con el motor de texto, integra el diario en tareas.txt).
+
+    Parámetros:
+        host (str, optional): Dirección en la que escuchar.
+        puerto (int, optional): Puerto en el que escuchar.
+        motor (MotorTexto o MotorSQLite, optional): Motor de almacenamiento;
+            por defecto, el configurado (ver obtener_motor).
+        **opciones: Opciones del almacén (durabilidad, ventana, ...).
+    """
+    if motor is None:
+        motor = obtener_motor()
+    opciones.setdefault("durabilidad", "grupo")
+    tareas = motor.abrir(
+        indice_texto=True, perezoso=False, esperar_escritura=False, **opciones
+    )
+    try:
+        try:
+            asyncio.get_running_loop().add_signal_handler(
+                signal.SIGTERM, asyncio.current_task().cancel
+            )
+        except NotImplementedError:
+            pass  # Windows: solo Ctrl+C
+        aplicacion = ServidorTareas(motor, tareas)
+        servidor = await asyncio.start_server(
+            aplicacion.atender, host, puerto, limit=LIMITE_CABECERAS
+        )
+        direccion = servidor.sockets[0].getsockname()
+        print(f"Escuchando en http://{direccion[0]}:{direccion[1]} ({motor!r})")
+        async with servidor:
+            await servidor.serve_forever()
+    finally:
+        motor.cerrar(tareas)
+
+
+def main(argv=None):
+    """
+    Punto de entrada: python servidor.py [opciones].
+
+    Parámetros:
+        argv (list, optional): Argumentos (por defecto, sys.argv[1:]).
+    """
+    parser = argparse.ArgumentParser(description="API HTTP de gestión de tareas")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--puerto", type=int, default=8000)
+    parser.add_argument("--motor", choices=MOTORES)
+    parser.add_argument("--archivo", help="Archivo de tareas (según el motor)")
+    parser.add_argument("--durabilidad", choices=MODOS_DURABILIDAD, default="grupo")
+    args = parser.parse_args(argv)
+
+    motor = obtener_motor(args.motor, args.archivo)
+    try:
+        asyncio.run(servir(args.host, args.puerto, motor, durabilidad=args.durabilidad))
+    except (KeyboardInterrupt, asyncio.CancelledError):
+        print("\nServidor detenido.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+import os
+import subprocess
+import sys
+import textwrap
+from pathlib import Path
+
+import pytest
+
+# Los módulos del proyecto están en la raíz del repositorio
+RAIZ = str(Path(__file__).resolve().parent.parent)
+sys.path.insert(0, RAIZ)
+
+from almacen import CAMPOS  # noqa: E402
+from almacenamiento import MOTORES, obtener_motor  # noqa: E402
+from funciones import guardar_tareas  # noqa: E402
+
+TITULOS = (
+    "Informe mensual",
+    "revisar código",
+    "llamar a cliente",
+    "informe de ventas",
+    "preparar reunión",
+)
+ESTADOS = ("pendiente", "en_progreso", "completada")
+PRIORIDADES = ("alta", "media", "baja")
+
+
+def tareas_de_ejemplo(n, primer_id=1):
+    """
+    Retorna n tareas con todas las combinaciones de estado y prioridad.
+    """
+    return [
+        {
+            "id": i,
+            "titulo": f"{TITULOS[i % len(TITULOS)]} {i}",
+            "descripcion": f"descripción {i}",
+            "estado": ESTADOS[i % 3],
+            "prioridad": PRIORIDADES[i // 3 % 3],
+        }
+        for i in range(primer_id, primer_id + n)
+    ]
+
+
+def filas(tareas):
+    """
+    Convierte tareas (diccionarios u objetos) en tuplas comparables.
+    """
+    return [tuple(t[campo] for campo in CAMPOS) for t in tareas]
+
+
+def en_otro_proceso(codigo, archivo):
+    """
+    Ejecuta código Python en un proceso aparte, con ARCHIVO definido.
+
+    Retorna:
+        str: Salida estándar del proceso.
+    """
+    entorno = dict(os.environ, PYTHONPATH=RAIZ)
+    resultado = subprocess.run(
+        [sys.executable, "-c", f"ARCHIVO = {archivo!r}\n" + textwrap.dedent(codigo)],
+        env=entorno,
+        capture_output=True,
+        text=True,
+        timeout=60,
+    )
+    assert resultado.returncode == 0, resultado.stderr
+    return resultado.stdout
+
+
+@pytest.fixture
+def archivo(tmp_path):
+    """
+    Archivo de tareas con 50 tareas de ejemplo.
+    """
+    ruta = str(tmp_path / "tareas.txt")
+    guardar_tareas(tareas_de_ejemplo(50), ruta)
+    return ruta
+
+
+@pytest.fixture(params=MOTORES)
+def motor(request, tmp_path):
+    """
+    Motor de cada tipo sobre un archivo vacío.
+    """
+    nombre = "tareas.db" if request.param == "sqlite" else "tareas.txt"
+    return obtener_motor(request.param, str(tmp_path / nombre))
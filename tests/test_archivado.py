@@ -0,0 +1,177 @@
+"""
+Pruebas del archivo de tareas completadas y de las consultas sobre él.
+"""
+
+import json
+
+import pytest
+
+import archivado
+from archivado import ArchivoTareas, ruta_archivo
+from funciones import (
+    buscar_por_titulo,
+    filtrar_por_estado,
+    filtrar_por_prioridad,
+    obtener_estadisticas,
+    ordenar_tareas,
+)
+from conftest import filas
+from generador import generar_almacen, generar_tareas
+
+N = 3000
+ANTIGUEDAD = 200
+
+
+@pytest.fixture(scope="module")
+def completadas():
+    return [
+        t
+        for t in generar_tareas(N, semilla=7)
+        if t["estado"] == "completada" and t["id"] < N + 1 - ANTIGUEDAD
+    ]
+
+
+@pytest.fixture
+def motor(motor):
+    motor.guardar(generar_almacen(N, semilla=7))
+    return motor
+
+
+def archivar(motor, **opciones):
+    almacen = motor.abrir()
+    archivo = ArchivoTareas(motor.archivo)
+    try:
+        ids = archivo.archivar(almacen, antiguedad=ANTIGUEDAD, **opciones)
+    finally:
+        motor.cerrar(almacen, compactar=False)
+    return archivo, ids
+
+
+@pytest.mark.parametrize("compresion", ["gzip", "lzma"])
+def test_archivar_mueve_las_completadas(motor, completadas, compresion):
+    archivo, ids = archivar(motor, compresion=compresion, tamano_segmento=250)
+    assert ids == [t["id"] for t in completadas]
+    assert len(archivo) == len(completadas)
+    assert filas(archivo) == filas(completadas)
+    assert [s["numero"] for s in archivo.segmentos()] == list(
+        range(1, len(archivo.segmentos()) + 1)
+    )
+
+    almacen = motor.abrir(diario=False)
+    assert len(almacen) == N - len(completadas)
+    assert not any(tarea_id in almacen for tarea_id in ids)
+    motor.cerrar(almacen, compactar=False)
+
+
+def test_consultar_archivadas(motor, completadas):
+    archivo, _ = archivar(motor, tamano_segmento=250)
+
+    assert filas(buscar_por_titulo(archivo, "INFORME")) == filas(
+        t for t in completadas if "informe" in t["titulo"].lower()
+    )
+    assert filas(filtrar_por_prioridad(archivo, "Alta")) == filas(
+        t for t in completadas if t["prioridad"] == "alta"
+    )
+    assert filtrar_por_estado(archivo, "pendiente") == []
+    assert filas(archivo.iterar_filtradas(estado="COMPLETADA", prioridad="baja")) == (
+        filas(t for t in completadas if t["prioridad"] == "baja")
+    )
+    esperado = sorted(completadas, key=lambda t: -t["id"])[:5]
+    assert filas(ordenar_tareas(archivo, "-id", 5)) == filas(esperado)
+
+    almacen = motor.abrir(diario=False)
+    estadisticas = obtener_estadisticas(almacen, archivo)
+    motor.cerrar(almacen, compactar=False)
+    assert estadisticas["total_tareas"] == N - len(completadas)
+    assert estadisticas["archivadas"]["total_tareas"] == len(completadas)
+    assert estadisticas["archivadas"]["completadas"] == len(completadas)
+
+
+def test_archivar_dos_veces_no_duplica(motor, completadas):
+    archivo, _ = archivar(motor)
+    assert archivar(motor)[1] == []
+    assert len(archivo) == len(completadas)
+
+
+def test_archivar_lista(tmp_path, completadas):
+    tareas = list(generar_tareas(N, semilla=7))
+    archivo = ArchivoTareas(str(tmp_path / "tareas.txt"))
+    ids = archivo.archivar(tareas, antiguedad=ANTIGUEDAD)
+    assert ids == [t["id"] for t in completadas]
+    assert len(tareas) == N - len(completadas)
+
+    # Pendientes hasta que la lista reducida se guarda y se confirma
+    assert len(archivo) == 0
+    assert archivo.segmentos(pendientes=True)
+    assert archivo.confirmar(tareas) == len(archivo.segmentos(pendientes=True))
+    assert filas(archivo) == filas(completadas)
+
+
+def test_archivar_lista_sin_guardarla_no_duplica(tmp_path, completadas):
+    original = list(generar_tareas(N, semilla=7))
+    archivo = ArchivoTareas(str(tmp_path / "tareas.txt"))
+    archivo.archivar(list(original), antiguedad=ANTIGUEDAD)
+
+    # La lista reducida no se guardó: las tareas siguen en la original
+    assert archivo.confirmar(original) == 0
+    assert archivo.segmentos(pendientes=True) == []
+    assert len(archivo) == 0
+
+
+def test_eliminacion_fallida_deja_el_segmento_pendiente(
+    motor, completadas, monkeypatch
+):
+    def falla(*args, **kwargs):
+        raise RuntimeError("caída")
+
+    with monkeypatch.context() as parche:
+        parche.setattr(archivado, "eliminar_tareas_masivo", falla)
+        with pytest.raises(RuntimeError):
+            archivar(motor)
+    archivo = ArchivoTareas(motor.archivo)
+    assert len(archivo) == 0
+    assert archivo.segmentos(pendientes=True)
+
+    # Las tareas siguen en el almacén: el segmento pendiente se descarta
+    _, ids = archivar(motor)
+    assert ids == [t["id"] for t in completadas]
+    assert len(archivo) == len(completadas)
+    assert len(archivo.segmentos(pendientes=True)) == len(archivo.segmentos())
+
+
+def test_confirmar_segmento_ya_eliminado(motor, completadas):
+    archivo, _ = archivar(motor)
+    indice = ruta_archivo(motor.archivo) + "/segmentos.json"
+    with open(indice, encoding="utf-8") as f:
+        datos = json.load(f)
+    for segmento in datos["segmentos"]:
+        segmento["confirmado"] = False
+        # Índices escritos antes de guardar el número
+        del segmento["numero"]
+    with open(indice, "w", encoding="utf-8") as f:
+        json.dump(datos, f)
+
+    assert len(archivo) == 0
+    assert archivar(motor)[1] == []
+    assert len(archivo) == len(completadas)
+
+
+def test_confirma_tras_asegurar_la_eliminacion(motor, completadas):
+    almacen = motor.abrir()
+    archivo = ArchivoTareas(motor.archivo)
+    asegurar = almacen.asegurar_cambios
+    vistos = []
+
+    def asegurar_cambios():
+        # Las tareas ya no están, pero sus segmentos siguen pendientes
+        pendientes = archivo.segmentos(pendientes=True)
+        vistos.append((len(almacen), len(archivo), len(pendientes)))
+        asegurar()
+
+    almacen.asegurar_cambios = asegurar_cambios
+    try:
+        archivo.archivar(almacen, antiguedad=ANTIGUEDAD)
+    finally:
+        motor.cerrar(almacen, compactar=False)
+    assert vistos == [(N - len(completadas), 0, 1)]
+    assert len(archivo) == len(completadas)
@@ -0,0 +1,42 @@
+"""
+Pruebas de la comparación de resultados de la suite de benchmark.py.
+"""
+
+from benchmark import comparar_resultados
+
+
+def resultados(tiempos, memoria=1_000_000):
+    fila = {
+        "funcion": "buscar_por_titulo",
+        "tareas": 10_000,
+        "llamadas": 1,
+        "segundos": min(tiempos),
+        "mediana": sorted(tiempos)[len(tiempos) // 2],
+        "tiempos": tiempos,
+        "memoria_pico": memoria,
+    }
+    return {"resultados": [fila]}
+
+
+def test_una_medicion_lenta_no_es_una_regresion():
+    base = resultados([0.100, 0.110, 0.105])
+    assert comparar_resultados(base, resultados([0.100, 0.400, 0.108])) == []
+
+
+def test_la_mediana_mas_lenta_es_una_regresion():
+    base = resultados([0.100, 0.110, 0.105])
+    [regresion] = comparar_resultados(base, resultados([0.200, 0.210, 0.205]))
+    assert "mediana" in regresion
+
+
+def test_la_dispersion_de_la_base_es_ruido():
+    # Las repeticiones de la base ya varían 60 ms: 40 ms más no cuentan
+    base = resultados([0.100, 0.160, 0.120])
+    assert comparar_resultados(base, resultados([0.160, 0.170, 0.160])) == []
+
+
+def test_sin_repeticiones_suficientes_no_se_juzga_el_tiempo():
+    base = resultados([0.100])
+    assert comparar_resultados(base, resultados([0.500])) == []
+    # La memoria se sigue comparando
+    assert comparar_resultados(base, resultados([0.500], memoria=2_000_000))
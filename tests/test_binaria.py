@@ -0,0 +1,75 @@
+"""
+Pruebas de la instantánea binaria (tareas.txt.bin): se usa solo mientras
+corresponde a tareas.txt y nunca en lugar del diario pendiente.
+"""
+
+import os
+
+import pytest
+
+import funciones
+from almacen import Tarea
+from conftest import filas, tareas_de_ejemplo
+from diario import DiarioTareas
+from funciones import (
+    cargar_almacen,
+    cargar_binaria,
+    cargar_instantanea,
+    cargar_tareas,
+    guardar_tareas,
+    ruta_binaria,
+)
+
+
+@pytest.fixture
+def archivo(archivo, monkeypatch):
+    # Con el tamaño mínimo en 0, las 50 tareas de ejemplo ya la crean
+    monkeypatch.setattr(funciones, "TAMANO_MINIMO_BINARIA", 0)
+    cargar_instantanea(archivo, fabrica=Tarea)
+    assert os.path.exists(ruta_binaria(archivo))
+    return archivo
+
+
+def test_se_usa_si_corresponde(archivo):
+    assert filas(cargar_binaria(archivo)) == filas(cargar_tareas(archivo))
+
+
+def test_vencida_si_cambia_el_tamano(archivo):
+    guardar_tareas(tareas_de_ejemplo(51), archivo)
+    assert cargar_binaria(archivo) is None
+    assert len(cargar_almacen(archivo)) == 51
+
+
+def test_vencida_si_cambia_la_fecha(archivo):
+    # Mismo tamaño, otro contenido: solo lo delata mtime_ns
+    with open(archivo, "r", encoding="utf-8") as f:
+        texto = f.read()
+    estado = os.stat(archivo)
+    with open(archivo, "w", encoding="utf-8") as f:
+        f.write(texto.replace("descripción 7", "descripción X"))
+    os.utime(archivo, ns=(estado.st_atime_ns, estado.st_mtime_ns + 1))
+    assert os.path.getsize(archivo) == estado.st_size
+
+    assert cargar_binaria(archivo) is None
+    assert cargar_almacen(archivo).obtener(7)["descripcion"] == "descripción X"
+
+
+def test_corrupta_se_descarta(archivo):
+    with open(ruta_binaria(archivo), "r+b") as f:
+        f.truncate(20)
+    assert cargar_binaria(archivo) is None
+    assert filas(cargar_almacen(archivo)) == filas(cargar_tareas(archivo))
+
+
+def test_el_diario_pendiente_se_aplica_encima(archivo):
+    almacen = cargar_almacen(archivo)
+    diario = DiarioTareas(archivo, almacen, umbral=float("inf"))
+    almacen.crear("nueva", "solo en el diario", "pendiente", "alta")
+    almacen.actualizar(3, titulo="cambiada")
+    almacen.eliminar(7)
+    diario.cerrar(compactar=False)
+
+    # tareas.txt no cambió: la instantánea binaria sigue valiendo para él,
+    # pero la carga incorpora los cambios del diario
+    assert cargar_binaria(archivo) is not None
+    assert filas(cargar_almacen(archivo)) == filas(almacen)
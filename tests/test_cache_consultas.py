@@ -0,0 +1,121 @@
+"""
+Pruebas de la caché de consultas y su invalidación por campo.
+"""
+
+from itertools import islice
+
+import pytest
+
+from almacen import AlmacenTareas
+from conftest import en_otro_proceso, tareas_de_ejemplo
+from diario import DiarioTareas
+from funciones import cargar_almacen, iterar_por_titulo
+
+
+@pytest.fixture
+def almacen():
+    return AlmacenTareas(tareas_de_ejemplo(500))
+
+
+def contadores(almacen):
+    estadisticas = almacen.cache_consultas.estadisticas()
+    return estadisticas["aciertos"], estadisticas["fallos"]
+
+
+def test_consulta_repetida_es_un_acierto(almacen):
+    primera = almacen.buscar("informe")
+    assert contadores(almacen) == (0, 1)
+    assert almacen.buscar("INFORME") == primera
+    assert contadores(almacen) == (1, 1)
+
+
+def test_cambiar_titulo_no_invalida_filtrar(almacen):
+    almacen.buscar("informe")
+    almacen.filtrar(estado="pendiente")
+    tarea = almacen.filtrar(estado="pendiente")[0]
+    assert contadores(almacen) == (1, 2)
+
+    almacen.actualizar(tarea["id"], titulo="informe nuevo")
+    assert tarea["id"] in [t["id"] for t in almacen.buscar("informe")]
+    assert contadores(almacen) == (1, 3)
+    almacen.filtrar(estado="pendiente")
+    assert contadores(almacen) == (2, 3)
+
+
+def test_cambiar_estado_invalida_filtrar_pero_no_buscar(almacen):
+    almacen.buscar("informe")
+    tarea = almacen.filtrar(estado="pendiente")[0]
+
+    almacen.actualizar(tarea["id"], estado="completada")
+    almacen.buscar("informe")
+    assert contadores(almacen) == (1, 2)
+    pendientes = almacen.filtrar(estado="pendiente")
+    assert contadores(almacen) == (1, 3)
+    assert tarea["id"] not in [t["id"] for t in pendientes]
+
+
+def test_altas_y_bajas_invalidan_todo(almacen):
+    almacen.buscar("informe")
+    almacen.filtrar(prioridad="alta")
+    nueva = almacen.crear("informe extra", "", "pendiente", "alta")
+
+    assert nueva["id"] in [t["id"] for t in almacen.buscar("informe")]
+    assert nueva["id"] in [t["id"] for t in almacen.filtrar(prioridad="alta")]
+    assert contadores(almacen) == (0, 4)
+
+    almacen.eliminar(nueva["id"])
+    assert nueva["id"] not in [t["id"] for t in almacen.buscar("informe")]
+    assert contadores(almacen) == (0, 5)
+
+
+def test_iterar_guarda_solo_consultas_completas(almacen):
+    assert len(list(islice(almacen.iterar_filtradas(estado="pendiente"), 3))) == 3
+    assert len(almacen.cache_consultas) == 0
+
+    completas = list(almacen.iterar_filtradas(estado="pendiente"))
+    assert len(almacen.cache_consultas) == 1
+    assert list(almacen.iterar_filtradas(estado="pendiente")) == completas
+    assert contadores(almacen) == (1, 2)
+
+
+def test_cambio_mientras_se_consume_no_guarda(almacen):
+    iterador = almacen.iterar_busqueda("informe")
+    primera = next(iterador)
+    almacen.actualizar(primera["id"], titulo="otro")
+    list(iterador)
+    assert len(almacen.cache_consultas) == 0
+    assert primera["id"] not in [t["id"] for t in almacen.buscar("informe")]
+
+
+def test_funciones_perezosas_usan_la_cache(almacen):
+    completas = list(iterar_por_titulo(almacen, "informe"))
+    assert list(iterar_por_titulo(almacen, "informe")) == completas
+    assert contadores(almacen) == (1, 1)
+
+
+def test_cambios_de_otro_proceso_invalidan(archivo):
+    almacen = cargar_almacen(archivo)
+    diario = DiarioTareas(archivo, almacen, umbral=float("inf"))
+    antes = [t["id"] for t in almacen.buscar("informe")]
+    en_otro_proceso(
+        """
+        from diario import DiarioTareas
+        from funciones import cargar_almacen
+
+        almacen = cargar_almacen(ARCHIVO)
+        diario = DiarioTareas(ARCHIVO, almacen, umbral=float("inf"))
+        almacen.actualizar(1, titulo="informe de otro proceso")
+        diario.cerrar(compactar=False)
+        """,
+        archivo,
+    )
+    with almacen.escritura():
+        despues = [t["id"] for t in almacen.buscar("informe")]
+    diario.cerrar(compactar=False)
+    assert despues == sorted(antes + [1])
+
+
+def test_sin_capacidad_no_guarda(almacen):
+    almacen.cache_consultas.redimensionar(0)
+    assert almacen.buscar("informe") == almacen.buscar("informe")
+    assert len(almacen.cache_consultas) == 0
@@ -0,0 +1,113 @@
+"""
+Pruebas de los subcomandos no interactivos y del modo lote.
+"""
+
+import os
+import subprocess
+import sys
+
+import pytest
+
+from cli import main
+from conftest import RAIZ, tareas_de_ejemplo
+from diario import DiarioTareas
+from funciones import cargar_almacen, guardar_tareas, leer_diario, ruta_diario
+
+COMANDOS = """\
+# Comentarios y líneas vacías se ignoran
+
+crear "Nueva tarea" "creada en lote" -e pendiente -p alta
+actualizar 3 -e completada
+eliminar 7
+actualizar 999 -e completada
+crear "Otra" "sin prioridad válida" -p urgente
+actualizar 4 -t "título nuevo" -p baja
+"""
+
+
+@pytest.fixture
+def anotaciones(monkeypatch):
+    """
+    Registra cada escritura al final del diario (ver DiarioTareas._anotar).
+    """
+    escrituras = []
+    anotar = DiarioTareas._anotar
+
+    def contar(diario, lineas):
+        escrituras.append(lineas)
+        return anotar(diario, lineas)
+
+    monkeypatch.setattr(DiarioTareas, "_anotar", contar)
+    return escrituras
+
+
+def test_subcomando_suelto_se_anota_en_el_diario(archivo, capsys):
+    assert main(["--archivo", archivo, "crear", "Suelta", "desc"]) == 0
+    assert "ID 51" in capsys.readouterr().out
+    assert [registro["op"] for registro in leer_diario(archivo)] == ["crear"]
+    assert cargar_almacen(archivo).obtener(51)["titulo"] == "Suelta"
+
+
+def test_error_de_comando(archivo, capsys):
+    assert main(["--archivo", archivo, "eliminar", "999"]) == 1
+    assert capsys.readouterr().err
+
+
+def test_lote_escribe_el_diario_una_sola_vez(archivo, tmp_path, anotaciones):
+    comandos = tmp_path / "comandos.txt"
+    comandos.write_text(COMANDOS, encoding="utf-8")
+
+    # Dos líneas fallan (ID inexistente y prioridad inválida): código 1
+    assert main(["--archivo", archivo, "lote", str(comandos)]) == 1
+
+    assert len(anotaciones) == 1
+    assert anotaciones[0].count("\n") == 4
+    assert os.path.getsize(ruta_diario(archivo)) == len(
+        anotaciones[0].encode("utf-8")
+    )
+    almacen = cargar_almacen(archivo)
+    assert almacen.obtener(51)["titulo"] == "Nueva tarea"
+    assert almacen.obtener(3)["estado"] == "completada"
+    assert 7 not in almacen
+    assert almacen.obtener(4)["titulo"] == "título nuevo"
+    assert almacen.obtener(4)["prioridad"] == "baja"
+    assert len(almacen) == 50
+
+
+def test_lote_desde_la_entrada_estandar(archivo, monkeypatch, anotaciones):
+    monkeypatch.setattr("sys.stdin", iter(["eliminar 1\n", "eliminar 2\n"]))
+    assert main(["--archivo", archivo, "batch"]) == 0
+    assert len(anotaciones) == 1
+    almacen = cargar_almacen(archivo)
+    assert 1 not in almacen and 2 not in almacen
+
+
+def test_lote_anidado_escribe_al_salir_del_externo(archivo, anotaciones):
+    almacen = cargar_almacen(archivo)
+    diario = DiarioTareas(archivo, almacen)
+    with almacen.lote():
+        almacen.eliminar(1)
+        with almacen.lote():
+            almacen.eliminar(2)
+        assert anotaciones == []
+        almacen.eliminar(3)
+    assert len(anotaciones) == 1
+    diario.cerrar(compactar=False)
+    assert len(cargar_almacen(archivo)) == 47
+
+
+def test_listar_a_una_tuberia_cerrada_termina_sin_traza(tmp_path):
+    archivo = str(tmp_path / "tareas.txt")
+    guardar_tareas(tareas_de_ejemplo(5000), archivo)
+    proceso = subprocess.Popen(
+        [sys.executable, os.path.join(RAIZ, "app.py"), "--archivo", archivo, "listar"],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+    )
+    # Como head: lee el comienzo de la página y cierra la tubería
+    assert proceso.stdout.readline()
+    proceso.stdout.close()
+    _, errores = proceso.communicate(timeout=60)
+
+    assert proceso.returncode == 1
+    assert errores == b""
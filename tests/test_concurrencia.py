@@ -0,0 +1,175 @@
+"""
+Pruebas de la coordinación entre procesos: cambios combinados o rechazados
+según la versión leída, IDs sin repetir y sincronización con el diario y
+la generación escritos por otro proceso.
+"""
+
+import pytest
+
+import funciones
+from almacen import ConflictoEscritura
+from almacen_mmap import AlmacenMapeado
+from conftest import en_otro_proceso, filas
+from diario import DiarioTareas
+from funciones import cargar_almacen, leer_estado, sincronizar_almacen
+
+ACTUALIZAR_TITULO = """
+from diario import DiarioTareas
+from funciones import cargar_almacen
+
+almacen = cargar_almacen(ARCHIVO)
+diario = DiarioTareas(ARCHIVO, almacen, umbral=float("inf"))
+almacen.actualizar(1, titulo="cambiado por otro proceso")
+almacen.actualizar(3, titulo="cambiado por otro proceso")
+diario.cerrar(compactar=False)
+"""
+
+CREAR = """
+from diario import DiarioTareas
+from funciones import cargar_almacen
+
+almacen = cargar_almacen(ARCHIVO)
+diario = DiarioTareas(ARCHIVO, almacen, umbral=float("inf"))
+print(almacen.crear("de otro proceso", "creada aparte", "pendiente", "baja").id)
+diario.cerrar(compactar=False)
+"""
+
+COMPACTAR = """
+from diario import DiarioTareas
+from funciones import cargar_almacen
+
+almacen = cargar_almacen(ARCHIVO)
+diario = DiarioTareas(ARCHIVO, almacen, umbral=float("inf"))
+almacen.eliminar(2)
+diario.compactar(en_segundo_plano=False)
+almacen.actualizar(4, estado="completada")
+diario.cerrar(compactar=False)
+"""
+
+
+def abrir(archivo):
+    almacen = cargar_almacen(archivo)
+    return almacen, DiarioTareas(archivo, almacen, umbral=float("inf"))
+
+
+def test_cambios_en_campos_distintos_se_combinan(archivo):
+    almacen, diario = abrir(archivo)
+    version = almacen.version_de(1)
+    en_otro_proceso(ACTUALIZAR_TITULO, archivo)
+
+    assert almacen.actualizar(1, estado="completada", version=version)
+    diario.cerrar(compactar=False)
+
+    tarea = cargar_almacen(archivo).obtener(1)
+    assert tarea["titulo"] == "cambiado por otro proceso"
+    assert tarea["estado"] == "completada"
+
+
+def test_cambio_en_el_mismo_campo_se_rechaza(archivo):
+    almacen, diario = abrir(archivo)
+    version = almacen.version_de(1)
+    en_otro_proceso(ACTUALIZAR_TITULO, archivo)
+
+    with pytest.raises(ConflictoEscritura):
+        almacen.actualizar(1, titulo="propio", estado="completada", version=version)
+    diario.cerrar(compactar=False)
+
+    # No se aplica nada del cambio rechazado
+    tarea = cargar_almacen(archivo).obtener(1)
+    assert tarea["titulo"] == "cambiado por otro proceso"
+    assert tarea["estado"] == "en_progreso"
+    assert filas(cargar_almacen(archivo)) == filas(almacen)
+
+
+def test_eliminar_tras_un_cambio_de_otro_proceso_se_rechaza(archivo):
+    almacen, diario = abrir(archivo)
+    version = almacen.version_de(1)
+    en_otro_proceso(ACTUALIZAR_TITULO, archivo)
+
+    with pytest.raises(ConflictoEscritura):
+        almacen.eliminar(1, version=version)
+    # Con la versión ya incorporada se puede eliminar
+    assert almacen.eliminar(1, version=almacen.version_de(1))
+    diario.cerrar(compactar=False)
+
+    assert cargar_almacen(archivo).obtener(1) is None
+
+
+def test_ids_no_se_repiten_entre_procesos(archivo):
+    almacen, diario = abrir(archivo)
+    propio = almacen.crear("propia", "creada aquí", "pendiente", "alta").id
+    ajeno = int(en_otro_proceso(CREAR, archivo))
+    otro = almacen.crear("propia 2", "creada aquí", "pendiente", "alta").id
+    diario.cerrar(compactar=False)
+
+    assert (propio, ajeno, otro) == (51, 52, 53)
+    assert filas(cargar_almacen(archivo)) == filas(almacen)
+
+
+def test_sincronizar_almacen_lee_el_diario_o_recarga_por_generacion(archivo):
+    almacen = cargar_almacen(archivo)
+    generacion = almacen.generacion
+    assert not sincronizar_almacen(almacen, archivo)
+
+    # Otro proceso añade registros: se leen solo los nuevos del diario
+    en_otro_proceso(CREAR, archivo)
+    assert sincronizar_almacen(almacen, archivo)
+    assert almacen.generacion == generacion
+    assert almacen.obtener(51)["titulo"] == "de otro proceso"
+    assert not sincronizar_almacen(almacen, archivo)
+
+    # Otro proceso compacta (rota el diario): se recarga todo el archivo
+    en_otro_proceso(COMPACTAR, archivo)
+    assert sincronizar_almacen(almacen, archivo)
+    assert almacen.generacion == generacion + 1
+    assert almacen.obtener(2) is None
+    assert almacen.obtener(4)["estado"] == "completada"
+    assert filas(almacen) == filas(cargar_almacen(archivo))
+
+
+def test_leer_estado_reintenta_si_otro_proceso_compacta(archivo, monkeypatch):
+    almacen = cargar_almacen(archivo)
+    leer = funciones.leer_archivos_estado
+    lecturas = []
+
+    def leer_mientras_compacta(*args, **kwargs):
+        lecturas.append(args)
+        resultado = leer(*args, **kwargs)
+        if len(lecturas) == 1:
+            en_otro_proceso(COMPACTAR, archivo)
+        return resultado
+
+    monkeypatch.setattr(funciones, "leer_archivos_estado", leer_mientras_compacta)
+    tareas, registros, generacion, _, _ = leer_estado(archivo)
+
+    # La primera lectura quedó a medias de la compactación y se descarta
+    assert len(lecturas) == 2
+    assert generacion == almacen.generacion + 1
+    tareas, _ = funciones.reproducir_registros(tareas, registros)
+    monkeypatch.undo()
+    assert filas(tareas) == filas(cargar_almacen(archivo))
+
+
+def test_almacen_mapeado_incorpora_los_cambios_de_otros_procesos(archivo):
+    almacen = AlmacenMapeado(archivo)
+    diario = DiarioTareas(archivo, almacen, umbral=float("inf"))
+    assert almacen.crear("propia", "creada aquí", "pendiente", "alta").id == 51
+
+    # Registros nuevos en el diario: otro ID y el título de otro proceso
+    assert int(en_otro_proceso(CREAR, archivo)) == 52
+    en_otro_proceso(ACTUALIZAR_TITULO, archivo)
+    assert almacen.crear("propia 2", "creada aquí", "pendiente", "alta").id == 53
+    assert almacen.obtener(3)["titulo"] == "cambiado por otro proceso"
+
+    # Otro proceso compacta: se vuelve a mapear el archivo antes de escribir
+    en_otro_proceso(COMPACTAR, archivo)
+    assert almacen.actualizar(5, estado="completada")
+    assert almacen.obtener(2) is None
+    assert almacen.obtener(4)["estado"] == "completada"
+    assert almacen.obtener(53)["titulo"] == "propia 2"
+
+    # La compactación propia parte del estado combinado
+    diario.compactar(en_segundo_plano=False)
+    diario.cerrar(compactar=False)
+    assert filas(cargar_almacen(archivo)) == filas(almacen)
+    almacen.cerrar()
@@ -0,0 +1,193 @@
+"""
+Pruebas del diario de cambios: reproducción, compactación y secuencia de IDs.
+"""
+
+import errno
+import os
+import threading
+
+import pytest
+
+import diario as modulo_diario
+from conftest import filas
+from diario import DiarioTareas
+from funciones import cargar_almacen, cargar_instantanea, cargar_tareas, ruta_diario
+
+
+def abrir(archivo):
+    almacen = cargar_almacen(archivo)
+    return almacen, DiarioTareas(archivo, almacen, umbral=float("inf"))
+
+
+def modificar(almacen):
+    almacen.crear("nueva", "creada con diario", "pendiente", "alta")
+    almacen.actualizar(3, titulo="cambiada", estado="completada")
+    almacen.eliminar(7)
+
+
+def test_reproducir_diario_sin_compactar(archivo):
+    almacen, diario = abrir(archivo)
+    modificar(almacen)
+    diario.cerrar(compactar=False)
+
+    assert os.path.getsize(ruta_diario(archivo)) > 0
+    assert filas(cargar_tareas(archivo)) == filas(almacen)
+    assert filas(cargar_almacen(archivo)) == filas(almacen)
+
+
+def test_compactar_integra_el_diario(archivo):
+    almacen, diario = abrir(archivo)
+    modificar(almacen)
+    diario.compactar(en_segundo_plano=False)
+    diario.cerrar(compactar=False)
+
+    assert os.path.getsize(ruta_diario(archivo)) == 0
+    assert not os.path.exists(ruta_diario(archivo) + ".old")
+    assert filas(cargar_almacen(archivo)) == filas(almacen)
+
+
+def test_cambios_durante_la_compactacion(archivo):
+    almacen, diario = abrir(archivo)
+    modificar(almacen)
+    diario.compactar(en_segundo_plano=True)
+    almacen.actualizar(4, prioridad="baja")
+    almacen.eliminar(5)
+    diario.cerrar(compactar=False)
+
+    assert filas(cargar_almacen(archivo)) == filas(almacen)
+
+
+def test_cambios_mientras_se_escribe_la_instantanea(archivo, monkeypatch):
+    almacen, diario = abrir(archivo)
+    escribir = DiarioTareas._escribir_instantanea
+
+    def escribir_lento(self, copia, ultimo_id):
+        # La copia solo tiene referencias: estos cambios pueden aparecer en
+        # la instantánea y también están en el diario nuevo
+        for tarea_id in range(1, 30, 3):
+            almacen.actualizar(tarea_id, titulo=f"cambiada {tarea_id}")
+        almacen.eliminar(2)
+        almacen.crear("nueva", "durante la compactación", "pendiente", "alta")
+        escribir(self, copia, ultimo_id)
+
+    monkeypatch.setattr(DiarioTareas, "_escribir_instantanea", escribir_lento)
+    almacen.actualizar(7, estado="completada")
+    assert diario.compactar(en_segundo_plano=True)
+    diario.cerrar(compactar=False)
+
+    # La instantánea ya tiene el título cambiado en la tarea compartida,
+    # pero todavía la tarea eliminada; el diario la deja al día
+    instantanea = {t["id"]: t for t in cargar_instantanea(archivo)}
+    assert instantanea[1]["titulo"] == "cambiada 1"
+    assert 2 in instantanea
+    assert filas(cargar_almacen(archivo)) == filas(almacen)
+
+
+def test_compactacion_interrumpida_se_reintenta(archivo, monkeypatch):
+    almacen, diario = abrir(archivo)
+    modificar(almacen)
+    with monkeypatch.context() as parche:
+        parche.setattr(modulo_diario, "guardar_tareas", lambda *args: False)
+        diario.compactar(en_segundo_plano=False)
+    diario.cerrar(compactar=False)
+    assert os.path.exists(ruta_diario(archivo) + ".old")
+
+    # El diario rotado se aplica al cargar y se integra al abrir el diario
+    almacen_nuevo, diario = abrir(archivo)
+    assert filas(almacen_nuevo) == filas(almacen)
+    assert not os.path.exists(ruta_diario(archivo) + ".old")
+    diario.cerrar(compactar=False)
+    assert filas(cargar_almacen(archivo)) == filas(almacen)
+
+
+@pytest.mark.parametrize("compactar", [False, True])
+def test_ids_eliminados_no_se_reutilizan(archivo, compactar):
+    almacen, diario = abrir(archivo)
+    ultima = almacen.crear("última", "", "pendiente", "media")
+    assert almacen.eliminar(ultima["id"])
+    diario.cerrar(compactar=compactar)
+
+    almacen, diario = abrir(archivo)
+    assert ultima["id"] not in almacen
+    assert almacen.crear("otra", "", "pendiente", "media")["id"] == ultima["id"] + 1
+    diario.cerrar()
+
+
+@pytest.fixture
+def sincronizaciones(monkeypatch):
+    """
+    Cuenta las llamadas a os.fsync.
+    """
+    llamadas = []
+    fsync = os.fsync
+
+    def contar(descriptor):
+        llamadas.append(descriptor)
+        fsync(descriptor)
+
+    monkeypatch.setattr(os, "fsync", contar)
+    return llamadas
+
+
+def test_durabilidad_invalida(archivo):
+    with pytest.raises(ValueError):
+        DiarioTareas(archivo, cargar_almacen(archivo), durabilidad="siempre")
+
+
+def test_durabilidad_inmediata_sincroniza_cada_registro(archivo, sincronizaciones):
+    almacen = cargar_almacen(archivo)
+    diario = DiarioTareas(archivo, almacen, durabilidad="inmediata")
+    for tarea_id in range(1, 11):
+        almacen.actualizar(tarea_id, estado="completada")
+    assert len(sincronizaciones) == 10
+    diario.cerrar(compactar=False)
+
+
+def test_confirmacion_en_grupo_comparte_el_fsync(archivo, sincronizaciones):
+    almacen = cargar_almacen(archivo)
+    diario = DiarioTareas(
+        archivo, almacen, durabilidad="grupo", ventana=0.05, esperar_escritura=False
+    )
+    for tarea_id in range(1, 21):
+        almacen.actualizar(tarea_id, estado="completada")
+    diario.esperar()
+
+    # Los 20 registros caen en la misma ventana (o en muy pocas)
+    assert 1 <= len(sincronizaciones) < 5
+    diario.cerrar(compactar=False)
+    assert filas(cargar_almacen(archivo)) == filas(almacen)
+
+
+def esperar_error(diario):
+    try:
+        diario.esperar()
+    except OSError as e:
+        return e
+    return None
+
+
+def test_error_del_fsync_en_grupo_llega_a_esperar(archivo, monkeypatch):
+    def fallar(descriptor):
+        raise OSError(errno.EIO, "error de E/S simulado")
+
+    almacen = cargar_almacen(archivo)
+    diario = DiarioTareas(
+        archivo, almacen, durabilidad="grupo", ventana=0, esperar_escritura=False
+    )
+    monkeypatch.setattr(os, "fsync", fallar)
+    almacen.actualizar(1, estado="completada")
+
+    # esperar() lanza el error en lugar de quedarse esperando para siempre
+    errores = []
+    hilo = threading.Thread(target=lambda: errores.append(esperar_error(diario)))
+    hilo.start()
+    hilo.join(10)
+    assert not hilo.is_alive()
+    assert errores[0].errno == errno.EIO
+
+    # También las escrituras siguientes que esperan su confirmación
+    diario.esperar_escritura = True
+    with pytest.raises(OSError):
+        almacen.actualizar(2, estado="completada")
+    monkeypatch.undo()
+    diario.cerrar(compactar=False)
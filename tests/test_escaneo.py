@@ -0,0 +1,117 @@
+"""
+Pruebas del escaneo en paralelo: búsqueda en columnas, resultados iguales
+al recorrido en serie y unión de las tareas cambiadas tras la instantánea.
+"""
+
+from array import array
+
+import pytest
+
+import almacen as modulo_almacen
+from almacen import AlmacenTareas
+from conftest import tareas_de_ejemplo
+from escaneo import EscaneoParalelo, buscar_en_columna, cumple_criterios
+
+FILAS = ["informe anual", "", "nada", "informe e informe", "x informe", "inf"]
+
+
+def columna(filas):
+    texto = b"".join(fila.encode("utf-8") + b"\x00" for fila in filas)
+    posiciones = array("q", [0])
+    for fila in filas:
+        posiciones.append(posiciones[-1] + len(fila.encode("utf-8")) + 1)
+    return texto, memoryview(posiciones)
+
+
+def es_urgente(tarea):
+    return tarea["prioridad"] == "alta" and "1" in tarea["titulo"]
+
+
+CONSULTAS = [
+    {"termino": "informe"},
+    {"termino": "INFORME", "estado": "pendiente"},
+    {"termino": "ión", "campos": ("titulo", "descripcion")},
+    {"termino": "zzz"},
+    {"prioridad": "baja"},
+    {"estado": "completada", "prioridad": "alta"},
+    {"predicado": es_urgente},
+]
+
+
+def en_serie(almacen, termino=None, campos=("titulo",), **criterios):
+    termino = termino.lower() if termino is not None else None
+    criterios = (
+        termino,
+        campos,
+        criterios.get("estado"),
+        criterios.get("prioridad"),
+        criterios.get("predicado"),
+    )
+    return [t["id"] for t in almacen if cumple_criterios(t, criterios)]
+
+
+def ids(tareas):
+    return [tarea["id"] for tarea in tareas]
+
+
+@pytest.fixture
+def almacen():
+    return AlmacenTareas(tareas_de_ejemplo(500))
+
+
+@pytest.mark.parametrize(
+    "termino, inicio, fin, esperadas",
+    [
+        ("informe", 0, 6, [0, 3, 4]),
+        ("inf", 0, 6, [0, 3, 4, 5]),
+        ("informe", 1, 4, [3]),
+        ("e x", 0, 6, []),  # No cruza el límite entre filas
+        ("nada", 3, 6, []),
+        ("", 1, 3, [1, 2]),
+    ],
+)
+def test_buscar_en_columna(termino, inicio, fin, esperadas):
+    texto, posiciones = columna(FILAS)
+    filas = buscar_en_columna(texto, posiciones, termino.encode(), inicio, fin)
+    assert filas == esperadas
+
+
+@pytest.mark.parametrize("procesos", [1, 2])
+@pytest.mark.parametrize("consulta", CONSULTAS)
+def test_escanear_igual_que_en_serie(almacen, procesos, consulta):
+    with EscaneoParalelo(almacen, procesos, umbral=0) as escaneo:
+        assert ids(escaneo.escanear(**consulta)) == en_serie(almacen, **consulta)
+
+
+def test_une_las_tareas_cambiadas_tras_la_instantanea(almacen):
+    with EscaneoParalelo(almacen, 1, umbral=0) as escaneo:
+        escaneo.escanear("informe")
+        directorio = escaneo._directorio
+
+        almacen.actualizar(1, titulo="informe nuevo")  # Ahora coincide
+        almacen.actualizar(4, titulo="ya no coincide")  # Antes coincidía
+        almacen.eliminar(9)
+        almacen.crear("informe creado", "", "pendiente", "alta")
+
+        for consulta in CONSULTAS:
+            assert ids(escaneo.escanear(**consulta)) == en_serie(
+                almacen, **consulta
+            )
+        # Pocos cambios: se evalúan aparte, sin rehacer la instantánea
+        assert escaneo._directorio == directorio
+
+        for tarea_id in range(10, 40):
+            almacen.actualizar(tarea_id, titulo=f"informe {tarea_id}")
+        assert ids(escaneo.escanear("informe")) == en_serie(almacen, "informe")
+        assert escaneo._directorio != directorio
+
+
+def test_buscar_usa_el_escaneo_en_almacenes_grandes(almacen, monkeypatch):
+    monkeypatch.setattr(modulo_almacen, "UMBRAL_ESCANEO_PARALELO", 100)
+    almacen.procesos_escaneo = 1
+    encontradas = ids(almacen.buscar("ión", ("titulo", "descripcion")))
+
+    assert almacen._escaneo is not None
+    assert encontradas == en_serie(almacen, "ión", ("titulo", "descripcion"))
+    almacen.cerrar_escaneo()
+    assert almacen._escaneo is None
@@ -0,0 +1,123 @@
+"""
+Pruebas del formato de archivo versión 2 (escapado de campos).
+"""
+
+import pytest
+
+from conftest import filas
+from diario import DiarioTareas
+from funciones import (
+    CABECERA_FORMATO,
+    cargar_almacen,
+    cargar_tareas,
+    desescapar_campo,
+    escapar_campo,
+    formatear_linea,
+    formatear_lote,
+    guardar_tareas,
+    migrar_formato,
+    parsear_bloque,
+)
+
+VALORES = [
+    "simple",
+    "con | barra",
+    "||",
+    "barra invertida \\ sola",
+    "\\p no es una barra",
+    "termina en \\",
+    "línea 1\nlínea 2",
+    "retorno\r\nde carro",
+    "ñandú 🦆 — ü",
+    "",
+]
+
+
+def con_valores():
+    return [
+        {
+            "id": i,
+            "titulo": valor,
+            "descripcion": f"desc {valor}",
+            "estado": "pendiente",
+            "prioridad": "alta",
+        }
+        for i, valor in enumerate(VALORES, 1)
+    ]
+
+
+@pytest.mark.parametrize("valor", VALORES)
+def test_escapar_y_desescapar_son_inversas(valor):
+    escapado = escapar_campo(valor)
+    assert "|" not in escapado
+    assert "\n" not in escapado
+    assert "\r" not in escapado
+    assert desescapar_campo(escapado) == valor
+
+
+@pytest.mark.parametrize("tarea", con_valores())
+def test_formatear_linea_una_sola_linea(tarea):
+    linea = formatear_linea(tarea)
+    assert linea.endswith("\n")
+    assert linea.count("\n") == 1
+    assert linea.count("|") == 4
+
+
+def test_lote_ida_y_vuelta():
+    tareas = con_valores()
+    leidas = []
+    parsear_bloque(formatear_lote(tareas), leidas)
+    assert leidas == tareas
+
+
+def test_lote_sin_caracteres_especiales_no_se_escapa():
+    tareas = con_valores()[:1]
+    assert formatear_lote(tareas) == formatear_linea(tareas[0])
+
+
+def test_guardar_y_cargar_ida_y_vuelta(tmp_path):
+    archivo = str(tmp_path / "tareas.txt")
+    tareas = con_valores()
+    assert guardar_tareas(tareas, archivo)
+
+    with open(archivo, encoding="utf-8") as f:
+        assert f.readline() == CABECERA_FORMATO + "\n"
+    assert cargar_tareas(archivo) == tareas
+    assert filas(cargar_almacen(archivo)) == filas(tareas)
+
+
+def test_diario_y_compactacion_conservan_los_caracteres(tmp_path):
+    archivo = str(tmp_path / "tareas.txt")
+    guardar_tareas([], archivo)
+    almacen = cargar_almacen(archivo)
+    diario = DiarioTareas(archivo, almacen)
+    for tarea in con_valores():
+        almacen.crear(tarea["titulo"], tarea["descripcion"], "pendiente", "alta")
+    diario.cerrar(compactar=False)
+    assert filas(cargar_almacen(archivo)) == filas(con_valores())
+
+    diario = DiarioTareas(archivo, cargar_almacen(archivo))
+    diario.cerrar(compactar=True)
+    assert filas(cargar_tareas(archivo)) == filas(con_valores())
+
+
+def test_migrar_formato_original(tmp_path):
+    archivo = tmp_path / "tareas.txt"
+    original = "1|uno|primera|pendiente|alta\n2|dos|segunda|completada|baja \n"
+    archivo.write_text(original, encoding="utf-8")
+
+    assert migrar_formato(str(archivo))
+    assert (tmp_path / "tareas.txt.v1.bak").read_text(encoding="utf-8") == original
+    assert archivo.read_text(encoding="utf-8").startswith(CABECERA_FORMATO + "\n")
+    assert filas(cargar_tareas(str(archivo))) == [
+        (1, "uno", "primera", "pendiente", "alta"),
+        (2, "dos", "segunda", "completada", "baja"),
+    ]
+    assert not migrar_formato(str(archivo))
+
+
+def test_formato_desconocido(tmp_path):
+    archivo = tmp_path / "tareas.txt"
+    archivo.write_text("#tareas v9\n1|a|b|pendiente|alta\n", encoding="utf-8")
+    with pytest.raises(ValueError):
+        cargar_tareas(str(archivo))
@@ -0,0 +1,45 @@
+"""
+Pruebas de la escritura atómica de instantáneas.
+"""
+
+import os
+
+import pytest
+
+from conftest import filas, tareas_de_ejemplo
+from funciones import archivo_atomico, cargar_tareas, guardar_tareas
+
+
+def test_archivo_atomico_reemplaza_al_terminar(tmp_path):
+    ruta = tmp_path / "datos.txt"
+    ruta.write_text("original\n", encoding="utf-8")
+    os.chmod(ruta, 0o600)
+
+    with archivo_atomico(str(ruta)) as f:
+        f.write("nuevo\n")
+        assert ruta.read_text(encoding="utf-8") == "original\n"
+
+    assert ruta.read_text(encoding="utf-8") == "nuevo\n"
+    assert os.stat(ruta).st_mode & 0o777 == 0o600
+    assert os.listdir(tmp_path) == ["datos.txt"]
+
+
+def test_archivo_atomico_conserva_el_original_si_falla(tmp_path):
+    ruta = tmp_path / "datos.txt"
+    ruta.write_text("original\n", encoding="utf-8")
+
+    with pytest.raises(RuntimeError):
+        with archivo_atomico(str(ruta)) as f:
+            f.write("a medio escribir")
+            raise RuntimeError("caída")
+
+    assert ruta.read_text(encoding="utf-8") == "original\n"
+    assert os.listdir(tmp_path) == ["datos.txt"]
+
+
+def test_guardar_tareas_fallido_conserva_el_archivo(archivo):
+    anteriores = cargar_tareas(archivo)
+    incompletas = tareas_de_ejemplo(10) + [{"id": 99}]
+    with pytest.raises(KeyError):
+        guardar_tareas(incompletas, archivo)
+    assert filas(cargar_tareas(archivo)) == filas(anteriores)
@@ -0,0 +1,200 @@
+"""
+Pruebas de la importación y exportación en CSV y JSON Lines.
+"""
+
+import csv
+import json
+
+import pytest
+
+from almacen import AlmacenTareas
+from cli import main
+from conftest import filas, tareas_de_ejemplo
+from diario import DiarioTareas
+from funciones import cargar_almacen, leer_diario
+from importacion import exportar_tareas, importar_tareas
+
+
+def escribir_csv(ruta, columnas, filas_csv):
+    with open(ruta, "w", encoding="utf-8", newline="") as f:
+        escritor = csv.writer(f)
+        escritor.writerow(columnas)
+        escritor.writerows(filas_csv)
+    return str(ruta)
+
+
+def leer_informe(ruta):
+    with open(ruta, encoding="utf-8", newline="") as f:
+        return list(csv.DictReader(f))
+
+
+@pytest.mark.parametrize("extension", ["csv", "jsonl"])
+def test_exportar_e_importar_ida_y_vuelta(tmp_path, extension):
+    tareas = tareas_de_ejemplo(30)
+    tareas[0]["titulo"] = 'Con "comillas", comas | y\nsalto'
+    ruta = str(tmp_path / f"tareas.{extension}")
+    assert exportar_tareas(AlmacenTareas(tareas), ruta) == 30
+
+    almacen = AlmacenTareas()
+    resumen = importar_tareas(almacen, ruta, conservar_ids=True)
+    assert resumen == {"leidas": 30, "importadas": 30, "rechazadas": 0}
+    assert filas(almacen) == filas(tareas)
+
+
+def test_exportar_una_consulta(tmp_path):
+    almacen = AlmacenTareas(tareas_de_ejemplo(30))
+    ruta = str(tmp_path / "pendientes.jsonl")
+    pendientes = (t for t in almacen if t["estado"] == "pendiente")
+    assert exportar_tareas(pendientes, ruta) == 10
+    with open(ruta, encoding="utf-8") as f:
+        assert {json.loads(linea)["estado"] for linea in f} == {"pendiente"}
+
+
+def test_filas_rechazadas_al_informe(tmp_path):
+    ruta = escribir_csv(
+        tmp_path / "entrada.csv",
+        ["titulo", "descripcion", "estado", "prioridad"],
+        [
+            ["válida", "uno", "2", "ALTA"],
+            ["", "sin título", "", ""],
+            ["estado malo", "dos", "terminada", "baja"],
+            ["prioridad mala", "tres", "pendiente", "urgente"],
+            ["por defecto", "cuatro", "", ""],
+        ],
+    )
+    informe = str(tmp_path / "rechazadas.csv")
+    almacen = AlmacenTareas(ultimo_id=10)
+    resumen = importar_tareas(almacen, ruta, informe=informe)
+
+    assert resumen == {"leidas": 5, "importadas": 2, "rechazadas": 3}
+    assert filas(almacen) == [
+        (11, "válida", "uno", "en_progreso", "alta"),
+        (12, "por defecto", "cuatro", "pendiente", "media"),
+    ]
+    rechazadas = leer_informe(informe)
+    assert [r["linea"] for r in rechazadas] == ["3", "4", "5"]
+    assert "título" in rechazadas[0]["motivo"]
+    assert "Estado inválido" in rechazadas[1]["motivo"]
+    assert "Prioridad inválida" in rechazadas[2]["motivo"]
+    assert json.loads(rechazadas[2]["fila"])["prioridad"] == "urgente"
+
+
+def test_lineas_json_invalidas(tmp_path):
+    ruta = tmp_path / "entrada.jsonl"
+    ruta.write_text(
+        '{"titulo": "una", "descripcion": "ok"}\n'
+        "{no es json\n"
+        "\n"
+        '["una", "lista"]\n'
+        '{"titulo": "dos", "descripcion": "ok", "estado": 3, "prioridad": null}\n',
+        encoding="utf-8",
+    )
+    informe = str(tmp_path / "rechazadas.csv")
+    almacen = AlmacenTareas()
+    resumen = importar_tareas(almacen, str(ruta), informe=informe)
+
+    assert resumen == {"leidas": 4, "importadas": 2, "rechazadas": 2}
+    assert [(t["estado"], t["prioridad"]) for t in almacen] == [
+        ("pendiente", "media"),
+        ("completada", "media"),
+    ]
+    rechazadas = leer_informe(informe)
+    assert [r["linea"] for r in rechazadas] == ["2", "4"]
+    assert rechazadas[0]["motivo"].startswith("JSON inválido")
+    assert rechazadas[1]["motivo"] == "Se esperaba un objeto JSON"
+
+
+def test_columnas_obligatorias(tmp_path):
+    ruta = escribir_csv(tmp_path / "entrada.csv", ["titulo", "estado"], [["a", "1"]])
+    with pytest.raises(ValueError, match="descripcion"):
+        importar_tareas(AlmacenTareas(), ruta)
+
+
+def test_formato_desconocido(tmp_path):
+    with pytest.raises(ValueError):
+        importar_tareas(AlmacenTareas(), str(tmp_path / "tareas.xml"))
+
+
+def test_ids_por_lote_y_un_registro_por_lote(archivo, tmp_path):
+    filas_csv = [[f"importada {i}", "desc", "", ""] for i in range(10)]
+    ruta = escribir_csv(tmp_path / "entrada.csv", ["titulo", "descripcion"], filas_csv)
+    almacen = cargar_almacen(archivo)
+    diario = DiarioTareas(archivo, almacen)
+    almacen.eliminar(50)
+    resumen = importar_tareas(almacen, ruta, tamano_lote=4)
+    diario.cerrar(compactar=False)
+
+    assert resumen["importadas"] == 10
+    # El ID eliminado (50) no se reutiliza
+    assert [t["id"] for t in almacen][-10:] == list(range(51, 61))
+    registros = [r["op"] for r in leer_diario(archivo)]
+    assert registros == ["eliminar"] + ["crear"] * 10
+    with open(archivo + ".log", encoding="utf-8") as f:
+        lineas = [json.loads(linea)["op"] for linea in f]
+    assert lineas == ["eliminar", "crear_lote", "crear_lote", "crear_lote"]
+    assert filas(cargar_almacen(archivo)) == filas(almacen)
+
+
+def test_conservar_ids_rechaza_los_existentes(tmp_path):
+    ruta = escribir_csv(
+        tmp_path / "entrada.csv",
+        ["id", "titulo", "descripcion"],
+        [["5", "existe", "x"], ["20", "nueva", "x"], ["20", "repetida", "x"]],
+    )
+    informe = str(tmp_path / "rechazadas.csv")
+    almacen = AlmacenTareas(tareas_de_ejemplo(10))
+    resumen = importar_tareas(almacen, ruta, informe=informe, conservar_ids=True)
+
+    assert resumen["importadas"] == 1
+    assert almacen.obtener(20)["titulo"] == "nueva"
+    assert almacen.obtener(5)["titulo"] != "existe"
+    assert [r["motivo"] for r in leer_informe(informe)] == [
+        "El ID 5 ya existe.",
+        "El ID 20 ya existe.",
+    ]
+
+
+def test_importar_y_exportar_desde_la_linea_de_comandos(archivo, tmp_path, capsys):
+    exportado = str(tmp_path / "pendientes.csv")
+    assert main(["--archivo", archivo, "exportar", exportado, "-e", "pendiente"]) == 0
+
+    otro = str(tmp_path / "otro.txt")
+    assert main(["--archivo", otro, "importar", exportado]) == 0
+    assert "16 tareas importadas" in capsys.readouterr().out
+    assert [t["id"] for t in cargar_almacen(otro)] == list(range(1, 17))
+
+
+def test_conservar_ids_no_revive_ids_eliminados(tmp_path):
+    ruta = escribir_csv(
+        tmp_path / "entrada.csv",
+        ["id", "titulo", "descripcion"],
+        [["8", "eliminada", "x"], ["15", "nueva", "x"]],
+    )
+    informe = str(tmp_path / "rechazadas.csv")
+    almacen = AlmacenTareas(tareas_de_ejemplo(10))
+    almacen.eliminar(8)
+    almacen.eliminar(10)
+    resumen = importar_tareas(almacen, ruta, informe=informe, conservar_ids=True)
+
+    assert resumen["importadas"] == 1
+    assert almacen.obtener(8) is None
+    assert almacen.obtener(15)["titulo"] == "nueva"
+    assert [r["motivo"] for r in leer_informe(informe)] == [
+        "El ID 8 ya se usó (tarea eliminada)."
+    ]
+
+
+def test_ids_asignados_no_chocan_con_los_conservados(tmp_path):
+    ruta = escribir_csv(
+        tmp_path / "entrada.csv",
+        ["id", "titulo", "descripcion"],
+        [["", "auto 1", "x"], ["12", "conservada", "x"], ["", "auto 2", "x"]],
+    )
+    almacen = AlmacenTareas(tareas_de_ejemplo(10))
+    resumen = importar_tareas(almacen, ruta, conservar_ids=True)
+
+    assert resumen == {"leidas": 3, "importadas": 3, "rechazadas": 0}
+    assert almacen.obtener(12)["titulo"] == "conservada"
+    assert almacen.obtener(13)["titulo"] == "auto 1"
+    assert almacen.obtener(14)["titulo"] == "auto 2"
+    assert almacen.ultimo_id == 14
@@ -0,0 +1,137 @@
+"""
+Pruebas del índice de trigramas: resultados iguales a recorrer todas las
+tareas y descarte del índice guardado cuando los datos cambian.
+"""
+
+import os
+
+import pytest
+
+from almacen import AlmacenTareas
+from conftest import en_otro_proceso, tareas_de_ejemplo
+from diario import DiarioTareas
+from funciones import cargar_almacen
+from indice_texto import (
+    IndiceTexto,
+    activar_indice_texto,
+    cargar_indice_texto,
+    guardar_indice_texto,
+)
+TERMINOS = ["i", "in", "inf", "INF", "nfo", "informe", "e v", "ón", "ión 1", "zzz"]
+
+
+def recorrer(almacen, termino, campos=("titulo",)):
+    termino = termino.lower()
+    return [
+        t["id"]
+        for t in almacen
+        if any(termino in t[campo].lower() for campo in campos)
+    ]
+
+
+def buscar(almacen, termino, campos=("titulo",)):
+    return [t["id"] for t in almacen.buscar(termino, campos)]
+
+
+@pytest.fixture
+def almacen():
+    almacen = AlmacenTareas(tareas_de_ejemplo(300))
+    almacen.indice_texto = IndiceTexto.construir(almacen)
+    return almacen
+
+
+@pytest.mark.parametrize("termino", TERMINOS)
+def test_buscar_con_indice_igual_que_sin_indice(almacen, termino):
+    assert buscar(almacen, termino) == recorrer(almacen, termino)
+
+
+@pytest.mark.parametrize("termino", TERMINOS)
+def test_indice_al_dia_tras_cambios(almacen, termino):
+    # Tras cada cambio, el atajo de los términos de 3 caracteres (todas las
+    # candidatas coinciden) solo es correcto si el índice sigue al día
+    almacen.actualizar(4, titulo="sin coincidencias")
+    almacen.actualizar(7, titulo="INFO nueva")
+    almacen.actualizar(9, descripcion="informe en la descripción")
+    almacen.eliminar(1)
+    almacen.crear("nfo suelto", "", "pendiente", "alta")
+    assert buscar(almacen, termino) == recorrer(almacen, termino)
+
+
+def test_campos_fuera_del_indice_recorren_todo(almacen):
+    almacen.actualizar(9, descripcion="informe en la descripción")
+    campos = ("titulo", "descripcion")
+    assert buscar(almacen, "nfo", campos) == recorrer(almacen, "nfo", campos)
+    assert 9 in buscar(almacen, "informe", campos)
+
+
+def test_indice_guardado_se_reutiliza(archivo):
+    almacen = cargar_almacen(archivo)
+    indice = activar_indice_texto(almacen, archivo)
+    assert guardar_indice_texto(indice, archivo)
+
+    cargado = cargar_indice_texto(archivo)
+    assert cargado is not None
+    assert cargado._trigramas == indice._trigramas
+    assert cargar_indice_texto(archivo, campos=("titulo", "descripcion")) is None
+
+
+def test_indice_corrupto_se_descarta(archivo):
+    guardar_indice_texto(IndiceTexto.construir(cargar_almacen(archivo)), archivo)
+    with open(archivo + ".trg", "r+b") as f:
+        f.truncate(10)
+    assert cargar_indice_texto(archivo) is None
+
+
+def test_cambio_en_otro_proceso_invalida_el_indice(archivo):
+    guardar_indice_texto(IndiceTexto.construir(cargar_almacen(archivo)), archivo)
+    en_otro_proceso(
+        """
+        from diario import DiarioTareas
+        from funciones import cargar_almacen
+
+        almacen = cargar_almacen(ARCHIVO)
+        diario = DiarioTareas(ARCHIVO, almacen)
+        almacen.actualizar(2, titulo="informe de otro proceso")
+        diario.cerrar(compactar=False)
+        """,
+        archivo,
+    )
+    # Solo cambió el diario: la firma lo detecta
+    assert cargar_indice_texto(archivo) is None
+
+    almacen = cargar_almacen(archivo)
+    activar_indice_texto(almacen, archivo)
+    assert 2 in buscar(almacen, "informe")
+
+
+def test_compactacion_invalida_el_indice(archivo):
+    almacen = cargar_almacen(archivo)
+    diario = DiarioTareas(archivo, almacen)
+    almacen.actualizar(2, titulo="informe")
+    diario.cerrar(compactar=False)
+    indice = activar_indice_texto(cargar_almacen(archivo), archivo)
+    guardar_indice_texto(indice, archivo)
+    assert cargar_indice_texto(archivo) is not None
+
+    en_otro_proceso(
+        """
+        from diario import DiarioTareas
+        from funciones import cargar_almacen
+
+        DiarioTareas(ARCHIVO, cargar_almacen(ARCHIVO)).cerrar(compactar=True)
+        """,
+        archivo,
+    )
+    assert os.path.getsize(archivo + ".log") == 0
+    assert cargar_indice_texto(archivo) is None
+
+
+def test_instantanea_reescrita_con_el_mismo_tamano(archivo):
+    guardar_indice_texto(IndiceTexto.construir(cargar_almacen(archivo)), archivo)
+    with open(archivo, "r+", encoding="utf-8") as f:
+        texto = f.read()
+        f.seek(0)
+        f.write(texto.replace("Informe mensual 5", "Xnforme mensual 5"))
+    estado = os.stat(archivo)
+    os.utime(archivo, ns=(estado.st_atime_ns, estado.st_mtime_ns + 1_000_000))
+    assert cargar_indice_texto(archivo) is None
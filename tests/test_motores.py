@@ -0,0 +1,109 @@
+"""
+Pruebas de paridad entre motores: las mismas operaciones sobre cada motor
+dan los mismos resultados que sobre una lista de diccionarios.
+"""
+
+import pytest
+
+from almacen import ConflictoEscritura, Tarea
+from almacenamiento import migrar_almacenamiento, obtener_motor
+from conftest import filas, tareas_de_ejemplo
+from funciones import (
+    actualizar_tarea,
+    buscar_por_titulo,
+    crear_tarea,
+    eliminar_tarea,
+    filtrar_tareas,
+    obtener_estadisticas,
+)
+
+
+def modificar(tareas):
+    crear_tarea(tareas, "Informe | anual", "con\nsalto", "Pendiente", "ALTA")
+    crear_tarea(tareas, "revisión ñ", "", "en progreso", "baja")
+    actualizar_tarea(tareas, 5, titulo="informe corregido", estado="completada")
+    actualizar_tarea(tareas, 6, prioridad="alta")
+    eliminar_tarea(tareas, 8)
+
+
+@pytest.fixture(scope="module")
+def referencia():
+    tareas = tareas_de_ejemplo(300)
+    modificar(tareas)
+    return tareas
+
+
+@pytest.fixture
+def almacen(motor):
+    motor.guardar(tareas_de_ejemplo(300))
+    almacen = motor.abrir(umbral=float("inf"))
+    modificar(almacen)
+    yield almacen
+    motor.cerrar(almacen, compactar=False)
+
+
+def test_mismas_tareas(almacen, referencia):
+    assert len(almacen) == len(referencia)
+    assert sorted(filas(almacen)) == sorted(filas(referencia))
+
+
+def test_cambios_persisten(almacen, motor, referencia):
+    motor.cerrar(almacen, compactar=False)
+    assert sorted(filas(motor.abrir(diario=False))) == sorted(filas(referencia))
+
+
+@pytest.mark.parametrize("termino", ["informe", "INFORME", "ñ", "|", "zzz"])
+def test_buscar(almacen, referencia, termino):
+    assert filas(buscar_por_titulo(almacen, termino)) == filas(
+        buscar_por_titulo(referencia, termino)
+    )
+
+
+@pytest.mark.parametrize(
+    "estado, prioridad",
+    [("pendiente", None), (None, "ALTA"), ("Completada", "baja"), ("otro", None)],
+)
+def test_filtrar(almacen, referencia, estado, prioridad):
+    assert filas(filtrar_tareas(almacen, estado, prioridad)) == filas(
+        filtrar_tareas(referencia, estado, prioridad)
+    )
+
+
+def test_estadisticas(almacen, referencia):
+    assert obtener_estadisticas(almacen) == obtener_estadisticas(referencia)
+
+
+def test_lote(almacen, motor):
+    with almacen.lote():
+        for i in range(5):
+            almacen.crear(f"en lote {i}", "", "pendiente", "media")
+        almacen.eliminar(1)
+    esperado = filas(almacen)
+    motor.cerrar(almacen, compactar=False)
+    assert filas(motor.abrir(diario=False)) == esperado
+
+
+def test_campos_de_las_tareas_nuevas_tienen_version(almacen):
+    creada = almacen.crear("nueva", "", "pendiente", "media")
+    [en_lote] = almacen.agregar_lote(
+        [Tarea(almacen.proximo_id(), "en lote", "", "pendiente", "media")]
+    )
+    for tarea in (creada, en_lote):
+        # Quien leyó antes de la creación no pisa sus campos
+        anterior = almacen.version_de(tarea["id"]) - 1
+        with pytest.raises(ConflictoEscritura):
+            almacen.actualizar(tarea["id"], titulo="otro", version=anterior)
+
+
+def test_migrar_texto_a_sqlite_y_vuelta(tmp_path):
+    texto = obtener_motor("texto", str(tmp_path / "tareas.txt"))
+    texto.guardar(tareas_de_ejemplo(100))
+    sqlite = obtener_motor("sqlite", str(tmp_path / "tareas.db"))
+    assert migrar_almacenamiento(texto, sqlite) == 100
+
+    copia = obtener_motor("texto", str(tmp_path / "copia.txt"))
+    assert migrar_almacenamiento(sqlite, copia) == 100
+    original = texto.abrir(diario=False)
+    migrado = copia.abrir(diario=False)
+    assert filas(migrado) == filas(original)
+    assert migrado.proximo_id() == original.proximo_id()
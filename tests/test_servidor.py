@@ -0,0 +1,151 @@
+"""
+Pruebas del servidor HTTP: cuerpos incompletos, errores inesperados y
+escrituras mientras otro proceso tiene el cerrojo de escritura.
+"""
+
+import asyncio
+import json
+import os
+import subprocess
+import sys
+from contextlib import asynccontextmanager
+
+import servidor
+from conftest import RAIZ
+from servidor import LIMITE_CABECERAS, ServidorTareas
+
+RETENER_CERROJO = """
+import sys
+from almacenamiento import obtener_motor
+
+motor = obtener_motor(sys.argv[1], sys.argv[2])
+tareas = motor.abrir()
+with tareas.escritura():
+    print("tomado", flush=True)
+    sys.stdin.readline()
+motor.cerrar(tareas)
+"""
+
+CUERPO = json.dumps({"titulo": "nueva", "descripcion": "desde http"}).encode()
+CREAR = (
+    b"POST /tareas HTTP/1.1\r\nConnection: close\r\n"
+    + b"Content-Length: %d\r\n\r\n" % len(CUERPO)
+    + CUERPO
+)
+
+
+@asynccontextmanager
+async def en_marcha(motor):
+    """
+    Atiende peticiones sobre el almacén del motor en un puerto libre.
+    """
+    tareas = motor.abrir(
+        indice_texto=True, perezoso=False, esperar_escritura=False, durabilidad="grupo"
+    )
+    aplicacion = ServidorTareas(motor, tareas)
+    escucha = await asyncio.start_server(
+        aplicacion.atender, "127.0.0.1", 0, limit=LIMITE_CABECERAS
+    )
+    try:
+        yield escucha.sockets[0].getsockname()[1]
+    finally:
+        escucha.close()
+        await escucha.wait_closed()
+        motor.cerrar(tareas)
+
+
+async def enviar(puerto, peticion):
+    """
+    Envía una petición y lee hasta que el servidor cierra la conexión.
+    """
+    lector, escritor = await asyncio.open_connection("127.0.0.1", puerto)
+    escritor.write(peticion)
+    await escritor.drain()
+    try:
+        return await asyncio.wait_for(lector.read(), 10)
+    finally:
+        escritor.close()
+
+
+def codigo(respuesta):
+    return int(respuesta.split(b" ", 2)[1])
+
+
+def test_cuerpo_incompleto_cierra_la_conexion(motor, monkeypatch):
+    monkeypatch.setattr(servidor, "TIEMPO_INACTIVIDAD", 0.2)
+
+    async def probar():
+        async with en_marcha(motor) as puerto:
+            # Faltan bytes del cuerpo: se cierra sin responder tras la espera
+            parcial = b"POST /tareas HTTP/1.1\r\nContent-Length: 40\r\n\r\n{}"
+            assert await enviar(puerto, parcial) == b""
+
+            # El cliente cierra a mitad del cuerpo
+            lector, escritor = await asyncio.open_connection("127.0.0.1", puerto)
+            escritor.write(parcial)
+            escritor.write_eof()
+            assert await asyncio.wait_for(lector.read(), 10) == b""
+            escritor.close()
+
+            # El servidor sigue atendiendo
+            peticion = b"GET /tareas HTTP/1.1\r\nConnection: close\r\n\r\n"
+            assert codigo(await enviar(puerto, peticion)) == 200
+
+    asyncio.run(probar())
+
+
+def test_error_inesperado_responde_500_y_cierra(motor, monkeypatch, capsys):
+    def fallar(self, consulta):
+        raise RuntimeError("fallo de prueba")
+
+    monkeypatch.setattr(ServidorTareas, "listar", fallar)
+
+    async def probar():
+        async with en_marcha(motor) as puerto:
+            respuesta = await enviar(puerto, b"GET /tareas HTTP/1.1\r\n\r\n")
+            assert codigo(respuesta) == 500
+            assert b"Connection: close" in respuesta
+
+    asyncio.run(probar())
+    assert "fallo de prueba" in capsys.readouterr().err
+
+
+def test_escritura_no_bloquea_el_bucle_con_el_cerrojo_ocupado(motor, monkeypatch):
+    procesos = []
+
+    async def probar():
+        async with en_marcha(motor) as puerto:
+            # El otro proceso toma el cerrojo una vez abierto el almacén
+            otro = subprocess.Popen(
+                [sys.executable, "-c", RETENER_CERROJO, motor.nombre, motor.archivo],
+                env=dict(os.environ, PYTHONPATH=RAIZ),
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                text=True,
+            )
+            procesos.append(otro)
+            assert otro.stdout.readline() == "tomado\n"
+
+            # Con el cerrojo ocupado más del límite, la escritura responde 503
+            monkeypatch.setattr(servidor, "TIEMPO_ESPERA_CERROJO", 0.05)
+            assert codigo(await enviar(puerto, CREAR)) == 503
+            monkeypatch.setattr(servidor, "TIEMPO_ESPERA_CERROJO", 30.0)
+
+            # Mientras la escritura espera, las lecturas se siguen atendiendo
+            escritura = asyncio.ensure_future(enviar(puerto, CREAR))
+            peticion = b"GET /estadisticas HTTP/1.1\r\nConnection: close\r\n\r\n"
+            assert codigo(await enviar(puerto, peticion)) == 200
+            assert not escritura.done()
+
+            otro.stdin.write("\n")
+            otro.stdin.flush()
+            respuesta = await escritura
+            assert codigo(respuesta) == 201
+            assert json.loads(respuesta.partition(b"\r\n\r\n")[2])["id"] == 1
+
+    try:
+        asyncio.run(probar())
+    finally:
+        for otro in procesos:
+            otro.communicate("\n", timeout=60)
+    assert [otro.returncode for otro in procesos] == [0]